@@ -42,7 +42,8 @@ from app.crud.crud_application import (
     crud_application_document
 )
 from app.crud.crud_license import crud_license
-from app.services.image_service import ImageProcessingService
+from app.services.image_service import ImageProcessingService, run_image_task, read_upload_limited
+from app.services.biometric_derivatives import biometric_derivative_cache, DERIVATIVE_VARIANTS, UnreadableImageError
 from app.core.config import get_settings
 from app.core.audit_decorators import audit_create, audit_update, audit_delete, get_application_by_id
 
@@ -1534,6 +1535,13 @@ def download_application_document(
     )
 
 
+def _write_upload(file_path: Path, content: bytes):
+    """Write an uploaded file to storage (blocking)"""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(content)
+
+
 @router.post("/{application_id}/biometric-data")
 async def upload_biometric_data(
     *,
@@ -1594,9 +1602,13 @@ async def upload_biometric_data(
         
         # Process based on data type
         if data_type.upper() == "PHOTO":
-            # Process license photo with ISO standards
-            result = ImageProcessingService.process_license_photo(
-                image_file=file,
+            # Process license photo with ISO standards (off the event loop)
+            image_data = await read_upload_limited(file)
+            result = await run_image_task(
+                ImageProcessingService.process_license_photo_data,
+                image_data=image_data,
+                content_type=file.content_type,
+                original_filename=file.filename,
                 storage_path=storage_path,
                 filename_prefix=f"license_photo_{application_id}"
             )
@@ -1718,15 +1730,10 @@ async def upload_biometric_data(
             filename = f"{data_type.lower()}_{application_id}_{uuid.uuid4()}.{file_extension}"
             file_path = storage_path / filename
             
-            # Ensure directory exists
-            storage_path.mkdir(parents=True, exist_ok=True)
-            
             # Save file
-            file_content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-            
-            file_size = file_path.stat().st_size
+            file_content = await read_upload_limited(file)
+            await run_image_task(_write_upload, file_path, file_content)
+            file_size = len(file_content)
             
             # Store biometric data record in database
             biometric_data_create = ApplicationBiometricDataCreate(
@@ -1991,9 +1998,13 @@ async def process_biometric_image(
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_path = Path(temp_dir)
                 
-                # Process the image
-                result = ImageProcessingService.process_license_photo(
-                    image_file=file,
+                # Process the image (off the event loop)
+                image_data = await read_upload_limited(file)
+                result = await run_image_task(
+                    ImageProcessingService.process_license_photo_data,
+                    image_data=image_data,
+                    content_type=file.content_type,
+                    original_filename=file.filename,
                     storage_path=temp_path,
                     filename_prefix="temp_license_photo"
                 )
@@ -2028,7 +2039,7 @@ async def process_biometric_image(
             import base64
             
             # Read and encode the file
-            file_content = await file.read()
+            file_content = await read_upload_limited(file)
             file_base64 = base64.b64encode(file_content).decode('utf-8')
             
             # Determine format from content type
@@ -2844,15 +2855,35 @@ def get_person_card_data(
         )
 
 
+@router.get("/biometric-derivatives/stats")
+def get_biometric_derivative_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Thumbnail/WebP derivative cache counters (hits, misses, evictions) and size
+    
+    Requires: applications.read permission
+    """
+    if not current_user.has_permission("applications.read"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to view file statistics"
+        )
+    return {"variants": DERIVATIVE_VARIANTS, **biometric_derivative_cache.stats()}
+
+
 @router.get("/files/{file_path:path}")
 def serve_biometric_file(
     file_path: str,
     request: Request,
+    variant: Optional[str] = Query(None, description=f"Image derivative to serve instead of the original: {', '.join(DERIVATIVE_VARIANTS)}"),
     db: Session = Depends(get_db)
 ):
     """
     Serve biometric files (photos, signatures, fingerprints)
     
+    Pass variant (e.g. thumb, thumb-webp) to get a cached resized/re-encoded copy.
+    
     Requires: applications.read permission
     """
     from fastapi.responses import FileResponse
@@ -2968,6 +2999,21 @@ def serve_biometric_file(
     elif file_path.lower().endswith('.pdf'):
         content_type = "application/pdf"
     
+    if variant:
+        try:
+            derivative_path = biometric_derivative_cache.get(full_file_path, variant)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        except UnreadableImageError as e:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+        return FileResponse(
+            path=derivative_path,
+            media_type=biometric_derivative_cache.media_type(variant),
+            filename=derivative_path.name
+        )
+    
     return FileResponse(
         path=full_file_path,
         media_type=content_type,
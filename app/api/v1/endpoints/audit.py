@@ -4,12 +4,18 @@ Provides access to comprehensive audit logs and security monitoring
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
+import csv
+import io
+import json
 import uuid
+import zlib
 from datetime import datetime, timezone, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.user import User, UserAuditLog, ApiRequestLog
 from app.services.audit_service import MadagascarAuditService, create_user_context
@@ -662,39 +668,117 @@ async def get_audit_statistics(
     }
 
 
+AUDIT_EXPORT_FETCH_SIZE = 1000  # Rows per server-side cursor fetch
+AUDIT_EXPORT_CHUNK_BYTES = 64 * 1024  # Response chunk size before compression
+AUDIT_EXPORT_CSV_HEADER = [
+    "Timestamp", "Action", "Resource", "Resource ID", "User ID",
+    "IP Address", "Success", "Error Message", "Details"
+]
+AUDIT_EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _audit_export_chunks(criteria: list, export_format: str, export_metadata: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Stream matching audit logs as encoded CSV/JSON/NDJSON chunks
+    
+    Rows are fetched through a server-side cursor (yield_per) on a dedicated
+    session and written into a small buffer that is flushed every
+    AUDIT_EXPORT_CHUNK_BYTES, so memory stays constant regardless of row count.
+    """
+    db = SessionLocal()
+    try:
+        audit_service = MadagascarAuditService(db)
+        query = db.query(UserAuditLog).filter(*criteria).order_by(
+            UserAuditLog.created_at.desc()
+        ).yield_per(AUDIT_EXPORT_FETCH_SIZE)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(AUDIT_EXPORT_CSV_HEADER)
+        elif export_format == "json":
+            buffer.write('{"export_metadata": ')
+            buffer.write(json.dumps(export_metadata, default=str))
+            buffer.write(', "audit_logs": [')
+        
+        first = True
+        for log in query:
+            if export_format == "csv":
+                writer.writerow([
+                    log.created_at.isoformat(),
+                    log.action,
+                    log.resource,
+                    log.resource_id,
+                    str(log.user_id) if log.user_id else "",
+                    log.ip_address,
+                    log.success,
+                    log.error_message or "",
+                    log.details or ""
+                ])
+            elif export_format == "ndjson":
+                buffer.write(json.dumps(audit_service._audit_log_to_dict(log), default=str))
+                buffer.write("\n")
+            else:
+                buffer.write("\n" if first else ",\n")
+                buffer.write(json.dumps(audit_service._audit_log_to_dict(log), default=str))
+            first = False
+            
+            if buffer.tell() >= AUDIT_EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        if export_format == "json":
+            buffer.write("\n]}\n")
+        yield buffer.getvalue().encode()
+    finally:
+        db.close()
+
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
 @router.post("/export", summary="Export Audit Logs")
 async def export_audit_logs(
     request: Request,
-    export_format: str = Query("csv", pattern="^(csv|json)$", description="Export format"),
+    export_format: str = Query("csv", pattern="^(csv|json|ndjson)$", description="Export format"),
     action_type: Optional[str] = Query(None, description="Filter by action type"),
     resource_type: Optional[str] = Query(None, description="Filter by resource type"),
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
     start_date: Optional[datetime] = Query(None, description="Start date filter"),
     end_date: Optional[datetime] = Query(None, description="End date filter"),
+    compress: bool = Query(False, description="Gzip the export on the fly"),
     current_user: User = Depends(require_permission("audit.export")),
     db: Session = Depends(get_db)
 ):
     """
     Export audit logs with filtering
+    Streams rows as they are read, so exports of any size run in constant memory
     Requires audit.export permission
     """
-    from app.models.user import UserAuditLog
-    import csv
-    import io
-    from fastapi.responses import StreamingResponse
-    
-    # Build query with filters
-    query = db.query(UserAuditLog)
+    # Build filters
+    criteria = []
     
     if action_type:
-        query = query.filter_by(action=action_type)
+        criteria.append(UserAuditLog.action == action_type)
     
     if resource_type:
-        query = query.filter_by(resource=resource_type)
+        criteria.append(UserAuditLog.resource == resource_type)
     
     if user_id:
         try:
-            query = query.filter_by(user_id=uuid.UUID(user_id))
+            criteria.append(UserAuditLog.user_id == uuid.UUID(user_id))
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -702,90 +786,50 @@ async def export_audit_logs(
             )
     
     if start_date:
-        query = query.filter(UserAuditLog.created_at >= start_date)
+        criteria.append(UserAuditLog.created_at >= start_date)
     
     if end_date:
-        query = query.filter(UserAuditLog.created_at <= end_date)
+        criteria.append(UserAuditLog.created_at <= end_date)
     
-    # Get all matching logs
-    logs = query.order_by(UserAuditLog.created_at.desc()).all()
+    record_count = db.query(func.count(UserAuditLog.id)).filter(*criteria).scalar()
+    filters = {
+        "action_type": action_type,
+        "resource_type": resource_type,
+        "user_id": user_id,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None
+    }
     
     # Log the export action
     audit_service = MadagascarAuditService(db)
     user_context = create_user_context(current_user, request)
     audit_service.log_export_action(
         export_type="AUDIT_LOGS",
-        filters={
-            "action_type": action_type,
-            "resource_type": resource_type,
-            "user_id": user_id,
-            "start_date": start_date.isoformat() if start_date else None,
-            "end_date": end_date.isoformat() if end_date else None,
-            "format": export_format
-        },
-        record_count=len(logs),
+        filters={**filters, "format": export_format},
+        record_count=record_count,
         user_context=user_context,
         screen_reference="AuditExportPage"
     )
     
-    if export_format == "csv":
-        # Generate CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            "Timestamp", "Action", "Resource", "Resource ID", "User ID",
-            "IP Address", "Success", "Error Message", "Details"
-        ])
-        
-        # Write data
-        for log in logs:
-            writer.writerow([
-                log.created_at.isoformat(),
-                log.action,
-                log.resource,
-                log.resource_id,
-                str(log.user_id) if log.user_id else "",
-                log.ip_address,
-                log.success,
-                log.error_message or "",
-                log.details or ""
-            ])
-        
-        output.seek(0)
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode()),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-        )
-    
-    else:  # JSON format
-        audit_service = MadagascarAuditService(db)
-        json_data = {
-            "export_metadata": {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "exported_by": current_user.username,
-                "total_records": len(logs),
-                "filters": {
-                    "action_type": action_type,
-                    "resource_type": resource_type,
-                    "user_id": user_id,
-                    "start_date": start_date.isoformat() if start_date else None,
-                    "end_date": end_date.isoformat() if end_date else None
-                }
-            },
-            "audit_logs": [audit_service._audit_log_to_dict(log) for log in logs]
-        }
-        
-        import json
-        json_str = json.dumps(json_data, indent=2, default=str)
-        
-        return StreamingResponse(
-            io.BytesIO(json_str.encode()),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"}
-        )
+    export_metadata = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "exported_by": current_user.username,
+        "total_records": record_count,
+        "filters": filters
+    }
+    chunks = _audit_export_chunks(criteria, export_format, export_metadata)
+    media_type = AUDIT_EXPORT_MEDIA_TYPES[export_format]
+    filename = f"audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 
 # API Request Log Endpoints (Middleware Logs)
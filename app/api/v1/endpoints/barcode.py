@@ -6,11 +6,14 @@ Handles PDF417 barcode generation, decoding, and testing
 import json
 import uuid
 import base64
-from typing import Dict, Any, Optional, List
+from pathlib import Path
+from typing import Dict, Any, Optional, List, AsyncIterator
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
+from app.core.config import get_settings
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.user import User
@@ -18,6 +21,7 @@ from app.models.license import License
 from app.models.person import Person
 from app.models.card import Card
 from app.services.barcode_service import barcode_service, BarcodeGenerationError, BarcodeDecodingError
+from app.services.barcode_batch import generate_barcodes, decode_barcodes
 from app.crud.crud_license import crud_license
 from app.crud.crud_card import crud_card
 
@@ -129,6 +133,16 @@ class BarcodeDecodingResponse(BaseModel):
         }
 
 
+class BarcodeBatchGenerationRequest(BaseModel):
+    """Request model for generating many barcodes in one call"""
+    items: List[BarcodeGenerationRequest] = Field(..., min_length=1)
+
+
+class BarcodeBatchDecodingRequest(BaseModel):
+    """Request model for decoding many scanned barcodes in one call"""
+    barcodes: List[str] = Field(..., min_length=1, description="Hex strings from PDF417 barcode scans")
+
+
 class TestBarcodeRequest(BaseModel):
     """Request model for testing barcode with standardized Madagascar license format"""
     # Field 1: Initials and surname
@@ -185,6 +199,77 @@ class TestBarcodeRequest(BaseModel):
         }
 
 
+def _barcode_photo_path(license: License) -> Optional[Path]:
+    """Absolute path of the license photo embedded in barcodes"""
+    if not license.photo_file_path:
+        return None
+    return Path(get_settings().get_file_storage_path()) / license.photo_file_path
+
+
+def _barcode_inputs(license: License, person: Person, card: Optional[Card]):
+    """Person, license and card data for V4 barcode generation (standardized format)"""
+    person_data = {
+        "first_name": person.first_name,
+        "last_name": person.surname,
+        "date_of_birth": person.birth_date.strftime('%Y%m%d') if person.birth_date else '',
+        "gender": "M" if person.person_nature == "01" else "F"
+    }
+    
+    license_data = {
+        "license_codes": [license.category.value] if license.category else ['B'],
+        "vehicle_restrictions": [],  # Can be expanded based on license data
+        "driver_restrictions": []   # Can be expanded based on license data  
+    }
+    
+    card_data = {
+        "card_number": card.card_number if card else f"MG{license.id:010d}"
+    }
+    return person_data, license_data, card_data
+
+
+def _barcode_response_data(person_data: Dict[str, Any], license_data: Dict[str, Any],
+                           card_data: Dict[str, Any], has_photo: bool) -> Dict[str, Any]:
+    """Simplified V4 format info returned with a generated barcode"""
+    return {
+        "format": "standardized_madagascar_v4",
+        "encryption": "static_key_xor",
+        "compression": "zlib_level_9",
+        "person_name": f"{person_data['first_name']} {person_data['last_name']}",
+        "license_codes": license_data['license_codes'],
+        "has_photo": has_photo,
+        "card_number": card_data['card_number']
+    }
+
+
+def _v4_license_info(decoded_data: Dict[str, Any]) -> Dict[str, Any]:
+    """License info summary for a decoded V4 barcode"""
+    return {
+        "format": "standardized_madagascar_v4",
+        "decryption": "static_key_xor_successful",
+        "compression": "zlib_decompressed",
+        "total_fields": 9,
+        "data_integrity": "verified",
+        "person_summary": f"{decoded_data['person_name']} ({decoded_data['sex']})",
+        "license_summary": f"License {decoded_data['license_number']} - Codes: {', '.join(decoded_data['license_codes']) or 'None'}",
+        "validity_summary": f"Valid: {decoded_data['valid_from']} to {decoded_data['valid_to']}",
+        "restrictions_summary": f"Vehicle: {', '.join(decoded_data['vehicle_restrictions']) or 'None'}, Driver: {', '.join(decoded_data['driver_restrictions']) or 'None'}",
+        "image_summary": f"Photo: {'Present' if decoded_data['has_image'] else 'Not present'} ({decoded_data['image_size_bytes']} bytes)"
+    }
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+
+def _check_batch_size(size: int):
+    max_size = get_settings().MAX_BARCODE_BATCH_SIZE
+    if size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large: {size} items (maximum {max_size})"
+        )
+
+
 @router.post(
     "/generate",
     response_model=BarcodeGenerationResponse,
@@ -203,8 +288,6 @@ async def generate_license_barcode(
 ):
     """Generate V4 PDF417 barcode for a specific license"""
     try:
-        import base64
-        import zlib
         # Get license
         license = crud_license.get(db, id=request.license_id)
         if not license:
@@ -233,11 +316,9 @@ async def generate_license_barcode(
         
         # Load photo data if requested
         photo_data = None
-        if request.include_photo and license.photo_file_path:
+        photo_path = _barcode_photo_path(license) if request.include_photo else None
+        if photo_path:
             try:
-                from pathlib import Path
-                from app.core.config import settings
-                photo_path = Path(settings.get_file_storage_path()) / license.photo_file_path
                 if photo_path.exists():
                     with open(photo_path, 'rb') as f:
                         photo_data = f.read()
@@ -245,56 +326,24 @@ async def generate_license_barcode(
                 # Continue without photo if there's an error
                 pass
         
-        # Prepare data for V4 barcode generation (standardized format)
-        person_data = {
-            "first_name": person.first_name,
-            "last_name": person.surname,
-            "date_of_birth": person.birth_date.strftime('%Y%m%d') if person.birth_date else '',
-            "gender": "M" if person.person_nature == "01" else "F"
-        }
-        
-        license_data = {
-            "license_codes": [license.category.value] if license.category else ['B'],
-            "vehicle_restrictions": [],  # Can be expanded based on license data
-            "driver_restrictions": []   # Can be expanded based on license data  
-        }
-        
-        card_data = {
-            "card_number": card.card_number if card else f"MG{license.id:010d}"
-        }
+        person_data, license_data, card_data = _barcode_inputs(license, person, card)
         
         # Generate V4 barcode using standardized format with encryption and compression
-        barcode_image = barcode_service.generate_pdf417_barcode_v4(
+        generated = barcode_service.generate_pdf417_barcode_v4_with_size(
             person_data=person_data,
             license_data=license_data,
             card_data=card_data,
             photo_data=photo_data
         )
         
-        if not barcode_image:
+        if not generated:
             raise BarcodeGenerationError("Failed to generate V4 barcode")
+        barcode_image, data_size = generated
         
         # Convert PNG to base64
         barcode_image_base64 = base64.b64encode(barcode_image).decode('utf-8')
         
-        # Create simplified response data (V4 format info)
-        response_data = {
-            "format": "standardized_madagascar_v4",
-            "encryption": "static_key_xor",
-            "compression": "zlib_level_9",
-            "person_name": f"{person_data['first_name']} {person_data['last_name']}",
-            "license_codes": license_data['license_codes'],
-            "has_photo": photo_data is not None,
-            "card_number": card_data['card_number']
-        }
-        
-        # Calculate compressed+encrypted data size
-        test_payload = f"{person_data['first_name']} {person_data['last_name']}|000000000000|{person_data['date_of_birth']}|{card_data['card_number']}|20250101-20300101|{','.join(license_data['license_codes'])}|||{person_data['gender']}"
-        if photo_data:
-            test_payload += "||IMG||" + base64.b64encode(photo_data[:1000]).decode('utf-8')  # Sample calculation
-        compressed = zlib.compress(test_payload.encode('utf-8'), level=9)
-        encrypted = barcode_service._static_encrypt(compressed)
-        data_size = len(encrypted)
+        response_data = _barcode_response_data(person_data, license_data, card_data, photo_data is not None)
         
         return BarcodeGenerationResponse(
             success=True,
@@ -334,101 +383,8 @@ async def decode_license_barcode(
 ):
     """Decode V4 barcode hex data using standardized Madagascar format"""
     try:
-        import binascii
-        import zlib
-        import base64
-        
-        # Step 1: Decode hex to binary
-        try:
-            binary_data = binascii.unhexlify(request.barcode_json.strip())
-            print(f"Step 1 - Hex decode: {len(request.barcode_json)} chars → {len(binary_data)} bytes")
-        except Exception as e:
-            raise BarcodeDecodingError(f"Invalid hex data: {str(e)}")
-        
-        # Step 2: Decrypt with static key XOR
-        try:
-            decrypted_data = barcode_service._static_decrypt(binary_data)
-            print(f"Step 2 - Decrypt: {len(binary_data)} → {len(decrypted_data)} bytes")
-        except Exception as e:
-            raise BarcodeDecodingError(f"Decryption failed: {str(e)}")
-        
-        # Step 3: Decompress with zlib
-        try:
-            decompressed_data = zlib.decompress(decrypted_data)
-            print(f"Step 3 - Decompress: {len(decrypted_data)} → {len(decompressed_data)} bytes")
-        except Exception as e:
-            raise BarcodeDecodingError(f"Decompression failed: {str(e)}")
-        
-        # Step 4: Parse pipe-delimited format
-        try:
-            # Check for image separator
-            image_separator = b"||IMG||"
-            has_image = image_separator in decompressed_data
-            
-            if has_image:
-                # Split license data and image
-                parts = decompressed_data.split(image_separator, 1)
-                license_data_bytes = parts[0]
-                image_bytes = parts[1] if len(parts) > 1 else b""
-                print(f"Found embedded image: {len(image_bytes)} bytes")
-            else:
-                license_data_bytes = decompressed_data
-                image_bytes = b""
-                print("No embedded image found")
-            
-            # Parse license data string
-            license_data_str = license_data_bytes.decode('utf-8')
-            print(f"License data string: {license_data_str}")
-            
-            # Split by pipes: Name|ID|DOB|LicenseNum|ValidFrom-ValidTo|Codes|VehicleRestr|DriverRestr|Sex
-            fields = license_data_str.split('|')
-            
-            if len(fields) != 9:
-                raise ValueError(f"Expected 9 fields in license data, got {len(fields)}")
-            
-            # Parse valid date range
-            valid_dates = fields[4].split('-') if fields[4] else ['', '']
-            valid_from = valid_dates[0] if len(valid_dates) > 0 else ''
-            valid_to = valid_dates[1] if len(valid_dates) > 1 else ''
-            
-            # Build decoded data
-            decoded_data = {
-                "person_name": fields[0],
-                "id_number": fields[1],
-                "date_of_birth": fields[2],
-                "license_number": fields[3],
-                "valid_from": valid_from,
-                "valid_to": valid_to,
-                "license_codes": fields[5].split(',') if fields[5] else [],
-                "vehicle_restrictions": fields[6].split(',') if fields[6] else [],
-                "driver_restrictions": fields[7].split(',') if fields[7] else [],
-                "sex": fields[8],
-                "has_image": has_image,
-                "image_size_bytes": len(image_bytes)
-            }
-            
-            # Add image data if present
-            if has_image and image_bytes:
-                decoded_data["image_base64"] = base64.b64encode(image_bytes).decode('utf-8')
-            
-            print("Step 4 - Parse: License data extracted successfully")
-            
-        except Exception as e:
-            raise BarcodeDecodingError(f"Failed to parse license data: {str(e)}")
-        
-        # Generate license info summary
-        license_info = {
-            "format": "standardized_madagascar_v4",
-            "decryption": "static_key_xor_successful",
-            "compression": "zlib_decompressed",
-            "total_fields": 9,
-            "data_integrity": "verified",
-            "person_summary": f"{decoded_data['person_name']} ({decoded_data['sex']})",
-            "license_summary": f"License {decoded_data['license_number']} - Codes: {', '.join(decoded_data['license_codes']) or 'None'}",
-            "validity_summary": f"Valid: {decoded_data['valid_from']} to {decoded_data['valid_to']}",
-            "restrictions_summary": f"Vehicle: {', '.join(decoded_data['vehicle_restrictions']) or 'None'}, Driver: {', '.join(decoded_data['driver_restrictions']) or 'None'}",
-            "image_summary": f"Photo: {'Present' if decoded_data['has_image'] else 'Not present'} ({decoded_data['image_size_bytes']} bytes)"
-        }
+        decoded_data = barcode_service.decode_pdf417_barcode_v4(request.barcode_json)
+        license_info = _v4_license_info(decoded_data)
         
         return BarcodeDecodingResponse(
             success=True,
@@ -449,6 +405,138 @@ async def decode_license_barcode(
         )
 
 
+@router.post(
+    "/generate/batch",
+    summary="Generate V4 PDF417 barcodes for many licenses",
+    description="""Generate barcodes for a batch of licenses in one call.
+    
+    Barcodes are built in parallel on a process pool and streamed back as NDJSON,
+    one line per item as it finishes: `{"type": "item", "index", "license_id", "success", ...}`
+    with either the barcode fields of `/generate` or an `error`. A final
+    `{"type": "summary", "total", "succeeded", "failed"}` line closes the stream."""
+)
+async def generate_license_barcode_batch(
+    request: BarcodeBatchGenerationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("licenses.read"))
+):
+    """Generate V4 PDF417 barcodes for a batch of licenses, streaming per-item results"""
+    _check_batch_size(len(request.items))
+    
+    # Load every license, person and card of the batch up front (three queries)
+    license_ids = {item.license_id for item in request.items}
+    card_ids = {item.card_id for item in request.items if item.card_id}
+    licenses = {license.id: license for license in db.query(License).filter(License.id.in_(license_ids)).all()}
+    person_ids = {license.person_id for license in licenses.values()}
+    persons = {person.id: person for person in db.query(Person).filter(Person.id.in_(person_ids)).all()} if person_ids else {}
+    cards = {card.id: card for card in db.query(Card).filter(Card.id.in_(card_ids)).all()} if card_ids else {}
+    
+    work = []
+    failures = []
+    summaries = {}
+    for index, item in enumerate(request.items):
+        license = licenses.get(item.license_id)
+        person = persons.get(license.person_id) if license else None
+        card = cards.get(item.card_id) if item.card_id else None
+        if not license:
+            failures.append((index, "License not found"))
+        elif not person:
+            failures.append((index, "Person not found"))
+        elif item.card_id and not card:
+            failures.append((index, "Card not found"))
+        else:
+            try:
+                person_data, license_data, card_data = _barcode_inputs(license, person, card)
+            except Exception as e:
+                failures.append((index, f"Invalid license data: {str(e)}"))
+                continue
+            photo_path = _barcode_photo_path(license) if item.include_photo else None
+            summaries[index] = (person_data, license_data, card_data)
+            work.append((index, {
+                "person_data": person_data,
+                "license_data": license_data,
+                "card_data": card_data,
+                "photo_path": str(photo_path) if photo_path else None
+            }))
+    
+    async def results() -> AsyncIterator[bytes]:
+        succeeded = 0
+        for index, error in failures:
+            yield _ndjson_line({
+                "type": "item",
+                "index": index,
+                "license_id": request.items[index].license_id,
+                "success": False,
+                "error": error
+            })
+        
+        async for index, result, error in generate_barcodes(work):
+            record = {"type": "item", "index": index, "license_id": request.items[index].license_id}
+            if error is not None:
+                record.update(success=False, error=f"Barcode generation failed: {error}")
+            else:
+                succeeded += 1
+                person_data, license_data, card_data = summaries[index]
+                record.update(
+                    success=True,
+                    barcode_image_base64=result["barcode_image_base64"],
+                    barcode_data=_barcode_response_data(person_data, license_data, card_data, result["has_photo"]),
+                    data_size_bytes=result["data_size_bytes"]
+                )
+            yield _ndjson_line(record)
+        
+        yield _ndjson_line({
+            "type": "summary",
+            "total": len(request.items),
+            "succeeded": succeeded,
+            "failed": len(request.items) - succeeded
+        })
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/decode/batch",
+    summary="Decode many V4 PDF417 barcodes",
+    description="""Decode a batch of hex strings scanned from V4 barcodes in one call.
+    
+    Results stream back as NDJSON: `{"type": "item", "index", "success", "decoded_data", "license_info"}`
+    or `{"type": "item", "index", "success": false, "error"}` per barcode, then a
+    `{"type": "summary", "total", "succeeded", "failed"}` line."""
+)
+async def decode_license_barcode_batch(
+    request: BarcodeBatchDecodingRequest,
+    current_user: User = Depends(require_permission("licenses.read"))
+):
+    """Decode V4 barcode hex strings in parallel, streaming per-item results"""
+    _check_batch_size(len(request.barcodes))
+    
+    async def results() -> AsyncIterator[bytes]:
+        succeeded = 0
+        async for index, decoded_data, error in decode_barcodes(request.barcodes):
+            if error is not None:
+                record = {"type": "item", "index": index, "success": False, "error": f"V4 barcode decoding failed: {error}"}
+            else:
+                succeeded += 1
+                record = {
+                    "type": "item",
+                    "index": index,
+                    "success": True,
+                    "decoded_data": decoded_data,
+                    "license_info": _v4_license_info(decoded_data)
+                }
+            yield _ndjson_line(record)
+        
+        yield _ndjson_line({
+            "type": "summary",
+            "total": len(request.barcodes),
+            "succeeded": succeeded,
+            "failed": len(request.barcodes) - succeeded
+        })
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @router.post(
     "/test",
     response_model=BarcodeGenerationResponse,
@@ -9,20 +9,34 @@ Based on BioMini WebAgent best practices:
 - Full audit trail for compliance
 """
 
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from typing import Iterator, List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, text
+from sqlalchemy import and_, or_, func, text, tuple_
 import base64
 import hashlib
 import json
+import struct
 import time
 import logging
-from datetime import datetime
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
 
-from app.core.database import get_db
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from app.core.config import get_settings
+from app.core.database import get_db, SessionLocal
 from app.services.fingerprint_image_service import fingerprint_image_service
+from app.services.image_service import run_image_task
+from app.services.fingerprint_index import fingerprint_index, exact_match_counters, SERVER_MATCH_THRESHOLDS
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.audit_decorators import audit_create, audit_update, audit_delete
 from app.models.user import User
@@ -39,6 +53,7 @@ from app.schemas.biometric import (
 router = APIRouter()
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 @router.post("/fingerprint/enroll", response_model=FingerprintEnrollResponse)
@@ -80,20 +95,29 @@ async def enroll_fingerprint(
     # Calculate template hash for integrity
     template_hash = hashlib.sha256(template_bytes).hexdigest()
     
-    # Check for duplicate template (same person, finger, hash)
-    existing = db.query(FingerprintTemplate).filter(
+    # Check for duplicate template: identical bytes anywhere in the registry (indexed hash lookup)
+    identical_templates = db.query(FingerprintTemplate).filter(
         and_(
-            FingerprintTemplate.person_id == request.person_id,
-            FingerprintTemplate.finger_position == request.finger_position,
             FingerprintTemplate.template_hash == template_hash,
             FingerprintTemplate.is_active == True
         )
-    ).first()
+    ).all()
+    exact_match_counters.record("enroll", bool(identical_templates))
     
-    if existing:
+    for existing in identical_templates:
+        if existing.person_id == request.person_id and existing.finger_position == request.finger_position:
+            raise HTTPException(
+                status_code=409, 
+                detail="Duplicate fingerprint template - identical template already exists for this person and finger"
+            )
+    
+    if identical_templates:
+        # Two live captures never produce identical bytes
+        logger.warning(f"Enrollment for person {request.person_id} finger {request.finger_position} "
+                       f"matches template {identical_templates[0].id} byte for byte")
         raise HTTPException(
-            status_code=409, 
-            detail="Duplicate fingerprint template - identical template already exists for this person and finger"
+            status_code=409,
+            detail="Duplicate fingerprint template - identical template already enrolled for another person or finger"
         )
     
     # Handle re-enrollment: check for existing template for same person/finger (different hash)
@@ -145,6 +169,11 @@ async def enroll_fingerprint(
     db.commit()
     db.refresh(template)
     
+    # Keep the identification gallery in sync
+    if existing_different_template:
+        fingerprint_index.remove(existing_different_template.id)
+    fingerprint_index.add(template)
+    
     # Save captured fingerprint image if provided
     image_url = None
     thumbnail_url = None
@@ -155,7 +184,8 @@ async def enroll_fingerprint(
             image_data = base64.b64decode(request.captured_image_base64)
             
             # Save the image using the fingerprint image service
-            image_path = fingerprint_image_service.save_fingerprint_image(
+            image_path = await run_image_task(
+                fingerprint_image_service.save_fingerprint_image,
                 template_id=template.id,
                 image_data=image_data,
                 image_format="BMP"  # BioMini usually returns BMP
@@ -316,65 +346,113 @@ async def identify_fingerprint(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid probe template: {str(e)}")
     
-    # Build query for candidate templates
-    query = db.query(FingerprintTemplate).filter(
+    # Exact duplicate of an enrolled capture: indexed hash lookup before any fuzzy scoring
+    exact_query = db.query(FingerprintTemplate).filter(
+        FingerprintTemplate.template_hash == hashlib.sha256(probe_bytes).hexdigest(),
         FingerprintTemplate.is_active == True
     )
-    
-    # Filter by finger position if specified
     if request.finger_position:
-        query = query.filter(FingerprintTemplate.finger_position == request.finger_position)
-    
-    # Filter by person IDs if specified (for restricted searches)
+        exact_query = exact_query.filter(FingerprintTemplate.finger_position == request.finger_position)
     if request.candidate_person_ids:
-        query = query.filter(FingerprintTemplate.person_id.in_(request.candidate_person_ids))
+        exact_query = exact_query.filter(FingerprintTemplate.person_id.in_(request.candidate_person_ids))
+    exact_templates = exact_query.all()
+    exact_match_counters.record("identify", bool(exact_templates))
     
-    # Limit results for performance
-    max_candidates = request.max_candidates or 1000
-    candidates = query.limit(max_candidates).all()
-    
-    if not candidates:
-        raise HTTPException(status_code=404, detail="No candidate templates found")
-    
-    # Perform matching against candidates
-    matches = []
-    candidates_checked = 0
-    
-    for template in candidates:
-        candidates_checked += 1
+    matcher_engine = "server"
+    if exact_templates and not request.return_all_matches:
+        matches = [
+            {
+                'template_id': template.id,
+                'person_id': template.person_id,
+                'finger_position': template.finger_position,
+                'match_score': 100,
+                'template_quality': template.quality_score
+            }
+            for template in exact_templates
+        ]
+        candidates_checked = len(exact_templates)
+        matches_found = len(matches)
+        matcher_engine = "exact_hash"
+    elif fingerprint_index.available and not request.use_webagent_matching:
+        # Score the whole resident gallery in one vectorized pass (off the event loop)
+        await run_in_threadpool(fingerprint_index.ensure_loaded, db)
+        early_exit_score = settings.FINGERPRINT_EARLY_EXIT_SCORE or None
+        matches, candidates_checked, matches_found = await run_in_threadpool(
+            fingerprint_index.identify,
+            probe_bytes,
+            request.security_level or 4,
+            finger_position=request.finger_position,
+            candidate_person_ids=request.candidate_person_ids or None,
+            max_results=(request.max_results or 10) if request.return_all_matches else 1,
+            probe_quality_score=request.probe_quality_score,
+            early_exit_score=None if request.return_all_matches else early_exit_score,
+            max_candidates=request.max_candidates
+        )
         
-        if request.use_webagent_matching:
-            try:
-                match_found, score = await _verify_with_webagent(
-                    template.template_bytes,
-                    probe_bytes,
-                    request.security_level or 4
-                )
-            except:
+        if candidates_checked == 0:
+            raise HTTPException(status_code=404, detail="No candidate templates found")
+    else:
+        # Build query for candidate templates
+        query = db.query(FingerprintTemplate).filter(
+            FingerprintTemplate.is_active == True
+        )
+        
+        # Filter by finger position if specified
+        if request.finger_position:
+            query = query.filter(FingerprintTemplate.finger_position == request.finger_position)
+        
+        # Filter by person IDs if specified (for restricted searches)
+        if request.candidate_person_ids:
+            query = query.filter(FingerprintTemplate.person_id.in_(request.candidate_person_ids))
+        
+        # Limit results for performance
+        max_candidates = request.max_candidates or 1000
+        candidates = query.limit(max_candidates).all()
+        
+        if not candidates:
+            raise HTTPException(status_code=404, detail="No candidate templates found")
+        
+        # Perform matching against candidates
+        matches = []
+        candidates_checked = 0
+        
+        for template in candidates:
+            candidates_checked += 1
+            
+            if request.use_webagent_matching:
+                try:
+                    match_found, score = await _verify_with_webagent(
+                        template.template_bytes,
+                        probe_bytes,
+                        request.security_level or 4
+                    )
+                except:
+                    match_found, score = _verify_with_server(
+                        template.template_bytes,
+                        probe_bytes,
+                        request.security_level or 4
+                    )
+            else:
                 match_found, score = _verify_with_server(
                     template.template_bytes,
                     probe_bytes,
                     request.security_level or 4
                 )
-        else:
-            match_found, score = _verify_with_server(
-                template.template_bytes,
-                probe_bytes,
-                request.security_level or 4
-            )
-        
-        if match_found:
-            matches.append({
-                'template_id': template.id,
-                'person_id': template.person_id,
-                'finger_position': template.finger_position,
-                'match_score': score,
-                'template_quality': template.quality_score
-            })
             
-            # Stop at first match for 1:1 mode, or collect all for ranking
-            if not request.return_all_matches:
-                break
+            if match_found:
+                matches.append({
+                    'template_id': template.id,
+                    'person_id': template.person_id,
+                    'finger_position': template.finger_position,
+                    'match_score': score,
+                    'template_quality': template.quality_score
+                })
+                
+                # Stop at first match for 1:1 mode, or collect all for ranking
+                if not request.return_all_matches:
+                    break
+        
+        matches_found = len(matches)
     
     # Sort matches by score (highest first)
     matches.sort(key=lambda x: x['match_score'] or 0, reverse=True)
@@ -393,7 +471,7 @@ async def identify_fingerprint(
         match_found=len(matches) > 0,
         match_score=matches[0]['match_score'] if matches else None,
         security_level=request.security_level,
-        matcher_engine="server",
+        matcher_engine=matcher_engine,
         verification_time_ms=verification_time,
         candidates_checked=candidates_checked,
         performed_by=current_user.id,
@@ -402,12 +480,12 @@ async def identify_fingerprint(
     )
     
     return FingerprintIdentifyResponse(
-        matches_found=len(matches),
+        matches_found=matches_found,
         matches=matches[:request.max_results or 10],
         candidates_checked=candidates_checked,
         search_time_ms=verification_time,
         security_level=request.security_level or 4,
-        message=f"Identification completed: {len(matches)} matches found"
+        message=f"Identification completed: {matches_found} matches found"
     )
 
 
@@ -453,6 +531,7 @@ async def get_templates_for_matching(
     """
     Get fingerprint templates with template data for UFMatcher identification
     This endpoint returns the actual template Base64 data for client-side UFMatcher
+    (see /fingerprint/templates-for-matching/stream for paged binary sync)
     """
     
     templates = db.query(FingerprintTemplate).filter(
@@ -478,6 +557,161 @@ async def get_templates_for_matching(
     return results
 
 
+TEMPLATE_STREAM_MAGIC = b"FPTS"
+TEMPLATE_STREAM_VERSION = 1
+TEMPLATE_STREAM_MAX_PAGE = 50000
+TEMPLATE_STREAM_FETCH_SIZE = 500
+TEMPLATE_STREAM_CHUNK_BYTES = 64 * 1024
+TEMPLATE_RECORD_HEADER = struct.Struct(">B16s16sBBBq")
+# updated_at is stamped at flush, not at commit: a final cursor never passes
+# now - this window, so rows that commit late are sent on the next poll
+TEMPLATE_STREAM_OVERLAP_SECONDS = 60
+
+
+def _encode_template_cursor(updated_at: datetime, template_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{template_id}".encode()).decode("ascii")
+
+
+def _decode_template_cursor(cursor: str) -> tuple:
+    try:
+        updated_at, template_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode().split("|")
+        return datetime.fromisoformat(updated_at), uuid.UUID(template_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _settled_position(position: tuple) -> tuple:
+    """Cursor position pulled back to the start of the overlap window if it is inside it"""
+    updated_at, template_id = position
+    now = datetime.now(timezone.utc) if updated_at.tzinfo else datetime.utcnow()
+    horizon = now - timedelta(seconds=TEMPLATE_STREAM_OVERLAP_SECONDS)
+    if updated_at > horizon:
+        return horizon, uuid.UUID(int=0)
+    return position
+
+
+def _encode_template_record(template: FingerprintTemplate) -> bytes:
+    """One length-prefixed record of the binary template stream"""
+    deleted = not template.is_active
+    template_format = (template.template_format or "").encode("ascii")
+    updated_at = template.updated_at or template.created_at
+    body = TEMPLATE_RECORD_HEADER.pack(
+        1 if deleted else 0,
+        template.id.bytes,
+        template.person_id.bytes,
+        template.finger_position,
+        255 if template.quality_score is None else template.quality_score,
+        255 if template.quality_level is None else template.quality_level,
+        int(updated_at.timestamp() * 1_000_000)
+    ) + bytes([len(template_format)]) + template_format + (b"" if deleted else template.template_bytes)
+    return struct.pack(">I", len(body)) + body
+
+
+def _template_stream_chunks(
+    after: Optional[tuple],
+    changed_since: Optional[datetime],
+    limit: int,
+    compression: str
+) -> Iterator[bytes]:
+    """Encode one page of templates on a dedicated session, compressing on the fly"""
+    if compression == "zstd":
+        compressor = zstd.ZstdCompressor(level=3).compressobj()
+    elif compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    db = SessionLocal()
+    try:
+        query = db.query(FingerprintTemplate)
+        # Incremental sync also reports deactivated templates so clients can drop them
+        if after is None and changed_since is None:
+            query = query.filter(FingerprintTemplate.is_active == True)
+        if changed_since is not None:
+            query = query.filter(FingerprintTemplate.updated_at > changed_since)
+        if after is not None:
+            query = query.filter(tuple_(FingerprintTemplate.updated_at, FingerprintTemplate.id) > after)
+        query = query.order_by(
+            FingerprintTemplate.updated_at, FingerprintTemplate.id
+        ).limit(limit + 1).yield_per(TEMPLATE_STREAM_FETCH_SIZE)
+
+        buffer = bytearray(TEMPLATE_STREAM_MAGIC + bytes([TEMPLATE_STREAM_VERSION]))
+        sent = 0
+        has_more = False
+        last = None
+        for template in query:
+            if sent == limit:
+                has_more = True
+                break
+            buffer += _encode_template_record(template)
+            last = (template.updated_at, template.id)
+            sent += 1
+            if len(buffer) >= TEMPLATE_STREAM_CHUNK_BYTES:
+                chunk = emit(bytes(buffer))
+                buffer.clear()
+                if chunk:
+                    yield chunk
+
+        position = last or after
+        if position is not None and not has_more:
+            # Last page: the next poll sends the overlap window again
+            position = _settled_position(position)
+        # Nothing new: the client keeps polling from the same position
+        next_cursor = _encode_template_cursor(*position).encode("ascii") if position else b""
+        buffer += struct.pack(">I", 0) + bytes([1 if has_more else 0]) + struct.pack(">H", len(next_cursor)) + next_cursor
+        chunk = emit(bytes(buffer))
+        if compressor:
+            chunk += compressor.flush()
+        yield chunk
+    finally:
+        db.close()
+
+
+@router.get("/fingerprint/templates-for-matching/stream")
+async def stream_templates_for_matching(
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+    changed_since: Optional[datetime] = Query(None, description="Only templates created, changed or deleted after this time"),
+    limit: int = Query(5000, ge=1, le=TEMPLATE_STREAM_MAX_PAGE, description="Templates per page"),
+    compression: str = Query("none", pattern="^(none|gzip|zstd)$", description="Content-Encoding for the stream"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream templates for client-side UFMatcher galleries as length-prefixed binary
+    
+    Pages are ordered by (updated_at, id). A full download starts without cursor
+    and follows the returned cursor until has_more is 0; afterwards the last
+    cursor (or changed_since) returns only what changed, including deletions.
+    The cursor of the last page stays TEMPLATE_STREAM_OVERLAP_SECONDS behind
+    now, so the next poll repeats recent changes (catching rows that committed
+    after a later stamped row); clients apply records by template id.
+    
+    Stream layout (integers big-endian):
+    - b"FPTS", u8 version (1)
+    - Records: u32 length, then u8 flags (1 = deleted), 16-byte template id,
+      16-byte person id, u8 finger position, u8 quality score (255 = unknown),
+      u8 quality level (255 = unknown), i64 updated_at (microseconds since epoch),
+      u8 format length + ASCII template format, raw template bytes (rest of the
+      record, empty when deleted)
+    - u32 0 (end of records), u8 has_more, u16 cursor length + ASCII next cursor
+    """
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        raise HTTPException(status_code=400, detail="zstd compression not available")
+    after = _decode_template_cursor(cursor) if cursor else None
+    
+    headers = {"X-Template-Stream-Version": str(TEMPLATE_STREAM_VERSION)}
+    if compression != "none":
+        headers["Content-Encoding"] = compression
+    
+    return StreamingResponse(
+        _template_stream_chunks(after, changed_since, limit, compression),
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+
 @router.get("/system/stats", response_model=BiometricSystemStats)
 async def get_system_stats(
     db: Session = Depends(get_db),
@@ -504,6 +738,7 @@ async def get_system_stats(
         total_persons_enrolled=total_persons,
         total_verifications=total_verifications,
         verifications_24h=recent_verifications,
+        exact_match_shortcuts=exact_match_counters.snapshot(),
         system_status="operational"
     )
 
@@ -569,6 +804,18 @@ async def initialize_biometric_tables(
         );
         """,
         
+        # Exact duplicate lookup by template hash
+        """
+        CREATE INDEX IF NOT EXISTS ix_fingerprint_templates_template_hash
+        ON fingerprint_templates (template_hash);
+        """,
+        
+        # Keyset paging for template sync
+        """
+        CREATE INDEX IF NOT EXISTS ix_fingerprint_templates_updated_at_id
+        ON fingerprint_templates (updated_at, id);
+        """,
+        
         # Fingerprint Verification Logs Table
         """
         CREATE TABLE IF NOT EXISTS fingerprint_verification_logs (
@@ -650,6 +897,7 @@ async def initialize_biometric_tables(
             db.execute(text(sql))
         
         db.commit()
+        fingerprint_index.invalidate()
         
         # Verify tables were created
         result = db.execute(text("""
@@ -706,6 +954,7 @@ async def reset_biometric_tables(
             images_deleted = 0
         
         db.commit()
+        fingerprint_index.invalidate()
         
         return {
             "message": "Biometric tables reset successfully",
@@ -763,6 +1012,7 @@ async def delete_fingerprint_template(
         # Mark template as inactive (soft delete)
         existing_template.is_active = False
         db.commit()
+        fingerprint_index.remove(existing_template.id)
         
         logger.info(f"Deleted template {existing_template.id} for person {person_id}, finger {finger_position}")
         
@@ -868,8 +1118,7 @@ def _verify_with_server(stored_template: bytes, probe_template: bytes, security_
     similarity = int((matches / len(stored_template)) * 100)
     
     # Determine threshold based on security level
-    thresholds = {1: 60, 2: 65, 3: 70, 4: 75, 5: 80, 6: 85, 7: 90}
-    threshold = thresholds.get(security_level, 75)
+    threshold = SERVER_MATCH_THRESHOLDS.get(security_level, 75)
     
     return similarity >= threshold, similarity
 
@@ -3,13 +3,18 @@ Document Generation API Endpoints
 Production endpoints for A4 document generation and preview
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional
+import asyncio
+import io
 import logging
+import zipfile
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Path
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.user import User
@@ -244,3 +249,104 @@ async def generate_custom_receipt_pdf(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate receipt: {str(e)}"
         )
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink for zipfile; collects what was written since the last take()"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_chunks(template_type: str, pdfs: Iterator[bytes]) -> Iterator[bytes]:
+    """Zip PDFs on the fly, yielding each one as soon as it is generated"""
+    sink = _ChunkWriter()
+    timestamp = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for index, pdf in enumerate(pdfs, 1):
+            archive.writestr(zipfile.ZipInfo(f"{template_type}_{index:04d}.pdf", timestamp), pdf)
+            yield sink.take()
+    yield sink.take()
+
+
+@router.post("/generate-pdf-batch/{template_type}", summary="Generate Many Documents at Once")
+async def generate_pdf_batch(
+    documents: List[Dict[str, Any]],
+    template_type: str = Path(..., description="Template type (receipt, card_collection)"),
+    output: str = Query("pdf", pattern="^(pdf|zip)$", description="pdf: one multi-page PDF, zip: one PDF per document, streamed"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate receipts or card collection notices for many documents in one request
+    
+    With output=pdf every document starts on a new page of a single PDF, ready
+    to print. With output=zip each document is its own PDF, streamed in a zip
+    archive as it is generated.
+    """
+    if template_type not in document_generator.BATCH_TEMPLATES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch generation supports: {', '.join(document_generator.BATCH_TEMPLATES)}"
+        )
+    
+    if not documents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one document is required"
+        )
+    
+    max_documents = get_settings().DOCUMENT_BATCH_MAX_DOCUMENTS
+    if len(documents) > max_documents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {max_documents} documents per batch"
+        )
+    
+    # Receipts printed again keep their original cashier
+    if template_type == "receipt":
+        processed_by = f"{current_user.first_name} {current_user.last_name}" if current_user.first_name else current_user.email
+        for document_data in documents:
+            document_data.setdefault('processed_by', processed_by)
+    
+    logger.info(f"Generating {len(documents)} {template_type} documents ({output}) for user: {current_user.email}")
+    filename = f"{template_type}_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    if output == "zip":
+        # Starlette iterates a sync generator in its thread pool
+        return StreamingResponse(
+            _zip_chunks(template_type, document_generator.generate_each(template_type, documents)),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.zip"}
+        )
+    
+    try:
+        pdf_bytes = await asyncio.to_thread(document_generator.generate_batch, template_type, documents)
+    except Exception as e:
+        logger.error(f"Error generating {template_type} batch PDF: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate {template_type} batch: {str(e)}"
+        )
+    
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"inline; filename={filename}.pdf",
+            "Content-Length": str(len(pdf_bytes)),
+            "Cache-Control": "no-cache, no-store, must-revalidate",
+            "Pragma": "no-cache",
+            "Expires": "0"
+        }
+    )
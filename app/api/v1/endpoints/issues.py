@@ -7,12 +7,10 @@ from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request, Body, Response
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from pathlib import Path
 import uuid
 import logging
 from datetime import datetime
 import base64
-import io
 
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
@@ -28,6 +26,7 @@ from app.schemas.issue import (
 )
 from app.crud import issue as crud_issue, issue_comment as crud_issue_comment
 from app.services.issue_file_manager import IssueFileManager
+from app.services.issue_auto_reports import issue_auto_reports, error_fingerprint, AutoReportRateLimited
 # Permission checking is done using current_user.has_permission()
 
 router = APIRouter()
@@ -87,6 +86,9 @@ async def create_issue(
                 issue.screenshot_path = screenshot_info["file_path"]
                 db.commit()
                 
+                # Re-encode to a smaller format after the response
+                file_manager.schedule_screenshot_optimization(issue.id, screenshot_info["file_path"])
+                
             except Exception as e:
                 logger.error(f"Failed to save screenshot for issue {issue.id}: {e}")
                 # Continue without screenshot rather than failing the entire request
@@ -127,19 +129,46 @@ async def auto_report_issue(
     *,
     db: Session = Depends(get_db),
     issue_in: AutoIssueCreate,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """
     Auto-report an issue (JavaScript errors, API failures, etc.)
     
     This endpoint is called automatically by the frontend when errors are detected.
+    Repeats of an error already reported recently are counted on the existing
+    issue (200 with its occurrence_count) instead of creating a new one (201).
+    Reports beyond the per-user or new-issue rate get 429 with Retry-After.
     """
     try:
+        issue_auto_reports.check_rate(current_user.id)
+        fingerprint = error_fingerprint(
+            issue_in.report_type, issue_in.error_message, issue_in.page_url, issue_in.stack_trace
+        )
+        
+        # Hot error: counted in memory, written by the periodic flush
+        coalesced = issue_auto_reports.coalesce(fingerprint)
+        if coalesced is not None:
+            response.status_code = status.HTTP_200_OK
+            return coalesced
+        
+        existing = crud_issue.get_recent_by_fingerprint(
+            db, fingerprint, since=datetime.now() - issue_auto_reports.window
+        )
+        if existing:
+            issue = crud_issue.record_occurrence(db, existing)
+            issue_auto_reports.remember(fingerprint, issue, created=False)
+            response.status_code = status.HTTP_200_OK
+            return issue
+        
+        issue_auto_reports.check_new_issue()
+        
         # Create the auto-reported issue
         issue = crud_issue.create_with_reporter(
             db=db, 
             obj_in=issue_in, 
-            reported_by=current_user.id
+            reported_by=current_user.id,
+            error_fingerprint=fingerprint
         )
         
         # Handle console logs if provided
@@ -158,10 +187,17 @@ async def auto_report_issue(
             except Exception as e:
                 logger.error(f"Failed to save console logs for auto-issue {issue.id}: {e}")
         
+        issue_auto_reports.remember(fingerprint, issue, created=True)
         logger.info(f"Auto-issue created: {issue.id} - {issue_in.error_message}")
         
         return issue
         
+    except AutoReportRateLimited as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Failed to auto-report issue: {e}")
         raise HTTPException(
@@ -302,6 +338,10 @@ async def update_issue(
     # Update issue
     issue = crud_issue.update(db=db, db_obj=issue, obj_in=issue_in)
     
+    if issue.status in (IssueStatus.RESOLVED, IssueStatus.CLOSED, IssueStatus.CANCELLED):
+        # Closed here as well as through /status: repeats open a new issue
+        issue_auto_reports.forget_issue(issue_id)
+    
     logger.info(f"Issue updated: {issue_id} by user {current_user.id}")
     
     return issue
@@ -376,6 +416,10 @@ async def update_issue_status(
         resolution_notes=status_update.resolution_notes
     )
     
+    if status_update.new_status in (IssueStatus.RESOLVED, IssueStatus.CLOSED, IssueStatus.CANCELLED):
+        # A repeat after this opens a new issue (possible regression)
+        issue_auto_reports.forget_issue(issue_id)
+    
     logger.info(f"Issue status updated: {issue_id} to {status_update.new_status.value} by {current_user.id}")
     
     return {"message": "Issue status updated successfully"}
@@ -504,16 +548,18 @@ async def get_issue_file(
         )
     
     try:
-        # Get file content
-        content, mime_type = file_manager.get_file_content(file_path)
+        # Open the file (compressed console logs are decompressed as they stream)
+        chunks, mime_type, filename = file_manager.open_file_stream(file_path)
         
         # Return file
         return StreamingResponse(
-            io.BytesIO(content),
+            chunks,
             media_type=mime_type,
-            headers={"Content-Disposition": f"inline; filename={Path(file_path).name}"}
+            headers={"Content-Disposition": f"inline; filename={filename}"}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to serve file {file_path}: {e}")
         raise HTTPException(
@@ -596,6 +642,7 @@ async def delete_issue(
     file_manager.delete_issue_files(issue.id, issue.created_at)
     
     # Delete issue from database
+    issue_auto_reports.forget_issue(issue_id)
     crud_issue.remove(db=db, id=issue_id)
     
     logger.info(f"Issue deleted: {issue_id} by user {current_user.id}")
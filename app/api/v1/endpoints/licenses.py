@@ -14,25 +14,28 @@ Features:
 
 from typing import List, Optional, Dict, Any
 from uuid import UUID
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Response
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+from app.core.config import get_settings
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.audit_decorators import audit_create, audit_update, audit_delete
 from app.crud.crud_license import crud_license
 from app.crud.crud_application import crud_application
 from app.models.user import User
+from app.services.license_bulk_status import license_bulk_status_jobs
 from app.schemas.license import (
     LicenseCreateFromApplication, LicenseCreate, LicenseStatusUpdate,
     LicenseRestrictionsUpdate, LicenseProfessionalPermitUpdate,
     LicenseSearchFilters,
     LicenseResponse, LicenseDetailResponse, LicenseListResponse,
     LicenseStatusHistoryResponse, PersonLicensesSummary,
-    LicenseStatistics, BulkLicenseStatusUpdate, BulkOperationResponse,
+    LicenseStatistics, BulkLicenseStatusUpdate, BulkOperationResponse, BulkOperationJobResponse,
     AuthorizationData, AvailableRestrictionsResponse, RestrictionDetail
 )
 
@@ -524,49 +527,64 @@ async def get_license_statistics(
 @router.post("/bulk/status-update", response_model=BulkOperationResponse, summary="Bulk Status Update")
 async def bulk_status_update(
     bulk_update: BulkLicenseStatusUpdate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("licenses.bulk_update"))
 ):
     """
     Update status for multiple licenses in bulk
     
-    Useful for administrative actions like bulk suspensions.
+    Useful for administrative actions like bulk suspensions. Eligibility is
+    checked with one query and all eligible licenses change in one
+    transaction; ineligible or unknown ids are listed in error_details.
+    Requests larger than LICENSE_BULK_STATUS_BACKGROUND_THRESHOLD return 202
+    with a job_id to poll at /bulk/status-update/jobs/{job_id}.
     """
-    successful = 0
-    failed = 0
-    error_details = []
-    
-    for license_id in bulk_update.license_ids:
-        try:
-            status_update = LicenseStatusUpdate(
-                status=bulk_update.status,
-                reason=bulk_update.reason,
-                notes=bulk_update.notes
-            )
-            
-            crud_license.update_status(
-                db=db,
-                license_id=license_id,
-                status_update=status_update,
-                current_user=current_user
-            )
-            successful += 1
-            
-        except Exception as e:
-            failed += 1
-            error_details.append({
-                "license_id": str(license_id),
-                "error": str(e)
-            })
+    if license_bulk_status_jobs.runs_in_background(bulk_update.license_ids):
+        job = license_bulk_status_jobs.submit(bulk_update, current_user.id, current_user.username)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return BulkOperationResponse(**job)
+    
+    successful, error_details = await asyncio.to_thread(
+        crud_license.bulk_update_status,
+        db,
+        license_ids=bulk_update.license_ids,
+        status_update=bulk_update,
+        changed_by=current_user.id,
+        batch_size=get_settings().LICENSE_BULK_STATUS_BATCH_SIZE
+    )
     
     return BulkOperationResponse(
         total_requested=len(bulk_update.license_ids),
         successful=successful,
-        failed=failed,
+        failed=len(error_details),
         error_details=error_details
     )
 
 
+@router.get("/bulk/status-update/jobs", response_model=List[BulkOperationJobResponse], summary="Bulk Status Update Jobs")
+async def list_bulk_status_jobs(
+    current_user: User = Depends(require_permission("licenses.bulk_update"))
+):
+    """Recent background bulk status updates (without per-license errors)"""
+    return license_bulk_status_jobs.jobs()
+
+
+@router.get("/bulk/status-update/jobs/{job_id}", response_model=BulkOperationJobResponse, summary="Bulk Status Update Job")
+async def get_bulk_status_job(
+    job_id: str = Path(..., description="Job ID returned by the bulk status update"),
+    current_user: User = Depends(require_permission("licenses.bulk_update"))
+):
+    """Progress and result of a background bulk status update"""
+    job = license_bulk_status_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Bulk status job {job_id} not found"
+        )
+    return job
+
+
 # Health Check
 @router.get("/health", summary="License Service Health Check")
 async def health_check(
@@ -3,7 +3,8 @@ Mobile App API Endpoints for Madagascar Digital License
 Provides secure access to license data for mobile applications
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import hashlib
@@ -21,6 +22,7 @@ from app.models.application import ApplicationBiometricData
 from app.models.enums import BiometricDataType
 from app.crud.crud_license import crud_license
 from app.crud import person as crud_person
+from app.services.biometric_derivatives import biometric_derivative_cache, DERIVATIVE_VARIANTS
 
 router = APIRouter()
 
@@ -354,6 +356,7 @@ async def health_check():
 @router.get("/biometric-file/{file_path:path}", summary="Serve Biometric Files (Public for Mobile App)")
 async def serve_mobile_biometric_file(
     file_path: str,
+    variant: Optional[str] = Query(None, description=f"Image derivative to serve instead of the original: {', '.join(DERIVATIVE_VARIANTS)}"),
     db: Session = Depends(get_db)
 ):
     """
@@ -361,6 +364,8 @@ async def serve_mobile_biometric_file(
     
     This is a PUBLIC endpoint (no authentication required) to allow React Native 
     Image components to load biometric images without auth tokens.
+    Pass variant (e.g. thumb-webp) to get a cached resized/re-encoded copy; the
+    original is returned while that variant has not been rendered yet.
     
     Security: File paths must be properly validated to prevent directory traversal.
     """
@@ -445,6 +450,20 @@ async def serve_mobile_biometric_file(
     elif file_path.lower().endswith('.png'):
         content_type = "image/png"
     
+    if variant:
+        # Public route: only variants already rendered by an authenticated request,
+        # never a render here; otherwise the original is served
+        try:
+            derivative_path = await run_in_threadpool(biometric_derivative_cache.peek, full_file_path, variant)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if derivative_path is not None:
+            return FileResponse(
+                path=derivative_path,
+                media_type=biometric_derivative_cache.media_type(variant),
+                filename=derivative_path.name
+            )
+    
     return FileResponse(
         path=full_file_path,
         media_type=content_type,
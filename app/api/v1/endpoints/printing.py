@@ -6,45 +6,62 @@ Handles card printing workflow, queue management, and production tracking
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 from datetime import datetime, timedelta
+import asyncio
 import base64
+import json
 import logging
 import os
 import shutil
 from pathlib import Path as FilePath
 
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response, Body, Header, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.database import get_db, SessionLocal
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.audit_decorators import audit_create, audit_update, audit_delete
 from app.crud.crud_printing import crud_print_job, crud_print_queue
 from app.crud.crud_application import crud_application
 from app.crud.crud_license import crud_license
 from app.crud.crud_person import person as crud_person
-from app.crud.crud_card import crud_card
+from app.crud.crud_card import crud_card, crud_card_production_batch
 from app.models.user import User
 from app.models.application import Application
 from app.models.license import License
 from app.models.person import Person
-from app.models.card import CardNumberGenerator, Card, CardType, CardStatus, CardLicense, ProductionStatus
+from app.models.card import CardNumberGenerator, Card, CardType, CardStatus, CardLicense, ProductionStatus, CardProductionBatch
 from app.models.enums import ApplicationStatus, LicenseCategory, BiometricDataType
 from app.models.printing import PrintJobStatus, PrintJobPriority, QualityCheckResult, PrintJobStatusHistory, PrintJob, PrintJobApplication
 from app.schemas.printing import (
     PrintJobCreateRequest, PrintJobResponse, PrintJobDetailResponse,
     PrintJobQueueMoveRequest, PrintJobAssignRequest, PrintJobStartRequest,
     PrintJobCompleteRequest, QualityCheckRequest, PrintJobSearchFilters,
-    PrintQueueResponse, PrintJobStatistics, PrintJobSearchResponse
+    PrintQueueResponse, PrintJobStatistics, PrintJobSearchResponse,
+    PrintJobBatchCreateRequest, PrintJobBatchFailure, PrintJobBatchResponse
 )
 from app.services.card_file_manager import card_file_manager
+from app.services.card_batch_renderer import render_cards, impose_rendered_cards
 from app.services.card_generator import madagascar_card_generator
+from app.services.file_delivery import file_response
+from app.services.print_file_retention import print_file_retention, RetentionPassRunning
+from app.services.storage_reconciliation import storage_reconciliation, ReconciliationRunning, AREAS as RECONCILE_AREAS
+from app.services.print_queue_events import print_queue_events, RESYNC, JOB_CREATED
+from app.services.sequence_service import sequence_service, max_numeric_suffix
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Bearer header is optional on the event stream: EventSource cannot set headers
+optional_bearer = HTTPBearer(auto_error=False)
+PRINT_QUEUE_STREAM_KEEPALIVE_SECONDS = 15
+PRINT_QUEUE_STREAM_RETRY_MS = 3000
+
 
 def get_person_primary_id_number(person) -> str:
     """
@@ -420,6 +437,380 @@ async def search_person_for_card_ordering(
 
 
 # Print Job Creation
+def build_print_job_inputs(
+    db: Session,
+    *,
+    application_id: UUID,
+    location_id: Optional[UUID],
+    card_template: str,
+    current_user: User
+) -> Dict[str, Any]:
+    """
+    Validate an application for printing and assemble the card data for its print job
+    
+    Shared by single and batch print job creation. Raises HTTPException when the
+    application cannot be printed. The returned license_data has no card_number
+    yet; callers add it once the number is allocated.
+    """
+    # Get primary application with biometric data
+    logger.info(f"Looking up application with ID: {application_id}")
+    from sqlalchemy.orm import joinedload
+    application = db.query(Application).options(
+        joinedload(Application.biometric_data),
+        joinedload(Application.person),
+        joinedload(Application.location)
+    ).filter(Application.id == application_id).first()
+    
+    if not application:
+        logger.error(f"Application not found with ID: {application_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Application not found with ID: {application_id}"
+        )
+    
+    logger.info(f"Found application: {application.application_number} (status: {application.status})")
+    
+    # Debug: Check if biometric data was loaded
+    logger.info(f"Application biometric_data loaded: {hasattr(application, 'biometric_data')}")
+    if hasattr(application, 'biometric_data') and application.biometric_data:
+        logger.info(f"Found {len(application.biometric_data)} biometric records in application")
+        for i, bio_data in enumerate(application.biometric_data):
+            logger.info(f"Biometric record {i}: type={bio_data.data_type}, file_path={bio_data.file_path}")
+    else:
+        logger.info("No biometric data found in loaded application")
+    
+    # Determine print location (admin users can specify location, others use application location)
+    if location_id:
+        # Admin user specified a print location
+        logger.info(f"Admin user specified print location: {location_id}")
+        print_location_id = location_id
+    
+        # Validate user has access to the specified print location
+        if not current_user.can_access_location(print_location_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to create print jobs for the specified location"
+            )
+    
+        # Get the print location to validate it exists
+        from app.crud.crud_location import location as crud_location
+        print_location = crud_location.get(db, id=print_location_id)
+        if not print_location:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Specified print location not found"
+            )
+    
+    else:
+        # Use application's location as print location
+        print_location_id = application.location_id
+    
+        # Validate user has access to the application's location
+        if not current_user.can_access_location(application.location_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to create print jobs for this location"
+            )
+    
+    # Validate application is ready for printing
+    if application.status not in [ApplicationStatus.APPROVED]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Application status must be APPROVED, currently {application.status}"
+        )
+    
+    # Get person details with all related data (aliases and addresses)
+    person = crud_person.get_with_details(db, id=application.person_id)
+    if not person:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Person not found"
+        )
+    
+    # Extract biometric data from the application for card printing
+    biometric_data = {
+        "photo_url": None,
+        "photo_path": None,
+        "signature_url": None,
+        "signature_path": None,
+        "fingerprint_url": None,
+        "fingerprint_path": None
+    }
+    
+    # Look through application biometric data
+    logger.info(f"Checking application biometric data...")
+    if hasattr(application, 'biometric_data') and application.biometric_data:
+        logger.info(f"Found {len(application.biometric_data)} biometric data records")
+        for i, bio_data in enumerate(application.biometric_data):
+            logger.info(f"Biometric record {i}: type={bio_data.data_type}, file_path={bio_data.file_path}")
+            logger.info(f"  bio_data.data_type type: {type(bio_data.data_type)}")
+            logger.info(f"  BiometricDataType.PHOTO: {BiometricDataType.PHOTO}, type: {type(BiometricDataType.PHOTO)}")
+            logger.info(f"  Comparison result: {bio_data.data_type == BiometricDataType.PHOTO}")
+    
+            if bio_data.data_type == BiometricDataType.PHOTO:
+                # Check if there's a license_ready version in metadata (optimized for card printing)
+                photo_path = bio_data.file_path
+                license_ready_photo_base64 = None
+    
+                logger.info(f"Photo metadata: {bio_data.metadata}")
+                if bio_data.metadata and isinstance(bio_data.metadata, dict):
+                    logger.info(f"Photo metadata keys: {list(bio_data.metadata.keys())}")
+                    license_ready = bio_data.metadata.get('license_ready_version', {})
+                    logger.info(f"License ready info: {license_ready}")
+                    if license_ready.get('file_path'):
+                        photo_path = license_ready['file_path']
+                        logger.info(f"Using license_ready photo: {photo_path}")
+    
+                        # Also read license_ready photo as base64 for barcode generation
+                        try:
+                            from app.services.card_file_manager import card_file_manager
+                            license_ready_photo_base64 = card_file_manager.read_file_as_base64(license_ready['file_path'])
+                            logger.info(f"Read license_ready photo as base64: {len(license_ready_photo_base64)} chars")
+                        except Exception as e:
+                            logger.warning(f"Could not read license_ready photo as base64: {e}")
+                    else:
+                        logger.info("No license_ready file_path found in metadata")
+                else:
+                    logger.info("No metadata found for photo biometric data")
+    
+                biometric_data["photo_url"] = None  # URL not available in ApplicationBiometricData model
+                biometric_data["photo_path"] = photo_path
+                biometric_data["license_ready_photo_base64"] = license_ready_photo_base64
+                logger.info(f"Set photo_path to: {photo_path}")
+                if license_ready_photo_base64:
+                    logger.info(f"Set license_ready_photo_base64: {len(license_ready_photo_base64)} chars")
+                else:
+                    logger.info("No license_ready_photo_base64 available")
+            elif bio_data.data_type == BiometricDataType.SIGNATURE:
+                biometric_data["signature_url"] = None  # URL not available in ApplicationBiometricData model
+                biometric_data["signature_path"] = bio_data.file_path
+                logger.info(f"Set signature_path to: {bio_data.file_path}")
+            elif bio_data.data_type == BiometricDataType.FINGERPRINT:
+                biometric_data["fingerprint_url"] = None  # URL not available in ApplicationBiometricData model
+                biometric_data["fingerprint_path"] = bio_data.file_path
+                logger.info(f"Set fingerprint_path to: {bio_data.file_path}")
+            else:
+                logger.warning(f"Unknown biometric data type: {bio_data.data_type} (type: {type(bio_data.data_type)})")
+    else:
+        logger.info(f"No biometric data found for application. hasattr={hasattr(application, 'biometric_data')}, biometric_data={getattr(application, 'biometric_data', 'MISSING')}")
+    
+    # Debug: Log what biometric data was actually collected
+    logger.info(f"Biometric data after processing:")
+    for key, value in biometric_data.items():
+        logger.info(f"  {key}: {value}")
+    
+    # Get all licenses for person (excluding learners permits)
+    logger.info(f"Getting licenses for person {application.person_id}")
+    person_licenses = crud_license.get_by_person_id(
+        db, 
+        person_id=application.person_id,
+        active_only=True
+    )
+    logger.info(f"Found {len(person_licenses)} total licenses for person {application.person_id}")
+    
+    # Filter out learners permits (they don't go on cards)
+    learners_categories = [LicenseCategory.L1, LicenseCategory.L2, LicenseCategory.L3]
+    card_licenses = [
+        license for license in person_licenses 
+        if license.category not in learners_categories
+    ]
+    logger.info(f"Found {len(card_licenses)} card-eligible licenses (excluding learners permits: {[cat.value for cat in learners_categories]})")
+    
+    # Check if the approved application is for a card-eligible category
+    application_is_card_eligible = (
+        application.license_category and 
+        application.license_category not in learners_categories
+    )
+    logger.info(f"Application {application.application_number} is card-eligible: {application_is_card_eligible} (category: {application.license_category.value if application.license_category else 'None'})")
+    
+    # Allow print job creation if there are existing card-eligible licenses OR the application is for a card-eligible category
+    if not card_licenses and not application_is_card_eligible:
+        logger.error(f"No valid licenses found for card printing - person {application.person_id} has {len(person_licenses)} total licenses but none are card-eligible, and application is not for a card-eligible category")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No valid licenses found for card printing - neither existing licenses nor the application qualify for card printing"
+        )
+    
+    logger.info(f"Print job validation passed - existing card licenses: {len(card_licenses)}, application card-eligible: {application_is_card_eligible}")
+    
+    # Use the print location (not application location) for card number generation
+    logger.info(f"Looking up print location with ID: {print_location_id}")
+    from app.crud.crud_location import location as crud_location
+    print_location = crud_location.get(db, id=print_location_id)
+    if not print_location:
+        logger.error(f"Print location not found with ID: {print_location_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Print location not found with ID: {print_location_id}"
+        )
+    
+    logger.info(f"Found print location: {print_location.name} (code: {print_location.code})")
+    
+    # Prepare license data for card generation
+    logger.info(f"Preparing license data for {len(card_licenses)} existing licenses")
+    
+    # Start with existing card-eligible licenses
+    licenses_for_card = [
+        {
+            "id": str(license.id),
+            "category": license.category.value,
+            "issue_date": license.issue_date.isoformat(),
+            "expiry_date": license.expiry_date.isoformat() if license.expiry_date else None,
+            "restrictions": license.restrictions,
+            "status": license.status.value
+        }
+        for license in card_licenses
+    ]
+    
+    # If no existing card-eligible licenses but application is for a card-eligible category,
+    # add the application's license information (it will become a license when printed)
+    if not card_licenses and application_is_card_eligible:
+        logger.info(f"Adding application license data for category {application.license_category.value}")
+        # Calculate issue and expiry dates for new license
+        issue_date = datetime.now()
+        expiry_date = issue_date + timedelta(days=365 * 10)  # 10 years validity
+    
+        licenses_for_card.append({
+            "id": str(application.id),  # Use application ID as temporary license ID
+            "category": application.license_category.value,
+            "issue_date": issue_date.isoformat(),
+            "expiry_date": expiry_date.isoformat(),
+            "restrictions": "0",  # Default no restrictions
+            "status": "ACTIVE"  # Will be active once issued
+        })
+    
+    license_data = {
+        "licenses": licenses_for_card,
+        "total_licenses": len(licenses_for_card),
+        "card_template": card_template,
+        "license_ready_photo_base64": biometric_data.get("license_ready_photo_base64")  # Add license_ready 8-bit photo for barcode
+    }
+    
+    logger.info(f"Final license data contains {len(licenses_for_card)} licenses for card generation")
+    
+    # Prepare person data for card generation
+    logger.info(f"Preparing person data for person {person.id}")
+    
+    # Get person ID number from their primary alias
+    person_id_number = None
+    if person.aliases:
+        primary_alias = next((alias for alias in person.aliases if alias.is_primary), person.aliases[0] if person.aliases else None)
+        if primary_alias:
+            person_id_number = primary_alias.document_number
+    
+    # Get primary address if available
+    primary_address = None
+    if person.addresses:
+        primary_address = next((addr for addr in person.addresses if addr.is_primary), person.addresses[0] if person.addresses else None)
+    
+    person_data = {
+        "id": str(person.id),
+        "first_name": person.first_name,
+        "last_name": person.surname,  # Use surname field from Person model
+        "middle_name": person.middle_name,
+        "date_of_birth": person.birth_date.isoformat() if person.birth_date else None,
+        "id_number": person_id_number,  # Use ID number from alias
+        "nationality_code": person.nationality_code,  # Use nationality_code field
+        "person_nature": person.person_nature,  # Gender info
+        "email_address": person.email_address,
+        "cell_phone": person.cell_phone,
+        "is_active": person.is_active,
+        # Address information
+        "address": {
+            "street_line1": primary_address.street_line1 if primary_address else "",
+            "street_line2": primary_address.street_line2 if primary_address else "",
+            "locality": primary_address.locality if primary_address else "",
+            "town": primary_address.town if primary_address else "",
+            "postal_code": primary_address.postal_code if primary_address else "",
+            "province_code": primary_address.province_code if primary_address else ""
+        },
+        # Biometric data (from applications, not person directly)
+        "biometric_data": {
+            "photo_url": biometric_data.get("photo_url"),
+            "photo_path": biometric_data.get("photo_path"),
+            "signature_url": biometric_data.get("signature_url"),
+            "signature_path": biometric_data.get("signature_path"),
+            "fingerprint_url": biometric_data.get("fingerprint_url"),
+            "fingerprint_path": biometric_data.get("fingerprint_path")
+        }
+    }
+    
+    # Debug: Log the final biometric data being passed to card generator
+    logger.info(f"Final person_data biometric paths:")
+    logger.info(f"  photo_path: {biometric_data.get('photo_path')}")
+    logger.info(f"  signature_path: {biometric_data.get('signature_path')}")
+    logger.info(f"  fingerprint_path: {biometric_data.get('fingerprint_path')}")
+    
+    return {
+        "application": application,
+        "print_location_id": print_location_id,
+        "print_location": print_location,
+        "card_licenses": card_licenses,
+        "license_data": license_data,
+        "person_data": person_data
+    }
+
+
+def create_card_for_print_job(
+    db: Session,
+    *,
+    print_job: PrintJob,
+    card_number: str,
+    print_location_id: UUID,
+    card_licenses: List[License],
+    current_user: User
+):
+    """Create the Card entity that represents the physical card of a print job"""
+    # Create the actual Card entity that represents the physical card
+    try:
+        logger.info(f"Creating Card entity for print job {print_job.id}")
+
+        # Calculate card validity period (5 years for standard cards)
+        valid_from = datetime.utcnow()
+        valid_until = valid_from + timedelta(days=365 * 5)  # 5 years
+
+        # Create Card entity
+        card = Card(
+            card_number=card_number,
+            person_id=print_job.person_id,
+            card_type=CardType.STANDARD,
+            status=CardStatus.ORDERED,  # Card ordered for production when print job is created
+            production_status=ProductionStatus.NOT_STARTED,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            ordered_date=datetime.utcnow(),  # Mark as ordered
+            created_from_application_id=print_job.primary_application_id,
+            production_location_id=print_location_id,
+            collection_location_id=print_location_id,  # Same location for collection
+            is_active=True,
+            created_by=current_user.id,
+            created_at=datetime.utcnow()
+        )
+
+        db.add(card)
+        db.flush()  # Get card ID
+        logger.info(f"Created Card entity with ID: {card.id}")
+
+        # Create CardLicense associations for all card-eligible licenses
+        for i, license in enumerate(card_licenses):
+            card_license = CardLicense(
+                card_id=card.id,
+                license_id=license.id,
+                is_primary=(i == 0),  # First license is primary
+                added_by=current_user.id,
+                added_at=datetime.utcnow()
+            )
+            db.add(card_license)
+            logger.info(f"Associated license {license.category.value} with card {card.id}")
+
+        logger.info(f"Card entity created successfully with {len(card_licenses)} license associations")
+
+    except Exception as card_error:
+        logger.error(f"Failed to create Card entity: {card_error}", exc_info=True)
+        # Don't fail the print job creation if card creation fails
+        # The print job can still proceed without the card entity
+
+
 @router.post("/jobs", response_model=PrintJobResponse, summary="Create Print Job")
 @audit_create(resource_type="PRINT_JOB", screen_reference="PrintJobCreation")
 async def create_print_job(
@@ -442,201 +833,20 @@ async def create_print_job(
         logger.info(f"Request data: application_id={request.application_id}, location_id={request.location_id}, card_template={request.card_template}")
         logger.info(f"Current user: {current_user.id} ({current_user.username})")
         
-        # Get primary application with biometric data
-        logger.info(f"Looking up application with ID: {request.application_id}")
-        from sqlalchemy.orm import joinedload
-        application = db.query(Application).options(
-            joinedload(Application.biometric_data),
-            joinedload(Application.person),
-            joinedload(Application.location)
-        ).filter(Application.id == request.application_id).first()
-        
-        if not application:
-            logger.error(f"Application not found with ID: {request.application_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Application not found with ID: {request.application_id}"
-            )
-        
-        logger.info(f"Found application: {application.application_number} (status: {application.status})")
-        
-        # Debug: Check if biometric data was loaded
-        logger.info(f"Application biometric_data loaded: {hasattr(application, 'biometric_data')}")
-        if hasattr(application, 'biometric_data') and application.biometric_data:
-            logger.info(f"Found {len(application.biometric_data)} biometric records in application")
-            for i, bio_data in enumerate(application.biometric_data):
-                logger.info(f"Biometric record {i}: type={bio_data.data_type}, file_path={bio_data.file_path}")
-        else:
-            logger.info("No biometric data found in loaded application")
-        
-        # Determine print location (admin users can specify location, others use application location)
-        if request.location_id:
-            # Admin user specified a print location
-            logger.info(f"Admin user specified print location: {request.location_id}")
-            print_location_id = request.location_id
-            
-            # Validate user has access to the specified print location
-            if not current_user.can_access_location(print_location_id):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not authorized to create print jobs for the specified location"
-                )
-            
-            # Get the print location to validate it exists
-            from app.crud.crud_location import location as crud_location
-            print_location = crud_location.get(db, id=print_location_id)
-            if not print_location:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Specified print location not found"
-                )
-                
-        else:
-            # Use application's location as print location
-            print_location_id = application.location_id
-            
-            # Validate user has access to the application's location
-            if not current_user.can_access_location(application.location_id):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not authorized to create print jobs for this location"
-                )
-        
-        # Validate application is ready for printing
-        if application.status not in [ApplicationStatus.APPROVED]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Application status must be APPROVED, currently {application.status}"
-            )
-        
-        # Get person details with all related data (aliases and addresses)
-        person = crud_person.get_with_details(db, id=application.person_id)
-        if not person:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Person not found"
-            )
-        
-        # Extract biometric data from the application for card printing
-        biometric_data = {
-            "photo_url": None,
-            "photo_path": None,
-            "signature_url": None,
-            "signature_path": None,
-            "fingerprint_url": None,
-            "fingerprint_path": None
-        }
-        
-        # Look through application biometric data
-        logger.info(f"Checking application biometric data...")
-        if hasattr(application, 'biometric_data') and application.biometric_data:
-            logger.info(f"Found {len(application.biometric_data)} biometric data records")
-            for i, bio_data in enumerate(application.biometric_data):
-                logger.info(f"Biometric record {i}: type={bio_data.data_type}, file_path={bio_data.file_path}")
-                logger.info(f"  bio_data.data_type type: {type(bio_data.data_type)}")
-                logger.info(f"  BiometricDataType.PHOTO: {BiometricDataType.PHOTO}, type: {type(BiometricDataType.PHOTO)}")
-                logger.info(f"  Comparison result: {bio_data.data_type == BiometricDataType.PHOTO}")
-                
-                if bio_data.data_type == BiometricDataType.PHOTO:
-                    # Check if there's a license_ready version in metadata (optimized for card printing)
-                    photo_path = bio_data.file_path
-                    license_ready_photo_base64 = None
-                    
-                    logger.info(f"Photo metadata: {bio_data.metadata}")
-                    if bio_data.metadata and isinstance(bio_data.metadata, dict):
-                        logger.info(f"Photo metadata keys: {list(bio_data.metadata.keys())}")
-                        license_ready = bio_data.metadata.get('license_ready_version', {})
-                        logger.info(f"License ready info: {license_ready}")
-                        if license_ready.get('file_path'):
-                            photo_path = license_ready['file_path']
-                            logger.info(f"Using license_ready photo: {photo_path}")
-                            
-                            # Also read license_ready photo as base64 for barcode generation
-                            try:
-                                from app.services.card_file_manager import card_file_manager
-                                license_ready_photo_base64 = card_file_manager.read_file_as_base64(license_ready['file_path'])
-                                logger.info(f"Read license_ready photo as base64: {len(license_ready_photo_base64)} chars")
-                            except Exception as e:
-                                logger.warning(f"Could not read license_ready photo as base64: {e}")
-                        else:
-                            logger.info("No license_ready file_path found in metadata")
-                    else:
-                        logger.info("No metadata found for photo biometric data")
-                    
-                    biometric_data["photo_url"] = None  # URL not available in ApplicationBiometricData model
-                    biometric_data["photo_path"] = photo_path
-                    biometric_data["license_ready_photo_base64"] = license_ready_photo_base64
-                    logger.info(f"Set photo_path to: {photo_path}")
-                    if license_ready_photo_base64:
-                        logger.info(f"Set license_ready_photo_base64: {len(license_ready_photo_base64)} chars")
-                    else:
-                        logger.info("No license_ready_photo_base64 available")
-                elif bio_data.data_type == BiometricDataType.SIGNATURE:
-                    biometric_data["signature_url"] = None  # URL not available in ApplicationBiometricData model
-                    biometric_data["signature_path"] = bio_data.file_path
-                    logger.info(f"Set signature_path to: {bio_data.file_path}")
-                elif bio_data.data_type == BiometricDataType.FINGERPRINT:
-                    biometric_data["fingerprint_url"] = None  # URL not available in ApplicationBiometricData model
-                    biometric_data["fingerprint_path"] = bio_data.file_path
-                    logger.info(f"Set fingerprint_path to: {bio_data.file_path}")
-                else:
-                    logger.warning(f"Unknown biometric data type: {bio_data.data_type} (type: {type(bio_data.data_type)})")
-        else:
-            logger.info(f"No biometric data found for application. hasattr={hasattr(application, 'biometric_data')}, biometric_data={getattr(application, 'biometric_data', 'MISSING')}")
-        
-        # Debug: Log what biometric data was actually collected
-        logger.info(f"Biometric data after processing:")
-        for key, value in biometric_data.items():
-            logger.info(f"  {key}: {value}")
-        
-        # Get all licenses for person (excluding learners permits)
-        logger.info(f"Getting licenses for person {application.person_id}")
-        person_licenses = crud_license.get_by_person_id(
-            db, 
-            person_id=application.person_id,
-            active_only=True
-        )
-        logger.info(f"Found {len(person_licenses)} total licenses for person {application.person_id}")
-        
-        # Filter out learners permits (they don't go on cards)
-        learners_categories = [LicenseCategory.L1, LicenseCategory.L2, LicenseCategory.L3]
-        card_licenses = [
-            license for license in person_licenses 
-            if license.category not in learners_categories
-        ]
-        logger.info(f"Found {len(card_licenses)} card-eligible licenses (excluding learners permits: {[cat.value for cat in learners_categories]})")
-        
-        # Check if the approved application is for a card-eligible category
-        application_is_card_eligible = (
-            application.license_category and 
-            application.license_category not in learners_categories
+        inputs = build_print_job_inputs(
+            db,
+            application_id=request.application_id,
+            location_id=request.location_id,
+            card_template=request.card_template,
+            current_user=current_user
         )
-        logger.info(f"Application {application.application_number} is card-eligible: {application_is_card_eligible} (category: {application.license_category.value if application.license_category else 'None'})")
-        
-        # Allow print job creation if there are existing card-eligible licenses OR the application is for a card-eligible category
-        if not card_licenses and not application_is_card_eligible:
-            logger.error(f"No valid licenses found for card printing - person {application.person_id} has {len(person_licenses)} total licenses but none are card-eligible, and application is not for a card-eligible category")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid licenses found for card printing - neither existing licenses nor the application qualify for card printing"
-            )
-        
-        logger.info(f"Print job validation passed - existing card licenses: {len(card_licenses)}, application card-eligible: {application_is_card_eligible}")
+        application = inputs["application"]
+        print_location_id = inputs["print_location_id"]
+        card_licenses = inputs["card_licenses"]
+        person_data = inputs["person_data"]
         
         # Generate card number
-        # Use the print location (not application location) for card number generation
-        logger.info(f"Looking up print location with ID: {print_location_id}")
-        from app.crud.crud_location import location as crud_location
-        print_location = crud_location.get(db, id=print_location_id)
-        if not print_location:
-            logger.error(f"Print location not found with ID: {print_location_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Print location not found with ID: {print_location_id}"
-            )
-        
-        logger.info(f"Found print location: {print_location.name} (code: {print_location.code})")
-        location_code = print_location.code
+        location_code = inputs["print_location"].code
         logger.info(f"Generating card number with location code: {location_code}")
         sequence_number = CardNumberGenerator.get_next_sequence_number(db, location_code)
         
@@ -647,101 +857,8 @@ async def create_print_job(
         )
         logger.info(f"Generated card number: {card_number}")
         
-        # Prepare license data for card generation
-        logger.info(f"Preparing license data for {len(card_licenses)} existing licenses")
-        
-        # Start with existing card-eligible licenses
-        licenses_for_card = [
-            {
-                "id": str(license.id),
-                "category": license.category.value,
-                "issue_date": license.issue_date.isoformat(),
-                "expiry_date": license.expiry_date.isoformat() if license.expiry_date else None,
-                "restrictions": license.restrictions,
-                "status": license.status.value
-            }
-            for license in card_licenses
-        ]
-        
-        # If no existing card-eligible licenses but application is for a card-eligible category,
-        # add the application's license information (it will become a license when printed)
-        if not card_licenses and application_is_card_eligible:
-            logger.info(f"Adding application license data for category {application.license_category.value}")
-            # Calculate issue and expiry dates for new license
-            issue_date = datetime.now()
-            expiry_date = issue_date + timedelta(days=365 * 10)  # 10 years validity
-            
-            licenses_for_card.append({
-                "id": str(application.id),  # Use application ID as temporary license ID
-                "category": application.license_category.value,
-                "issue_date": issue_date.isoformat(),
-                "expiry_date": expiry_date.isoformat(),
-                "restrictions": "0",  # Default no restrictions
-                "status": "ACTIVE"  # Will be active once issued
-            })
-        
-        license_data = {
-            "licenses": licenses_for_card,
-            "total_licenses": len(licenses_for_card),
-            "card_template": request.card_template,
-            "card_number": card_number,  # Add the generated card number with location code + sequence + checksum
-            "license_ready_photo_base64": biometric_data.get("license_ready_photo_base64")  # Add license_ready 8-bit photo for barcode
-        }
-        
-        logger.info(f"Final license data contains {len(licenses_for_card)} licenses for card generation")
-        
-        # Prepare person data for card generation
-        logger.info(f"Preparing person data for person {person.id}")
-        
-        # Get person ID number from their primary alias
-        person_id_number = None
-        if person.aliases:
-            primary_alias = next((alias for alias in person.aliases if alias.is_primary), person.aliases[0] if person.aliases else None)
-            if primary_alias:
-                person_id_number = primary_alias.document_number
-        
-        # Get primary address if available
-        primary_address = None
-        if person.addresses:
-            primary_address = next((addr for addr in person.addresses if addr.is_primary), person.addresses[0] if person.addresses else None)
-        
-        person_data = {
-            "id": str(person.id),
-            "first_name": person.first_name,
-            "last_name": person.surname,  # Use surname field from Person model
-            "middle_name": person.middle_name,
-            "date_of_birth": person.birth_date.isoformat() if person.birth_date else None,
-            "id_number": person_id_number,  # Use ID number from alias
-            "nationality_code": person.nationality_code,  # Use nationality_code field
-            "person_nature": person.person_nature,  # Gender info
-            "email_address": person.email_address,
-            "cell_phone": person.cell_phone,
-            "is_active": person.is_active,
-            # Address information
-            "address": {
-                "street_line1": primary_address.street_line1 if primary_address else "",
-                "street_line2": primary_address.street_line2 if primary_address else "",
-                "locality": primary_address.locality if primary_address else "",
-                "town": primary_address.town if primary_address else "",
-                "postal_code": primary_address.postal_code if primary_address else "",
-                "province_code": primary_address.province_code if primary_address else ""
-            },
-            # Biometric data (from applications, not person directly)
-            "biometric_data": {
-                "photo_url": biometric_data.get("photo_url"),
-                "photo_path": biometric_data.get("photo_path"),
-                "signature_url": biometric_data.get("signature_url"),
-                "signature_path": biometric_data.get("signature_path"),
-                "fingerprint_url": biometric_data.get("fingerprint_url"),
-                "fingerprint_path": biometric_data.get("fingerprint_path")
-            }
-        }
-        
-        # Debug: Log the final biometric data being passed to card generator
-        logger.info(f"Final person_data biometric paths:")
-        logger.info(f"  photo_path: {biometric_data.get('photo_path')}")
-        logger.info(f"  signature_path: {biometric_data.get('signature_path')}")
-        logger.info(f"  fingerprint_path: {biometric_data.get('fingerprint_path')}")
+        # Add the generated card number with location code + sequence + checksum
+        license_data = {**inputs["license_data"], "card_number": card_number}
         
         # Create print job
         logger.info(f"Calling create_print_job with application_id={request.application_id}, print_location_id={print_location_id}")
@@ -758,54 +875,14 @@ async def create_print_job(
         )
         logger.info(f"Print job created successfully with ID: {print_job.id}")
         
-        # Create the actual Card entity that represents the physical card
-        try:
-            logger.info(f"Creating Card entity for print job {print_job.id}")
-            
-            # Calculate card validity period (5 years for standard cards)
-            valid_from = datetime.utcnow()
-            valid_until = valid_from + timedelta(days=365 * 5)  # 5 years
-            
-            # Create Card entity
-            card = Card(
-                card_number=card_number,
-                person_id=application.person_id,
-                card_type=CardType.STANDARD,
-                status=CardStatus.ORDERED,  # Card ordered for production when print job is created
-                production_status=ProductionStatus.NOT_STARTED,
-                valid_from=valid_from,
-                valid_until=valid_until,
-                ordered_date=datetime.utcnow(),  # Mark as ordered
-                created_from_application_id=request.application_id,
-                production_location_id=print_location_id,
-                collection_location_id=print_location_id,  # Same location for collection
-                is_active=True,
-                created_by=current_user.id,
-                created_at=datetime.utcnow()
-            )
-            
-            db.add(card)
-            db.flush()  # Get card ID
-            logger.info(f"Created Card entity with ID: {card.id}")
-            
-            # Create CardLicense associations for all card-eligible licenses
-            for i, license in enumerate(card_licenses):
-                card_license = CardLicense(
-                    card_id=card.id,
-                    license_id=license.id,
-                    is_primary=(i == 0),  # First license is primary
-                    added_by=current_user.id,
-                    added_at=datetime.utcnow()
-                )
-                db.add(card_license)
-                logger.info(f"Associated license {license.category.value} with card {card.id}")
-            
-            logger.info(f"Card entity created successfully with {len(card_licenses)} license associations")
-            
-        except Exception as card_error:
-            logger.error(f"Failed to create Card entity: {card_error}", exc_info=True)
-            # Don't fail the print job creation if card creation fails
-            # The print job can still proceed without the card entity
+        create_card_for_print_job(
+            db,
+            print_job=print_job,
+            card_number=card_number,
+            print_location_id=print_location_id,
+            card_licenses=card_licenses,
+            current_user=current_user
+        )
         
         # Update application status
         application.status = ApplicationStatus.SENT_TO_PRINTER
@@ -871,6 +948,237 @@ async def create_print_job(
         )
 
 
+@router.post("/jobs/batch", response_model=PrintJobBatchResponse, summary="Create Print Jobs in Batch")
+@audit_create(resource_type="PRINT_JOB", screen_reference="PrintJobBatchCreation")
+async def create_print_job_batch(
+    request: PrintJobBatchCreateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("printing.create"))
+):
+    """
+    Create print jobs for many approved applications as one production batch
+    
+    This endpoint:
+    1. Validates every application like single job creation (invalid ones are reported, not fatal)
+    2. Reserves card numbers, job numbers and queue ranks for the whole batch at once
+    3. Creates all jobs, cards and application updates in one transaction
+    4. Renders card files for all jobs in parallel
+    5. Imposes the batch on duplex A4 sheets (2 x 5 cards per page)
+    """
+    settings = get_settings()
+    if len(request.application_ids) > settings.MAX_PRINT_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large: {len(request.application_ids)} applications (maximum {settings.MAX_PRINT_BATCH_SIZE})"
+        )
+    
+    failed: List[PrintJobBatchFailure] = []
+    prepared: List[Dict[str, Any]] = []
+    batch_location_id = request.location_id
+    
+    # Validate applications and assemble card data
+    for application_id in request.application_ids:
+        try:
+            inputs = build_print_job_inputs(
+                db,
+                application_id=application_id,
+                location_id=batch_location_id,
+                card_template=request.card_template,
+                current_user=current_user
+            )
+        except HTTPException as e:
+            failed.append(PrintJobBatchFailure(application_id=application_id, error=str(e.detail)))
+            continue
+        except Exception as e:
+            logger.error(f"Failed to prepare application {application_id} for batch printing: {e}", exc_info=True)
+            failed.append(PrintJobBatchFailure(application_id=application_id, error=str(e) or type(e).__name__))
+            continue
+        
+        if batch_location_id is None:
+            batch_location_id = inputs["print_location_id"]
+        elif inputs["print_location_id"] != batch_location_id:
+            failed.append(PrintJobBatchFailure(
+                application_id=application_id,
+                error="Application belongs to a different print location than the batch"
+            ))
+            continue
+        prepared.append(inputs)
+    
+    if not prepared:
+        return PrintJobBatchResponse(
+            print_location_id=batch_location_id,
+            total_requested=len(request.application_ids),
+            failed=failed
+        )
+    
+    try:
+        # Reserve numbers for the whole batch (one counter update each)
+        location_code = prepared[0]["print_location"].code
+        today = datetime.utcnow().strftime("%Y%m%d")
+        count = len(prepared)
+        first_card_sequence, _ = sequence_service.allocate_block(
+            "card", scope=location_code, size=count,
+            seed=lambda session: CardNumberGenerator.legacy_sequence(session, location_code)
+        )
+        job_prefix = f"PJ{today}{location_code}"
+        first_job_sequence, _ = sequence_service.allocate_block(
+            "print_job", scope=location_code, period=today, size=count,
+            seed=lambda session: max_numeric_suffix(session, PrintJob.job_number, job_prefix)
+        )
+        queue_positions = crud_print_queue.add_many_to_queue(db, batch_location_id, count)
+        
+        batch = crud_card_production_batch.create_print_batch(
+            db,
+            production_location_id=batch_location_id,
+            location_code=location_code,
+            batch_size=count,
+            template_used=request.card_template,
+            production_notes=request.production_notes,
+            current_user=current_user
+        )
+        
+        created_jobs: List[PrintJob] = []
+        for index, inputs in enumerate(prepared):
+            application = inputs["application"]
+            card_number = Card.generate_card_number(
+                location_code, first_card_sequence + index,
+                card_type=CardType.STANDARD
+            )
+            
+            # Savepoint per job: one bad application does not sink the batch
+            savepoint = db.begin_nested()
+            try:
+                print_job = crud_print_job.create_print_job(
+                    db=db,
+                    application_id=application.id,
+                    person_id=application.person_id,
+                    print_location_id=batch_location_id,
+                    card_number=card_number,
+                    license_data={**inputs["license_data"], "card_number": card_number},
+                    person_data=inputs["person_data"],
+                    current_user=current_user,
+                    job_number=f"{job_prefix}{first_job_sequence + index:03d}",
+                    queue_position=queue_positions[index],
+                    production_batch_id=batch.batch_id,
+                    render_files=False,
+                    commit=False
+                )
+                create_card_for_print_job(
+                    db,
+                    print_job=print_job,
+                    card_number=card_number,
+                    print_location_id=batch_location_id,
+                    card_licenses=inputs["card_licenses"],
+                    current_user=current_user
+                )
+                application.status = ApplicationStatus.SENT_TO_PRINTER
+                application.print_job_id = print_job.id
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                crud_print_queue.remove_from_queue(db, batch_location_id)
+                logger.error(f"Failed to create batch print job for application {application.id}: {e}", exc_info=True)
+                failed.append(PrintJobBatchFailure(application_id=application.id, error=str(e) or type(e).__name__))
+                continue
+            created_jobs.append(print_job)
+        
+        batch.batch_size = len(created_jobs)
+        jobs_data = [crud_print_job.card_generation_data(job) for job in created_jobs]
+        job_ids = [job.id for job in created_jobs]
+        batch_id = batch.batch_id
+        batch_date = batch.batch_date
+        db.commit()
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batch print job creation failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create print job batch: {str(e) or type(e).__name__}"
+        )
+    
+    # Render card files in parallel, outside the transaction
+    render_results = await render_cards(jobs_data)
+    
+    jobs = db.query(PrintJob).options(
+        selectinload(PrintJob.job_applications).selectinload(PrintJobApplication.application),
+        selectinload(PrintJob.person),
+        selectinload(PrintJob.print_location),
+        selectinload(PrintJob.assigned_to_user)
+    ).filter(PrintJob.id.in_(job_ids)).all()
+    jobs_by_id = {job.id: job for job in jobs}
+    
+    generated_results = []
+    for job_id, (generation_result, error) in zip(job_ids, render_results):
+        print_job = jobs_by_id[job_id]
+        if generation_result:
+            crud_print_job.apply_generation_result(print_job, generation_result)
+            generated_results.append(generation_result)
+        else:
+            crud_print_job.mark_generation_failed(print_job, Exception(error))
+    
+    sheet_available = False
+    if generated_results:
+        try:
+            loop = asyncio.get_running_loop()
+            sheet_pdf = await loop.run_in_executor(
+                None, impose_rendered_cards, card_file_manager.base_path, generated_results, f"Production batch {batch_id}"
+            )
+            if sheet_pdf:
+                card_file_manager.save_batch_sheet(batch_id, sheet_pdf, created_at=batch_date)
+                sheet_available = True
+        except Exception as e:
+            logger.error(f"Failed to build imposed sheet for batch {batch_id}: {e}", exc_info=True)
+    
+    db.commit()
+    
+    ordered_jobs = [jobs_by_id[job_id] for job_id in job_ids]
+    for print_job in ordered_jobs:
+        print_queue_events.publish_job(JOB_CREATED, print_job)
+    
+    logger.info(f"Created batch {batch_id}: {len(ordered_jobs)} jobs, {len(generated_results)} rendered, {len(failed)} failed")
+    
+    return PrintJobBatchResponse(
+        batch_id=batch_id,
+        print_location_id=batch_location_id,
+        total_requested=len(request.application_ids),
+        created_jobs=[serialize_print_job_response(job) for job in ordered_jobs],
+        failed=failed,
+        files_generated=len(generated_results),
+        sheet_available=sheet_available
+    )
+
+
+@router.get("/batches/{batch_id}/sheet", summary="Get Production Batch Sheet")
+async def get_production_batch_sheet(
+    batch_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("printing.read"))
+):
+    """Get the imposed duplex A4 PDF with every card of a production batch"""
+    batch = db.query(CardProductionBatch).filter(CardProductionBatch.batch_id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Production batch not found")
+    
+    if not current_user.can_access_location(batch.production_location_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access batches for this location"
+        )
+    
+    sheet_path = card_file_manager.get_batch_sheet_path(batch.batch_id, batch.batch_date)
+    if not sheet_path:
+        raise HTTPException(status_code=404, detail="Batch sheet not found on disk")
+    
+    return await file_response(
+        request,
+        sheet_path,
+        media_type="application/pdf",
+        filename=f"batch_{batch.batch_id}.pdf"
+    )
+
+
 # Queue Management
 @router.get("/queues", response_model=List[PrintQueueResponse], summary="Get Accessible Print Queues")
 async def get_accessible_print_queues(
@@ -902,18 +1210,26 @@ async def get_accessible_print_queues(
         if location:
             accessible_locations = [location]
     
-    # Get print queues for accessible locations
+    # Get print queues for accessible locations in a single query
+    from app.models.printing import PrintQueue
+    queue_rows = {
+        queue.location_id: queue
+        for queue in db.query(PrintQueue).filter(
+            PrintQueue.location_id.in_([location.id for location in accessible_locations])
+        ).all()
+    } if accessible_locations else {}
+    
     queues = []
     for location in accessible_locations:
         try:
-            print_queue = crud_print_queue.get_or_create_queue(db, location_id=location.id)
+            print_queue = queue_rows.get(location.id)
             queue_response = PrintQueueResponse(
                 location_id=location.id,
                 location_name=location.name,
-                current_queue_size=print_queue.current_queue_size,
-                total_jobs_processed=print_queue.total_jobs_processed,
-                average_processing_time_minutes=float(print_queue.average_processing_time_minutes) if print_queue.average_processing_time_minutes else None,
-                last_updated=print_queue.last_updated,
+                current_queue_size=print_queue.current_queue_size if print_queue else 0,
+                total_jobs_processed=print_queue.total_jobs_processed if print_queue else 0,
+                average_processing_time_minutes=float(print_queue.average_processing_time_minutes) if print_queue and print_queue.average_processing_time_minutes else None,
+                last_updated=print_queue.last_updated if print_queue else datetime.utcnow(),
                 queued_jobs=[],  # Empty for summary view
                 in_progress_jobs=[],  # Empty for summary view
                 completed_jobs=[]  # Empty for summary view
@@ -985,6 +1301,101 @@ async def get_print_queue(
     )
 
 
+@router.get("/queue/{location_id}/events", summary="Stream Print Queue Updates")
+async def stream_print_queue_events(
+    request: Request,
+    location_id: UUID = Path(..., description="Location ID"),
+    access_token: Optional[str] = Query(None, description="JWT for clients that cannot set headers (EventSource)"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events stream of print queue changes for a location
+    
+    Clients load the queue once from GET /queue/{location_id}, then apply the
+    job-level deltas from this stream (job_created, job_moved, status_changed,
+    qa_result) to their local copy instead of polling. Reconnects send
+    Last-Event-ID and receive only missed events; a `resync` event means the
+    local copy should be refetched once.
+    """
+    if credentials is None and access_token:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    current_user = get_current_user(credentials=credentials, db=db)
+    if not check_permission(current_user, "printing.read"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Permission required: printing.read"
+        )
+    if not current_user.can_access_location(location_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view print queue for this location"
+        )
+    
+    # Long-lived stream: hand the pooled connection back before streaming
+    db.close()
+    
+    def format_event(event: Dict[str, Any]) -> str:
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    def resync_event() -> str:
+        current_id = print_queue_events.last_event_id(location_id)
+        payload = {"id": current_id, "type": RESYNC, "data": {"location_id": str(location_id)}}
+        return f"id: {current_id}\nevent: {RESYNC}\ndata: {json.dumps(payload)}\n\n"
+    
+    async def event_stream():
+        subscription = print_queue_events.subscribe(location_id)
+        try:
+            yield f"retry: {PRINT_QUEUE_STREAM_RETRY_MS}\n\n"
+            
+            if last_event_id is None:
+                yield resync_event()
+            else:
+                missed = print_queue_events.events_since(location_id, last_event_id)
+                if missed is None:
+                    yield resync_event()
+                else:
+                    for event in missed:
+                        yield format_event(event)
+            
+            while True:
+                if await request.is_disconnected():
+                    break
+                if subscription.overflowed:
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.overflowed = False
+                    yield resync_event()
+                    continue
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=PRINT_QUEUE_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            print_queue_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.post("/jobs/{job_id}/move-to-top", response_model=PrintJobResponse, summary="Move Job to Top of Queue")
 async def move_job_to_top(
     job_id: UUID = Path(..., description="Print Job ID"),
@@ -1480,13 +1891,18 @@ async def get_print_statistics(
     ) 
 
 
-@router.get("/jobs/{job_id}/files/front")
-async def get_print_job_front_card(
+async def _serve_print_job_file(
+    request: Request,
     job_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User,
+    db: Session,
+    file_type: str,
+    media_type: str,
+    filename_prefix: str,
+    extension: str,
+    missing_detail: str
 ) -> Response:
-    """Get front card image/PDF for print job"""
+    """Serve one of a print job's card files from disk (ETag/304 and Range aware)"""
     
     # Check permissions
     if not current_user.has_permission("printing.read"):
@@ -1508,133 +1924,80 @@ async def get_print_job_front_card(
             detail="Card files have been deleted after QA completion"
         )
     
+    file_path = card_file_manager.get_file_path(
+        print_job_id=str(print_job.id),
+        file_type=file_type,
+        created_at=print_job.submitted_at
+    )
+    if not file_path:
+        raise HTTPException(status_code=404, detail=missing_detail)
+    
     try:
-        # Get file content from disk
-        file_content = card_file_manager.get_file_content(
-            print_job_id=str(print_job.id),
-            file_type="front_image",
-            created_at=print_job.submitted_at
-        )
-        
-        if not file_content:
-            raise HTTPException(status_code=404, detail="Front card image not found on disk")
-        
-        return Response(
-            content=file_content,
-            media_type="image/png",
-            headers={
-                "Content-Disposition": f"attachment; filename=card_front_{print_job.job_number}.png",
-                "Content-Length": str(len(file_content))
-            }
+        return await file_response(
+            request,
+            file_path,
+            media_type=media_type,
+            filename=f"{filename_prefix}_{print_job.job_number}.{extension}"
         )
-        
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=missing_detail)
     except Exception as e:
-        logger.error(f"Error retrieving front card for job {job_id}: {e}")
+        logger.error(f"Error retrieving {file_type} for job {job_id}: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving card file")
 
 
+@router.get("/jobs/{job_id}/files/front")
+async def get_print_job_front_card(
+    job_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Get front card image/PDF for print job"""
+    return await _serve_print_job_file(
+        request, job_id, current_user, db,
+        file_type="front_image",
+        media_type="image/png",
+        filename_prefix="card_front",
+        extension="png",
+        missing_detail="Front card image not found on disk"
+    )
+
+
 @router.get("/jobs/{job_id}/files/back")
 async def get_print_job_back_card(
     job_id: UUID,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Response:
     """Get back card image/PDF for print job"""
-    
-    # Check permissions
-    if not current_user.has_permission("printing.read"):
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    # Get print job
-    print_job = crud_print_job.get(db, id=job_id)
-    if not print_job:
-        raise HTTPException(status_code=404, detail="Print job not found")
-    
-    # Check if files were generated and still exist
-    if not print_job.generation_metadata or not print_job.generation_metadata.get("files_saved_to_disk"):
-        raise HTTPException(status_code=404, detail="Card files were not generated")
-    
-    if print_job.generation_metadata.get("files_deleted_after_qa"):
-        raise HTTPException(
-            status_code=410, 
-            detail="Card files have been deleted after QA completion"
-        )
-    
-    try:
-        # Get file content from disk
-        file_content = card_file_manager.get_file_content(
-            print_job_id=str(print_job.id),
-            file_type="back_image", 
-            created_at=print_job.submitted_at
-        )
-        
-        if not file_content:
-            raise HTTPException(status_code=404, detail="Back card image not found on disk")
-        
-        return Response(
-            content=file_content,
-            media_type="image/png",
-            headers={
-                "Content-Disposition": f"attachment; filename=card_back_{print_job.job_number}.png",
-                "Content-Length": str(len(file_content))
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Error retrieving back card for job {job_id}: {e}")
-        raise HTTPException(status_code=500, detail="Error retrieving card file")
+    return await _serve_print_job_file(
+        request, job_id, current_user, db,
+        file_type="back_image",
+        media_type="image/png",
+        filename_prefix="card_back",
+        extension="png",
+        missing_detail="Back card image not found on disk"
+    )
 
 
 @router.get("/jobs/{job_id}/files/combined-pdf")
 async def get_print_job_combined_pdf(
     job_id: UUID,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Response:
     """Get combined PDF (front + back) for print job"""
-    
-    # Check permissions
-    if not current_user.has_permission("printing.read"):
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    # Get print job
-    print_job = crud_print_job.get(db, id=job_id)
-    if not print_job:
-        raise HTTPException(status_code=404, detail="Print job not found")
-    
-    # Check if files were generated and still exist
-    if not print_job.generation_metadata or not print_job.generation_metadata.get("files_saved_to_disk"):
-        raise HTTPException(status_code=404, detail="Card files were not generated")
-    
-    if print_job.generation_metadata.get("files_deleted_after_qa"):
-        raise HTTPException(
-            status_code=410, 
-            detail="Card files have been deleted after QA completion"
-        )
-    
-    try:
-        # Get file content from disk
-        file_content = card_file_manager.get_file_content(
-            print_job_id=str(print_job.id),
-            file_type="combined_pdf",
-            created_at=print_job.submitted_at
-        )
-        
-        if not file_content:
-            raise HTTPException(status_code=404, detail="Combined PDF not found on disk")
-        
-        return Response(
-            content=file_content,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=card_{print_job.job_number}.pdf",
-                "Content-Length": str(len(file_content))
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Error retrieving combined PDF for job {job_id}: {e}")
-        raise HTTPException(status_code=500, detail="Error retrieving PDF file")
+    return await _serve_print_job_file(
+        request, job_id, current_user, db,
+        file_type="combined_pdf",
+        media_type="application/pdf",
+        filename_prefix="card",
+        extension="pdf",
+        missing_detail="Combined PDF not found on disk"
+    )
 
 
 @router.post("/jobs/{job_id}/regenerate-files")
@@ -1822,6 +2185,79 @@ async def force_cleanup_empty_directories(
         raise HTTPException(status_code=500, detail=f"Force cleanup failed: {str(e)}")
 
 
+@router.get("/storage/retention", summary="Get Print File Retention Status")
+async def get_print_file_retention_status(
+    current_user: User = Depends(require_permission("printing.view_statistics"))
+):
+    """
+    Retention settings, whether a pass is running, and what recent passes freed
+    """
+    return print_file_retention.status()
+
+
+@router.post("/storage/retention/run", summary="Run Print File Retention Pass")
+async def run_print_file_retention(
+    dry_run: bool = Query(True, description="Report what would be deleted without deleting anything"),
+    current_user: User = Depends(require_permission("printing.delete"))
+):
+    """
+    Run a retention pass now instead of waiting for the schedule
+    
+    Deletes the card files of completed, cancelled and failed print jobs last
+    updated more than PRINT_FILE_RETENTION_DAYS ago, plus batch sheets dated
+    before the cutoff. Defaults to a dry run, which lists the selection with
+    sizes from the storage ledger.
+    """
+    if get_settings().PRINT_FILE_RETENTION_DAYS <= 0:
+        raise HTTPException(status_code=400, detail="Print file retention is disabled (PRINT_FILE_RETENTION_DAYS=0)")
+    
+    def run_pass():
+        db = SessionLocal()
+        try:
+            return print_file_retention.run_pass(db, dry_run=dry_run, trigger=f"manual:{current_user.username}")
+        finally:
+            db.close()
+    
+    try:
+        return await asyncio.to_thread(run_pass)
+    except RetentionPassRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/storage/reconciliation", summary="Get Storage Reconciliation Status")
+async def get_storage_reconciliation_status(
+    current_user: User = Depends(require_permission("printing.view_statistics"))
+):
+    """
+    Whether a reconciliation is running, and the findings of recent runs
+    """
+    return storage_reconciliation.status()
+
+
+@router.post("/storage/reconciliation/run", summary="Find Orphaned and Missing Stored Files")
+async def run_storage_reconciliation(
+    areas: List[str] = Query(list(RECONCILE_AREAS), description="Storage areas: fingerprints, biometric, cards"),
+    quarantine: bool = Query(False, description="Move orphaned files to the quarantine directory"),
+    current_user: User = Depends(require_permission("printing.delete"))
+):
+    """
+    Compare fingerprint, biometric and card storage with the database
+    
+    Reports orphaned files (on disk, referenced by nothing) and missing files
+    (referenced, not on disk). Orphans are only moved when quarantine is set,
+    into <storage>/.quarantine/<run_id>/, never deleted. The full list of
+    findings is written to the findings file named in the response.
+    """
+    try:
+        return await asyncio.to_thread(
+            storage_reconciliation.run, areas, quarantine, f"manual:{current_user.username}"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ReconciliationRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.get("/storage/verify-cleanup/{job_id}", summary="Verify Complete Cleanup for Print Job")
 async def verify_print_job_cleanup(
     job_id: UUID,
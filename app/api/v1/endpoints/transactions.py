@@ -7,6 +7,7 @@ from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from decimal import Decimal
+import time
 import uuid
 from datetime import datetime, date
 
@@ -14,10 +15,10 @@ from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.audit_decorators import audit_create, audit_update, audit_delete, get_transaction_by_id
 from app.models.user import User
-from app.models.person import Person
 from app.models.application import Application
 from app.models.enums import ApplicationStatus
 from app.models.transaction import Transaction as TransactionModel
+from app.services.receipt_views import receipt_views
 from app.crud import crud_transaction, crud_card_order, crud_fee_structure, transaction_calculator, person as crud_person, person_alias
 from app.schemas.transaction import (
     Transaction, TransactionCreate, TransactionUpdate,
@@ -643,40 +644,8 @@ def get_transaction(
     return transaction
 
 
-@router.get("/{transaction_id}/receipt")
-def get_transaction_receipt(
-    transaction_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Generate and return transaction receipt (A4 format)
-    """
-    # Get transaction with person and aliases loaded
-    transaction = db.query(TransactionModel).options(
-        joinedload(TransactionModel.person).joinedload(Person.aliases),
-        joinedload(TransactionModel.location)
-    ).filter(TransactionModel.id == transaction_id).first()
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
-    
-    # Check location access
-    if not current_user.can_access_location(transaction.location_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this transaction"
-        )
-    
-    # Mark receipt as printed
-    if not transaction.receipt_printed:
-        transaction.receipt_printed = True
-        transaction.receipt_printed_at = datetime.utcnow()
-        db.commit()
-    
+def _receipt_data(transaction: TransactionModel) -> Dict[str, Any]:
+    """Receipt data of a transaction loaded with crud_transaction.get_for_receipt"""
     # Get the person's primary ID number from their aliases
     primary_alias = None
     if transaction.person.aliases:
@@ -690,6 +659,7 @@ def get_transaction_receipt(
             primary_alias = transaction.person.aliases[0] if transaction.person.aliases else None
 
     # Generate comprehensive A4 receipt data for frontend printing
+    # (processed_by is the viewing user, filled in per request)
     receipt_data = {
         # Transaction details
         "receipt_number": transaction.receipt_number,
@@ -725,8 +695,8 @@ def get_transaction_receipt(
         "payment_reference": transaction.payment_reference,
         
         # Processing details
-        "processed_by": f"{current_user.first_name} {current_user.last_name}",
-        "processed_by_id": current_user.username,
+        "processed_by": None,
+        "processed_by_id": None,
         "processing_date": transaction.processed_at.strftime("%Y-%m-%d %H:%M:%S") if transaction.processed_at else transaction.created_at.strftime("%Y-%m-%d %H:%M:%S"),
         
         # Additional information
@@ -737,4 +707,53 @@ def get_transaction_receipt(
         "currency_name": "Malagasy Ariary"
     }
     
-    return receipt_data 
\ No newline at end of file
+    return receipt_data
+
+
+@router.get("/{transaction_id}/receipt")
+def get_transaction_receipt(
+    transaction_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate and return transaction receipt (A4 format)
+    
+    Repeat views are served from a short-lived cache and the printed flag is
+    written in the background (see app/services/receipt_views.py).
+    """
+    cached = receipt_views.get(transaction_id)
+    if cached is not None:
+        location_id, receipt_data = cached.location_id, cached.receipt
+    else:
+        # Transaction with person, aliases, location and items in one read
+        read_at = time.monotonic()
+        transaction = crud_transaction.get_for_receipt(db=db, id=transaction_id)
+        
+        if not transaction:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transaction not found"
+            )
+        location_id = transaction.location_id
+    
+    # Check location access
+    if not current_user.can_access_location(location_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this transaction"
+        )
+    
+    if cached is None:
+        receipt_data = _receipt_data(transaction)
+        receipt_views.put(transaction, receipt_data, read_at)
+        
+        # Mark receipt as printed
+        if not transaction.receipt_printed:
+            receipt_views.mark_printed(transaction.id)
+    
+    return {
+        **receipt_data,
+        "processed_by": f"{current_user.first_name} {current_user.last_name}",
+        "processed_by_id": current_user.username,
+    } 
\ No newline at end of file
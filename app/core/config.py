@@ -149,6 +149,13 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE_MB: int = 10
     ALLOWED_IMAGE_TYPES: str = "image/jpeg,image/png,image/gif,image/bmp,image/tiff"
     ALLOWED_DOCUMENT_TYPES: str = "application/pdf,image/jpeg,image/png"
+    BIOMETRIC_DERIVATIVE_CACHE_MAX_MB: int = 512  # Thumbnails/WebP variants of biometric images (LRU evicted)
+    IMAGE_PROCESSING_WORKERS: int = 0  # Photo/fingerprint image processing threads (0 = min(4, CPU count))
+    STORAGE_LARGE_DIRECTORY_MB: int = 50  # Print job/issue directories above this are reported as bloat
+    COLD_ARCHIVE_AFTER_DAYS: int = 14  # Card/issue day directories older than this are packed into bundles
+    COLD_ARCHIVE_CACHE_MAX_AGE_HOURS: int = 24  # Extracted copies of archived files kept this long after last use
+    STORAGE_RECONCILE_WORKERS: int = 4  # Shards compared in parallel by the orphan/missing file reconciliation
+    STORAGE_RECONCILE_GRACE_MINUTES: int = 60  # Files younger than this are never reported as orphans (upload in flight)
     
     @property
     def allowed_image_types_list(self) -> List[str]:
@@ -210,6 +217,51 @@ class Settings(BaseSettings):
     CARD_PRODUCTION_MODE: str = "local"
     ISO_18013_COMPLIANCE: bool = True
     
+    CARD_RENDER_WORKERS: int = 0  # Process pool size for batch card rendering (0 = CPU count)
+    MAX_PRINT_BATCH_SIZE: int = 500
+    
+    # Print job file retention (see app/services/print_file_retention.py)
+    PRINT_FILE_RETENTION_DAYS: int = 30  # Files of completed/cancelled/failed jobs older than this are deleted (0 = off)
+    PRINT_FILE_RETENTION_INTERVAL_MINUTES: int = 360
+    PRINT_FILE_RETENTION_BATCH_SIZE: int = 500  # Jobs selected and updated per query
+    PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND: int = 200  # Deletion pacing to leave disk I/O for requests (0 = unthrottled)
+    
+    # Issue auto-report deduplication (see app/services/issue_auto_reports.py)
+    ISSUE_AUTO_REPORT_WINDOW_HOURS: int = 24  # Repeats of an error within this long of its last occurrence join the open issue
+    ISSUE_AUTO_REPORT_USER_RATE_PER_MINUTE: int = 30  # Auto-reports accepted per user per minute (429 beyond)
+    ISSUE_AUTO_REPORT_MAX_NEW_PER_MINUTE: int = 60  # New auto-reported issues created per minute across all users
+    ISSUE_AUTO_REPORT_BUFFER_SIZE: int = 256  # Recent fingerprints whose repeats are counted in memory
+    ISSUE_AUTO_REPORT_FLUSH_SECONDS: int = 10  # How often buffered occurrence counts are written
+    ISSUE_STATISTICS_CACHE_SECONDS: int = 30  # How long GET /issues/stats/overview results are reused (0 = no cache)
+    
+    # Bulk license status updates (see app/services/license_bulk_status.py)
+    LICENSE_BULK_STATUS_BATCH_SIZE: int = 1000  # Licenses updated (and history rows inserted) per statement
+    LICENSE_BULK_STATUS_BACKGROUND_THRESHOLD: int = 500  # Larger requests run as a background job (202 + job id)
+    
+    # Batch document generation (see app/services/document_generator.py)
+    DOCUMENT_BATCH_MAX_DOCUMENTS: int = 1000  # Receipts / collection notices per batch request
+    
+    # Transaction receipts (see app/services/receipt_views.py)
+    RECEIPT_CACHE_SECONDS: int = 30  # How long a receipt is served again without a query (0 disables)
+    RECEIPT_CACHE_SIZE: int = 1000  # Receipts kept in memory
+    RECEIPT_PRINTED_FLUSH_SECONDS: int = 10  # How often queued receipt_printed flags are written
+    
+    # Fingerprint identification (see app/services/fingerprint_index.py)
+    FINGERPRINT_QUALITY_BANDS: str = "40,70"  # Comma-separated quality score band edges
+    FINGERPRINT_QUALITY_BAND_SPREAD: int = 1  # Bands searched either side of the probe's band
+    FINGERPRINT_SEARCH_WORKERS: int = 0  # Parallel search threads (0 = CPU count)
+    FINGERPRINT_EARLY_EXIT_SCORE: int = 95  # Stop a first-match search once a score reaches this (0 = off)
+    
+    # License barcode compression (see train_barcode_dictionary.py)
+    BARCODE_ZSTD_LEVEL: int = 3  # Levels above 3 gain nothing on ~100 byte payloads
+    BARCODE_ZSTD_DICTIONARY_ID: int = 32769  # Dictionary for new barcodes (0 = none); older barcodes still decode
+    BARCODE_BATCH_WORKERS: int = 0  # Process pool size for batch barcode generate/decode (0 = CPU count)
+    MAX_BARCODE_BATCH_SIZE: int = 500
+    
+    # Business number sequences (see app/services/sequence_service.py)
+    SEQUENCE_BLOCK_SIZE: int = 50
+    SEQUENCE_PREALLOCATE_KINDS: str = ""  # Comma-separated kinds allowed to use block pre-allocation (may leave gaps)
+    
     def get_file_storage_path(self) -> Path:
         """Get file storage path"""
         base_path = Path(self.FILE_STORAGE_PATH)
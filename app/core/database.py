@@ -61,7 +61,7 @@ def create_tables():
     from sqlalchemy import text
     
     # Import all models to ensure they're registered with Base.metadata
-    from app.models import user, person, application, transaction, license, card, printing, issue, biometric
+    from app.models import user, person, application, transaction, license, card, printing, issue, biometric, sequence
     
     print("🔧 Creating database enums before tables...")
     
@@ -188,7 +188,7 @@ def drop_tables():
     from sqlalchemy import text
     
     # Import all models to ensure they're registered with Base.metadata
-    from app.models import user, person, application, transaction, license, card, printing, issue, biometric
+    from app.models import user, person, application, transaction, license, card, printing, issue, biometric, sequence
     
     # First try the normal approach
     try:
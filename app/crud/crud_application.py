@@ -20,6 +20,7 @@ from app.models.enums import (
     TestAttemptType, TestResult, PaymentStatus, BiometricDataType,
     MedicalCertificateStatus, ParentalConsentStatus
 )
+from app.services.sequence_service import sequence_service, max_numeric_suffix
 from app.schemas.application import (
     ApplicationCreate, ApplicationUpdate, ApplicationSearch,
     ApplicationBiometricDataCreate, ApplicationBiometricDataUpdate,
@@ -117,19 +118,10 @@ class CRUDApplication(CRUDBase[Application, ApplicationCreate, ApplicationUpdate
         
         # Get next sequence number for this location, type, and year
         prefix = f"{location.code}-{type_code}-{current_year}"
-        
-        last_app = db.query(Application).filter(
-            Application.application_number.like(f"{prefix}-%")
-        ).order_by(desc(Application.application_number)).first()
-        
-        if last_app:
-            try:
-                last_sequence = int(last_app.application_number.split('-')[-1])
-                next_sequence = last_sequence + 1
-            except (ValueError, IndexError):
-                next_sequence = 1
-        else:
-            next_sequence = 1
+        next_sequence = sequence_service.next_value(
+            db, "application", scope=f"{location.code}-{type_code}", period=str(current_year),
+            seed=lambda session: max_numeric_suffix(session, Application.application_number, prefix, "-")
+        )
         
         return f"{prefix}-{next_sequence:04d}"
     
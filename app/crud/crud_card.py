@@ -11,11 +11,12 @@ from sqlalchemy import and_, or_, desc, func, text
 from fastapi import HTTPException, status
 
 from app.crud.base import CRUDBase
-from app.models.card import Card, CardLicense, CardSequenceCounter, CardProductionBatch
+from app.models.card import Card, CardLicense, CardNumberGenerator, CardProductionBatch
 from app.models.license import License
 from app.models.application import Application
 from app.models.person import Person
 from app.models.user import User, Location
+from app.services.sequence_service import sequence_service, max_numeric_suffix
 from app.schemas.card import (
     CardCreate, CardUpdate, CardStatusUpdate, TemporaryCardCreate,
     CardSearchFilters
@@ -672,24 +673,11 @@ class CRUDCard(CRUDBase[Card, CardCreate, CardUpdate]):
             
             location_code = location.code
             
-            # Get next sequence number for this location
-            sequence_counter = db.query(CardSequenceCounter).filter(
-                CardSequenceCounter.location_code == location_code
-            ).first()
-            
-            if not sequence_counter:
-                # Create new sequence counter
-                sequence_counter = CardSequenceCounter(
-                    location_code=location_code,
-                    current_sequence=1
-                )
-                db.add(sequence_counter)
-                db.flush()
-                sequence_num = 1
-            else:
-                # Increment sequence
-                sequence_counter.current_sequence += 1
-                sequence_num = sequence_counter.current_sequence
+            # Get next sequence number for this location (row-locked counter)
+            sequence_num = sequence_service.next_value(
+                db, "card", scope=location_code,
+                seed=lambda session: CardNumberGenerator.legacy_sequence(session, location_code)
+            )
             
             # Format as 8-digit number
             sequence_str = f"{sequence_num:08d}"
@@ -800,6 +788,44 @@ class CRUDCardProductionBatch(CRUDBase[CardProductionBatch, dict, dict]):
         
         return batch
 
+    def create_print_batch(
+        self,
+        db: Session,
+        *,
+        production_location_id: UUID,
+        location_code: str,
+        batch_size: int,
+        template_used: Optional[str] = None,
+        production_notes: Optional[str] = None,
+        current_user: User
+    ) -> CardProductionBatch:
+        """
+        Create a production batch for batch print job creation
+        
+        Batch id format: PB{YYYYMMDD}{LocationCode}{Sequence}. Flushed only, so the
+        batch commits together with its print jobs.
+        """
+        today = datetime.utcnow().strftime("%Y%m%d")
+        prefix = f"PB{today}{location_code}"
+        sequence = sequence_service.next_value(
+            db, "production_batch", scope=location_code, period=today,
+            seed=lambda session: max_numeric_suffix(session, CardProductionBatch.batch_id, prefix)
+        )
+        
+        batch = CardProductionBatch(
+            batch_id=f"{prefix}{sequence:03d}",
+            batch_date=datetime.utcnow(),
+            production_location_id=production_location_id,
+            batch_size=batch_size,
+            status="PENDING",
+            template_used=template_used,
+            production_notes=production_notes,
+            created_by=current_user.id
+        )
+        db.add(batch)
+        db.flush()
+        return batch
+
 
 # Create instances
 crud_card = CRUDCard(Card)
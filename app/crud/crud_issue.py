@@ -5,10 +5,13 @@ Provides comprehensive database operations for issue management
 
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc, func, extract
+from sqlalchemy import and_, or_, desc, func, extract, text, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from datetime import datetime, timedelta
+import time
 import uuid
 
+from app.core.config import get_settings
 from app.crud.base import CRUDBase
 from app.models.issue import Issue, IssueComment, IssueAttachment
 from app.models.user import User
@@ -16,20 +19,26 @@ from app.schemas.issue import (
     IssueCreate, IssueUpdate, IssueFilter,
     IssueCommentCreate, IssueCommentResponse
 )
-from app.models.enums import IssueStatus, IssueReportType, IssuePriority
+from app.models.enums import IssueStatus, IssueReportType, IssuePriority, IssueCategory
 
 
 class CRUDIssue(CRUDBase[Issue, IssueCreate, IssueUpdate]):
     """CRUD operations for issues"""
     
+    def __init__(self, model):
+        super().__init__(model)
+        # days -> (expiry on the monotonic clock, statistics)
+        self._statistics_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+    
     def create_with_reporter(
         self, 
         db: Session, 
         *, 
         obj_in: IssueCreate, 
-        reported_by: Optional[uuid.UUID] = None
+        reported_by: Optional[uuid.UUID] = None,
+        error_fingerprint: Optional[str] = None
     ) -> Issue:
-        """Create issue with reporter information"""
+        """Create issue with reporter information (and the error fingerprint of an auto-report)"""
         obj_data = obj_in.model_dump()
         
         # Set reporter if provided
@@ -39,12 +48,56 @@ class CRUDIssue(CRUDBase[Issue, IssueCreate, IssueUpdate]):
         # Set timestamps
         obj_data["reported_at"] = datetime.now()
         
+        if error_fingerprint:
+            obj_data["error_fingerprint"] = error_fingerprint
+            obj_data["occurrence_count"] = 1
+            obj_data["last_occurred_at"] = obj_data["reported_at"]
+        
         db_obj = Issue(**obj_data)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
     
+    def get_recent_by_fingerprint(self, db: Session, error_fingerprint: str, since: datetime) -> Optional[Issue]:
+        """Open issue for an error fingerprint that last occurred after since"""
+        return db.query(Issue).filter(
+            Issue.error_fingerprint == error_fingerprint,
+            Issue.last_occurred_at >= since,
+            Issue.status.notin_([IssueStatus.RESOLVED, IssueStatus.CLOSED, IssueStatus.CANCELLED])
+        ).order_by(desc(Issue.last_occurred_at)).first()
+    
+    def record_occurrence(self, db: Session, issue: Issue) -> Issue:
+        """Count one more auto-report on an existing issue"""
+        # Incremented in SQL so buffered counts flushed concurrently are not lost
+        issue.occurrence_count = Issue.occurrence_count + 1
+        issue.last_occurred_at = datetime.now()
+        db.commit()
+        db.refresh(issue)
+        return issue
+    
+    def record_occurrences(self, db: Session, occurrences: Dict[uuid.UUID, Tuple[int, datetime]]) -> None:
+        """Add buffered auto-report counts to their issues in one statement"""
+        if not occurrences:
+            return
+        issue_ids = list(occurrences)
+        db.execute(
+            text("""
+                UPDATE issues AS i
+                SET occurrence_count = i.occurrence_count + repeats.count,
+                    last_occurred_at = GREATEST(i.last_occurred_at, repeats.last_occurred_at)
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:counts AS integer[]), CAST(:last AS timestamp[]))
+                    AS repeats(id, count, last_occurred_at)
+                WHERE i.id = repeats.id
+            """),
+            {
+                "ids": [str(issue_id) for issue_id in issue_ids],
+                "counts": [occurrences[issue_id][0] for issue_id in issue_ids],
+                "last": [occurrences[issue_id][1] for issue_id in issue_ids],
+            }
+        )
+        db.commit()
+    
     def get_with_details(self, db: Session, id: uuid.UUID) -> Optional[Issue]:
         """Get issue with all related data loaded"""
         return db.query(Issue).options(
@@ -247,92 +300,80 @@ class CRUDIssue(CRUDBase[Issue, IssueCreate, IssueUpdate]):
         return issues, total
     
     def get_statistics(self, db: Session, days: int = 30) -> Dict[str, Any]:
-        """Get comprehensive issue statistics"""
+        """
+        Get comprehensive issue statistics
+        
+        Computed by one aggregate query (resolution time average and
+        percentiles included) and reused for ISSUE_STATISTICS_CACHE_SECONDS.
+        """
+        ttl = get_settings().ISSUE_STATISTICS_CACHE_SECONDS
+        cached = self._statistics_cache.get(days)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        
+        statistics = self._compute_statistics(db, days)
+        if ttl > 0:
+            self._statistics_cache[days] = (time.monotonic() + ttl, statistics)
+        return statistics
+    
+    def _compute_statistics(self, db: Session, days: int) -> Dict[str, Any]:
         cutoff_date = datetime.now() - timedelta(days=days)
+        breakdowns = {
+            "by_status": (Issue.status, IssueStatus),
+            "by_category": (Issue.category, IssueCategory),
+            "by_priority": (Issue.priority, IssuePriority),
+            "by_report_type": (Issue.report_type, IssueReportType),
+        }
         
-        # Basic counts
-        total_issues = db.query(Issue).count()
-        open_issues = db.query(Issue).filter(
-            Issue.status.in_([IssueStatus.NEW, IssueStatus.IN_PROGRESS, IssueStatus.TESTING])
-        ).count()
-        resolved_issues = db.query(Issue).filter(
-            Issue.status.in_([IssueStatus.RESOLVED, IssueStatus.CLOSED])
-        ).count()
-        
-        # Status breakdown
-        status_counts = {}
-        for status in IssueStatus:
-            count = db.query(Issue).filter(Issue.status == status).count()
-            status_counts[status.value] = count
-        
-        # Category breakdown
-        category_counts = {}
-        category_query = db.query(
-            Issue.category, func.count(Issue.id)
-        ).group_by(Issue.category).all()
-        for category, count in category_query:
-            category_counts[category.value] = count
-        
-        # Priority breakdown
-        priority_counts = {}
-        priority_query = db.query(
-            Issue.priority, func.count(Issue.id)
-        ).group_by(Issue.priority).all()
-        for priority, count in priority_query:
-            priority_counts[priority.value] = count
-        
-        # Report type breakdown
-        report_type_counts = {}
-        report_type_query = db.query(
-            Issue.report_type, func.count(Issue.id)
-        ).group_by(Issue.report_type).all()
-        for report_type, count in report_type_query:
-            report_type_counts[report_type.value] = count
-        
-        # Daily reports (last 30 days)
-        daily_query = db.query(
-            func.date(Issue.reported_at),
-            func.count(Issue.id)
-        ).filter(
-            Issue.reported_at >= cutoff_date
-        ).group_by(
-            func.date(Issue.reported_at)
-        ).all()
-        
-        daily_reports = [
-            {"date": str(date), "count": count}
-            for date, count in daily_query
+        # Daily reports (last N days) as a JSON array from a grouped subquery
+        daily = select(
+            func.date(Issue.reported_at).label("day"),
+            func.count().label("count")
+        ).where(Issue.reported_at >= cutoff_date).group_by(func.date(Issue.reported_at)).subquery()
+        daily_reports = select(
+            func.json_agg(aggregate_order_by(
+                func.json_build_object("date", daily.c.day, "count", daily.c["count"]), daily.c.day
+            ))
+        ).scalar_subquery()
+        
+        # NULL when either timestamp is missing, so ignored by the aggregates
+        resolution_seconds = func.extract("epoch", Issue.resolved_at - Issue.reported_at)
+        
+        columns = [
+            func.count().label("total_issues"),
+            func.count().filter(
+                Issue.status.in_([IssueStatus.NEW, IssueStatus.IN_PROGRESS, IssueStatus.TESTING])
+            ).label("open_issues"),
+            func.count().filter(
+                Issue.status.in_([IssueStatus.RESOLVED, IssueStatus.CLOSED])
+            ).label("resolved_issues"),
+            func.avg(resolution_seconds).label("avg_resolution_seconds"),
+            func.percentile_cont(0.5).within_group(resolution_seconds).label("median_resolution_seconds"),
+            func.percentile_cont(0.9).within_group(resolution_seconds).label("p90_resolution_seconds"),
+            daily_reports.label("daily_reports"),
         ]
-        
-        # Average resolution time
-        resolved_issues_with_time = db.query(Issue).filter(
-            and_(
-                Issue.resolved_at.isnot(None),
-                Issue.reported_at.isnot(None)
+        for key, (column, enum) in breakdowns.items():
+            columns.extend(
+                func.count().filter(column == member).label(f"{key}_{member.name}") for member in enum
             )
-        ).all()
-        
-        avg_resolution_time = None
-        if resolved_issues_with_time:
-            total_seconds = sum([
-                (issue.resolved_at - issue.reported_at).total_seconds()
-                for issue in resolved_issues_with_time
-            ])
-            avg_seconds = total_seconds / len(resolved_issues_with_time)
-            avg_hours = avg_seconds / 3600
-            avg_resolution_time = f"{avg_hours:.1f} hours"
-        
-        return {
-            "total_issues": total_issues,
-            "open_issues": open_issues,
-            "resolved_issues": resolved_issues,
-            "avg_resolution_time": avg_resolution_time,
-            "by_status": status_counts,
-            "by_category": category_counts,
-            "by_priority": priority_counts,
-            "by_report_type": report_type_counts,
-            "daily_reports": daily_reports
+        row = db.execute(select(*columns).select_from(Issue)).mappings().one()
+        
+        statistics = {
+            "total_issues": row["total_issues"],
+            "open_issues": row["open_issues"],
+            "resolved_issues": row["resolved_issues"],
         }
+        for key in ("avg", "median", "p90"):
+            seconds = row[f"{key}_resolution_seconds"]
+            statistics[f"{key}_resolution_time"] = (
+                f"{float(seconds) / 3600:.1f} hours" if seconds is not None else None
+            )
+        for key, (column, enum) in breakdowns.items():
+            counts = {member.value: row[f"{key}_{member.name}"] for member in enum}
+            # Every status is listed; the other breakdowns only list values that occur
+            statistics[key] = counts if key == "by_status" else {value: count for value, count in counts.items() if count}
+        statistics["daily_reports"] = row["daily_reports"] or []
+        return statistics
     
     def _create_status_comment(
         self, 
@@ -7,7 +7,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta, date
 from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import and_, or_, desc, func, text
+from sqlalchemy import and_, or_, desc, func, text, select, update, insert
 from fastapi import HTTPException, status
 
 from app.crud.base import CRUDBase
@@ -19,9 +19,17 @@ from app.models.user import User, Location
 from app.schemas.license import (
     LicenseCreateFromApplication, LicenseCreate, LicenseStatusUpdate,
     LicenseRestrictionsUpdate, LicenseProfessionalPermitUpdate,
-    LicenseSearchFilters
+    LicenseSearchFilters, BulkLicenseStatusUpdate
 )
 
+# Statuses a license may be in for a bulk change to the key status
+# (cancellation is permanent; unchanged statuses are reported, not rewritten)
+BULK_STATUS_TRANSITIONS = {
+    LicenseStatus.ACTIVE: {LicenseStatus.SUSPENDED},
+    LicenseStatus.SUSPENDED: {LicenseStatus.ACTIVE},
+    LicenseStatus.CANCELLED: {LicenseStatus.ACTIVE, LicenseStatus.SUSPENDED},
+}
+
 
 class CRUDLicense(CRUDBase[License, LicenseCreate, dict]):
     """CRUD operations for License model"""
@@ -323,6 +331,98 @@ class CRUDLicense(CRUDBase[License, LicenseCreate, dict]):
         
         return license_obj
 
+    def bulk_update_status(
+        self,
+        db: Session,
+        *,
+        license_ids: List[UUID],
+        status_update: BulkLicenseStatusUpdate,
+        changed_by: UUID,
+        batch_size: int = 1000
+    ) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Set-based status update for many licenses in one transaction
+
+        Current statuses are read (and locked) with one query; licenses that
+        are missing or not eligible for the new status are reported per id and
+        left alone. The rest are updated and get their history rows in batches
+        of batch_size, committed together.
+
+        Returns:
+            (number updated, [{"license_id", "error"}] for the rest)
+        """
+        error_details = []
+        unique_ids = []
+        seen = set()
+        for license_id in license_ids:
+            if license_id in seen:
+                error_details.append({"license_id": str(license_id), "error": "Duplicate license id in request"})
+                continue
+            seen.add(license_id)
+            unique_ids.append(license_id)
+        
+        # Ordered lock acquisition so concurrent bulk updates cannot deadlock
+        current = dict(db.execute(
+            select(License.id, License.status)
+            .where(License.id.in_(unique_ids))
+            .order_by(License.id)
+            .with_for_update()
+        ).all())
+        
+        new_status = status_update.status
+        eligible = []
+        for license_id in unique_ids:
+            old_status = current.get(license_id)
+            if old_status is None:
+                error_details.append({"license_id": str(license_id), "error": f"License {license_id} not found"})
+            elif old_status not in BULK_STATUS_TRANSITIONS[new_status]:
+                error_details.append({
+                    "license_id": str(license_id),
+                    "error": f"Cannot change status from {old_status.value} to {new_status.value}"
+                })
+            else:
+                eligible.append(license_id)
+        
+        now = datetime.utcnow()
+        values = {"status": new_status, "status_changed_date": now, "status_changed_by": changed_by}
+        if new_status == LicenseStatus.SUSPENDED:
+            values.update(
+                suspension_start_date=status_update.suspension_start_date or now,
+                suspension_end_date=status_update.suspension_end_date,
+                suspension_reason=status_update.reason
+            )
+        elif new_status == LicenseStatus.CANCELLED:
+            values.update(cancellation_date=now, cancellation_reason=status_update.reason)
+        
+        try:
+            for start in range(0, len(eligible), batch_size):
+                batch = eligible[start:start + batch_size]
+                db.execute(
+                    update(License).where(License.id.in_(batch)).values(**values),
+                    execution_options={"synchronize_session": False}
+                )
+                db.execute(insert(LicenseStatusHistory), [
+                    {
+                        "license_id": license_id,
+                        "from_status": current[license_id],
+                        "to_status": new_status,
+                        "changed_by": changed_by,
+                        "changed_at": now,
+                        "reason": status_update.reason,
+                        "notes": status_update.notes,
+                        "suspension_start_date": status_update.suspension_start_date,
+                        "suspension_end_date": status_update.suspension_end_date,
+                        "system_initiated": False
+                    }
+                    for license_id in batch
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return len(eligible), error_details
+
     def update_restrictions(
         self,
         db: Session,
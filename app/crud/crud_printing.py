@@ -11,6 +11,7 @@ import logging
 
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, desc, asc, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.crud.base import CRUDBase
 from app.models.printing import (
@@ -22,6 +23,10 @@ from app.models.application import Application
 from app.models.user import User, Location
 from app.models.person import Person
 from app.models.enums import UserType
+from app.services.sequence_service import sequence_service, max_numeric_suffix
+from app.services.print_queue_events import (
+    print_queue_events, JOB_CREATED, JOB_MOVED, JOB_STATUS_CHANGED, JOB_QA_RESULT
+)
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
@@ -41,17 +46,13 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         location_code = location.code
         today = datetime.utcnow().strftime("%Y%m%d")
         
-        # Get next sequence for today and location
+        # Next sequence for today and location, committed on its own so the counter
+        # row is not locked while the job's card files render
         prefix = f"PJ{today}{location_code}"
-        last_job = db.query(PrintJob).filter(
-            PrintJob.job_number.like(f"{prefix}%")
-        ).order_by(desc(PrintJob.job_number)).first()
-        
-        if last_job:
-            last_seq = int(last_job.job_number[-3:])
-            new_seq = last_seq + 1
-        else:
-            new_seq = 1
+        new_seq = sequence_service.next_committed_value(
+            "print_job", scope=location_code, period=today,
+            seed=lambda session: max_numeric_suffix(session, PrintJob.job_number, prefix)
+        )
         
         return f"{prefix}{new_seq:03d}"
 
@@ -66,7 +67,12 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         license_data: Dict[str, Any],
         person_data: Dict[str, Any],
         current_user: User,
-        additional_application_ids: Optional[List[UUID]] = None
+        additional_application_ids: Optional[List[UUID]] = None,
+        job_number: Optional[str] = None,
+        queue_position: Optional[int] = None,
+        production_batch_id: Optional[str] = None,
+        render_files: bool = True,
+        commit: bool = True
     ) -> PrintJob:
         """
         Create a new print job for card production
@@ -80,18 +86,20 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             person_data: Person information for card
             current_user: User creating the job
             additional_application_ids: Other applications to include in same print job
+            job_number: Pre-allocated job number (batch creation), generated if omitted
+            queue_position: Pre-allocated queue rank (batch creation, already counted in
+                            the queue), allocated if omitted
+            production_batch_id: Production batch the job belongs to
+            render_files: Render card files now (batch creation renders them in parallel later)
+            commit: Commit and publish the job (batch creation commits all jobs at once)
         """
         try:
             # Generate job number
             logger.info(f"Starting print job creation for application {application_id}")
-            job_number = self.generate_job_number(db, print_location_id)
+            if job_number is None:
+                job_number = self.generate_job_number(db, print_location_id)
             logger.info(f"Generated job number: {job_number}")
             
-            # Get queue position
-            logger.info(f"Getting queue position for location {print_location_id}")
-            queue_position = crud_print_queue.get_next_queue_position(db, print_location_id)
-            logger.info(f"Queue position: {queue_position}")
-            
             # Create print job
             logger.info(f"Creating print job database record")
             print_job = PrintJob(
@@ -105,6 +113,7 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
                 card_number=card_number,
                 license_data=license_data,
                 person_data=person_data,
+                production_batch_id=production_batch_id,
                 created_by=current_user.id,
                 created_at=datetime.utcnow()
             )
@@ -140,71 +149,93 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             )
             db.add(status_history)
             
-            # Update queue size
-            logger.info(f"Updating queue size")
-            crud_print_queue.increment_queue_size(db, print_location_id)
-            
             # Generate card files immediately after job creation
-            try:
-                logger.info(f"Starting card generation for print job {print_job.id}")
-                from app.services.card_generator import madagascar_card_generator
-                
-                # Prepare data for card generation
-                print_job_data = {
-                    "license_data": license_data,
-                    "person_data": person_data,
-                    "print_job_id": str(print_job.id),
-                    "job_number": job_number,
-                    "card_number": card_number
-                }
-                
-                logger.info(f"Calling card generator for print job {print_job.id}")
-                # Generate card files and save to disk with database session for production barcode API
-                generation_result = madagascar_card_generator.generate_card_files(print_job_data, db_session=db)
-                
-                logger.info(f"Card generation completed for print job {print_job.id}")
-                # Update print job with file paths and metadata (no base64 data stored)
-                print_job.pdf_files_generated = generation_result.get("files_generated", False)
-                print_job.pdf_front_path = generation_result.get("file_paths", {}).get("front_image_path")
-                print_job.pdf_back_path = generation_result.get("file_paths", {}).get("back_image_path")
-                print_job.pdf_combined_path = generation_result.get("file_paths", {}).get("combined_pdf_path")
-                
-                # Store generation metadata (file sizes, timestamps, etc.)
-                print_job.generation_metadata = {
-                    "generator_version": generation_result.get("generator_version"),
-                    "generation_timestamp": generation_result.get("generation_timestamp"),
-                    "file_sizes": generation_result.get("file_sizes", {}),
-                    "files_saved_to_disk": True,
-                    "total_size_mb": generation_result.get("file_sizes", {}).get("total_bytes", 0) / 1024 / 1024
-                }
-                
-                # Remove card_files_data field - files are now on disk
-                print_job.card_files_data = None
-                
-                logger.info(f"Generated and saved card files for print job {print_job.id} - Total size: {generation_result.get('file_sizes', {}).get('total_bytes', 0):,} bytes")
-                
-            except Exception as card_error:
-                # Log card generation error but don't fail the print job creation
-                logger.error(f"Card generation failed for print job {print_job.id}: {card_error}")
-                
-                # Mark as failed generation but keep job in queue for manual retry
-                print_job.pdf_files_generated = False
-                print_job.generation_metadata = {
-                    "error": str(card_error),
-                    "error_timestamp": datetime.utcnow().isoformat(),
-                    "files_saved_to_disk": False
-                }
+            if render_files:
+                try:
+                    logger.info(f"Starting card generation for print job {print_job.id}")
+                    from app.services.card_generator import madagascar_card_generator
+                    
+                    logger.info(f"Calling card generator for print job {print_job.id}")
+                    # Generate card files and save to disk with database session for production barcode API
+                    generation_result = madagascar_card_generator.generate_card_files(
+                        self.card_generation_data(print_job), db_session=db
+                    )
+                    
+                    logger.info(f"Card generation completed for print job {print_job.id}")
+                    self.apply_generation_result(print_job, generation_result)
+                    
+                except Exception as card_error:
+                    # Log card generation error but don't fail the print job creation
+                    logger.error(f"Card generation failed for print job {print_job.id}: {card_error}")
+                    self.mark_generation_failed(print_job, card_error)
+            
+            # Get queue position last (also counts the job in the queue, same transaction):
+            # the queue row lock is then held for the commit only, not while files render
+            if queue_position is None:
+                logger.info(f"Getting queue position for location {print_location_id}")
+                print_job.queue_position = crud_print_queue.add_to_queue(db, print_location_id)
+            logger.info(f"Queue position: {print_job.queue_position}")
+            
+            if not commit:
+                db.flush()
+                return print_job
             
             db.commit()
             db.refresh(print_job)
             
+            print_queue_events.publish_job(JOB_CREATED, print_job)
+            
             return print_job
             
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"Failed to create print job: {str(e)}", exc_info=True)
             raise Exception(f"Failed to create print job: {str(e) if str(e) else repr(e)}")
 
+    @staticmethod
+    def card_generation_data(print_job: PrintJob) -> Dict[str, Any]:
+        """Input for MadagascarCardGenerator.generate_card_files"""
+        return {
+            "license_data": print_job.license_data,
+            "person_data": print_job.person_data,
+            "print_job_id": str(print_job.id),
+            "job_number": print_job.job_number,
+            "card_number": print_job.card_number
+        }
+
+    @staticmethod
+    def apply_generation_result(print_job: PrintJob, generation_result: Dict[str, Any]):
+        """Record generated file paths and metadata on the job (no base64 data stored)"""
+        print_job.pdf_files_generated = generation_result.get("files_generated", False)
+        print_job.pdf_front_path = generation_result.get("file_paths", {}).get("front_image_path")
+        print_job.pdf_back_path = generation_result.get("file_paths", {}).get("back_image_path")
+        print_job.pdf_combined_path = generation_result.get("file_paths", {}).get("combined_pdf_path")
+        
+        # Store generation metadata (file sizes, timestamps, etc.)
+        print_job.generation_metadata = {
+            "generator_version": generation_result.get("generator_version"),
+            "generation_timestamp": generation_result.get("generation_timestamp"),
+            "file_sizes": generation_result.get("file_sizes", {}),
+            "files_saved_to_disk": True,
+            "total_size_mb": generation_result.get("file_sizes", {}).get("total_bytes", 0) / 1024 / 1024
+        }
+        
+        # Remove card_files_data field - files are now on disk
+        print_job.card_files_data = None
+        
+        logger.info(f"Generated and saved card files for print job {print_job.id} - Total size: {generation_result.get('file_sizes', {}).get('total_bytes', 0):,} bytes")
+
+    @staticmethod
+    def mark_generation_failed(print_job: PrintJob, card_error: Exception):
+        """Mark as failed generation but keep job in queue for manual retry"""
+        print_job.pdf_files_generated = False
+        print_job.generation_metadata = {
+            "error": str(card_error),
+            "error_timestamp": datetime.utcnow().isoformat(),
+            "files_saved_to_disk": False
+        }
+
     def get_print_queue(
         self,
         db: Session,
@@ -258,20 +289,9 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         
         old_position = print_job.queue_position
         
-        # Get all jobs in same location with better positions
-        jobs_to_move_down = db.query(PrintJob).filter(
-            PrintJob.print_location_id == print_job.print_location_id,
-            PrintJob.status.in_([PrintJobStatus.QUEUED, PrintJobStatus.ASSIGNED]),
-            PrintJob.queue_position < print_job.queue_position,
-            PrintJob.id != print_job.id
-        ).all()
-        
-        # Move other jobs down by 1
-        for job in jobs_to_move_down:
-            job.queue_position += 1
-        
-        # Move this job to position 1
-        print_job.queue_position = 1
+        # Take a rank ahead of the current front; other jobs keep theirs
+        new_position = crud_print_queue.move_to_front(db, print_job.print_location_id)
+        print_job.queue_position = new_position
         print_job.priority = PrintJobPriority.HIGH
         
         # Record queue change
@@ -280,7 +300,7 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             reason=reason,
             user_id=current_user.id,
             old_position=old_position,
-            new_position=1
+            new_position=new_position
         )
         
         # Create status history
@@ -290,13 +310,15 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             to_status=print_job.status,  # Status doesn't change
             changed_by_user_id=current_user.id,
             change_reason=f"Moved to top of queue: {reason}",
-            change_notes=f"Priority changed from position {old_position} to 1"
+            change_notes=f"Priority changed from position {old_position} to front of queue"
         )
         db.add(status_history)
         
         db.commit()
         db.refresh(print_job)
         
+        print_queue_events.publish_job(JOB_MOVED, print_job, old_position=old_position)
+        
         return print_job
 
     def assign_to_printer(
@@ -334,6 +356,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.commit()
         db.refresh(print_job)
         
+        print_queue_events.publish_job(JOB_STATUS_CHANGED, print_job)
+        
         return print_job
 
     def start_printing(
@@ -369,6 +393,9 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         # Update card status to IN_PRODUCTION
         self._update_card_status_for_print_job(db, print_job, "IN_PRODUCTION")
         
+        # Job leaves the queue
+        crud_print_queue.remove_from_queue(db, print_job.print_location_id)
+        
         # Create status history
         status_history = PrintJobStatusHistory(
             print_job_id=print_job.id,
@@ -383,6 +410,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.commit()
         db.refresh(print_job)
         
+        print_queue_events.publish_job(JOB_STATUS_CHANGED, print_job)
+        
         return print_job
 
     def complete_printing(
@@ -427,6 +456,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.commit()
         db.refresh(print_job)
         
+        print_queue_events.publish_job(JOB_STATUS_CHANGED, print_job)
+        
         return print_job
 
     def start_quality_check(
@@ -464,6 +495,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.commit()
         db.refresh(print_job)
         
+        print_queue_events.publish_job(JOB_STATUS_CHANGED, print_job)
+        
         return print_job
 
     def complete_quality_check(
@@ -500,6 +533,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
                 # Update card status to READY_FOR_COLLECTION
                 self._update_card_status_for_print_job(db, print_job, "READY_FOR_COLLECTION")
                 
+                crud_print_queue.record_job_processed(db, print_job.print_location_id)
+                
                 # Clean up files after successful QA - they're no longer needed
                 try:
                     from app.services.card_file_manager import card_file_manager
@@ -526,6 +561,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
                                 "cleanup_result": {
                                     "files_deleted": cleanup_result["files_deleted"],
                                     "bytes_freed": cleanup_result["bytes_freed"],
+                                    "archived_files_released": cleanup_result.get("archived_files_released", 0),
+                                    "archived_bytes_released": cleanup_result.get("archived_bytes_released", 0),
                                     "folder_path": cleanup_result.get("folder_path"),
                                     "empty_dirs_cleaned": cleanup_result.get("empty_dirs_cleaned", 0),
                                     "total_cleanup_items": cleanup_result.get("total_cleanup_items", 0)
@@ -579,18 +616,10 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
                     print_job.assigned_at = None
                     print_job.printing_started_at = None
                     print_job.printing_completed_at = None
-                    # Reset queue position to top
-                    print_job.queue_position = 1
-                    
-                    # Move other jobs down by 1 position
-                    other_jobs = db.query(PrintJob).filter(
-                        PrintJob.print_location_id == print_job.print_location_id,
-                        PrintJob.status.in_([PrintJobStatus.QUEUED, PrintJobStatus.ASSIGNED]),
-                        PrintJob.id != print_job.id
-                    ).all()
-                    
-                    for job in other_jobs:
-                        job.queue_position += 1
+                    # Back into the queue ahead of everything else
+                    print_job.queue_position = crud_print_queue.add_to_queue(
+                        db, print_job.print_location_id, at_front=True
+                    )
                     
                 elif qa_result == QualityCheckResult.FAILED_DATA:
                     print_job.status = PrintJobStatus.REPRINT_REQUIRED
@@ -619,6 +648,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             db.commit()
             db.refresh(print_job)
             
+            print_queue_events.publish_job(JOB_QA_RESULT, print_job)
+            
             return print_job
             
         except Exception as e:
@@ -643,11 +674,12 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         job_number = self.generate_job_number(db, original_job.print_location_id)
         
         # Create reprint job (goes to top of queue)
+        queue_position = crud_print_queue.add_to_queue(db, original_job.print_location_id, at_front=True)
         reprint_job = PrintJob(
             job_number=job_number,
             status=PrintJobStatus.QUEUED,
             priority=PrintJobPriority.REPRINT,  # High priority
-            queue_position=1,  # Top of queue
+            queue_position=queue_position,  # Top of queue
             person_id=original_job.person_id,
             print_location_id=original_job.print_location_id,
             primary_application_id=original_job.primary_application_id,
@@ -665,16 +697,6 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.add(reprint_job)
         db.flush()
         
-        # Move all other jobs down by 1 position
-        jobs_to_move = db.query(PrintJob).filter(
-            PrintJob.print_location_id == original_job.print_location_id,
-            PrintJob.status.in_([PrintJobStatus.QUEUED, PrintJobStatus.ASSIGNED]),
-            PrintJob.id != reprint_job.id
-        ).all()
-        
-        for job in jobs_to_move:
-            job.queue_position += 1
-        
         # Copy application associations from original job
         for original_job_app in original_job.job_applications:
             reprint_job_app = PrintJobApplication(
@@ -691,7 +713,7 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
             reason=reprint_reason,
             user_id=current_user.id,
             old_position=None,
-            new_position=1
+            new_position=queue_position
         )
         
         # Create status history
@@ -708,6 +730,8 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
         db.commit()
         db.refresh(reprint_job)
         
+        print_queue_events.publish_job(JOB_CREATED, reprint_job, original_job_id=str(original_job_id))
+        
         return reprint_job
 
     def get_jobs_by_location_and_user(
@@ -891,39 +915,77 @@ class CRUDPrintJob(CRUDBase[PrintJob, dict, dict]):
 
 
 class CRUDPrintQueue(CRUDBase[PrintQueue, dict, dict]):
-    """CRUD operations for Print Queue management"""
+    """
+    CRUD operations for Print Queue management
+    
+    Counter updates lock the queue row and are flushed, not committed, so they
+    land in the same transaction as the job change that caused them.
+    """
 
-    def get_or_create_queue(self, db: Session, location_id: UUID) -> PrintQueue:
-        """Get or create print queue for location"""
-        queue = db.query(PrintQueue).filter(PrintQueue.location_id == location_id).first()
+    def get_or_create_queue(self, db: Session, location_id: UUID, for_update: bool = False) -> PrintQueue:
+        """Get or create print queue for location (optionally locked for update)"""
+        query = db.query(PrintQueue).filter(PrintQueue.location_id == location_id)
+        if for_update:
+            query = query.with_for_update()
+        queue = query.first()
         if not queue:
-            queue = PrintQueue(
-                location_id=location_id,
-                current_queue_size=0,
-                next_queue_position=1
+            # Concurrent creators race on uq_print_queue_location; only one insert wins
+            db.execute(
+                pg_insert(PrintQueue.__table__)
+                .values(location_id=location_id, current_queue_size=0, next_queue_position=1, front_queue_position=0)
+                .on_conflict_do_nothing(index_elements=["location_id"])
             )
-            db.add(queue)
-            db.commit()
-            db.refresh(queue)
+            queue = query.first()
         return queue
 
-    def get_next_queue_position(self, db: Session, location_id: UUID) -> int:
-        """Get next available queue position for location"""
-        queue = self.get_or_create_queue(db, location_id)
-        next_position = queue.get_next_position()
-        db.commit()
-        return next_position
-
-    def increment_queue_size(self, db: Session, location_id: UUID):
-        """Increment queue size after adding job"""
-        queue = self.get_or_create_queue(db, location_id)
+    def add_to_queue(self, db: Session, location_id: UUID, at_front: bool = False) -> int:
+        """Count a job entering the queue and return its rank (back, or front for urgent jobs)"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
+        self._rebalance_if_needed(db, queue)
+        position = queue.get_front_position() if at_front else queue.get_next_position()
         queue.current_queue_size += 1
-        db.commit()
+        db.flush()
+        return position
+
+    def add_many_to_queue(self, db: Session, location_id: UUID, count: int) -> List[int]:
+        """Reserve `count` consecutive back-of-queue ranks with a single queue row update"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
+        self._rebalance_if_needed(db, queue)
+        positions = [queue.get_next_position() for _ in range(count)]
+        queue.current_queue_size += count
+        db.flush()
+        return positions
+
+    def move_to_front(self, db: Session, location_id: UUID) -> int:
+        """Return a rank ahead of every queued job without touching the other jobs"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
+        self._rebalance_if_needed(db, queue)
+        position = queue.get_front_position()
+        db.flush()
+        return position
+
+    def remove_from_queue(self, db: Session, location_id: UUID):
+        """Count a job leaving the queue (printing started)"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
+        queue.current_queue_size = max(0, queue.current_queue_size - 1)
+        db.flush()
+
+    def record_job_processed(self, db: Session, location_id: UUID):
+        """Count a job that finished production"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
+        queue.total_jobs_processed += 1
+        db.flush()
 
     def recalculate_queue(self, db: Session, location_id: UUID):
-        """Recalculate entire queue for location"""
-        queue = self.get_or_create_queue(db, location_id)
+        """Rebalance entire queue for location"""
+        queue = self.get_or_create_queue(db, location_id, for_update=True)
         queue.recalculate_queue_positions(db)
+        db.flush()
+
+    def _rebalance_if_needed(self, db: Session, queue: PrintQueue):
+        if queue.needs_rebalance():
+            logger.info(f"Rebalancing print queue ranks for location {queue.location_id}")
+            queue.recalculate_queue_positions(db)
 
 
 # Create CRUD instances
@@ -3,9 +3,9 @@ CRUD operations for Transaction Management
 Handles payment processing, POS system logic, and fee calculations
 """
 
-from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc, func
+from typing import List, Optional, Dict, Any, Tuple, Union
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, desc, func, text
 from decimal import Decimal
 import uuid
 from datetime import datetime, timedelta
@@ -17,7 +17,10 @@ from app.models.transaction import (
     DEFAULT_FEE_STRUCTURE
 )
 from app.models.application import Application, ApplicationStatus
+from app.models.person import Person
 from app.models.enums import ApplicationType, LicenseCategory, TestResult
+from app.services.sequence_service import sequence_service, max_numeric_suffix
+from app.services.receipt_views import receipt_views
 from app.schemas.transaction import (
     TransactionCreate, TransactionUpdate, TransactionItemCreate,
     CardOrderCreate, CardOrderUpdate, FeeStructureCreate, FeeStructureUpdate
@@ -32,16 +35,10 @@ class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate
         today = datetime.now()
         prefix = f"TXN{today.strftime('%Y%m%d')}"
         
-        # Find highest number for today
-        last_transaction = db.query(Transaction).filter(
-            Transaction.transaction_number.like(f"{prefix}%")
-        ).order_by(desc(Transaction.transaction_number)).first()
-        
-        if last_transaction:
-            last_num = int(last_transaction.transaction_number[-4:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        new_num = sequence_service.next_value(
+            db, "transaction", period=today.strftime('%Y%m%d'),
+            seed=lambda session: max_numeric_suffix(session, Transaction.transaction_number, prefix)
+        )
             
         return f"{prefix}{new_num:04d}"
     
@@ -199,23 +196,31 @@ class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate
         
         print(f"DEBUG: About to commit changes for transaction {transaction.id}")
         db.commit()
+        receipt_views.invalidate(transaction.id)
         print(f"DEBUG: Changes committed successfully for transaction {transaction.id}")
         return transaction
     
+    def update(self, db: Session, *, db_obj: Transaction, obj_in: Union[TransactionUpdate, Dict[str, Any]], updated_by: Optional[str] = None) -> Transaction:
+        """Update a transaction and drop its cached receipt"""
+        transaction = super().update(db, db_obj=db_obj, obj_in=obj_in, updated_by=updated_by)
+        receipt_views.invalidate(transaction.id)
+        return transaction
+    
+    def remove(self, db: Session, *, id: uuid.UUID) -> Optional[Transaction]:
+        """Delete a transaction and drop its cached receipt"""
+        transaction = super().remove(db, id=id)
+        receipt_views.invalidate(id)
+        return transaction
+    
     def generate_receipt_number(self, db: Session) -> str:
         """Generate unique receipt number"""
         today = datetime.now()
         prefix = f"RCP{today.strftime('%Y%m%d')}"
         
-        last_receipt = db.query(Transaction).filter(
-            Transaction.receipt_number.like(f"{prefix}%")
-        ).order_by(desc(Transaction.receipt_number)).first()
-        
-        if last_receipt:
-            last_num = int(last_receipt.receipt_number[-4:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        new_num = sequence_service.next_value(
+            db, "receipt", period=today.strftime('%Y%m%d'),
+            seed=lambda session: max_numeric_suffix(session, Transaction.receipt_number, prefix)
+        )
             
         return f"{prefix}{new_num:04d}"
     
@@ -261,6 +266,40 @@ class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate
             joinedload(Transaction.person)
         ).order_by(desc(Transaction.created_at)).all()
     
+    def get_for_receipt(self, db: Session, id: uuid.UUID) -> Optional[Transaction]:
+        """Get a transaction with everything its receipt shows
+
+        Person, aliases and location come in one joined SELECT; items are
+        loaded with a second IN query so rows do not multiply (aliases x items).
+        """
+        return db.query(Transaction).options(
+            joinedload(Transaction.person).joinedload(Person.aliases),
+            joinedload(Transaction.location),
+            selectinload(Transaction.items)
+        ).filter(Transaction.id == id).first()
+    
+    def mark_receipts_printed(self, db: Session, printed: Dict[uuid.UUID, datetime]) -> None:
+        """Record first receipt prints (transaction id -> printed at) in one statement"""
+        if not printed:
+            return
+        transaction_ids = list(printed)
+        # updated_at is left alone: the flag is bookkeeping, not a change to the transaction
+        db.execute(
+            text("""
+                UPDATE transactions AS t
+                SET receipt_printed = true,
+                    receipt_printed_at = prints.printed_at
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:printed_at AS timestamp[]))
+                    AS prints(id, printed_at)
+                WHERE t.id = prints.id AND NOT t.receipt_printed
+            """),
+            {
+                "ids": [str(transaction_id) for transaction_id in transaction_ids],
+                "printed_at": [printed[transaction_id] for transaction_id in transaction_ids],
+            }
+        )
+        db.commit()
+    
     def get_daily_summary(self, db: Session, location_id: uuid.UUID, date: datetime) -> Dict[str, Any]:
         """Get daily transaction summary for a location"""
         start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -305,15 +344,10 @@ class CRUDCardOrder(CRUDBase[CardOrder, CardOrderCreate, CardOrderUpdate]):
         today = datetime.now()
         prefix = f"CO{today.strftime('%Y%m%d')}"
         
-        last_order = db.query(CardOrder).filter(
-            CardOrder.order_number.like(f"{prefix}%")
-        ).order_by(desc(CardOrder.order_number)).first()
-        
-        if last_order:
-            last_num = int(last_order.order_number[-4:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        new_num = sequence_service.next_value(
+            db, "card_order", period=today.strftime('%Y%m%d'),
+            seed=lambda session: max_numeric_suffix(session, CardOrder.order_number, prefix)
+        )
             
         return f"{prefix}{new_num:04d}"
     
@@ -72,10 +72,25 @@ async def lifespan(app: FastAPI):
     # Use /admin/reset-database or /admin/init-tables endpoints for database management
     logger.info("Database table auto-creation disabled - use admin endpoints for database management")
     
+    # Background deletion of expired print job files
+    from app.services.print_file_retention import print_file_retention
+    print_file_retention.start()
+    
+    # Periodic write of coalesced issue auto-report counts
+    from app.services.issue_auto_reports import issue_auto_reports
+    issue_auto_reports.start()
+    
+    # Periodic write of receipt_printed flags
+    from app.services.receipt_views import receipt_views
+    receipt_views.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Madagascar License System...")
+    await print_file_retention.stop()
+    await issue_auto_reports.stop()
+    await receipt_views.stop()
 
 
 async def check_and_create_critical_tables():
@@ -25,6 +25,7 @@ from app.models.printing import (
 from app.models.biometric import (
     FingerprintTemplate, FingerprintVerificationLog, BiometricSystemConfig
 )
+from app.models.sequence import SequenceCounter
 from app.models.issue import (
     Issue, IssueComment, IssueAttachment
 )
@@ -14,7 +14,7 @@ Features:
 - Medical certificate requirements: C/D/E categories, age 60+, specific health conditions
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum, TypeDecorator
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum, TypeDecorator, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -486,6 +486,11 @@ class ApplicationBiometricData(BaseModel):
     captured_by_user = relationship("User", foreign_keys=[captured_by])
     verified_by_user = relationship("User", foreign_keys=[verified_by])
 
+    __table_args__ = (
+        # Prefix (LIKE '<day directory>/%') lookups for storage reconciliation (see add_storage_reconciliation_indexes_migration.py)
+        Index('ix_application_biometric_data_file_path', 'file_path', postgresql_ops={'file_path': 'text_pattern_ops'}),
+    )
+
     def __repr__(self):
         return f"<ApplicationBiometricData(application_id={self.application_id}, type='{self.data_type}')>"
 
@@ -9,7 +9,7 @@ Based on BioMini WebAgent documentation and best practices:
 - Audit trail for security compliance
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, LargeBinary, SmallInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, LargeBinary, SmallInteger, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -53,7 +53,7 @@ class FingerprintTemplate(BaseModel):
     
     # Security and audit
     encrypted_key = Column(String(100), nullable=True, comment="Encryption key if template was encrypted by WebAgent")
-    template_hash = Column(String(64), nullable=True, comment="SHA-256 hash of template bytes for integrity")
+    template_hash = Column(String(64), nullable=True, index=True, comment="SHA-256 hash of template bytes for integrity and exact duplicate lookup")
     
     # Audit trail
     captured_by = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=True, comment="User who captured template")
@@ -68,6 +68,7 @@ class FingerprintTemplate(BaseModel):
     
     # Additional indexes for performance
     __table_args__ = (
+        Index('ix_fingerprint_templates_updated_at_id', 'updated_at', 'id'),  # Keyset paging for template sync
         {'comment': 'Production fingerprint template storage with ISO standards compliance'}
     )
 
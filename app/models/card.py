@@ -60,26 +60,26 @@ class CardNumberGenerator:
     def get_next_sequence_number(db: Session, location_code: str) -> int:
         """
         Get next sequence number for a location
-        Thread-safe method to increment and return next sequence
+        Allocated from the row-locked sequence counter; commits so the lock is
+        released before the (slow) card rendering that follows
         """
-        # Get or create the counter record for this location
-        counter = db.query(CardSequenceCounter).filter(
-            CardSequenceCounter.location_code == location_code
-        ).first()
+        from app.services.sequence_service import sequence_service
         
-        if not counter:
-            counter = CardSequenceCounter(
-                location_code=location_code,
-                current_sequence=0
-            )
-            db.add(counter)
-            db.flush()
-        
-        # Increment and save
-        counter.current_sequence += 1
+        sequence_number = sequence_service.next_value(
+            db, "card", scope=location_code,
+            seed=lambda session: CardNumberGenerator.legacy_sequence(session, location_code)
+        )
         db.commit()
         
-        return counter.current_sequence
+        return sequence_number
+
+    @staticmethod
+    def legacy_sequence(db: Session, location_code: str) -> int:
+        """Last value of the pre-sequence-service CardSequenceCounter row (seed only)"""
+        counter = db.query(CardSequenceCounter).filter(
+            CardSequenceCounter.location_code == location_code
+        ).first()
+        return counter.current_sequence if counter else 0
 
 
 class CardType(str, Enum):
@@ -410,7 +410,8 @@ class CardProductionBatch(BaseModel):
 class CardSequenceCounter(BaseModel):
     """
     Sequence counter for card number generation by location
-    Ensures unique sequential numbers for each location
+    Legacy: card numbers are now allocated by the sequence service
+    (SequenceCounter kind='card'); this row only seeds it on first use
     """
     __tablename__ = "card_sequence_counters"
 
@@ -10,7 +10,7 @@ Provides comprehensive issue tracking and bug reporting capabilities with:
 - Persistent disk storage following biometric pattern
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -80,12 +80,25 @@ class Issue(BaseModel):
     browser_version = Column(String(100), nullable=True, comment="Browser version information")
     operating_system = Column(String(100), nullable=True, comment="Operating system information")
     
+    # Auto-report deduplication (see app/services/issue_auto_reports.py)
+    error_fingerprint = Column(String(64), nullable=True, comment="SHA-256 of the normalized error (type, message, URL pattern, stack top)")
+    occurrence_count = Column(Integer, nullable=False, default=1, server_default="1", comment="Auto-reports collapsed into this issue")
+    last_occurred_at = Column(DateTime, nullable=True, comment="When the error was last auto-reported")
+    
     # Relationships
     reported_by_user = relationship("User", foreign_keys=[reported_by], back_populates="reported_issues")
     assigned_to_user = relationship("User", foreign_keys=[assigned_to], back_populates="assigned_issues")
     resolved_by_user = relationship("User", foreign_keys=[resolved_by], back_populates="resolved_issues")
     comments = relationship("IssueComment", back_populates="issue", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Recent issue for an error fingerprint (see add_issue_error_fingerprint_migration.py)
+        Index(
+            'ix_issues_error_fingerprint_recent', 'error_fingerprint', 'last_occurred_at',
+            postgresql_where=text("error_fingerprint IS NOT NULL")
+        ),
+    )
+    
     def __repr__(self):
         return f"<Issue(id={self.id}, title='{self.title[:50]}...', status={self.status.value}, priority={self.priority.value})>"
     
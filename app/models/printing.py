@@ -3,7 +3,7 @@ Printing Module for Madagascar License System
 Handles card printing workflow, queue management, and production tracking
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum, func, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum as SQLEnum, func, Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
@@ -140,6 +140,17 @@ class PrintJob(BaseModel):
         Index('idx_print_job_person_status', 'person_id', 'status'),
         # Index for reprint tracking
         Index('idx_print_job_original', 'original_print_job_id'),
+        # Finished jobs still holding card files, for the retention pass (see add_print_file_retention_index_migration.py)
+        Index(
+            'ix_print_jobs_file_retention', 'updated_at', 'id',
+            postgresql_where=text("pdf_files_generated AND status IN ('COMPLETED', 'CANCELLED', 'FAILED')")
+        ),
+        # Jobs holding card files by day directory, for storage reconciliation (see add_storage_reconciliation_indexes_migration.py)
+        Index(
+            'ix_print_jobs_stored_files_path', 'pdf_front_path',
+            postgresql_ops={'pdf_front_path': 'text_pattern_ops'},
+            postgresql_where=text("pdf_files_generated")
+        ),
     )
 
     def __repr__(self):
@@ -219,17 +230,28 @@ class PrintJobStatusHistory(BaseModel):
         return f"<PrintJobStatusHistory(job_id={self.print_job_id}, from='{self.from_status}', to='{self.to_status}')>"
 
 
+# Queue ranks are handed out with gaps so a job can be placed at the front, the
+# back (or between two jobs) by writing only its own row. Ranks grow downwards
+# from the front and upwards from the back; once either end nears the column
+# limit the queue is rebalanced back to evenly spaced ranks.
+QUEUE_POSITION_GAP = 1024
+QUEUE_POSITION_LIMIT = 2 ** 30
+
+
 class PrintQueue(BaseModel):
     """
     Print queue management per location
     
-    Manages FIFO ordering and queue positions for each print location
+    Manages FIFO ordering and queue positions for each print location.
+    queue_position on PrintJob is a sparse rank (lower = printed sooner),
+    not a dense 1..N index.
     """
     __tablename__ = "print_queues"
 
     location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=False, primary_key=True)
     current_queue_size = Column(Integer, nullable=False, default=0, comment="Current number of jobs in queue")
     next_queue_position = Column(Integer, nullable=False, default=1, comment="Next available queue position")
+    front_queue_position = Column(Integer, nullable=False, default=0, comment="Lowest rank handed out (move-to-top goes below it)")
     last_updated = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now(), comment="Last queue update")
     updated_by_user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=True, comment="User who last updated queue")
     
@@ -241,33 +263,54 @@ class PrintQueue(BaseModel):
     location = relationship("Location")
     updated_by_user = relationship("User")
     
+    # One queue row per location; also the conflict target when the row is first created
+    __table_args__ = (
+        UniqueConstraint('location_id', name='uq_print_queue_location'),
+    )
+    
     def __repr__(self):
         return f"<PrintQueue(location_id={self.location_id}, size={self.current_queue_size})>"
 
     def get_next_position(self) -> int:
-        """Get next available queue position"""
+        """Get next available queue position (back of the queue)"""
         next_pos = self.next_queue_position
-        self.next_queue_position += 1
+        self.next_queue_position += QUEUE_POSITION_GAP
         return next_pos
 
+    def get_front_position(self) -> int:
+        """Get a rank ahead of every job currently in the queue"""
+        self.front_queue_position -= QUEUE_POSITION_GAP
+        return self.front_queue_position
+
+    def needs_rebalance(self) -> bool:
+        """True once either end of the rank space is close to the integer limit"""
+        return (
+            self.next_queue_position > QUEUE_POSITION_LIMIT
+            or self.front_queue_position < -QUEUE_POSITION_LIMIT
+        )
+
     def recalculate_queue_positions(self, db_session: Session):
-        """Recalculate queue positions after changes"""
+        """
+        Rebalance queue positions to evenly spaced ranks
+        
+        Keeps the current order (priority, then rank) and is only needed when the
+        rank space runs out, so this is the one operation that rewrites every job.
+        """
         from app.models.printing import PrintJob
         
-        # Get all queued jobs for this location ordered by priority and submission time
         queued_jobs = db_session.query(PrintJob).filter(
             PrintJob.print_location_id == self.location_id,
             PrintJob.status.in_([PrintJobStatus.QUEUED, PrintJobStatus.ASSIGNED])
         ).order_by(
             PrintJob.priority.desc(),  # High priority first
+            PrintJob.queue_position.asc(),
             PrintJob.submitted_at.asc()  # Then FIFO
         ).all()
         
         # Reassign positions
         for i, job in enumerate(queued_jobs, 1):
-            job.queue_position = i
+            job.queue_position = i * QUEUE_POSITION_GAP
         
         self.current_queue_size = len(queued_jobs)
-        self.next_queue_position = len(queued_jobs) + 1
-        
-        db_session.commit() 
\ No newline at end of file
+        self.front_queue_position = QUEUE_POSITION_GAP
+        self.next_queue_position = (len(queued_jobs) + 1) * QUEUE_POSITION_GAP
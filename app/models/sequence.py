@@ -0,0 +1,35 @@
+"""
+Business Number Sequence Models for Madagascar License System
+Backs the sequence service used for job, application, transaction, receipt,
+card order and card numbers
+"""
+
+from sqlalchemy import Column, String, BigInteger, UniqueConstraint
+
+from app.models.base import BaseModel
+
+
+class SequenceCounter(BaseModel):
+    """
+    Counter row per (kind, scope, period)
+
+    kind:   what is being numbered (print_job, application, receipt, ...)
+    scope:  partition inside the kind, usually a location code ('' when global)
+    period: reset window, e.g. '20260118' for daily or '2026' for yearly ('' = never)
+
+    Rows are always read with SELECT ... FOR UPDATE so concurrent allocators
+    serialize on the single row instead of scanning the business table.
+    """
+    __tablename__ = "sequence_counters"
+
+    kind = Column(String(50), nullable=False, comment="Sequence kind (print_job, application, transaction, ...)")
+    scope = Column(String(50), nullable=False, default="", comment="Partition key inside the kind, e.g. location code")
+    period = Column(String(20), nullable=False, default="", comment="Reset period key (YYYYMMDD, YYYY or empty)")
+    current_value = Column(BigInteger, nullable=False, default=0, comment="Last value handed out (including pre-allocated blocks)")
+
+    __table_args__ = (
+        UniqueConstraint('kind', 'scope', 'period', name='uq_sequence_counter_key'),
+    )
+
+    def __repr__(self):
+        return f"<SequenceCounter(kind='{self.kind}', scope='{self.scope}', period='{self.period}', value={self.current_value})>"
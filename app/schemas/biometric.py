@@ -156,8 +156,9 @@ class FingerprintIdentifyRequest(BaseModel):
     
     probe_template_base64: str = Field(..., description="Base64-encoded probe template")
     finger_position: Optional[int] = Field(None, ge=1, le=10, description="Filter by finger position")
+    probe_quality_score: Optional[int] = Field(None, ge=0, le=100, description="Scanner quality score of the probe (limits the search to nearby quality bands)")
     candidate_person_ids: Optional[List[UUID]] = Field(None, description="Limit search to specific persons")
-    max_candidates: Optional[int] = Field(1000, ge=1, le=10000, description="Maximum templates to check")
+    max_candidates: Optional[int] = Field(None, ge=1, le=10000, description="Maximum templates to check (all resident templates when not set; the database scan checks at most 1000)")
     max_results: Optional[int] = Field(10, ge=1, le=100, description="Maximum results to return")
     security_level: Optional[int] = Field(4, ge=1, le=7, description="Security level (1-7)")
     return_all_matches: bool = Field(False, description="Return all matches vs first match only")
@@ -268,6 +269,7 @@ class BiometricSystemStats(BaseModel):
     total_persons_enrolled: int = Field(..., description="Total persons with templates")
     total_verifications: int = Field(..., description="Total verification attempts")
     verifications_24h: int = Field(..., description="Verifications in last 24 hours")
+    exact_match_shortcuts: Dict[str, int] = Field(default_factory=dict, description="Exact template_hash lookups and hits per operation (enroll/identify) since server start")
     system_status: str = Field(..., description="System operational status")
 
     class Config:
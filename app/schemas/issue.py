@@ -100,6 +100,11 @@ class IssueResponse(IssueBase):
     # Additional metadata
     error_message: Optional[str] = None
     
+    # Auto-report deduplication
+    error_fingerprint: Optional[str] = None
+    occurrence_count: int = 1
+    last_occurred_at: Optional[datetime] = None
+    
     created_at: datetime
     updated_at: datetime
 
@@ -260,6 +265,8 @@ class IssueStatsResponse(BaseModel):
     open_issues: int
     resolved_issues: int
     avg_resolution_time: Optional[str] = None
+    median_resolution_time: Optional[str] = None
+    p90_resolution_time: Optional[str] = None
     
     # Breakdown by category
     by_status: Dict[str, int] = {}
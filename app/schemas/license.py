@@ -547,6 +547,16 @@ class BulkOperationResponse(BaseModel):
     successful: int
     failed: int
     error_details: List[Dict[str, str]] = Field(default_factory=list)
+    job_id: Optional[str] = Field(None, description="Background job tracking the operation (large requests)")
+
+
+class BulkOperationJobResponse(BulkOperationResponse):
+    """Progress and result of a bulk operation running as a background job"""
+    status: str = Field(..., description="running, completed or failed")
+    requested_by: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = Field(None, description="Why the job failed (nothing was changed)")
 
 
 # Forward reference for recursive model
@@ -39,6 +39,19 @@ class PrintJobCreateRequest(BaseModel):
         return v
 
 
+class PrintJobBatchCreateRequest(BaseModel):
+    """Schema for creating many print jobs as one production batch"""
+    application_ids: List[UUID] = Field(..., min_items=1, description="Approved applications to print (one card each)")
+    card_template: str = Field("MADAGASCAR_STANDARD", description="Card design template")
+    location_id: Optional[UUID] = Field(None, description="Print location for the batch (defaults to the first application's location)")
+    production_notes: Optional[str] = Field(None, description="Batch production notes")
+
+    @validator('application_ids')
+    def validate_unique_applications(cls, v):
+        """Drop duplicate application IDs while keeping order"""
+        return list(dict.fromkeys(v))
+
+
 class PrintJobQueueMoveRequest(BaseModel):
     """Schema for moving job to top of queue"""
     reason: str = Field(..., min_length=5, max_length=500, description="Reason for moving job to top")
@@ -207,6 +220,23 @@ class PrintJobDetailResponse(PrintJobResponse):
         from_attributes = True
 
 
+class PrintJobBatchFailure(BaseModel):
+    """Application that could not be added to a batch"""
+    application_id: UUID
+    error: str
+
+
+class PrintJobBatchResponse(BaseModel):
+    """Result of batch print job creation"""
+    batch_id: Optional[str] = Field(None, description="Production batch identifier")
+    print_location_id: Optional[UUID]
+    total_requested: int
+    created_jobs: List[PrintJobResponse] = Field(default_factory=list)
+    failed: List[PrintJobBatchFailure] = Field(default_factory=list)
+    files_generated: int = Field(0, description="Jobs whose card files rendered successfully")
+    sheet_available: bool = Field(False, description="Imposed multi-card PDF available for the batch")
+
+
 class PrintQueueResponse(BaseModel):
     """Schema for print queue status"""
     location_id: UUID
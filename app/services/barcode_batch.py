@@ -0,0 +1,151 @@
+"""
+Barcode Batch Processor for Madagascar License System
+Generates and decodes many V4 PDF417 barcodes in parallel
+
+Barcode work is CPU bound (photo fitting, zlib, PDF417 encoding and PNG
+rendering), so it runs in a process pool. Every worker imports the module-level
+barcode_service once and reuses it - and its keys - for every item it handles.
+Results are yielded as soon as each item finishes, so callers can stream them
+back while the rest of the batch is still running.
+"""
+
+import asyncio
+import base64
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Decodes are microseconds each, so they are sent to workers in chunks
+DECODE_CHUNK_SIZE = 64
+
+_barcode_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _generate_barcode(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: build one barcode from prepared person/license/card data"""
+    from app.services.barcode_service import barcode_service, BarcodeGenerationError
+
+    photo_data = None
+    photo_path = item.get("photo_path")
+    if photo_path:
+        try:
+            with open(photo_path, "rb") as f:
+                photo_data = f.read()
+        except OSError:
+            # Continue without photo, like the single barcode endpoint
+            pass
+
+    result = barcode_service.generate_pdf417_barcode_v4_with_size(
+        person_data=item["person_data"],
+        license_data=item["license_data"],
+        card_data=item["card_data"],
+        photo_data=photo_data
+    )
+    if not result:
+        raise BarcodeGenerationError("Failed to generate V4 barcode")
+
+    barcode_image, data_size = result
+    return {
+        "barcode_image_base64": base64.b64encode(barcode_image).decode("utf-8"),
+        "data_size_bytes": data_size,
+        "has_photo": photo_data is not None
+    }
+
+
+def _decode_barcodes(hex_items: List[str]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """Worker entry point: decode a chunk of V4 barcode hex strings"""
+    from app.services.barcode_service import barcode_service
+
+    results = []
+    for hex_data in hex_items:
+        try:
+            results.append((barcode_service.decode_pdf417_barcode_v4(hex_data), None))
+        except Exception as e:
+            results.append((None, str(e) or repr(e)))
+    return results
+
+
+def get_barcode_pool() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _barcode_pool
+    if _barcode_pool is None:
+        settings = get_settings()
+        workers = settings.BARCODE_BATCH_WORKERS or os.cpu_count() or 1
+        # spawn: workers must not inherit the parent's database connections
+        _barcode_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Started barcode batch pool with {workers} workers")
+    return _barcode_pool
+
+
+async def _tagged(index: int, future: asyncio.Future) -> Tuple[int, Any, Optional[str]]:
+    """Pair a pool future's outcome with its position in the batch"""
+    try:
+        return index, await future, None
+    except Exception as e:
+        return index, None, str(e) or repr(e)
+
+
+async def _as_completed(
+    loop: asyncio.AbstractEventLoop, calls: List[Tuple[int, Any, Any]]
+) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    """Run (index, function, argument) calls in the pool, yielding outcomes as they finish"""
+    pool = get_barcode_pool()
+    futures = [loop.run_in_executor(pool, function, argument) for _, function, argument in calls]
+    tasks = [asyncio.ensure_future(_tagged(index, future)) for (index, _, _), future in zip(calls, futures)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Client went away: drop work that has not started yet
+        for future in futures:
+            future.cancel()
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_barcodes(
+    items: List[Tuple[int, Dict[str, Any]]]
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Generate barcodes in parallel
+    
+    Args:
+        items: (index, {person_data, license_data, card_data, photo_path}) per barcode
+        
+    Yields:
+        (index, result, None) or (index, None, error message) in completion order
+    """
+    loop = asyncio.get_running_loop()
+    calls = [(index, _generate_barcode, item) for index, item in items]
+    async for outcome in _as_completed(loop, calls):
+        yield outcome
+
+
+async def decode_barcodes(
+    items: List[str]
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Decode V4 barcode hex strings in parallel
+    
+    Yields:
+        (index, decoded_data, None) or (index, None, error message), chunk by chunk
+    """
+    loop = asyncio.get_running_loop()
+    calls = [
+        (start, _decode_barcodes, items[start:start + DECODE_CHUNK_SIZE])
+        for start in range(0, len(items), DECODE_CHUNK_SIZE)
+    ]
+    async for start, results, error in _as_completed(loop, calls):
+        if error is not None:
+            results = [(None, error)] * min(DECODE_CHUNK_SIZE, len(items) - start)
+        for offset, (decoded_data, item_error) in enumerate(results):
+            yield start + offset, decoded_data, item_error
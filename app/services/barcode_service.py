@@ -68,6 +68,37 @@ from app.models.enums import LicenseCategory, DriverRestrictionCode, VehicleRest
 
 logger = logging.getLogger(__name__)
 
+# Trained zstd dictionaries for the CBOR payload (see train_barcode_dictionary.py).
+# A barcode carries the id of the dictionary it was compressed with in its zstd
+# frame header, so shipped dictionary files must never be changed or removed.
+BARCODE_DICTIONARY_DIR = Path(__file__).parent / "barcode_dictionaries"
+BARCODE_DICTIONARY_ID_BASE = 32768  # Ids below 32768 are reserved by the zstd format
+
+
+def load_compression_dictionaries() -> Dict[int, Any]:
+    """Load every shipped barcode dictionary, keyed by its zstd dictionary id"""
+    dictionaries = {}
+    if not ZSTD_AVAILABLE or not BARCODE_DICTIONARY_DIR.exists():
+        return dictionaries
+    for path in sorted(BARCODE_DICTIONARY_DIR.glob("*.zstdict")):
+        dictionary = zstd.ZstdCompressionDict(path.read_bytes())
+        dictionaries[dictionary.dict_id()] = dictionary
+    return dictionaries
+
+
+def _xor_with_rotating_key(data: bytes, key: bytes) -> bytes:
+    """
+    XOR data with the key repeated over its length (byte i ^ key[i % len(key)])
+    
+    The whole payload is XORed as one big integer against the repeated key,
+    which runs in C instead of a Python loop per byte and gives the same bytes.
+    """
+    length = len(data)
+    if length == 0:
+        return b""
+    key_stream = (key * (length // len(key) + 1))[:length]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key_stream, "big")).to_bytes(length, "big")
+
 
 class LicenseBarcodeError(Exception):
     """Base exception for barcode-related errors"""
@@ -661,15 +692,7 @@ class LicenseBarcodeService:
         Lightweight encryption using XOR with key rotation
         Minimal overhead, calculatable by 3rd parties
         """
-        encrypted = bytearray()
-        key_len = len(key)
-        
-        for i, byte in enumerate(data):
-            # XOR with rotating key
-            key_byte = key[i % key_len]
-            encrypted.append(byte ^ key_byte)
-        
-        return bytes(encrypted)
+        return _xor_with_rotating_key(data, key)
 
     def _lightweight_decrypt(self, data: bytes, key: bytes) -> bytes:
         """
@@ -687,15 +710,7 @@ class LicenseBarcodeService:
         Returns:
             Encrypted data (same length as input)
         """
-        key_bytes = self.STATIC_ENCRYPTION_KEY.encode('utf-8')
-        encrypted = bytearray()
-        
-        for i, byte in enumerate(data):
-            # XOR with rotating key
-            key_byte = key_bytes[i % len(key_bytes)]
-            encrypted.append(byte ^ key_byte)
-        
-        return bytes(encrypted)
+        return _xor_with_rotating_key(data, self.STATIC_ENCRYPTION_KEY.encode('utf-8'))
     
     def _static_decrypt(self, data: bytes) -> bytes:
         """
@@ -988,11 +1003,28 @@ class LicenseBarcodeService:
             print(f"Photo processing error: {e}")
             return None
 
+    def _compression_dictionaries(self) -> Dict[int, Any]:
+        """Shipped zstd dictionaries, loaded on first use"""
+        dictionaries = getattr(self, "_dictionaries", None)
+        if dictionaries is None:
+            dictionaries = load_compression_dictionaries()
+            self._dictionaries = dictionaries
+        return dictionaries
+    
     def _compress_data(self, data: bytes) -> bytes:
         """Compress data using zstandard (preferred) or zlib fallback"""
         if ZSTD_AVAILABLE:
             try:
-                compressor = zstd.ZstdCompressor(level=19)  # Maximum compression
+                level = settings.BARCODE_ZSTD_LEVEL
+                dictionary_id = settings.BARCODE_ZSTD_DICTIONARY_ID
+                if dictionary_id:
+                    dictionary = self._compression_dictionaries().get(dictionary_id)
+                    if dictionary is None:
+                        raise ValueError(f"barcode dictionary {dictionary_id} not found in {BARCODE_DICTIONARY_DIR}")
+                    # The dictionary id goes into the frame header for the decoder
+                    compressor = zstd.ZstdCompressor(level=level, dict_data=dictionary, write_dict_id=True)
+                else:
+                    compressor = zstd.ZstdCompressor(level=level)
                 compressed = compressor.compress(data)
                 return compressed
             except Exception as e:
@@ -1002,19 +1034,34 @@ class LicenseBarcodeService:
         return zlib.compress(data, level=9)
     
     def _decompress_data(self, data: bytes) -> bytes:
-        """Decompress data - try zstandard first, then zlib"""
+        """Decompress data - try zstandard first (with the dictionary named in the frame), then zlib"""
         # Try zstandard first
         if ZSTD_AVAILABLE:
             try:
-                decompressor = zstd.ZstdDecompressor()
-                return decompressor.decompress(data)
-            except:
-                pass  # Fall through to zlib
+                dictionary_id = zstd.get_frame_parameters(data).dict_id
+            except zstd.ZstdError:
+                dictionary_id = None  # Not a zstd frame
+            
+            if dictionary_id:
+                dictionary = self._compression_dictionaries().get(dictionary_id)
+                if dictionary is None:
+                    raise BarcodeDecodingError(f"Barcode was compressed with unknown dictionary {dictionary_id}")
+                try:
+                    return zstd.ZstdDecompressor(dict_data=dictionary).decompress(data)
+                except zstd.ZstdError as e:
+                    raise BarcodeDecodingError(f"Failed to decompress data with dictionary {dictionary_id}: {e}")
+            
+            if dictionary_id is not None:
+                try:
+                    decompressor = zstd.ZstdDecompressor()
+                    return decompressor.decompress(data)
+                except zstd.ZstdError:
+                    pass  # Fall through to zlib
         
         # Try zlib
         try:
             return zlib.decompress(data)
-        except:
+        except zlib.error:
             raise BarcodeDecodingError("Failed to decompress data with both zstandard and zlib")
     
     def _encrypt_data(self, data: bytes) -> bytes:
@@ -1118,6 +1165,18 @@ class LicenseBarcodeService:
         Returns:
             PNG image bytes of the barcode or None if generation fails
         """
+        result = self.generate_pdf417_barcode_v4_with_size(person_data, license_data, card_data, photo_data)
+        return result[0] if result else None
+
+    def generate_pdf417_barcode_v4_with_size(self, person_data: Dict[str, Any], license_data: Dict[str, Any],
+                                             card_data: Dict[str, Any],
+                                             photo_data: Optional[bytes] = None) -> Optional[Tuple[bytes, int]]:
+        """
+        Same as generate_pdf417_barcode_v4, also returning the encoded payload size
+        
+        Returns:
+            (PNG image bytes, payload bytes in the barcode) or None if generation fails
+        """
         try:
             print("=== V4 PDF417 GENERATION (PyZint Only) ===")
             
@@ -1255,13 +1314,88 @@ class LicenseBarcodeService:
             print("V4 PDF417 barcode generated successfully using PyZint")
             print("=== V4 PDF417 COMPLETE ===")
             
-            return barcode_image_bytes
+            return barcode_image_bytes, len(compressed)
             
         except Exception as e:
             self.logger.error(f"Failed to generate V4 PDF417 barcode: {e}")
             print(f"V4 PDF417 generation error: {e}")
             return None
 
+    def decode_pdf417_barcode_v4(self, hex_data: str) -> Dict[str, Any]:
+        """
+        Decode the hex string scanned from a V4 barcode
+        
+        Pipeline: hex → static key XOR decrypt → zlib decompress → pipe-delimited fields
+        
+        Args:
+            hex_data: Hex-encoded barcode content
+            
+        Returns:
+            Decoded license fields (with image_base64 when a photo is embedded)
+        """
+        # Step 1: Decode hex to binary
+        try:
+            binary_data = binascii.unhexlify(hex_data.strip())
+        except Exception as e:
+            raise BarcodeDecodingError(f"Invalid hex data: {str(e)}")
+        
+        # Step 2: Decrypt with static key XOR
+        try:
+            decrypted_data = self._static_decrypt(binary_data)
+        except Exception as e:
+            raise BarcodeDecodingError(f"Decryption failed: {str(e)}")
+        
+        # Step 3: Decompress with zlib
+        try:
+            decompressed_data = zlib.decompress(decrypted_data)
+        except Exception as e:
+            raise BarcodeDecodingError(f"Decompression failed: {str(e)}")
+        
+        # Step 4: Parse pipe-delimited format
+        try:
+            # Split license data and image
+            image_separator = b"||IMG||"
+            has_image = image_separator in decompressed_data
+            if has_image:
+                license_data_bytes, image_bytes = decompressed_data.split(image_separator, 1)
+            else:
+                license_data_bytes = decompressed_data
+                image_bytes = b""
+            
+            # Split by pipes: Name|ID|DOB|LicenseNum|ValidFrom-ValidTo|Codes|VehicleRestr|DriverRestr|Sex
+            fields = license_data_bytes.decode('utf-8').split('|')
+            if len(fields) != 9:
+                raise ValueError(f"Expected 9 fields in license data, got {len(fields)}")
+            
+            # Parse valid date range
+            valid_dates = fields[4].split('-') if fields[4] else ['', '']
+            valid_from = valid_dates[0] if len(valid_dates) > 0 else ''
+            valid_to = valid_dates[1] if len(valid_dates) > 1 else ''
+            
+            decoded_data = {
+                "person_name": fields[0],
+                "id_number": fields[1],
+                "date_of_birth": fields[2],
+                "license_number": fields[3],
+                "valid_from": valid_from,
+                "valid_to": valid_to,
+                "license_codes": fields[5].split(',') if fields[5] else [],
+                "vehicle_restrictions": fields[6].split(',') if fields[6] else [],
+                "driver_restrictions": fields[7].split(',') if fields[7] else [],
+                "sex": fields[8],
+                "has_image": has_image,
+                "image_size_bytes": len(image_bytes)
+            }
+            
+            # Add image data if present
+            if has_image and image_bytes:
+                decoded_data["image_base64"] = base64.b64encode(image_bytes).decode('utf-8')
+            
+            return decoded_data
+            
+        except Exception as e:
+            raise BarcodeDecodingError(f"Failed to parse license data: {str(e)}")
+
     def _generate_pdf417_with_zint(self, payload_bytes: bytes) -> Optional[bytes]:
         """Generate PDF417 using pyzint library with exact working format"""
         try:
@@ -0,0 +1,274 @@
+"""
+Biometric Image Derivative Cache for Madagascar License System
+Generates thumbnails and WebP variants of stored biometric images on demand
+
+Derivatives are rendered once and kept on the storage volume under
+<storage>/derivatives/, mirroring the path of their original:
+
+    biometric/2025/01/15/<application_id>/photo_x.jpg
+    derivatives/biometric/2025/01/15/<application_id>/photo_x.jpg.thumb.jpg
+
+A derivative is reused while it is newer than its original. The cache is
+bounded by BIOMETRIC_DERIVATIVE_CACHE_MAX_MB: when it grows past the limit the
+least recently served derivatives are deleted and regenerated when asked for
+again. Only authenticated routes render (get); the public mobile route serves
+an existing derivative (peek) or the original.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Variants selectable through ?variant=
+DERIVATIVE_VARIANTS = {
+    "thumb": {"width": 160, "format": "JPEG"},
+    "thumb-webp": {"width": 160, "format": "WEBP"},
+    "medium": {"width": 480, "format": "JPEG"},
+    "webp": {"width": None, "format": "WEBP"},  # Original size, WebP encoded
+}
+FORMAT_DETAILS = {
+    "JPEG": ("jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+    "WEBP": ("webp", "image/webp", {"quality": 80, "method": 4}),
+}
+DERIVATIVE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".gif", ".webp"}
+
+# After an eviction pass the cache is brought down to this share of the limit
+EVICTION_TARGET_RATIO = 0.9
+
+
+class UnreadableImageError(Exception):
+    """The original could not be decoded as an image (corrupt, truncated or too large)"""
+
+
+class BiometricDerivativeCache:
+    """On-disk LRU of resized/re-encoded biometric images"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.base_path = self.settings.get_file_storage_path()
+        self.derivatives_path = self.base_path / "derivatives"
+        self.max_bytes = self.settings.BIOMETRIC_DERIVATIVE_CACHE_MAX_MB * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # derivative path -> size, oldest first
+        self._total_bytes = 0
+        self._loaded = False
+        self._generation_locks: Dict[str, threading.Lock] = {}
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+    @staticmethod
+    def media_type(variant: str) -> str:
+        return FORMAT_DETAILS[DERIVATIVE_VARIANTS[variant]["format"]][1]
+
+    def derivative_path(self, original: Path, variant: str) -> Path:
+        """Cache location of a variant of an original inside the storage directory"""
+        extension = FORMAT_DETAILS[DERIVATIVE_VARIANTS[variant]["format"]][0]
+        resolved = original.resolve()
+        try:
+            relative = resolved.relative_to(self.base_path.resolve())
+        except ValueError:
+            # Original outside the configured storage root (development fallback paths)
+            relative = Path(*resolved.parts[1:])
+        return self.derivatives_path / relative.parent / f"{relative.name}.{variant}.{extension}"
+
+    def get(self, original: Path, variant: str) -> Path:
+        """
+        Path of the requested variant, rendering it first if needed (blocking)
+
+        Raises:
+            ValueError: unknown variant, or the original is not an image
+            UnreadableImageError: the original could not be decoded
+        """
+        target = self._target(original, variant)
+        key = str(target)
+
+        if self._is_fresh(target, original):
+            self._record_hit(key)
+            return target
+
+        lock = self._generation_lock(key)
+        with lock:
+            try:
+                # Another request may have rendered it while we waited
+                if self._is_fresh(target, original):
+                    self._record_hit(key)
+                    return target
+                size = self._render(original, target, variant)
+            except Exception:
+                with self._lock:
+                    self._counters["errors"] += 1
+                raise
+            finally:
+                # Dropped while still held, so a failed render does not leave it behind
+                with self._lock:
+                    if self._generation_locks.get(key) is lock:
+                        del self._generation_locks[key]
+        self._record_miss(key, size)
+        return target
+
+    def peek(self, original: Path, variant: str) -> Optional[Path]:
+        """
+        Path of the requested variant if it is already rendered and fresh, never renders
+
+        Raises:
+            ValueError: unknown variant, or the original is not an image
+        """
+        target = self._target(original, variant)
+        if not self._is_fresh(target, original):
+            return None
+        self._record_hit(str(target))
+        return target
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters since process start and current cache size"""
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _target(self, original: Path, variant: str) -> Path:
+        if variant not in DERIVATIVE_VARIANTS:
+            raise ValueError(f"Unknown image variant '{variant}'. Available: {', '.join(DERIVATIVE_VARIANTS)}")
+        if original.suffix.lower() not in DERIVATIVE_EXTENSIONS:
+            raise ValueError(f"Variants are only available for images, not {original.suffix or 'this file'}")
+        self._ensure_loaded()
+        return self.derivative_path(original, variant)
+
+    @staticmethod
+    def _is_fresh(target: Path, original: Path) -> bool:
+        try:
+            return target.stat().st_mtime_ns >= original.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _generation_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._generation_locks.setdefault(key, threading.Lock())
+
+    def _render(self, original: Path, target: Path, variant: str) -> int:
+        """Render a variant to a temporary file and move it into place; returns its size"""
+        spec = DERIVATIVE_VARIANTS[variant]
+        save_options = FORMAT_DETAILS[spec["format"]][2]
+
+        try:
+            with Image.open(original) as source:
+                image = self._prepare(source, spec)
+        except FileNotFoundError:
+            raise
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise UnreadableImageError(f"Cannot read {original.name} as an image: {e}") from e
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            image.save(temporary, format=spec["format"], **save_options)
+            os.replace(temporary, target)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+
+        logger.info(f"Rendered {variant} variant of {original.name} ({target.stat().st_size:,} bytes)")
+        return target.stat().st_size
+
+    @staticmethod
+    def _prepare(source: Image.Image, spec: Dict) -> Image.Image:
+        """Decode, orient, resize and convert an original for its variant's format (a copy)"""
+        image = ImageOps.exif_transpose(source)
+        if spec["width"] and image.width > spec["width"]:
+            height = max(1, round(image.height * spec["width"] / image.width))
+            image = image.resize((spec["width"], height), Image.LANCZOS)
+
+        if spec["format"] == "JPEG":
+            if image.mode in ("RGBA", "LA", "P"):
+                # Signatures are often transparent PNGs: flatten on white
+                rgba = image.convert("RGBA")
+                background = Image.new("RGB", rgba.size, (255, 255, 255))
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                image = background
+            elif image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        # Decode now, so a truncated file fails here and not while saving
+        image.load()
+        return image
+
+    def _ensure_loaded(self):
+        """Index the derivatives already on disk, least recently used first"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            found = []
+            if self.derivatives_path.exists():
+                for directory, _, filenames in os.walk(self.derivatives_path):
+                    for filename in filenames:
+                        if filename.startswith("."):
+                            continue  # Interrupted render
+                        path = os.path.join(directory, filename)
+                        try:
+                            stat_result = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        found.append((max(stat_result.st_atime, stat_result.st_mtime), path, stat_result.st_size))
+            for _, path, size in sorted(found):
+                self._entries[path] = size
+                self._total_bytes += size
+            self._loaded = True
+            logger.info(f"Biometric derivative cache: {len(self._entries)} files, {self._total_bytes:,} bytes")
+        self._evict()
+
+    def _record_hit(self, key: str):
+        with self._lock:
+            self._counters["hits"] += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _record_miss(self, key: str, size: int):
+        with self._lock:
+            self._counters["misses"] += 1
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None):
+        """Delete least recently served derivatives until the cache fits its limit"""
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            target_bytes = self.max_bytes * EVICTION_TARGET_RATIO
+            victims = []
+            for path in list(self._entries):
+                if self._total_bytes <= target_bytes:
+                    break
+                if path == keep:
+                    continue
+                self._total_bytes -= self._entries.pop(path)
+                victims.append(path)
+            self._counters["evictions"] += len(victims)
+
+        for path in victims:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict biometric derivative {path}: {e}")
+
+
+# Global instance
+biometric_derivative_cache = BiometricDerivativeCache()
@@ -0,0 +1,159 @@
+"""
+Card Batch Renderer for Madagascar License System
+Renders many print jobs' card files in parallel and imposes them on A4 sheets
+
+Card rendering is CPU bound (PIL compositing, PDF417 encoding, ReportLab), and
+MadagascarCardGenerator keeps per-call state on the instance, so cards are
+rendered in a process pool: every worker has its own generator instance and
+writes the job files to the shared card storage like the single-job path does.
+
+Imposed sheet layout (A4 portrait, 2 x 5 CR80 cards per page):
+- Page 1, 3, ... carry card fronts in reading order
+- Page 2, 4, ... carry the matching backs with columns mirrored, so a
+  long-edge duplex print lands each back behind its front
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.core.config import get_settings
+from app.services.card_generator import CARD_W_MM, CARD_H_MM
+
+logger = logging.getLogger(__name__)
+
+SHEET_COLUMNS = 2
+SHEET_ROWS = 5
+SHEET_COLUMN_GAP_MM = 5
+SHEET_ROW_GAP_MM = 3
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _render_card_files(print_job_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: render and save one job's card files"""
+    from app.services.card_generator import madagascar_card_generator
+    return madagascar_card_generator.generate_card_files(print_job_data, db_session=None)
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _render_pool
+    if _render_pool is None:
+        settings = get_settings()
+        workers = settings.CARD_RENDER_WORKERS or os.cpu_count() or 1
+        # spawn: workers must not inherit the parent's database connections
+        _render_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Started card render pool with {workers} workers")
+    return _render_pool
+
+
+async def render_cards(jobs_data: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Render card files for many print jobs in parallel
+
+    Args:
+        jobs_data: CRUDPrintJob.card_generation_data() for each job
+
+    Returns:
+        (generation_result, None) or (None, error message) per job, in input order
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_render_pool()
+    futures = [loop.run_in_executor(pool, _render_card_files, job_data) for job_data in jobs_data]
+    outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+    results = []
+    for job_data, outcome in zip(jobs_data, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Card generation failed for print job {job_data.get('print_job_id')}: {outcome}")
+            results.append((None, str(outcome) or repr(outcome)))
+        else:
+            results.append((outcome, None))
+    return results
+
+
+def build_imposed_sheet(cards: List[Tuple[bytes, bytes]], title: str) -> bytes:
+    """
+    Build a duplex A4 PDF with every card of a batch
+
+    Args:
+        cards: (front PNG bytes, back PNG bytes) per card, in print order
+        title: PDF document title
+
+    Returns:
+        PDF bytes
+    """
+    page_width, page_height = A4
+    card_width = CARD_W_MM * mm
+    card_height = CARD_H_MM * mm
+    column_gap = SHEET_COLUMN_GAP_MM * mm
+    row_gap = SHEET_ROW_GAP_MM * mm
+    margin_x = (page_width - SHEET_COLUMNS * card_width - (SHEET_COLUMNS - 1) * column_gap) / 2
+    margin_y = (page_height - SHEET_ROWS * card_height - (SHEET_ROWS - 1) * row_gap) / 2
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+
+    def slot_origin(slot: int, mirrored: bool) -> Tuple[float, float]:
+        row, column = divmod(slot, SHEET_COLUMNS)
+        if mirrored:
+            column = SHEET_COLUMNS - 1 - column
+        x = margin_x + column * (card_width + column_gap)
+        y = page_height - margin_y - (row + 1) * card_height - row * row_gap
+        return x, y
+
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    c.setTitle(title)
+    c.setAuthor("Madagascar License System - AMPRO")
+    c.setSubject("Card production batch sheet")
+    c.setCreator("Madagascar License System v3.0")
+
+    for page_start in range(0, len(cards), per_page):
+        page_cards = cards[page_start:page_start + per_page]
+        for side, mirrored in ((0, False), (1, True)):
+            for slot, card in enumerate(page_cards):
+                x, y = slot_origin(slot, mirrored)
+                c.drawImage(ImageReader(io.BytesIO(card[side])), x, y, width=card_width, height=card_height)
+            c.showPage()
+
+    c.save()
+    return pdf_buffer.getvalue()
+
+
+def impose_rendered_cards(base_path: Path, generation_results: List[Dict[str, Any]], title: str) -> Optional[bytes]:
+    """Read the rendered fronts/backs of a batch and build its imposed sheet (blocking)"""
+    cards = []
+    for generation_result in generation_results:
+        images = read_card_images(base_path, generation_result)
+        if images:
+            cards.append(images)
+    if not cards:
+        return None
+    return build_imposed_sheet(cards, title)
+
+
+def read_card_images(base_path: Path, generation_result: Dict[str, Any]) -> Optional[Tuple[bytes, bytes]]:
+    """Load the rendered front/back PNGs of a job for imposition"""
+    file_paths = generation_result.get("file_paths", {})
+    front_path = file_paths.get("front_image_path")
+    back_path = file_paths.get("back_image_path")
+    if not front_path or not back_path:
+        return None
+    with open(base_path / front_path, "rb") as f:
+        front = f.read()
+    with open(base_path / back_path, "rb") as f:
+        back = f.read()
+    return front, back
@@ -13,6 +13,9 @@ import base64
 import shutil
 
 from app.core.config import get_settings
+from app.services.cold_archive import cold_archive
+from app.services.file_delivery import content_hashes
+from app.services.storage_ledger import storage_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +31,20 @@ class CardFileManager:
     │   ├── front.pdf
     │   ├── back.pdf
     │   └── combined.pdf
+    
+    Day directories older than COLD_ARCHIVE_AFTER_DAYS are packed into bundles
+    (see app/services/cold_archive.py); reads fall back to the archive.
     """
     
+    # Servable card files: file type -> file name
+    CARD_FILE_NAMES = {
+        "front_image": "front.png",
+        "back_image": "back.png",
+        "front_pdf": "front.pdf",
+        "back_pdf": "back.pdf",
+        "combined_pdf": "combined.pdf"
+    }
+    
     def __init__(self):
         self.settings = get_settings()
         self.base_path = self.settings.get_file_storage_path()
@@ -90,6 +105,8 @@ class CardFileManager:
                     file_data = base64.b64decode(card_files_data[internal_name])
                     with open(file_path, 'wb') as f:
                         f.write(file_data)
+                    content_hashes.remember(file_path, file_data)
+                    storage_ledger.record(file_path, len(file_data))
                     
                     # Store relative path from base storage directory
                     relative_path = file_path.relative_to(self.base_path)
@@ -104,6 +121,43 @@ class CardFileManager:
         logger.info(f"Saved {len(file_paths)} files for print job {print_job_id}")
         return file_paths
         
+    def _get_batch_directory(self, batch_id: str, created_at: datetime = None) -> Path:
+        """Get the directory path for a production batch's imposed sheet"""
+        if created_at is None:
+            created_at = datetime.utcnow()
+        return self.cards_path / "batches" / created_at.strftime("%Y") / created_at.strftime("%m") / created_at.strftime("%d") / str(batch_id)
+    
+    def save_batch_sheet(self, batch_id: str, pdf_bytes: bytes, created_at: datetime = None) -> str:
+        """
+        Save the imposed multi-card PDF of a production batch
+        
+        Returns:
+            Path of the sheet relative to the storage base path
+        """
+        batch_dir = self._get_batch_directory(batch_id, created_at)
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        
+        file_path = batch_dir / "sheet.pdf"
+        with open(file_path, 'wb') as f:
+            f.write(pdf_bytes)
+        content_hashes.remember(file_path, pdf_bytes)
+        storage_ledger.record(file_path, len(pdf_bytes))
+        
+        relative_path = file_path.relative_to(self.base_path)
+        logger.info(f"Saved batch sheet for {batch_id} to {relative_path} ({len(pdf_bytes):,} bytes)")
+        return str(relative_path)
+    
+    def get_batch_sheet_path(self, batch_id: str, created_at: datetime = None) -> Optional[Path]:
+        """Get the imposed sheet path for a production batch, None if missing"""
+        return self._existing_or_archived(self._get_batch_directory(batch_id, created_at) / "sheet.pdf")
+    
+    @staticmethod
+    def _existing_or_archived(file_path: Path) -> Optional[Path]:
+        """The file itself, or an extracted copy if it was moved into the cold archive"""
+        if file_path.exists():
+            return file_path
+        return cold_archive.materialize(file_path)
+    
     def read_file_as_base64(self, file_path: str) -> Optional[str]:
         """
         Read a file and return it as base64 encoded string
@@ -150,17 +204,8 @@ class CardFileManager:
         """
         job_dir = self._get_print_job_directory(print_job_id, created_at)
         
-        file_mappings = {
-            "front_image": "front.png",
-            "back_image": "back.png",
-            "front_pdf": "front.pdf", 
-            "back_pdf": "back.pdf",
-            "combined_pdf": "combined.pdf"
-        }
-        
-        if file_type in file_mappings:
-            file_path = job_dir / file_mappings[file_type]
-            return file_path if file_path.exists() else None
+        if file_type in self.CARD_FILE_NAMES:
+            return self._existing_or_archived(job_dir / self.CARD_FILE_NAMES[file_type])
         
         return None
     
@@ -176,17 +221,25 @@ class CardFileManager:
         Returns:
             File content as bytes or None if file doesn't exist
         """
-        file_path = self.get_file_path(print_job_id, file_type, created_at)
+        if file_type not in self.CARD_FILE_NAMES:
+            return None
+        file_path = self._get_print_job_directory(print_job_id, created_at) / self.CARD_FILE_NAMES[file_type]
         
-        if file_path and file_path.exists():
-            try:
-                with open(file_path, 'rb') as f:
-                    return f.read()
-            except Exception as e:
-                logger.error(f"Error reading file {file_path}: {e}")
-                return None
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {e}")
+            return None
         
-        return None
+        try:
+            # Archived: read the member straight out of its bundle
+            return cold_archive.read(file_path)
+        except Exception as e:
+            logger.error(f"Error reading archived file {file_path}: {e}")
+            return None
     
     def delete_print_job_files(self, print_job_id: str, created_at: datetime = None) -> Dict[str, Any]:
         """
@@ -207,13 +260,33 @@ class CardFileManager:
         try:
             job_dir = self._get_print_job_directory(print_job_id, created_at)
             
+            # Files moved into the cold archive are released from their bundle
+            archived = cold_archive.forget_directory(job_dir)
+            
+            # Released members only free disk space once their whole bundle goes
+            released = {
+                "archived_files_released": archived["files"],
+                "archived_bytes_released": archived["bytes"]
+            }
+            
             if not job_dir.exists():
+                if archived["files"]:
+                    logger.info(f"Released {archived['files']} archived files of print job {print_job_id}")
+                    return {
+                        "status": "success",
+                        "message": f"Released {archived['files']} archived files",
+                        "files_deleted": 0,
+                        "bytes_freed": archived["bytes_freed"],
+                        **released,
+                        "folder_removed": False
+                    }
                 logger.info(f"Print job directory {job_dir} does not exist - already cleaned up")
                 return {
                     "status": "success",
                     "message": "Directory already cleaned up",
                     "files_deleted": 0,
                     "bytes_freed": 0,
+                    **released,
                     "folder_removed": False
                 }
             
@@ -238,6 +311,7 @@ class CardFileManager:
             # COMPLETE FOLDER REMOVAL - Remove entire print job directory tree
             logger.info(f"COMPLETE CLEANUP: Removing entire directory tree {job_dir} with {files_deleted} files")
             shutil.rmtree(job_dir)
+            storage_ledger.forget_directory(job_dir)
             
             # Verify folder is completely gone
             if job_dir.exists():
@@ -254,7 +328,8 @@ class CardFileManager:
                 "status": "success", 
                 "message": f"Completely removed print job folder with {files_deleted} files",
                 "files_deleted": files_deleted,
-                "bytes_freed": total_size,
+                "bytes_freed": total_size + archived["bytes_freed"],
+                **released,
                 "folder_removed": True,
                 "folder_path": original_job_dir,
                 "empty_dirs_cleaned": empty_dirs_cleaned,
@@ -271,6 +346,48 @@ class CardFileManager:
                 "folder_removed": False
             }
     
+    def remove_job_directory(self, job_dir: Path, update_ledger: bool = True) -> Dict[str, int]:
+        """
+        Remove one print job directory without pruning its parents or verifying
+        
+        Used by bulk cleanup (see app/services/print_file_retention.py), which
+        prunes the emptied day directories once per pass instead of per job and
+        updates the storage ledger once per page (update_ledger=False).
+        
+        Returns:
+            Dictionary with files_deleted and bytes_freed (loose files and emptied
+            archive bundles), archived_files_released and archived_bytes_released
+            (archived members dropped from bundles that are still in use)
+        """
+        files_deleted = 0
+        bytes_freed = 0
+        try:
+            # One scan both sizes and removes the files (rmtree would scan again)
+            with os.scandir(job_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                        continue
+                    if entry.is_file(follow_symlinks=False):
+                        files_deleted += 1
+                        bytes_freed += entry.stat(follow_symlinks=False).st_size
+                    os.unlink(entry.path)
+            os.rmdir(job_dir)
+        except FileNotFoundError:
+            pass  # Already gone (or removed concurrently)
+        
+        archived = cold_archive.forget_directory(job_dir)
+        bytes_freed += archived["bytes_freed"]
+        
+        if update_ledger:
+            storage_ledger.forget_directory(job_dir)
+        return {
+            "files_deleted": files_deleted,
+            "bytes_freed": bytes_freed,
+            "archived_files_released": archived["files"],
+            "archived_bytes_released": archived["bytes"]
+        }
+    
     def _cleanup_empty_directories(self, directory: Path, max_levels: int = 3) -> int:
         """
         Clean up empty parent directories (day/month/year structure) to prevent bloat
@@ -387,50 +504,30 @@ class CardFileManager:
         """
         Get overall storage statistics for card files
         
+        Read from the storage ledger (see app/services/storage_ledger.py) rather
+        than by walking the card tree; run reconcile_storage_ledger.py to repair
+        drift after files are changed outside this service.
+        
         Returns:
             Dictionary with storage usage information
         """
         try:
-            if not self.cards_path.exists():
-                return {
-                    "total_size_bytes": 0,
-                    "total_files": 0,
-                    "total_directories": 0,
-                    "total_print_jobs": 0
-                }
-            
-            total_size = 0
-            total_files = 0
-            total_directories = 0
-            print_job_directories = set()
-            
-            # Walk through all files
-            for root, dirs, files in os.walk(self.cards_path):
-                total_directories += len(dirs)
-                
-                for file in files:
-                    file_path = Path(root) / file
-                    try:
-                        total_size += file_path.stat().st_size
-                        total_files += 1
-                        
-                        # Extract print job ID from path
-                        path_parts = file_path.parts
-                        if len(path_parts) >= 5:  # .../cards/YYYY/MM/DD/job_id/file
-                            print_job_id = path_parts[-2]
-                            print_job_directories.add(print_job_id)
-                            
-                    except Exception as e:
-                        logger.warning(f"Error processing file {file_path}: {e}")
+            totals = storage_ledger.totals("cards")
+            total_size = totals["bytes"]
+            # Every batch directory holds exactly one sheet.pdf
+            batch_directories = totals["by_type"].get("sheet.pdf", {}).get("files", 0)
+            print_jobs = totals["directories"] - batch_directories
             
             return {
                 "total_size_bytes": total_size,
                 "total_size_mb": total_size / 1024 / 1024,
                 "total_size_gb": total_size / 1024 / 1024 / 1024,
-                "total_files": total_files,
-                "total_directories": total_directories,
-                "total_print_jobs": len(print_job_directories),
-                "average_size_per_job_mb": (total_size / 1024 / 1024 / len(print_job_directories)) if print_job_directories else 0
+                "total_files": totals["files"],
+                "total_directories": totals["directories"],
+                "total_print_jobs": print_jobs,
+                "average_size_per_job_mb": (total_size / 1024 / 1024 / print_jobs) if print_jobs else 0,
+                "by_file_type": totals["by_type"],
+                "ledger_reconciled_at": totals["reconciled_at"]
             }
             
         except Exception as e:
@@ -440,6 +537,15 @@ class CardFileManager:
                 "total_size_bytes": 0,
                 "total_files": 0
             }
+    
+    def get_daily_storage_usage(self, start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Card storage used per day (print jobs and batch sheets), oldest first"""
+        return storage_ledger.by_day(
+            "cards",
+            start_date.strftime("%Y-%m-%d") if start_date else None,
+            end_date.strftime("%Y-%m-%d") if end_date else None
+        )
 
     def verify_complete_cleanup(self, print_job_id: str, created_at: datetime = None) -> Dict[str, Any]:
         """
@@ -515,8 +621,8 @@ class CardFileManager:
         Generate a report on potential directory bloat and cleanup opportunities
         
         Identifies:
-        - Empty directories that can be removed
-        - Orphaned directories without database records
+        - Empty directories that can be removed (as of the last ledger reconcile)
+        - Orphaned directories without database records (as of the last storage reconciliation)
         - Large directories that may need attention
         
         Returns:
@@ -530,36 +636,42 @@ class CardFileManager:
                     "bloat_detected": False
                 }
             
+            # Imported here: the reconciliation service imports the database models
+            from app.services.storage_reconciliation import storage_reconciliation
+            
+            large_directories = storage_ledger.large_directories(
+                "cards", self.settings.STORAGE_LARGE_DIRECTORY_MB * 1024 * 1024
+            )
+            empty_directories = storage_ledger.empty_directories("cards")
+            totals = storage_ledger.totals("cards")
+            last_reconciliation = storage_reconciliation.latest_run("cards")
+            orphaned_directories = [
+                str(self.base_path / path)
+                for path in last_reconciliation["areas"]["cards"]["orphan_sample"]
+            ] if last_reconciliation and not last_reconciliation["quarantine"] else []
+            
             bloat_report = {
                 "scan_timestamp": datetime.utcnow().isoformat(),
-                "total_directories": 0,
-                "empty_directories": [],
-                "large_directories": [],
-                "orphaned_directories": [],
-                "bloat_detected": False,
+                "source": "storage_ledger",
+                "ledger_reconciled_at": totals["reconciled_at"],
+                "total_directories": totals["directories"],
+                # Empty directories hold no files, so only the last reconcile sees them
+                "empty_directories": empty_directories,
+                "large_directories": [
+                    {
+                        "directory": entry["directory"],
+                        "size_mb": entry["size_bytes"] / 1024 / 1024,
+                        "file_count": entry["file_count"]
+                    }
+                    for entry in large_directories
+                ],
+                # Sample from the last storage reconciliation that left its orphans in place
+                "orphaned_directories": orphaned_directories,
+                "orphans_checked_at": last_reconciliation["started_at"] if last_reconciliation else None,
+                "bloat_detected": bool(empty_directories or orphaned_directories),
                 "cleanup_recommendations": []
             }
             
-            # Scan all directories
-            for root, dirs, files in os.walk(self.cards_path):
-                root_path = Path(root)
-                bloat_report["total_directories"] += len(dirs)
-                
-                # Check for empty directories
-                if len(dirs) == 0 and len(files) == 0:
-                    bloat_report["empty_directories"].append(str(root_path))
-                    bloat_report["bloat_detected"] = True
-                
-                # Check for large directories (>50MB)
-                if len(files) > 0:
-                    dir_size = sum(Path(root, f).stat().st_size for f in files if Path(root, f).exists())
-                    if dir_size > 50 * 1024 * 1024:  # 50MB threshold
-                        bloat_report["large_directories"].append({
-                            "directory": str(root_path),
-                            "size_mb": dir_size / 1024 / 1024,
-                            "file_count": len(files)
-                        })
-            
             # Generate cleanup recommendations
             if bloat_report["empty_directories"]:
                 bloat_report["cleanup_recommendations"].append(
@@ -571,6 +683,17 @@ class CardFileManager:
                     f"Investigate {len(bloat_report['large_directories'])} large directories"
                 )
             
+            if orphaned_directories:
+                bloat_report["cleanup_recommendations"].append(
+                    f"Quarantine {last_reconciliation['areas']['cards']['orphans']} orphaned job directories "
+                    f"- run reconcile_storage_files.py cards --quarantine"
+                )
+            
+            if not totals["reconciled_at"]:
+                bloat_report["cleanup_recommendations"].append(
+                    "Storage ledger has never been reconciled - run reconcile_storage_ledger.py to index existing files"
+                )
+            
             if not bloat_report["cleanup_recommendations"]:
                 bloat_report["cleanup_recommendations"].append("No cleanup needed - storage is optimized")
             
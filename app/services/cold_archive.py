@@ -0,0 +1,506 @@
+"""
+Cold Archive for Madagascar License System
+Packs old card and issue files into per-day bundles to save inodes and blocks
+
+Every print job and issue keeps a handful of small files in its own
+directory. Once a day directory is older than COLD_ARCHIVE_AFTER_DAYS,
+compact() packs the files of all its job/issue directories into one bundle
+in that day directory and removes the loose files:
+
+    cards/2025/01/15/<job_id>/front.png   ->  cards/2025/01/15/archive-20250301T020000.pack
+    issues/2025/01/15/<issue_id>/screenshot.png
+
+A bundle is the member files back to back, followed by a JSON index of
+(path, offset, size, crc32) and a fixed trailer, so its contents can always be
+recovered from the bundle alone (read_bundle_index). The lookup index lives in SQLite on the storage volume
+(<storage>/.cold_archive_index.sqlite3): one row per archived file, keyed by
+its original storage-relative path, pointing at its bundle and offset.
+
+Reads stay transparent: the file managers look for the loose file first and
+fall back to the archive. read() seeks straight to the member (CRC checked);
+materialize() extracts it once into <storage>/.archive_cache/ for callers that
+need a real path (FileResponse, ETags, ranges). Deleting a job or issue drops
+its rows; a bundle is removed when none of its files are live any more.
+
+Run compaction with compact_cold_archive.py.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.storage_ledger import storage_ledger
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".cold_archive_index.sqlite3"
+CACHE_DIRECTORY = ".archive_cache"
+BUNDLE_PREFIX = "archive-"
+BUNDLE_SUFFIX = ".pack"
+BUNDLE_MAGIC = b"MLSPACK1"
+TRAILER = struct.Struct("<Q8s")  # index length, magic
+COPY_CHUNK_BYTES = 1024 * 1024
+LOOKUP_CHUNK_SIZE = 500  # Paths per IN (...) query (SQLite parameter limit)
+
+# Day directories that can be archived, per area (relative to the area root)
+ARCHIVE_DAY_ROOTS = {
+    "cards": ("", "batches"),
+    "issues": ("",),
+}
+DAY_PATTERN = "[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bundles (
+    bundle TEXT PRIMARY KEY,
+    area TEXT NOT NULL,
+    day TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    live_files INTEGER NOT NULL,
+    live_bytes INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archived_files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    bundle TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    crc32 INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archived_files_directory ON archived_files (directory);
+CREATE INDEX IF NOT EXISTS ix_archived_files_bundle ON archived_files (bundle);
+"""
+
+
+class ArchiveCorruptedError(Exception):
+    """Raised when an archived member does not match its recorded checksum"""
+
+
+def read_bundle_index(bundle_path: Path) -> Dict[str, Any]:
+    """Read the self-describing index stored at the end of a bundle"""
+    with open(bundle_path, "rb") as f:
+        f.seek(-TRAILER.size, os.SEEK_END)
+        index_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != BUNDLE_MAGIC:
+            raise ArchiveCorruptedError(f"{bundle_path} is not an archive bundle")
+        f.seek(-(TRAILER.size + index_length), os.SEEK_END)
+        return json.loads(f.read(index_length))
+
+
+class ColdArchive:
+    """Per-day bundles of old card and issue files with a random-access index"""
+
+    def __init__(self, base_path: Optional[Path] = None):
+        self.settings = get_settings()
+        self.base_path = Path(base_path) if base_path else self.settings.get_file_storage_path()
+        self.index_path = self.base_path / INDEX_FILENAME
+        self.cache_path = self.base_path / CACHE_DIRECTORY
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(str(self.index_path), check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path)
+        if path.is_absolute():
+            path = path.relative_to(self.base_path)
+        return path.as_posix()
+
+    def _lookup(self, path: Path) -> Optional[Tuple[str, int, int, int]]:
+        """(bundle, offset, size, crc32) of an archived file, None if not archived"""
+        if not self.index_path.exists():
+            return None  # Nothing was ever archived: don't create the index on a read
+        try:
+            relative = self._relative(path)
+        except ValueError:
+            return None  # Outside the storage root
+        with self._lock:
+            return self._connect().execute(
+                "SELECT bundle, offset, size, crc32 FROM archived_files WHERE path = ?", (relative,)
+            ).fetchone()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def contains(self, path: Path) -> bool:
+        return self._lookup(path) is not None
+
+    def archived_directories(self, parent: Path) -> Dict[str, List[str]]:
+        """Archived file names per job/issue directory directly below parent"""
+        if not self.index_path.exists():
+            return {}
+        prefix = self._relative(parent) + "/"
+        directories: Dict[str, List[str]] = {}
+        with self._lock:
+            # Range scan on the directory index; "0" sorts right after "/"
+            rows = self._connect().execute(
+                "SELECT directory, path FROM archived_files WHERE directory >= ? AND directory < ?",
+                (prefix, prefix[:-1] + "0"),
+            ).fetchall()
+        for directory, path in rows:
+            name = directory[len(prefix):]
+            if "/" not in name:
+                directories.setdefault(name, []).append(path.rsplit("/", 1)[-1])
+        return directories
+
+    def read(self, path: Path) -> Optional[bytes]:
+        """Content of an archived file (original path), None if it is not archived"""
+        entry = self._lookup(path)
+        if entry is None:
+            return None
+        bundle, offset, size, crc32 = entry
+        with open(self.base_path / bundle, "rb") as f:
+            f.seek(offset)
+            content = f.read(size)
+        if len(content) != size or zlib.crc32(content) != crc32:
+            raise ArchiveCorruptedError(f"Archived copy of {path} in {bundle} is damaged")
+        return content
+
+    def materialize(self, path: Path) -> Optional[Path]:
+        """
+        A real file with the content of an archived file, extracted on first use
+
+        The cache name includes the bundle, so a file archived again later gets
+        a fresh copy. Returns None if the path is not archived.
+        """
+        entry = self._lookup(path)
+        if entry is None:
+            return None
+        bundle, _, size, _ = entry
+        relative = Path(self._relative(path))
+        target = self.cache_path / relative.parent / f"{Path(bundle).stem}.{relative.name}"
+        try:
+            if target.stat().st_size == size:
+                os.utime(target)  # Last use, for prune_cache
+                return target
+        except FileNotFoundError:
+            pass
+
+        content = self.read(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temporary, "wb") as f:
+                f.write(content)
+            os.replace(temporary, target)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+        return target
+
+    def prune_cache(self, max_age_hours: Optional[int] = None) -> int:
+        """Remove extracted copies not used for max_age_hours; returns files removed"""
+        max_age_hours = max_age_hours if max_age_hours is not None else self.settings.COLD_ARCHIVE_CACHE_MAX_AGE_HOURS
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        if not self.cache_path.exists():
+            return removed
+        for directory, _, filenames in os.walk(self.cache_path, topdown=False):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat_result = os.stat(path)
+                    if max(stat_result.st_atime, stat_result.st_mtime) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+            if directory != str(self.cache_path):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass  # Not empty
+        return removed
+
+    # ------------------------------------------------------------------
+    # Deletes
+    # ------------------------------------------------------------------
+
+    def forget_directory(self, directory: Path) -> Dict[str, int]:
+        """
+        Drop the archived files of a deleted job/issue directory
+
+        Bundles left without live files are deleted. Returns the number of
+        archived files and bytes released ("files", "bytes"; dead space inside
+        bundles that stay, not freed on disk) and the bundles deleted with the
+        bytes that actually freed ("bundles_removed", "bytes_freed").
+        """
+        if not self.index_path.exists():
+            return {"files": 0, "bytes": 0, "bundles_removed": 0, "bytes_freed": 0}
+        relative = self._relative(directory)
+        emptied: List[str] = []
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    "SELECT bundle, COUNT(*), SUM(size) FROM archived_files WHERE directory = ? GROUP BY bundle",
+                    (relative,),
+                ).fetchall()
+                for bundle, files, size in rows:
+                    connection.execute(
+                        "UPDATE bundles SET live_files = live_files - ?, live_bytes = live_bytes - ? WHERE bundle = ?",
+                        (files, size, bundle),
+                    )
+                connection.execute("DELETE FROM archived_files WHERE directory = ?", (relative,))
+                emptied = [
+                    bundle for (bundle,) in connection.execute(
+                        "SELECT bundle FROM bundles WHERE live_files <= 0 AND bundle IN (%s)" % ",".join("?" * len(rows)),
+                        [bundle for bundle, _, _ in rows],
+                    )
+                ] if rows else []
+                connection.executemany("DELETE FROM bundles WHERE bundle = ?", [(bundle,) for bundle in emptied])
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        bytes_freed = sum(self._remove_bundle_file(bundle) for bundle in emptied)
+        return {
+            "files": sum(row[1] for row in rows),
+            "bytes": sum(row[2] for row in rows),
+            "bundles_removed": len(emptied),
+            "bytes_freed": bytes_freed,
+        }
+
+    def _remove_bundle_file(self, bundle: str) -> int:
+        """Delete a bundle file; returns its size (0 if it was already gone)"""
+        bundle_path = self.base_path / bundle
+        try:
+            size = bundle_path.stat().st_size
+            bundle_path.unlink()
+        except FileNotFoundError:
+            return 0
+        storage_ledger.forget(bundle_path)
+        logger.info(f"Removed archive bundle with no live files: {bundle}")
+        return size
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def archivable_days(self, area: str, cutoff: datetime) -> List[Path]:
+        """Day directories of an area dated before the cutoff, oldest first"""
+        cutoff_day = cutoff.strftime("%Y/%m/%d")
+        days = []
+        for day_root in ARCHIVE_DAY_ROOTS[area]:
+            root = self.base_path / area / day_root
+            if not root.exists():
+                continue
+            for day_directory in root.glob(DAY_PATTERN):
+                if day_directory.relative_to(root).as_posix() < cutoff_day and day_directory.is_dir():
+                    days.append(day_directory)
+        return sorted(days)
+
+    @staticmethod
+    def _day_members(day_directory: Path) -> List[Tuple[Path, os.stat_result]]:
+        """Loose files of the job/issue directories of a day directory"""
+        members = []
+        with os.scandir(day_directory) as leaves:
+            for leaf in leaves:
+                if not leaf.is_dir(follow_symlinks=False):
+                    continue  # Bundles and stray files
+                with os.scandir(leaf.path) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                            members.append((Path(entry.path), entry.stat(follow_symlinks=False)))
+        return sorted(members)
+
+    def compact_day(self, area: str, day_directory: Path, dry_run: bool = False) -> Dict[str, Any]:
+        """Pack the loose files of one day directory into a new bundle"""
+        members = self._day_members(day_directory)
+        loose_bytes = sum(stat_result.st_size for _, stat_result in members)
+        loose_blocks = sum(stat_result.st_blocks * 512 for _, stat_result in members)
+        result = {
+            "day_directory": str(day_directory),
+            "files": len(members),
+            "bytes": loose_bytes,
+            "disk_usage_before": loose_blocks,
+        }
+        if not members or dry_run:
+            return result
+
+        relative_day = self._relative(day_directory)
+        bundle_name = f"{BUNDLE_PREFIX}{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}{BUNDLE_SUFFIX}"
+        bundle_path = day_directory / bundle_name
+        bundle = f"{relative_day}/{bundle_name}"
+        temporary = day_directory / f".{bundle_name}.tmp"
+
+        # 1. Write the bundle next to the originals and move it into place
+        entries = []
+        try:
+            with open(temporary, "wb") as out:
+                for path, _ in members:
+                    offset = out.tell()
+                    crc32 = 0
+                    with open(path, "rb") as source:
+                        for chunk in iter(lambda: source.read(COPY_CHUNK_BYTES), b""):
+                            crc32 = zlib.crc32(chunk, crc32)
+                            out.write(chunk)
+                    entries.append((self._relative(path), offset, out.tell() - offset, crc32))
+                index = json.dumps({
+                    "version": 1,
+                    "area": area,
+                    "day": relative_day,
+                    "files": entries,
+                }, separators=(",", ":")).encode()
+                out.write(index)
+                out.write(TRAILER.pack(len(index), BUNDLE_MAGIC))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temporary, bundle_path)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+
+        # 2. Point the index at it (a re-archived path moves to the new bundle)
+        self._index_bundle(bundle, area, relative_day, entries)
+        storage_ledger.record(bundle_path, bundle_path.stat().st_size)
+
+        # 3. Remove the originals that did not change while being packed
+        removed_directories = set()
+        kept = 0
+        for (path, stat_result), (_, _, size, _) in zip(members, entries):
+            try:
+                current = path.stat()
+                if current.st_size != size or current.st_mtime_ns != stat_result.st_mtime_ns:
+                    kept += 1  # Rewritten meanwhile: the loose file stays authoritative
+                    continue
+                path.unlink()
+                removed_directories.add(path.parent)
+            except FileNotFoundError:
+                removed_directories.add(path.parent)
+        for directory in removed_directories:
+            try:
+                directory.rmdir()
+            except OSError:
+                pass  # Still holds files written after packing
+        storage_ledger.forget_directories(removed_directories)
+
+        result.update({
+            "bundle": bundle,
+            "bundle_bytes": bundle_path.stat().st_size,
+            "disk_usage_after": bundle_path.stat().st_blocks * 512,
+            "directories_removed": len(removed_directories),
+            "files_kept_loose": kept,
+        })
+        logger.info(f"Archived {len(members)} files ({loose_bytes:,} bytes) of {relative_day} into {bundle_name}")
+        return result
+
+    def _index_bundle(self, bundle: str, area: str, day: str, entries: List[Tuple[str, int, int, int]]):
+        emptied: List[str] = []
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                paths = [path for path, _, _, _ in entries]
+                for start in range(0, len(paths), LOOKUP_CHUNK_SIZE):
+                    chunk = paths[start:start + LOOKUP_CHUNK_SIZE]
+                    superseded = connection.execute(
+                        "SELECT bundle, COUNT(*), SUM(size) FROM archived_files WHERE path IN (%s) GROUP BY bundle"
+                        % ",".join("?" * len(chunk)),
+                        chunk,
+                    ).fetchall()
+                    for old_bundle, files, size in superseded:
+                        connection.execute(
+                            "UPDATE bundles SET live_files = live_files - ?, live_bytes = live_bytes - ? WHERE bundle = ?",
+                            (files, size, old_bundle),
+                        )
+                connection.executemany(
+                    "INSERT INTO archived_files (path, directory, bundle, offset, size, crc32) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (path) DO UPDATE SET directory = excluded.directory, bundle = excluded.bundle, "
+                    "offset = excluded.offset, size = excluded.size, crc32 = excluded.crc32",
+                    [(path, path.rsplit("/", 1)[0], bundle, offset, size, crc32) for path, offset, size, crc32 in entries],
+                )
+                total = sum(size for _, _, size, _ in entries)
+                connection.execute(
+                    "INSERT INTO bundles (bundle, area, day, files, bytes, live_files, live_bytes, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (bundle, area, day, len(entries), total, len(entries), total, datetime.utcnow().isoformat()),
+                )
+                emptied = [
+                    old_bundle for (old_bundle,) in connection.execute(
+                        "SELECT bundle FROM bundles WHERE live_files <= 0"
+                    )
+                ]
+                connection.executemany("DELETE FROM bundles WHERE bundle = ?", [(old_bundle,) for old_bundle in emptied])
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        for old_bundle in emptied:
+            self._remove_bundle_file(old_bundle)
+
+    def compact(self, areas: Iterable[str] = tuple(ARCHIVE_DAY_ROOTS), older_than_days: Optional[int] = None,
+                dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Archive every day directory older than the threshold
+
+        Args:
+            areas: Storage areas to compact ("cards", "issues")
+            older_than_days: Age threshold (defaults to COLD_ARCHIVE_AFTER_DAYS)
+            dry_run: Report what would be packed and its current disk usage only
+        """
+        older_than_days = older_than_days if older_than_days is not None else self.settings.COLD_ARCHIVE_AFTER_DAYS
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        report: Dict[str, Any] = {"dry_run": dry_run, "cutoff": cutoff.date().isoformat(), "areas": {}}
+        for area in areas:
+            totals = {"days": 0, "files": 0, "bytes": 0, "disk_usage_before": 0, "disk_usage_after": 0, "errors": 0}
+            for day_directory in self.archivable_days(area, cutoff):
+                try:
+                    result = self.compact_day(area, day_directory, dry_run=dry_run)
+                except Exception as e:
+                    totals["errors"] += 1
+                    logger.error(f"Failed to archive {day_directory}: {e}")
+                    continue
+                if not result["files"]:
+                    continue
+                totals["days"] += 1
+                for key in ("files", "bytes", "disk_usage_before"):
+                    totals[key] += result[key]
+                totals["disk_usage_after"] += result.get("disk_usage_after", 0)
+            report["areas"][area] = totals
+        if not dry_run:
+            report["cache_files_pruned"] = self.prune_cache()
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        """Bundle counts and live/dead bytes per area"""
+        if not self.index_path.exists():
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT area, COUNT(*), SUM(files), SUM(bytes), SUM(live_files), SUM(live_bytes) FROM bundles GROUP BY area"
+            ).fetchall()
+        return {
+            area: {"bundles": bundles, "files": files, "bytes": size, "live_files": live_files, "live_bytes": live_bytes}
+            for area, bundles, files, size, live_files, live_bytes in rows
+        }
+
+
+# Global instance
+cold_archive = ColdArchive()
@@ -1,18 +1,27 @@
 """
 Document Generation Service for Madagascar License System
 Standardized PDF document generation using ReportLab
+
+The parts of a template that are the same on every document are prepared once:
+the stylesheet is built on first use, table styles are module constants and
+fixed text (headers, labels, notices, footers) is parsed into a Paragraph once
+per template and handed out as a shallow copy, so each document only parses its
+own values. DocumentGenerator keeps one instance per template, and
+generate_batch lays out many documents as one multi-page PDF.
 """
 
+import copy
 import io
 import logging
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple
 from datetime import datetime
 from pathlib import Path
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Flowable, Image as RLImage
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import mm, inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
@@ -20,1038 +29,957 @@ from reportlab.graphics.shapes import Drawing, Rect
 
 logger = logging.getLogger(__name__)
 
+# Fixed paragraphs kept per template; header and footer text can come from the
+# caller, so the cache is bounded
+MAX_FIXED_PARAGRAPHS = 256
+
+
+@lru_cache(maxsize=None)
+def document_styles() -> StyleSheet1:
+    """Custom styles for Madagascar documents, built once and shared (read-only)"""
+    styles = getSampleStyleSheet()
+
+    # Government header style - National level
+    styles.add(ParagraphStyle(
+        name='GovernmentHeader',
+        parent=styles['Heading1'],
+        fontSize=14,
+        fontName='Helvetica-Bold',
+        alignment=TA_CENTER,
+        spaceAfter=3,
+        textColor=colors.black
+    ))
+
+    # Department header style - Ministry level
+    styles.add(ParagraphStyle(
+        name='DepartmentHeader',
+        parent=styles['Heading2'],
+        fontSize=12,
+        fontName='Helvetica-Bold',
+        alignment=TA_CENTER,
+        spaceAfter=3,
+        textColor=colors.black
+    ))
+
+    # Office header style - Department level
+    styles.add(ParagraphStyle(
+        name='OfficeHeader',
+        parent=styles['Heading3'],
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        alignment=TA_CENTER,
+        spaceAfter=6,
+        textColor=colors.black
+    ))
+
+    # Official title style - Document type
+    styles.add(ParagraphStyle(
+        name='OfficialTitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        fontName='Helvetica-Bold',
+        alignment=TA_CENTER,
+        textColor=colors.black,
+        borderColor=colors.black,
+        borderWidth=2,
+        borderPadding=8,
+        spaceAfter=12,
+        spaceBefore=6
+    ))
+
+    # Field label style
+    styles.add(ParagraphStyle(
+        name='FieldLabel',
+        parent=styles['Normal'],
+        fontSize=9,
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT,
+        textColor=colors.black,
+        spaceAfter=1
+    ))
+
+    # Field value style
+    styles.add(ParagraphStyle(
+        name='FieldValue',
+        parent=styles['Normal'],
+        fontSize=9,
+        fontName='Helvetica',
+        alignment=TA_LEFT,
+        textColor=colors.black,
+        spaceAfter=1
+    ))
+
+    # Section header style
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Normal'],
+        fontSize=10,
+        fontName='Helvetica-Bold',
+        alignment=TA_LEFT,
+        textColor=colors.black,
+        borderColor=colors.black,
+        borderWidth=1,
+        borderPadding=4,
+        spaceAfter=4,
+        spaceBefore=2
+    ))
+
+    # Footer style
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        fontName='Helvetica',
+        alignment=TA_CENTER,
+        textColor=colors.black,
+        spaceAfter=2,
+        spaceBefore=1
+    ))
+
+    # Official stamp style
+    styles.add(ParagraphStyle(
+        name='OfficialStamp',
+        parent=styles['Normal'],
+        fontSize=7,
+        fontName='Helvetica-Oblique',
+        alignment=TA_CENTER,
+        textColor=colors.black,
+        spaceAfter=3
+    ))
+
+    return styles
+
+
+# Table styles
+SEPARATOR_BELOW_STYLE = TableStyle([
+    ('LINEBELOW', (0, 0), (-1, -1), 1, colors.black),
+])
+
+SEPARATOR_ABOVE_STYLE = TableStyle([
+    ('LINEABOVE', (0, 0), (-1, -1), 1, colors.black),
+])
+
+# Four-column reference block under the title (receipt, card order)
+DETAILS_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+# Label / value grid
+FIELD_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+SHADED_FIELD_GRID_STYLE = TableStyle(FIELD_GRID_STYLE.getCommands() + [
+    ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+])
+
+COMPACT_FIELD_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+# Receipt items: description left, amount right
+PAYMENT_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+# Grey full-width section bar (card order)
+SECTION_BAR_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+])
+
+NOTICE_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+# Four-column list with a shaded header row (license verification)
+LIST_GRID_STYLE = TableStyle(NOTICE_GRID_STYLE.getCommands() + [
+    ('BACKGROUND', (0, 0), (3, 0), colors.lightgrey),
+])
+
+# Card collection applications list
+APPLICATIONS_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+DATE_LINE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 20),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+SIGNATURE_GRID_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 15),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+SIGNATURE_COLUMNS_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 15),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+
+class FixedParagraph(Paragraph):
+    """Paragraph whose text is the same on every document
+
+    Line breaking depends only on the text, the style and the available width,
+    so it is worked out once per width and shared by every copy.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Paragraph.split builds the pieces through self.__class__ with ReportLab's full signature
+        super().__init__(*args, **kwargs)
+        self._layouts: Dict[float, Tuple[Any, ...]] = {}
+
+    def wrap(self, availWidth, availHeight):
+        layout = self._layouts.get(availWidth)
+        if layout is None:
+            Paragraph.wrap(self, availWidth, availHeight)
+            layout = self._layouts[availWidth] = (self.width, self.height, self._wrapWidths, self.blPara)
+        self.width, self.height, self._wrapWidths, self.blPara = layout
+        return self.width, self.height
+
+
+def _table(rows: List[List[Any]], col_widths: List[float], style: TableStyle) -> Table:
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(style)
+    return table
+
+
 class DocumentTemplate:
-    """Base class for document templates"""
-    
+    """Base class for document templates
+
+    Subclasses build the flowables of one document in build_story; generate
+    and generate_batch lay them out. Templates hold no per-document state, so
+    one instance serves every call.
+    """
+
+    margin = 20*mm
+    # Used in log and error messages
+    document_name = "document"
+    subject_key = "id"
+    subject_label = "document"
+    failure_message = "Document generation failed"
+
     def __init__(self, title: str, page_size=A4):
         self.title = title
         self.page_size = page_size
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-    
-    def setup_custom_styles(self):
-        """Setup custom styles for Madagascar documents"""
-        
-        # Government header style - National level
-        self.styles.add(ParagraphStyle(
-            name='GovernmentHeader',
-            parent=self.styles['Heading1'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=3,
-            textColor=colors.black
-        ))
-        
-        # Department header style - Ministry level
-        self.styles.add(ParagraphStyle(
-            name='DepartmentHeader',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=3,
-            textColor=colors.black
-        ))
-        
-        # Office header style - Department level
-        self.styles.add(ParagraphStyle(
-            name='OfficeHeader',
-            parent=self.styles['Heading3'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=6,
-            textColor=colors.black
-        ))
-        
-        # Official title style - Document type
-        self.styles.add(ParagraphStyle(
-            name='OfficialTitle',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            borderColor=colors.black,
-            borderWidth=2,
-            borderPadding=8,
-            spaceAfter=12,
-            spaceBefore=6
-        ))
-        
-        # Field label style
-        self.styles.add(ParagraphStyle(
-            name='FieldLabel',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT,
-            textColor=colors.black,
-            spaceAfter=1
-        ))
-        
-        # Field value style
-        self.styles.add(ParagraphStyle(
-            name='FieldValue',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            fontName='Helvetica',
-            alignment=TA_LEFT,
-            textColor=colors.black,
-            spaceAfter=1
-        ))
-        
-        # Section header style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT,
-            textColor=colors.black,
-            borderColor=colors.black,
-            borderWidth=1,
-            borderPadding=4,
-            spaceAfter=4,
-            spaceBefore=2
-        ))
-        
-        # Footer style
-        self.styles.add(ParagraphStyle(
-            name='Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            fontName='Helvetica',
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            spaceAfter=2,
-            spaceBefore=1
-        ))
-        
-        # Official stamp style
-        self.styles.add(ParagraphStyle(
-            name='OfficialStamp',
-            parent=self.styles['Normal'],
-            fontSize=7,
-            fontName='Helvetica-Oblique',
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            spaceAfter=3
-        ))
+        self.styles = document_styles()
+        self._fixed: Dict[Tuple[str, str], Paragraph] = {}
+
+    def fixed(self, text: str, style: str) -> Paragraph:
+        """Paragraph for text that repeats across documents, parsed only once
+
+        Returns a shallow copy: the parsed fragments and line breaks are
+        shared, the position it is drawn at stays on the copy.
+        """
+        key = (text, style)
+        paragraph = self._fixed.get(key)
+        if paragraph is None:
+            if len(self._fixed) >= MAX_FIXED_PARAGRAPHS:
+                self._fixed.clear()
+            paragraph = self._fixed[key] = FixedParagraph(text, self.styles[style])
+        return copy.copy(paragraph)
+
+    def build_story(self, data: Dict[str, Any]) -> List[Flowable]:
+        """Flowables of one document"""
+        raise NotImplementedError
+
+    def _render(self, story: List[Flowable]) -> bytes:
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=self.page_size,
+            rightMargin=self.margin,
+            leftMargin=self.margin,
+            topMargin=self.margin,
+            bottomMargin=self.margin,
+            title=self.title
+        )
+        doc.build(story)
+        pdf_data = buffer.getvalue()
+        buffer.close()
+        return pdf_data
 
-class ReceiptTemplate(DocumentTemplate):
-    """Receipt document template for Madagascar transactions"""
-    
     def generate(self, data: Dict[str, Any]) -> bytes:
-        """Generate receipt PDF from transaction data"""
+        """Generate the PDF of one document"""
         try:
-            logger.info(f"Generating receipt PDF for transaction: {data.get('transaction_number', 'Unknown')}")
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=self.page_size,
-                rightMargin=20*mm,
-                leftMargin=20*mm,
-                topMargin=20*mm,
-                bottomMargin=20*mm,
-                title=self.title
-            )
-            
-            story = []
-            
-            # Government headers with coat of arms placeholder
-            story.append(Paragraph(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), self.styles['GovernmentHeader']))
-            story.append(Paragraph(data.get('department_header', 'MINISTRY OF TRANSPORT, TOURISM AND METEOROLOGY'), self.styles['DepartmentHeader']))
-            story.append(Paragraph(data.get('office_header', 'General Directorate of Land Transport'), self.styles['OfficeHeader']))
-            story.append(Spacer(1, 4))
-            
-            # Separator line
-            separator_table = Table([['']], colWidths=[170*mm])
-            separator_table.setStyle(TableStyle([
-                ('LINEBELOW', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(separator_table)
-            story.append(Spacer(1, 8))
-            
-            # Receipt title with official styling
-            story.append(Paragraph(data.get('receipt_title', 'OFFICIAL PAYMENT RECEIPT'), self.styles['OfficialTitle']))
-            story.append(Spacer(1, 8))
-            
-            # Receipt details table with official styling
-            receipt_details = [
-                [
-                    Paragraph('<b>Receipt No:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('receipt_number', 'N/A')), self.styles['FieldValue']),
-                    Paragraph('<b>Date & Time:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('date', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Transaction No:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('transaction_number', 'N/A')), self.styles['FieldValue']),
-                    Paragraph('<b>Office:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('location', 'N/A')), self.styles['FieldValue'])
-                ]
+            logger.info(f"Generating {self.document_name} PDF for {self.subject_label}: {data.get(self.subject_key, 'Unknown')}")
+            pdf_data = self._render(self.build_story(data))
+            logger.info(f"Successfully generated {self.document_name} PDF ({len(pdf_data)} bytes)")
+            return pdf_data
+
+        except Exception as e:
+            logger.error(f"Error generating {self.document_name} PDF: {e}")
+            raise Exception(f"{self.failure_message}: {str(e)}")
+
+    def generate_batch(self, documents: Iterable[Dict[str, Any]]) -> bytes:
+        """Generate one PDF with every document starting on a new page"""
+        try:
+            story: List[Flowable] = []
+            count = 0
+            for data in documents:
+                if count:
+                    story.append(PageBreak())
+                story.extend(self.build_story(data))
+                count += 1
+            pdf_data = self._render(story)
+            logger.info(f"Successfully generated {count} {self.document_name} documents as one PDF ({len(pdf_data)} bytes)")
+            return pdf_data
+
+        except Exception as e:
+            logger.error(f"Error generating {self.document_name} batch PDF: {e}")
+            raise Exception(f"{self.failure_message}: {str(e)}")
+
+    def generate_each(self, documents: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """Generate a separate PDF per document, one at a time"""
+        for data in documents:
+            try:
+                yield self._render(self.build_story(data))
+            except Exception as e:
+                logger.error(f"Error generating {self.document_name} PDF for {self.subject_label} {data.get(self.subject_key, 'Unknown')}: {e}")
+                raise Exception(f"{self.failure_message}: {str(e)}")
+
+class ReceiptTemplate(DocumentTemplate):
+    """Receipt document template for Madagascar transactions"""
+
+    document_name = "receipt"
+    subject_key = "transaction_number"
+    subject_label = "transaction"
+    failure_message = "PDF generation failed"
+
+    def build_story(self, data: Dict[str, Any]) -> List[Flowable]:
+        """Receipt flowables from transaction data"""
+        story = []
+
+        # Government headers with coat of arms placeholder
+        story.append(self.fixed(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), 'GovernmentHeader'))
+        story.append(self.fixed(data.get('department_header', 'MINISTRY OF TRANSPORT, TOURISM AND METEOROLOGY'), 'DepartmentHeader'))
+        story.append(self.fixed(data.get('office_header', 'General Directorate of Land Transport'), 'OfficeHeader'))
+        story.append(Spacer(1, 4))
+
+        # Separator line
+        story.append(_table([['']], [170*mm], SEPARATOR_BELOW_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Receipt title with official styling
+        story.append(self.fixed(data.get('receipt_title', 'OFFICIAL PAYMENT RECEIPT'), 'OfficialTitle'))
+        story.append(Spacer(1, 8))
+
+        # Receipt details table with official styling
+        receipt_details = [
+            [
+                self.fixed('<b>Receipt No:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('receipt_number', 'N/A')), self.styles['FieldValue']),
+                self.fixed('<b>Date & Time:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('date', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Transaction No:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('transaction_number', 'N/A')), self.styles['FieldValue']),
+                self.fixed('<b>Office:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('location', 'N/A')), self.styles['FieldValue'])
             ]
-            
-            receipt_table = Table(receipt_details, colWidths=[40*mm, 45*mm, 35*mm, 50*mm])
-            receipt_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            story.append(receipt_table)
-            story.append(Spacer(1, 8))
-            
-            # Customer information section with official header
-            story.append(Paragraph('BENEFICIARY INFORMATION', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            customer_data = [
-                [
-                    Paragraph('<b>Full Name:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>ID/Passport Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
-                ]
+        ]
+        story.append(_table(receipt_details, [40*mm, 45*mm, 35*mm, 50*mm], DETAILS_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Customer information section with official header
+        story.append(self.fixed('BENEFICIARY INFORMATION', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        customer_data = [
+            [
+                self.fixed('<b>Full Name:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>ID/Passport Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
             ]
-            
-            customer_table = Table(customer_data, colWidths=[50*mm, 120*mm])
-            customer_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(customer_table)
-            story.append(Spacer(1, 8))
-            
-            # Payment items section with official header
-            story.append(Paragraph('PAYMENT DETAILS', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            # Build payment items table with simple styling
-            payment_data = [
-                [
-                    Paragraph('<b>Service / Description</b>', self.styles['FieldLabel']),
-                    Paragraph(f'<b>Amount ({data.get("currency", "Ariary")})</b>', self.styles['FieldLabel'])
-                ]
+        ]
+        story.append(_table(customer_data, [50*mm, 120*mm], FIELD_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Payment items section with official header
+        story.append(self.fixed('PAYMENT DETAILS', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        # Build payment items table with simple styling
+        payment_data = [
+            [
+                self.fixed('<b>Service / Description</b>', 'FieldLabel'),
+                self.fixed(f'<b>Amount ({data.get("currency", "Ariary")})</b>', 'FieldLabel')
             ]
-            
-            # Add items
-            items = data.get('items', [])
-            for item in items:
-                payment_data.append([
-                    Paragraph(str(item.get('description', 'N/A')), self.styles['FieldValue']),
-                    Paragraph(f"{item.get('amount', 0):,.0f}", self.styles['FieldValue'])
-                ])
-            
-            # Add total row with emphasis
+        ]
+
+        # Add items
+        items = data.get('items', [])
+        for item in items:
             payment_data.append([
-                Paragraph('<b>TOTAL AMOUNT TO PAY</b>', self.styles['FieldLabel']),
-                Paragraph(f"<b>{data.get('total_amount', 0):,.0f}</b>", self.styles['FieldLabel'])
+                Paragraph(str(item.get('description', 'N/A')), self.styles['FieldValue']),
+                Paragraph(f"{item.get('amount', 0):,.0f}", self.styles['FieldValue'])
             ])
-            
-            payment_table = Table(payment_data, colWidths=[110*mm, 60*mm])
-            payment_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-            
-            story.append(payment_table)
-            story.append(Spacer(1, 8))
-            
-            # Payment method section with official header
-            story.append(Paragraph('PAYMENT METHODS', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            payment_method_data = [
-                [
-                    Paragraph('<b>Payment Method:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('payment_method', 'N/A')), self.styles['FieldValue'])
-                ]
+
+        # Add total row with emphasis
+        payment_data.append([
+            self.fixed('<b>TOTAL AMOUNT TO PAY</b>', 'FieldLabel'),
+            Paragraph(f"<b>{data.get('total_amount', 0):,.0f}</b>", self.styles['FieldLabel'])
+        ])
+
+        story.append(_table(payment_data, [110*mm, 60*mm], PAYMENT_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Payment method section with official header
+        story.append(self.fixed('PAYMENT METHODS', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        payment_method_data = [
+            [
+                self.fixed('<b>Payment Method:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('payment_method', 'N/A')), self.styles['FieldValue'])
             ]
-            
-            if data.get('payment_reference'):
-                payment_method_data.append([
-                    Paragraph('<b>Reference:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('payment_reference')), self.styles['FieldValue'])
-                ])
-            
+        ]
+
+        if data.get('payment_reference'):
             payment_method_data.append([
-                Paragraph('<b>Processed by:</b>', self.styles['FieldLabel']),
-                Paragraph(str(data.get('processed_by', 'System')), self.styles['FieldValue'])
+                self.fixed('<b>Reference:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('payment_reference')), self.styles['FieldValue'])
             ])
-            
-            payment_method_table = Table(payment_method_data, colWidths=[50*mm, 120*mm])
-            payment_method_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-            
-            story.append(payment_method_table)
-            story.append(Spacer(1, 10))
-            
-            # Official verification stamp area
-            story.append(Paragraph('OFFICIAL STAMP AND SIGNATURE', self.styles['OfficialStamp']))
-            story.append(Spacer(1, 10))
-            
-            # Official footer with government branding
-            footer_separator = Table([['']], colWidths=[170*mm])
-            footer_separator.setStyle(TableStyle([
-                ('LINEABOVE', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(footer_separator)
-            story.append(Spacer(1, 4))
-            
-            story.append(Paragraph(data.get('footer', 'République de Madagascar - Reçu Officiel du Gouvernement'), self.styles['Footer']))
-            story.append(Paragraph(data.get('validity_note', 'Ce reçu est valide et doit être conservé pour vos dossiers'), self.styles['Footer']))
-            story.append(Paragraph(data.get('contact_info', 'Pour assistance: +261 20 22 123 45 | transport@gov.mg'), self.styles['Footer']))
-            story.append(Spacer(1, 4))
-            story.append(Paragraph('Document generated electronically - No handwritten signature required', self.styles['OfficialStamp']))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_data = buffer.getvalue()
-            buffer.close()
-            
-            logger.info(f"Successfully generated receipt PDF ({len(pdf_data)} bytes)")
-            return pdf_data
-            
-        except Exception as e:
-            logger.error(f"Error generating receipt PDF: {e}")
-            raise Exception(f"PDF generation failed: {str(e)}")
+
+        payment_method_data.append([
+            self.fixed('<b>Processed by:</b>', 'FieldLabel'),
+            Paragraph(str(data.get('processed_by', 'System')), self.styles['FieldValue'])
+        ])
+
+        story.append(_table(payment_method_data, [50*mm, 120*mm], COMPACT_FIELD_GRID_STYLE))
+        story.append(Spacer(1, 10))
+
+        # Official verification stamp area
+        story.append(self.fixed('OFFICIAL STAMP AND SIGNATURE', 'OfficialStamp'))
+        story.append(Spacer(1, 10))
+
+        # Official footer with government branding
+        story.append(_table([['']], [170*mm], SEPARATOR_ABOVE_STYLE))
+        story.append(Spacer(1, 4))
+
+        story.append(self.fixed(data.get('footer', 'République de Madagascar - Reçu Officiel du Gouvernement'), 'Footer'))
+        story.append(self.fixed(data.get('validity_note', 'Ce reçu est valide et doit être conservé pour vos dossiers'), 'Footer'))
+        story.append(self.fixed(data.get('contact_info', 'Pour assistance: +261 20 22 123 45 | transport@gov.mg'), 'Footer'))
+        story.append(Spacer(1, 4))
+        story.append(self.fixed('Document generated electronically - No handwritten signature required', 'OfficialStamp'))
+
+        return story
 
 class CardOrderConfirmationTemplate(DocumentTemplate):
     """Card Order Confirmation template for Madagascar license orders"""
-    
-    def generate(self, data: Dict[str, Any]) -> bytes:
-        """Generate card order confirmation PDF from order data"""
-        try:
-            logger.info(f"Generating card order confirmation PDF for order: {data.get('order_number', 'Unknown')}")
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=self.page_size,
-                rightMargin=20*mm,
-                leftMargin=20*mm,
-                topMargin=20*mm,
-                bottomMargin=20*mm,
-                title=self.title
-            )
-            
-            story = []
-            
-            # Government headers
-            story.append(Paragraph(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), self.styles['GovernmentHeader']))
-            story.append(Paragraph(data.get('department_header', 'MINISTRY OF TRANSPORT, TOURISM AND METEOROLOGY'), self.styles['DepartmentHeader']))
-            story.append(Paragraph(data.get('office_header', 'General Directorate of Land Transport'), self.styles['OfficeHeader']))
-            story.append(Spacer(1, 4))
-            
-            # Separator line
-            separator_table = Table([['']], colWidths=[170*mm])
-            separator_table.setStyle(TableStyle([
-                ('LINEBELOW', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(separator_table)
-            story.append(Spacer(1, 8))
-            
-            # Document title
-            story.append(Paragraph(data.get('document_title', 'CARD ORDER CONFIRMATION'), self.styles['OfficialTitle']))
-            story.append(Spacer(1, 8))
-            
-            # Order details table
-            order_details = [
-                [
-                    Paragraph('<b>Order Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('order_number', 'N/A')), self.styles['FieldValue']),
-                    Paragraph('<b>Order Date:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('order_date', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Card Type:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('card_type', 'N/A')), self.styles['FieldValue']),
-                    Paragraph('<b>Urgency:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('urgency_level', 'N/A')), self.styles['FieldValue'])
-                ]
-            ]
-            
-            order_table = Table(order_details, colWidths=[40*mm, 45*mm, 35*mm, 50*mm])
-            order_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            story.append(order_table)
-            story.append(Spacer(1, 8))
-            
-            # Section header with full width
-            section_header_table = Table([['APPLICANT INFORMATION']], colWidths=[170*mm])
-            section_header_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ]))
-            story.append(section_header_table)
-            story.append(Spacer(1, 4))
-            
-            customer_data = [
-                [
-                    Paragraph('<b>Full Name:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>ID/Passport Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>License Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('license_number', 'N/A')), self.styles['FieldValue'])
-                ]
+
+    document_name = "card order confirmation"
+    subject_key = "order_number"
+    subject_label = "order"
+    failure_message = "Card order confirmation generation failed"
+
+    def section_bar(self, title: str) -> Table:
+        """Grey full-width section header"""
+        return _table([[title]], [170*mm], SECTION_BAR_STYLE)
+
+    def build_story(self, data: Dict[str, Any]) -> List[Flowable]:
+        """Card order confirmation flowables from order data"""
+        story = []
+
+        # Government headers
+        story.append(self.fixed(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), 'GovernmentHeader'))
+        story.append(self.fixed(data.get('department_header', 'MINISTRY OF TRANSPORT, TOURISM AND METEOROLOGY'), 'DepartmentHeader'))
+        story.append(self.fixed(data.get('office_header', 'General Directorate of Land Transport'), 'OfficeHeader'))
+        story.append(Spacer(1, 4))
+
+        # Separator line
+        story.append(_table([['']], [170*mm], SEPARATOR_BELOW_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Document title
+        story.append(self.fixed(data.get('document_title', 'CARD ORDER CONFIRMATION'), 'OfficialTitle'))
+        story.append(Spacer(1, 8))
+
+        # Order details table
+        order_details = [
+            [
+                self.fixed('<b>Order Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('order_number', 'N/A')), self.styles['FieldValue']),
+                self.fixed('<b>Order Date:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('order_date', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Card Type:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('card_type', 'N/A')), self.styles['FieldValue']),
+                self.fixed('<b>Urgency:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('urgency_level', 'N/A')), self.styles['FieldValue'])
             ]
-            
-            customer_table = Table(customer_data, colWidths=[50*mm, 120*mm])
-            customer_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(customer_table)
-            story.append(Spacer(1, 8))
-            
-            # Order status section header with full width
-            section_header_table = Table([['ORDER STATUS']], colWidths=[170*mm])
-            section_header_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ]))
-            story.append(section_header_table)
-            story.append(Spacer(1, 4))
-            
-            status_data = [
-                [
-                    Paragraph('<b>Current Status:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('order_status', 'PENDING')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Expected Delivery Date:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('expected_delivery', 'To be determined')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Processing Fee:</b>', self.styles['FieldLabel']),
-                    Paragraph(f"{data.get('processing_fee', 0):,.0f} {data.get('currency', 'Ariary')}", self.styles['FieldValue'])
-                ]
+        ]
+        story.append(_table(order_details, [40*mm, 45*mm, 35*mm, 50*mm], DETAILS_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Section header with full width
+        story.append(self.section_bar('APPLICANT INFORMATION'))
+        story.append(Spacer(1, 4))
+
+        customer_data = [
+            [
+                self.fixed('<b>Full Name:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>ID/Passport Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>License Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('license_number', 'N/A')), self.styles['FieldValue'])
             ]
-            
-            status_table = Table(status_data, colWidths=[50*mm, 120*mm])
-            status_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(status_table)
-            story.append(Spacer(1, 8))
-            
-            # Important notices section header with full width
-            section_header_table = Table([['IMPORTANT INFORMATION']], colWidths=[170*mm])
-            section_header_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ]))
-            story.append(section_header_table)
-            story.append(Spacer(1, 4))
-            
-            # Important notices in a table for consistency
-            notices_data = [
-                [Paragraph("• Please keep this document until you receive your card", self.styles['FieldValue'])],
-                [Paragraph("• The card will be available at the office indicated above", self.styles['FieldValue'])],
-                [Paragraph("• Bring this document and your ID when collecting", self.styles['FieldValue'])],
-                [Paragraph("• Cards not collected within 3 months will be destroyed", self.styles['FieldValue'])]
+        ]
+        story.append(_table(customer_data, [50*mm, 120*mm], FIELD_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Order status section header with full width
+        story.append(self.section_bar('ORDER STATUS'))
+        story.append(Spacer(1, 4))
+
+        status_data = [
+            [
+                self.fixed('<b>Current Status:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('order_status', 'PENDING')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Expected Delivery Date:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('expected_delivery', 'To be determined')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Processing Fee:</b>', 'FieldLabel'),
+                Paragraph(f"{data.get('processing_fee', 0):,.0f} {data.get('currency', 'Ariary')}", self.styles['FieldValue'])
             ]
-            
-            notices_table = Table(notices_data, colWidths=[170*mm])
-            notices_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            story.append(notices_table)
-            
-            story.append(Spacer(1, 8))
-            
-            # Signature area
-            story.append(Paragraph('APPLICANT SIGNATURE', self.styles['OfficialStamp']))
-            story.append(Spacer(1, 15))
-            
-            signature_table = Table([['Date: _______________', '']], colWidths=[85*mm, 85*mm])
-            signature_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 20),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(signature_table)
-            story.append(Spacer(1, 10))
-            
-            # Footer
-            footer_separator = Table([['']], colWidths=[170*mm])
-            footer_separator.setStyle(TableStyle([
-                ('LINEABOVE', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(footer_separator)
-            story.append(Spacer(1, 4))
-            
-            story.append(Paragraph(data.get('footer', 'République de Madagascar - Confirmation Officielle de Commande'), self.styles['Footer']))
-            story.append(Paragraph(data.get('contact_info', 'Pour assistance: +261 20 22 123 45 | transport@gov.mg'), self.styles['Footer']))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_data = buffer.getvalue()
-            buffer.close()
-            
-            logger.info(f"Successfully generated card order confirmation PDF ({len(pdf_data)} bytes)")
-            return pdf_data
-            
-        except Exception as e:
-            logger.error(f"Error generating card order confirmation PDF: {e}")
-            raise Exception(f"Card order confirmation generation failed: {str(e)}")
+        ]
+        story.append(_table(status_data, [50*mm, 120*mm], FIELD_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Important notices section header with full width
+        story.append(self.section_bar('IMPORTANT INFORMATION'))
+        story.append(Spacer(1, 4))
+
+        # Important notices in a table for consistency
+        notices_data = [
+            [self.fixed("• Please keep this document until you receive your card", 'FieldValue')],
+            [self.fixed("• The card will be available at the office indicated above", 'FieldValue')],
+            [self.fixed("• Bring this document and your ID when collecting", 'FieldValue')],
+            [self.fixed("• Cards not collected within 3 months will be destroyed", 'FieldValue')]
+        ]
+        story.append(_table(notices_data, [170*mm], NOTICE_GRID_STYLE))
+
+        story.append(Spacer(1, 8))
+
+        # Signature area
+        story.append(self.fixed('APPLICANT SIGNATURE', 'OfficialStamp'))
+        story.append(Spacer(1, 15))
+
+        story.append(_table([['Date: _______________', '']], [85*mm, 85*mm], DATE_LINE_STYLE))
+        story.append(Spacer(1, 10))
+
+        # Footer
+        story.append(_table([['']], [170*mm], SEPARATOR_ABOVE_STYLE))
+        story.append(Spacer(1, 4))
+
+        story.append(self.fixed(data.get('footer', 'République de Madagascar - Confirmation Officielle de Commande'), 'Footer'))
+        story.append(self.fixed(data.get('contact_info', 'Pour assistance: +261 20 22 123 45 | transport@gov.mg'), 'Footer'))
+
+        return story
 
 
 class LicenseVerificationTemplate(DocumentTemplate):
     """License Verification Document template for Madagascar license verification"""
-    
-    def generate(self, data: Dict[str, Any]) -> bytes:
-        """Generate license verification PDF from license data"""
-        try:
-            logger.info(f"Generating license verification PDF for person: {data.get('person_name', 'Unknown')}")
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=self.page_size,
-                rightMargin=15*mm,
-                leftMargin=15*mm,
-                topMargin=15*mm,
-                bottomMargin=15*mm,
-                title=self.title
-            )
-            
-            story = []
-            
-            # Government headers
-            story.append(Paragraph(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), self.styles['GovernmentHeader']))
-            story.append(Paragraph(data.get('department_header', 'MINISTRY OF TRANSPORT'), self.styles['DepartmentHeader']))
-            story.append(Paragraph(data.get('office_header', 'License Information Verification Document'), self.styles['OfficeHeader']))
-            story.append(Spacer(1, 4))
-            
-            # Document title
-            story.append(Paragraph(data.get('document_title', 'LICENSE VERIFICATION DOCUMENT'), self.styles['OfficialTitle']))
-            story.append(Spacer(1, 8))
-            
-            # Person Information
-            story.append(Paragraph('LICENSE HOLDER INFORMATION', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            person_data = [
-                [
-                    Paragraph('<b>Full Name:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>ID Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Date of Birth:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('birth_date', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Nationality:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('nationality', 'N/A')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Verification Date:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('verification_date', datetime.now().strftime('%d/%m/%Y'))), self.styles['FieldValue'])
-                ]
+
+    margin = 15*mm
+    document_name = "license verification"
+    subject_key = "person_name"
+    subject_label = "person"
+    failure_message = "License verification generation failed"
+
+    def build_story(self, data: Dict[str, Any]) -> List[Flowable]:
+        """License verification flowables from license data"""
+        story = []
+
+        # Government headers
+        story.append(self.fixed(data.get('government_header', 'REPUBLIC OF MADAGASCAR'), 'GovernmentHeader'))
+        story.append(self.fixed(data.get('department_header', 'MINISTRY OF TRANSPORT'), 'DepartmentHeader'))
+        story.append(self.fixed(data.get('office_header', 'License Information Verification Document'), 'OfficeHeader'))
+        story.append(Spacer(1, 4))
+
+        # Document title
+        story.append(self.fixed(data.get('document_title', 'LICENSE VERIFICATION DOCUMENT'), 'OfficialTitle'))
+        story.append(Spacer(1, 8))
+
+        # Person Information
+        story.append(self.fixed('LICENSE HOLDER INFORMATION', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        person_data = [
+            [
+                self.fixed('<b>Full Name:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_name', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>ID Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_id', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Date of Birth:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('birth_date', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Nationality:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('nationality', 'N/A')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Verification Date:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('verification_date', datetime.now().strftime('%d/%m/%Y'))), self.styles['FieldValue'])
             ]
-            
-            person_table = Table(person_data, colWidths=[60*mm, 120*mm])
-            person_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ]))
-            
-            story.append(person_table)
-            story.append(Spacer(1, 8))
-            
-            # Card Eligible Licenses
-            card_licenses = data.get('card_eligible_licenses', [])
-            story.append(Paragraph(f'LICENSES TO BE PRINTED ON CARD ({len(card_licenses)})', self.styles['SectionHeader']))
+        ]
+        story.append(_table(person_data, [60*mm, 120*mm], SHADED_FIELD_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Card Eligible Licenses
+        card_licenses = data.get('card_eligible_licenses', [])
+        story.append(self.fixed(f'LICENSES TO BE PRINTED ON CARD ({len(card_licenses)})', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        license_headers = [
+            [
+                self.fixed('<b>Category</b>', 'FieldLabel'),
+                self.fixed('<b>Status</b>', 'FieldLabel'),
+                self.fixed('<b>Issue Date</b>', 'FieldLabel'),
+                self.fixed('<b>Restrictions</b>', 'FieldLabel')
+            ]
+        ]
+
+        license_data = []
+        for license in card_licenses:
+            restrictions_text = self._format_restrictions(license.get('restrictions', {}))
+            license_data.append([
+                Paragraph(str(license.get('category', 'N/A')), self.styles['FieldValue']),
+                Paragraph(str(license.get('status', 'N/A')), self.styles['FieldValue']),
+                Paragraph(str(license.get('issue_date', 'N/A')), self.styles['FieldValue']),
+                Paragraph(restrictions_text, self.styles['FieldValue'])
+            ])
+
+        story.append(_table(license_headers + license_data, [45*mm, 35*mm, 40*mm, 60*mm], LIST_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Learners Permits if any
+        learners_permits = data.get('learners_permits', [])
+        if learners_permits:
+            story.append(self.fixed(f'LEARNER\'S PERMITS (NOT PRINTED ON CARD) ({len(learners_permits)})', 'SectionHeader'))
             story.append(Spacer(1, 4))
-            
-            license_headers = [
+
+            learners_headers = [
                 [
-                    Paragraph('<b>Category</b>', self.styles['FieldLabel']),
-                    Paragraph('<b>Status</b>', self.styles['FieldLabel']),
-                    Paragraph('<b>Issue Date</b>', self.styles['FieldLabel']),
-                    Paragraph('<b>Restrictions</b>', self.styles['FieldLabel'])
+                    self.fixed('<b>Category</b>', 'FieldLabel'),
+                    self.fixed('<b>Status</b>', 'FieldLabel'),
+                    self.fixed('<b>Issue Date</b>', 'FieldLabel'),
+                    self.fixed('<b>Expiry Date</b>', 'FieldLabel')
                 ]
             ]
-            
-            license_data = []
-            for license in card_licenses:
-                restrictions_text = self._format_restrictions(license.get('restrictions', {}))
-                license_data.append([
-                    Paragraph(str(license.get('category', 'N/A')), self.styles['FieldValue']),
-                    Paragraph(str(license.get('status', 'N/A')), self.styles['FieldValue']),
-                    Paragraph(str(license.get('issue_date', 'N/A')), self.styles['FieldValue']),
-                    Paragraph(restrictions_text, self.styles['FieldValue'])
+
+            learners_data = []
+            for permit in learners_permits:
+                learners_data.append([
+                    Paragraph(str(permit.get('category', 'N/A')), self.styles['FieldValue']),
+                    Paragraph(str(permit.get('status', 'N/A')), self.styles['FieldValue']),
+                    Paragraph(str(permit.get('issue_date', 'N/A')), self.styles['FieldValue']),
+                    Paragraph(str(permit.get('expiry_date', 'No expiry')), self.styles['FieldValue'])
                 ])
-            
-            license_table_data = license_headers + license_data
-            license_table = Table(license_table_data, colWidths=[45*mm, 35*mm, 40*mm, 60*mm])
-            license_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('BACKGROUND', (0, 0), (3, 0), colors.lightgrey),
-            ]))
-            
-            story.append(license_table)
-            story.append(Spacer(1, 8))
-            
-            # Learners Permits if any
-            learners_permits = data.get('learners_permits', [])
-            if learners_permits:
-                story.append(Paragraph(f'LEARNER\'S PERMITS (NOT PRINTED ON CARD) ({len(learners_permits)})', self.styles['SectionHeader']))
-                story.append(Spacer(1, 4))
-                
-                learners_headers = [
-                    [
-                        Paragraph('<b>Category</b>', self.styles['FieldLabel']),
-                        Paragraph('<b>Status</b>', self.styles['FieldLabel']),
-                        Paragraph('<b>Issue Date</b>', self.styles['FieldLabel']),
-                        Paragraph('<b>Expiry Date</b>', self.styles['FieldLabel'])
-                    ]
-                ]
-                
-                learners_data = []
-                for permit in learners_permits:
-                    learners_data.append([
-                        Paragraph(str(permit.get('category', 'N/A')), self.styles['FieldValue']),
-                        Paragraph(str(permit.get('status', 'N/A')), self.styles['FieldValue']),
-                        Paragraph(str(permit.get('issue_date', 'N/A')), self.styles['FieldValue']),
-                        Paragraph(str(permit.get('expiry_date', 'No expiry')), self.styles['FieldValue'])
-                    ])
-                
-                learners_table_data = learners_headers + learners_data
-                learners_table = Table(learners_table_data, colWidths=[45*mm, 35*mm, 45*mm, 55*mm])
-                learners_table.setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                    ('TOPPADDING', (0, 0), (-1, -1), 4),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                    ('BACKGROUND', (0, 0), (3, 0), colors.lightgrey),
-                ]))
-                
-                story.append(learners_table)
-                story.append(Spacer(1, 8))
-            
-            # Signature section
-            story.append(Paragraph('LICENSE HOLDER CONFIRMATION', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            confirmation_text = "I confirm that all the information above is accurate and I authorize the printing of my driver's license card with the categories and restrictions listed above."
-            story.append(Paragraph(confirmation_text, self.styles['FieldValue']))
+
+            story.append(_table(learners_headers + learners_data, [45*mm, 35*mm, 45*mm, 55*mm], LIST_GRID_STYLE))
             story.append(Spacer(1, 8))
-            
-            signature_data = [
-                [
-                    Paragraph('<b>License Holder Signature:</b>', self.styles['FieldLabel']),
-                    Paragraph('_____________________________', self.styles['FieldValue']),
-                    Paragraph('<b>Date:</b>', self.styles['FieldLabel']),
-                    Paragraph('_______________', self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Authorized Officer:</b>', self.styles['FieldLabel']),
-                    Paragraph('_____________________________', self.styles['FieldValue']),
-                    Paragraph('<b>Badge:</b>', self.styles['FieldLabel']),
-                    Paragraph('_______________', self.styles['FieldValue'])
-                ]
+
+        # Signature section
+        story.append(self.fixed('LICENSE HOLDER CONFIRMATION', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        confirmation_text = "I confirm that all the information above is accurate and I authorize the printing of my driver's license card with the categories and restrictions listed above."
+        story.append(self.fixed(confirmation_text, 'FieldValue'))
+        story.append(Spacer(1, 8))
+
+        signature_data = [
+            [
+                self.fixed('<b>License Holder Signature:</b>', 'FieldLabel'),
+                self.fixed('_____________________________', 'FieldValue'),
+                self.fixed('<b>Date:</b>', 'FieldLabel'),
+                self.fixed('_______________', 'FieldValue')
+            ],
+            [
+                self.fixed('<b>Authorized Officer:</b>', 'FieldLabel'),
+                self.fixed('_____________________________', 'FieldValue'),
+                self.fixed('<b>Badge:</b>', 'FieldLabel'),
+                self.fixed('_______________', 'FieldValue')
             ]
-            
-            signature_table = Table(signature_data, colWidths=[50*mm, 70*mm, 30*mm, 30*mm])
-            signature_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 15),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(signature_table)
-            story.append(Spacer(1, 10))
-            
-            # Footer
-            story.append(Paragraph(data.get('footer', 'Ministry of Transport - Republic of Madagascar'), self.styles['Footer']))
-            story.append(Paragraph('License Information System', self.styles['Footer']))
-            story.append(Paragraph('This document must be signed before card printing authorization', self.styles['Footer']))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_data = buffer.getvalue()
-            buffer.close()
-            
-            logger.info(f"Successfully generated license verification PDF ({len(pdf_data)} bytes)")
-            return pdf_data
-            
-        except Exception as e:
-            logger.error(f"Error generating license verification PDF: {e}")
-            raise Exception(f"License verification generation failed: {str(e)}")
-    
+        ]
+        story.append(_table(signature_data, [50*mm, 70*mm, 30*mm, 30*mm], SIGNATURE_GRID_STYLE))
+        story.append(Spacer(1, 10))
+
+        # Footer
+        story.append(self.fixed(data.get('footer', 'Ministry of Transport - Republic of Madagascar'), 'Footer'))
+        story.append(self.fixed('License Information System', 'Footer'))
+        story.append(self.fixed('This document must be signed before card printing authorization', 'Footer'))
+
+        return story
+
     def _format_restrictions(self, restrictions: Dict[str, Any]) -> str:
         """Format restrictions for display"""
         if not restrictions or not any(restrictions.values()):
             return "00 - None"
-        
+
         formatted = []
         for restriction_type, codes in restrictions.items():
             if codes and isinstance(codes, list):
                 for code in codes:
                     formatted.append(f"{restriction_type.replace('_', ' ')}: {code}")
-        
+
         return " | ".join(formatted) if formatted else "00 - None"
 
 
 class CardCollectionTemplate(DocumentTemplate):
     """Card Collection Document template for Madagascar card collection confirmation"""
-    
-    def generate(self, data: Dict[str, Any]) -> bytes:
-        """Generate card collection confirmation PDF from collection data"""
-        try:
-            logger.info(f"Generating card collection PDF for person: {data.get('person_name', 'Unknown')}")
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=self.page_size,
-                rightMargin=15*mm,
-                leftMargin=15*mm,
-                topMargin=15*mm,
-                bottomMargin=15*mm,
-                title=self.title
-            )
-            
-            story = []
-            
-            # Government headers
-            story.append(Paragraph(data.get('government_header', '🇲🇬 REPUBLIC OF MADAGASCAR'), self.styles['GovernmentHeader']))
-            story.append(Paragraph(data.get('department_header', 'MINISTRY OF TRANSPORT'), self.styles['DepartmentHeader']))
-            story.append(Paragraph(data.get('office_header', 'Driver License Collection Document'), self.styles['OfficeHeader']))
-            story.append(Spacer(1, 4))
-            
-            # Document title
-            story.append(Paragraph(data.get('document_title', 'CARD COLLECTION CONFIRMATION'), self.styles['OfficialTitle']))
-            story.append(Spacer(1, 8))
-            
-            # Collection Information
-            story.append(Paragraph('COLLECTION INFORMATION', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            collection_data = [
-                [
-                    Paragraph('<b>License Holder:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_name', 'Unknown')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>ID Number:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('person_id', 'Unknown')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Collection Date:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('collection_date', 'Unknown')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Collection Time:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('collection_time', 'Unknown')), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Total Cards:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('total_cards', 0)), self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph('<b>Collection Location:</b>', self.styles['FieldLabel']),
-                    Paragraph(str(data.get('collection_location', 'Unknown')), self.styles['FieldValue'])
-                ]
+
+    margin = 15*mm
+    document_name = "card collection"
+    subject_key = "person_name"
+    subject_label = "person"
+    failure_message = "Card collection generation failed"
+
+    def build_story(self, data: Dict[str, Any]) -> List[Flowable]:
+        """Card collection confirmation flowables from collection data"""
+        story = []
+
+        # Government headers
+        story.append(self.fixed(data.get('government_header', '🇲🇬 REPUBLIC OF MADAGASCAR'), 'GovernmentHeader'))
+        story.append(self.fixed(data.get('department_header', 'MINISTRY OF TRANSPORT'), 'DepartmentHeader'))
+        story.append(self.fixed(data.get('office_header', 'Driver License Collection Document'), 'OfficeHeader'))
+        story.append(Spacer(1, 4))
+
+        # Document title
+        story.append(self.fixed(data.get('document_title', 'CARD COLLECTION CONFIRMATION'), 'OfficialTitle'))
+        story.append(Spacer(1, 8))
+
+        # Collection Information
+        story.append(self.fixed('COLLECTION INFORMATION', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        collection_data = [
+            [
+                self.fixed('<b>License Holder:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_name', 'Unknown')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>ID Number:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('person_id', 'Unknown')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Collection Date:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('collection_date', 'Unknown')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Collection Time:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('collection_time', 'Unknown')), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Total Cards:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('total_cards', 0)), self.styles['FieldValue'])
+            ],
+            [
+                self.fixed('<b>Collection Location:</b>', 'FieldLabel'),
+                Paragraph(str(data.get('collection_location', 'Unknown')), self.styles['FieldValue'])
             ]
-            
-            collection_table = Table(collection_data, colWidths=[50*mm, 120*mm])
-            collection_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(collection_table)
-            story.append(Spacer(1, 8))
-            
-            # Applications Being Collected
-            story.append(Paragraph('APPLICATIONS COLLECTED', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            applications = data.get('applications', [])
-            if applications:
-                app_data = [['Application #', 'Type', 'Card Number', 'Print Job #', 'Approval Date']]
-                
-                for app in applications:
-                    app_data.append([
-                        str(app.get('application_number', 'N/A')),
-                        str(app.get('application_type', 'N/A')).replace('_', ' '),
-                        str(app.get('card_number', 'N/A')),
-                        str(app.get('print_job_number', 'N/A')),
-                        str(app.get('approval_date', 'N/A'))
-                    ])
-                
-                app_table = Table(app_data, colWidths=[35*mm, 35*mm, 35*mm, 35*mm, 30*mm])
-                app_table.setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 8),
-                    ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                    ('INNERGRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 2),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-                    ('TOPPADDING', (0, 0), (-1, -1), 3),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-                ]))
-                
-                story.append(app_table)
-            else:
-                story.append(Paragraph('No applications found', self.styles['FieldValue']))
-            
-            story.append(Spacer(1, 10))
-            
-            # Important Notice
-            story.append(Paragraph('IMPORTANT COLLECTION CONFIRMATION', self.styles['SectionHeader']))
-            story.append(Spacer(1, 4))
-            
-            notice_text = """
-            By signing below, I confirm that I have received my driver's license card(s) as detailed above. 
-            I understand that:
-            • I am responsible for the security of my card(s)
-            • Lost or stolen cards must be reported immediately
-            • This card is property of the Republic of Madagascar
-            • Any misuse of this card may result in legal consequences
-            """
-            
-            story.append(Paragraph(notice_text, self.styles['FieldValue']))
-            story.append(Spacer(1, 8))
-            
-            # Signatures section
-            story.append(Paragraph('SIGNATURES', self.styles['SectionHeader']))
-            story.append(Spacer(1, 6))
-            
-            signature_lines = data.get('signature_lines', {})
-            signature_data = [
-                [
-                    Paragraph('<b>' + signature_lines.get('collector', 'License Holder Signature') + '</b>', self.styles['FieldLabel']),
-                    Paragraph('<b>' + signature_lines.get('officer', 'Issuing Officer Signature') + '</b>', self.styles['FieldLabel'])
-                ],
-                [
-                    Paragraph('_' * 30, self.styles['FieldValue']),
-                    Paragraph('_' * 30, self.styles['FieldValue'])
-                ],
-                [
-                    Paragraph(f"Date: {data.get('collection_date', '___________')}", self.styles['FieldValue']),
-                    Paragraph(f"Officer: {data.get('collected_by', '___________')}", self.styles['FieldValue'])
-                ]
+        ]
+        story.append(_table(collection_data, [50*mm, 120*mm], FIELD_GRID_STYLE))
+        story.append(Spacer(1, 8))
+
+        # Applications Being Collected
+        story.append(self.fixed('APPLICATIONS COLLECTED', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        applications = data.get('applications', [])
+        if applications:
+            app_data = [['Application #', 'Type', 'Card Number', 'Print Job #', 'Approval Date']]
+
+            for app in applications:
+                app_data.append([
+                    str(app.get('application_number', 'N/A')),
+                    str(app.get('application_type', 'N/A')).replace('_', ' '),
+                    str(app.get('card_number', 'N/A')),
+                    str(app.get('print_job_number', 'N/A')),
+                    str(app.get('approval_date', 'N/A'))
+                ])
+
+            story.append(_table(app_data, [35*mm, 35*mm, 35*mm, 35*mm, 30*mm], APPLICATIONS_GRID_STYLE))
+        else:
+            story.append(self.fixed('No applications found', 'FieldValue'))
+
+        story.append(Spacer(1, 10))
+
+        # Important Notice
+        story.append(self.fixed('IMPORTANT COLLECTION CONFIRMATION', 'SectionHeader'))
+        story.append(Spacer(1, 4))
+
+        notice_text = """
+        By signing below, I confirm that I have received my driver's license card(s) as detailed above.
+        I understand that:
+        • I am responsible for the security of my card(s)
+        • Lost or stolen cards must be reported immediately
+        • This card is property of the Republic of Madagascar
+        • Any misuse of this card may result in legal consequences
+        """
+
+        story.append(self.fixed(notice_text, 'FieldValue'))
+        story.append(Spacer(1, 8))
+
+        # Signatures section
+        story.append(self.fixed('SIGNATURES', 'SectionHeader'))
+        story.append(Spacer(1, 6))
+
+        signature_lines = data.get('signature_lines', {})
+        signature_data = [
+            [
+                self.fixed('<b>' + signature_lines.get('collector', 'License Holder Signature') + '</b>', 'FieldLabel'),
+                self.fixed('<b>' + signature_lines.get('officer', 'Issuing Officer Signature') + '</b>', 'FieldLabel')
+            ],
+            [
+                self.fixed('_' * 30, 'FieldValue'),
+                self.fixed('_' * 30, 'FieldValue')
+            ],
+            [
+                Paragraph(f"Date: {data.get('collection_date', '___________')}", self.styles['FieldValue']),
+                Paragraph(f"Officer: {data.get('collected_by', '___________')}", self.styles['FieldValue'])
             ]
-            
-            signature_table = Table(signature_data, colWidths=[85*mm, 85*mm])
-            signature_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 15),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            
-            story.append(signature_table)
-            story.append(Spacer(1, 10))
-            
-            # Footer
-            story.append(Paragraph(data.get('footer', 'Ministry of Transport - Republic of Madagascar'), self.styles['Footer']))
-            story.append(Paragraph(data.get('contact_info', 'For assistance: +261 20 22 123 45 | transport@gov.mg'), self.styles['Footer']))
-            story.append(Paragraph('Card Collection Confirmation Document', self.styles['Footer']))
-            
-            # Build PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_data = buffer.getvalue()
-            buffer.close()
-            
-            logger.info(f"Successfully generated card collection PDF ({len(pdf_data)} bytes)")
-            return pdf_data
-            
-        except Exception as e:
-            logger.error(f"Error generating card collection PDF: {e}")
-            raise Exception(f"Card collection generation failed: {str(e)}")
+        ]
+        story.append(_table(signature_data, [85*mm, 85*mm], SIGNATURE_COLUMNS_STYLE))
+        story.append(Spacer(1, 10))
+
+        # Footer
+        story.append(self.fixed(data.get('footer', 'Ministry of Transport - Republic of Madagascar'), 'Footer'))
+        story.append(self.fixed(data.get('contact_info', 'For assistance: +261 20 22 123 45 | transport@gov.mg'), 'Footer'))
+        story.append(self.fixed('Card Collection Confirmation Document', 'Footer'))
+
+        return story
 
 
 class DocumentGenerator:
     """Main document generator service"""
     
+    # Templates that can render many documents into one PDF
+    BATCH_TEMPLATES = ("receipt", "card_collection")
+    
     def __init__(self):
         self.version = "1.0.0"
+        self.templates: Dict[str, DocumentTemplate] = {
+            "receipt": ReceiptTemplate("Madagascar Official Receipt"),
+            "card_order_confirmation": CardOrderConfirmationTemplate("Madagascar Card Order Confirmation"),
+            "license_verification": LicenseVerificationTemplate("Madagascar License Verification"),
+            "card_collection": CardCollectionTemplate("Madagascar Card Collection"),
+        }
         logger.info("Document Generator Service initialized")
     
     def generate_receipt(self, data: Dict[str, Any]) -> bytes:
         """Generate receipt PDF"""
-        template = ReceiptTemplate("Madagascar Official Receipt")
-        return template.generate(data)
+        return self.templates["receipt"].generate(data)
     
     def generate_card_order_confirmation(self, data: Dict[str, Any]) -> bytes:
         """Generate card order confirmation PDF"""
-        template = CardOrderConfirmationTemplate("Madagascar Card Order Confirmation")
-        return template.generate(data)
+        return self.templates["card_order_confirmation"].generate(data)
     
     def generate_license_verification(self, data: Dict[str, Any]) -> bytes:
         """Generate license verification PDF"""
-        template = LicenseVerificationTemplate("Madagascar License Verification")
-        return template.generate(data)
+        return self.templates["license_verification"].generate(data)
     
     def generate_card_collection(self, data: Dict[str, Any]) -> bytes:
         """Generate card collection document PDF"""
-        template = CardCollectionTemplate("Madagascar Card Collection")
-        return template.generate(data)
+        return self.templates["card_collection"].generate(data)
     
     def get_supported_templates(self) -> List[str]:
         """Get list of supported template types"""
@@ -1070,6 +998,19 @@ class DocumentGenerator:
         else:
             raise ValueError(f"Unsupported template type: {template_type}")
     
+    def _batch_template(self, template_type: str) -> DocumentTemplate:
+        if template_type not in self.BATCH_TEMPLATES:
+            raise ValueError(f"Batch generation is not supported for template type: {template_type}")
+        return self.templates[template_type]
+    
+    def generate_batch(self, template_type: str, documents: List[Dict[str, Any]]) -> bytes:
+        """Generate one multi-page PDF, each document starting on a new page"""
+        return self._batch_template(template_type).generate_batch(documents)
+    
+    def generate_each(self, template_type: str, documents: List[Dict[str, Any]]) -> Iterator[bytes]:
+        """Generate a separate PDF per document, lazily"""
+        return self._batch_template(template_type).generate_each(documents)
+    
     def get_sample_receipt_data(self) -> Dict[str, Any]:
         """Generate sample receipt data for testing"""
         return {
@@ -0,0 +1,197 @@
+"""
+File Delivery Service for Madagascar License System
+Serves stored files with strong ETags, conditional requests and byte ranges
+
+Stored card files are served straight from disk instead of being read into
+memory first:
+- Full responses go out through FileResponse, which streams the file in chunks
+  (or hands it to the server's sendfile when the server supports it)
+- The ETag is a SHA-256 of the stored bytes, so a regenerated file gets a new
+  one even if its size and timestamp happen to match; digests are cached per
+  (path, size, mtime) and primed when files are saved
+- If-None-Match answers 304 without touching the file
+- A single "bytes=" range answers 206 (If-Range honoured); unsatisfiable ranges
+  answer 416, and multi-range requests get the full file
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_CACHE_SIZE = 4096
+READ_CHUNK_BYTES = 64 * 1024
+
+# Card files are private and can be regenerated: browsers keep them but revalidate
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+class ContentHashCache:
+    """LRU of file content digests keyed by (path, size, mtime)"""
+
+    def __init__(self, max_entries: int = CONTENT_HASH_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._max_entries = max_entries
+
+    @staticmethod
+    def _key(path: Path, stat_result: os.stat_result) -> Tuple[str, int, int]:
+        return str(path), stat_result.st_size, stat_result.st_mtime_ns
+
+    def get(self, path: Path, stat_result: os.stat_result) -> str:
+        """Digest of the file, hashing it only when it is new or has changed (blocking)"""
+        key = self._key(path, stat_result)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        self._store(key, digest)
+        return digest
+
+    def remember(self, path: Path, content: bytes):
+        """Record the digest of bytes just written to path"""
+        try:
+            self._store(self._key(path, path.stat()), hashlib.sha256(content).hexdigest())
+        except OSError as e:
+            logger.warning(f"Could not record content hash for {path}: {e}")
+
+    def _store(self, key: Tuple[str, int, int], digest: str):
+        with self._lock:
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            while len(self._digests) > self._max_entries:
+                self._digests.popitem(last=False)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for it)"""
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _parse_range(header: str, size: int) -> Optional[Union[Tuple[int, int], str]]:
+    """
+    Parse a Range header against a file size
+
+    Returns:
+        (start, end) inclusive for one satisfiable range, "unsatisfiable", or None
+        when the header should be ignored (malformed, other unit or several ranges)
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if start > end and start < size:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                return "unsatisfiable"
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _read_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    filename: Optional[str] = None,
+    content_disposition_type: str = "attachment",
+    cache_control: str = PRIVATE_REVALIDATE
+) -> Response:
+    """
+    Serve a stored file honouring If-None-Match, Range and If-Range
+
+    Args:
+        request: Incoming request (for its conditional/range headers)
+        path: File on disk
+        media_type: Content-Type of the file
+        filename: Download name for Content-Disposition, if any
+        content_disposition_type: "attachment" or "inline"
+        cache_control: Cache-Control header value
+    """
+    stat_result = await run_in_threadpool(os.stat, path)
+    digest = await run_in_threadpool(content_hashes.get, path, stat_result)
+    etag = f'"{digest[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        quoted = quote(filename)
+        if quoted != filename:
+            headers["Content-Disposition"] = f"{content_disposition_type}; filename*=utf-8''{quoted}"
+        else:
+            headers["Content-Disposition"] = f'{content_disposition_type}; filename="{filename}"'
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        size = stat_result.st_size
+        byte_range = _parse_range(range_header, size)
+        if byte_range == "unsatisfiable":
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _read_range(path, start, end), status_code=206, media_type=media_type, headers=headers
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+# Global instance
+content_hashes = ContentHashCache()
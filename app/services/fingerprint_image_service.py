@@ -17,6 +17,9 @@ from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Alpha for each gray level: light background transparent, ridges opaque
+BACKGROUND_ALPHA_LUT = [0 if level > 200 else 255 for level in range(256)]
+
 class FingerprintImageService:
     """Service for storing and managing fingerprint images on persistent disk"""
     
@@ -108,7 +111,7 @@ class FingerprintImageService:
         
         # Create alpha channel based on intensity
         # Fingerprint ridges are typically darker, background is lighter
-        alpha = gray.point(lambda x: 0 if x > 200 else 255)  # Remove light background
+        alpha = gray.point(BACKGROUND_ALPHA_LUT)  # Remove light background
         
         # Apply some enhancement
         from PIL import ImageEnhance, ImageFilter
@@ -235,7 +238,7 @@ class FingerprintImageService:
             Number of files cleaned up
         """
         try:
-            valid_ids_str = [str(template_id) for template_id in valid_template_ids]
+            valid_ids_str = {str(template_id) for template_id in valid_template_ids}
             cleaned_count = 0
             
             # Clean images
@@ -0,0 +1,436 @@
+"""
+Fingerprint Index Service for Madagascar License System
+Resident in-memory gallery for 1:N fingerprint identification
+
+Active templates are loaded once from fingerprint_templates and kept in sync by
+the enroll/delete endpoints. Templates are partitioned by (template length,
+finger position, quality band) and each partition is packed into one uint8
+matrix, so the server matcher (see _verify_with_server) scores a probe with
+vectorized passes, only over the partitions that can match. Large searches are
+split into shards scored in parallel on a thread pool; NumPy releases the GIL
+while comparing.
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session, load_only
+
+from app.core.config import get_settings
+from app.models.biometric import FingerprintTemplate
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("numpy not available - fingerprint identification will scan the database")
+
+logger = logging.getLogger(__name__)
+
+# Server matcher similarity threshold (percent) per security level
+SERVER_MATCH_THRESHOLDS = {1: 60, 2: 65, 3: 70, 4: 75, 5: 80, 6: 85, 7: 90}
+
+INITIAL_BUCKET_CAPACITY = 1024
+SCORE_CHUNK_ROWS = 4096  # Bounds the temporary comparison matrix to ~rows x template length
+SHARD_ROWS = 16384  # Rows per parallel search task
+LOAD_BATCH_SIZE = 2000
+UNKNOWN_QUALITY_BAND = -1  # Templates stored without a quality score
+
+# (template length, finger position, quality band)
+PartitionKey = Tuple[int, int, int]
+
+
+class _TemplatePartition:
+    """Equal-length templates packed into one matrix with parallel metadata arrays"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.size = 0
+        self.templates = np.empty((INITIAL_BUCKET_CAPACITY, length), dtype=np.uint8)
+        self.finger_positions = np.zeros(INITIAL_BUCKET_CAPACITY, dtype=np.int16)
+        self.quality_scores = np.zeros(INITIAL_BUCKET_CAPACITY, dtype=np.int16)
+        self.person_codes = np.zeros(INITIAL_BUCKET_CAPACITY, dtype=np.int32)
+        self.template_ids: List[UUID] = []
+        self.person_ids: List[UUID] = []
+
+    def append(self, template_id: UUID, person_id: UUID, person_code: int,
+               finger_position: int, quality_score: Optional[int], template_bytes: bytes) -> int:
+        if self.size == len(self.templates):
+            self._grow()
+        row = self.size
+        self.templates[row] = np.frombuffer(template_bytes, dtype=np.uint8)
+        self.finger_positions[row] = finger_position
+        self.quality_scores[row] = -1 if quality_score is None else quality_score
+        self.person_codes[row] = person_code
+        self.template_ids.append(template_id)
+        self.person_ids.append(person_id)
+        self.size += 1
+        return row
+
+    def remove(self, row: int) -> Optional[UUID]:
+        """Remove a row by moving the last row into its place; returns the moved template id"""
+        last = self.size - 1
+        moved = None
+        if row != last:
+            self.templates[row] = self.templates[last]
+            self.finger_positions[row] = self.finger_positions[last]
+            self.quality_scores[row] = self.quality_scores[last]
+            self.person_codes[row] = self.person_codes[last]
+            self.template_ids[row] = self.template_ids[last]
+            self.person_ids[row] = self.person_ids[last]
+            moved = self.template_ids[row]
+        self.template_ids.pop()
+        self.person_ids.pop()
+        self.size -= 1
+        return moved
+
+    def _grow(self):
+        capacity = len(self.templates) * 2
+        self.templates = np.resize(self.templates, (capacity, self.length))
+        self.finger_positions = np.resize(self.finger_positions, capacity)
+        self.quality_scores = np.resize(self.quality_scores, capacity)
+        self.person_codes = np.resize(self.person_codes, capacity)
+
+
+class FingerprintIndex:
+    """In-memory gallery of active fingerprint templates scored with NumPy"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.quality_band_edges = sorted(
+            int(edge) for edge in self.settings.FINGERPRINT_QUALITY_BANDS.split(",") if edge.strip()
+        )
+        self._lock = threading.RLock()
+        self._partitions: Dict[PartitionKey, _TemplatePartition] = {}
+        self._locations: Dict[UUID, Tuple[PartitionKey, int]] = {}  # template id -> (partition, row)
+        self._person_codes: Dict[UUID, int] = {}
+        self._loaded = False
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return NUMPY_AVAILABLE
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def quality_band(self, quality_score: Optional[int]) -> int:
+        """Band index of a quality score (0 = lowest); unknown quality gets UNKNOWN_QUALITY_BAND"""
+        if quality_score is None:
+            return UNKNOWN_QUALITY_BAND
+        return bisect.bisect_right(self.quality_band_edges, quality_score)
+
+    def ensure_loaded(self, db: Session):
+        """Load the gallery on first use"""
+        if not self._loaded:
+            self.load(db)
+
+    def load(self, db: Session):
+        """(Re)build the gallery from all active templates"""
+        start_time = time.time()
+        query = db.query(FingerprintTemplate).options(load_only(
+            FingerprintTemplate.id,
+            FingerprintTemplate.person_id,
+            FingerprintTemplate.finger_position,
+            FingerprintTemplate.quality_score,
+            FingerprintTemplate.template_bytes
+        )).filter(FingerprintTemplate.is_active == True).yield_per(LOAD_BATCH_SIZE)
+
+        with self._lock:
+            self._clear()
+            for template in query:
+                self._add(template.id, template.person_id, template.finger_position,
+                          template.quality_score, template.template_bytes)
+            self._loaded = True
+
+        logger.info(f"Loaded fingerprint index: {len(self)} templates in {len(self._partitions)} partitions "
+                    f"({int((time.time() - start_time) * 1000)} ms)")
+
+    def invalidate(self):
+        """Drop the gallery; the next identification reloads it"""
+        with self._lock:
+            self._clear()
+            self._loaded = False
+
+    def add(self, template: FingerprintTemplate):
+        """Add a newly enrolled template (no-op until the gallery is loaded)"""
+        self.add_template(template.id, template.person_id, template.finger_position,
+                          template.quality_score, template.template_bytes)
+
+    def add_template(self, template_id: UUID, person_id: UUID, finger_position: int,
+                     quality_score: Optional[int], template_bytes: bytes):
+        if not NUMPY_AVAILABLE:
+            return
+        with self._lock:
+            if self._loaded:
+                self._add(template_id, person_id, finger_position, quality_score, template_bytes)
+
+    def remove(self, template_id: UUID):
+        """Remove a deactivated template"""
+        with self._lock:
+            location = self._locations.pop(template_id, None)
+            if location is None:
+                return
+            key, row = location
+            moved = self._partitions[key].remove(row)
+            if moved is not None:
+                self._locations[moved] = (key, row)
+
+    def identify(
+        self,
+        probe: bytes,
+        security_level: int,
+        finger_position: Optional[int] = None,
+        candidate_person_ids: Optional[Iterable[UUID]] = None,
+        max_results: Optional[int] = None,
+        probe_quality_score: Optional[int] = None,
+        early_exit_score: Optional[int] = None,
+        max_candidates: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Score a probe against the compatible partitions of the gallery
+
+        Uses the same similarity as _verify_with_server: the percentage of equal
+        bytes between equal-length templates, so only partitions with the probe's
+        length (and finger position, when given) are searched. With a probe quality
+        score, only quality bands within FINGERPRINT_QUALITY_BAND_SPREAD of the
+        probe's band are searched, closest band first. Templates of unknown
+        quality are searched by every probe, after the known bands.
+
+        Partitions are cut into shards that are scored in parallel; each shard
+        keeps its top `max_results` and the shard results are merged. With
+        early_exit_score, no further shards are started once a match reaches it.
+        With max_candidates, at most that many templates are scored, taken in
+        search order (closest quality band first).
+
+        Returns:
+            (top matches, highest score first; candidates checked; total matches found)
+        """
+        threshold = SERVER_MATCH_THRESHOLDS.get(security_level, 75)
+        probe_array = np.frombuffer(probe, dtype=np.uint8)
+
+        with self._lock:
+            person_codes = None
+            if candidate_person_ids is not None:
+                person_codes = np.array(
+                    [self._person_codes[p] for p in candidate_person_ids if p in self._person_codes],
+                    dtype=np.int32
+                )
+
+            partitions = self._search_order(len(probe), finger_position, probe_quality_score)
+            shards = [
+                (partition, start, min(start + SHARD_ROWS, partition.size), None)
+                for partition in partitions
+                for start in range(0, partition.size, SHARD_ROWS)
+            ]
+            if max_candidates is not None:
+                shards = _limit_shards(shards, person_codes, max_candidates)
+
+            candidates_checked = 0
+            matches_found = 0
+            best_score = -1
+            hits: List[Tuple[int, _TemplatePartition, int]] = []
+            wave_size = max(1, self._search_workers())
+            for wave_start in range(0, len(shards), wave_size):
+                wave = shards[wave_start:wave_start + wave_size]
+                if len(wave) == 1:
+                    results = [_score_shard(*wave[0], probe_array, person_codes, threshold, max_results)]
+                else:
+                    pool = self._get_search_pool()
+                    results = list(pool.map(
+                        lambda shard: _score_shard(*shard, probe_array, person_codes, threshold, max_results),
+                        wave
+                    ))
+
+                for (partition, _, _, _), (scores, rows, checked, found) in zip(wave, results):
+                    candidates_checked += checked
+                    matches_found += found
+                    hits.extend((int(score), partition, int(row)) for score, row in zip(scores, rows))
+                    if len(scores):
+                        best_score = max(best_score, int(scores.max()))
+
+                if early_exit_score is not None and best_score >= early_exit_score:
+                    break
+
+            # Merge shard top-k lists
+            if max_results:
+                hits = heapq.nlargest(max_results, hits, key=lambda hit: hit[0])
+            else:
+                hits.sort(key=lambda hit: hit[0], reverse=True)
+
+            matches = [
+                {
+                    "template_id": partition.template_ids[row],
+                    "person_id": partition.person_ids[row],
+                    "finger_position": int(partition.finger_positions[row]),
+                    "match_score": score,
+                    "template_quality": None if partition.quality_scores[row] < 0 else int(partition.quality_scores[row])
+                }
+                for score, partition, row in hits
+            ]
+        return matches, candidates_checked, matches_found
+
+    def _search_order(self, length: int, finger_position: Optional[int],
+                      probe_quality_score: Optional[int]) -> List[_TemplatePartition]:
+        """Compatible partitions, most promising quality band first"""
+        probe_band = None if probe_quality_score is None else self.quality_band(probe_quality_score)
+        spread = self.settings.FINGERPRINT_QUALITY_BAND_SPREAD
+
+        selected = []
+        for (partition_length, partition_finger, band), partition in self._partitions.items():
+            if partition_length != length or partition.size == 0:
+                continue
+            if finger_position is not None and partition_finger != finger_position:
+                continue
+            if band == UNKNOWN_QUALITY_BAND:
+                # Could be any quality: always searched, after the known bands
+                distance = 0 if probe_band is None else spread + 1
+            elif probe_band is not None and abs(band - probe_band) > spread:
+                continue
+            else:
+                distance = 0 if probe_band is None else abs(band - probe_band)
+            selected.append((distance, -band, partition))
+        selected.sort(key=lambda item: (item[0], item[1]))
+        return [partition for _, _, partition in selected]
+
+    def _search_workers(self) -> int:
+        return self.settings.FINGERPRINT_SEARCH_WORKERS or os.cpu_count() or 1
+
+    def _get_search_pool(self) -> ThreadPoolExecutor:
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(
+                max_workers=self._search_workers(),
+                thread_name_prefix="fingerprint-search"
+            )
+        return self._search_pool
+
+    def _add(self, template_id: UUID, person_id: UUID, finger_position: int,
+             quality_score: Optional[int], template_bytes: bytes):
+        if template_id in self._locations:
+            self.remove(template_id)
+        length = len(template_bytes)
+        if length == 0:
+            return
+        key = (length, finger_position, self.quality_band(quality_score))
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _TemplatePartition(length)
+        person_code = self._person_codes.setdefault(person_id, len(self._person_codes))
+        row = partition.append(template_id, person_id, person_code, finger_position, quality_score, template_bytes)
+        self._locations[template_id] = (key, row)
+
+    def _clear(self):
+        self._partitions.clear()
+        self._locations.clear()
+        self._person_codes.clear()
+
+
+def _limit_shards(
+    shards: List[Tuple[_TemplatePartition, int, int, Optional[int]]],
+    person_codes: Optional["np.ndarray"],
+    max_candidates: int
+) -> List[Tuple[_TemplatePartition, int, int, Optional[int]]]:
+    """Shards (in search order) cut so that at most max_candidates templates are scored"""
+    limited = []
+    remaining = max_candidates
+    for partition, start, stop, _ in shards:
+        if remaining <= 0:
+            break
+        if person_codes is None:
+            count = stop - start
+        else:
+            count = int(np.count_nonzero(np.isin(partition.person_codes[start:stop], person_codes)))
+        if count == 0:
+            continue
+        limited.append((partition, start, stop, remaining if count > remaining else None))
+        remaining -= count
+    return limited
+
+
+def _score_shard(
+    partition: _TemplatePartition,
+    start: int,
+    stop: int,
+    limit: Optional[int],
+    probe: "np.ndarray",
+    person_codes: Optional["np.ndarray"],
+    threshold: int,
+    top_k: Optional[int]
+) -> Tuple["np.ndarray", "np.ndarray", int, int]:
+    """
+    Score rows [start, stop) of a partition, only the first `limit` candidates
+    when given (runs on a search thread; NumPy releases the GIL for the comparisons)
+
+    Returns:
+        (scores at or above the threshold and their rows, trimmed to the shard's
+        top_k scores; rows scored; matches before trimming)
+    """
+    rows = None
+    if person_codes is not None:
+        rows = start + np.flatnonzero(np.isin(partition.person_codes[start:stop], person_codes))[:limit]
+    elif limit is not None:
+        stop = min(stop, start + limit)
+    total = stop - start if rows is None else len(rows)
+
+    matched_scores = []
+    matched_rows = []
+    for offset in range(0, total, SCORE_CHUNK_ROWS):
+        if rows is None:
+            chunk_start = start + offset
+            chunk_stop = min(chunk_start + SCORE_CHUNK_ROWS, stop)
+            chunk_rows = np.arange(chunk_start, chunk_stop)
+            chunk = partition.templates[chunk_start:chunk_stop]
+        else:
+            chunk_rows = rows[offset:offset + SCORE_CHUNK_ROWS]
+            chunk = partition.templates[chunk_rows]
+        agreement = np.count_nonzero(chunk == probe, axis=1)
+        # Same float arithmetic as int((matches / len) * 100) in the 1:1 matcher
+        similarity = (agreement / partition.length * 100).astype(np.int64)
+        hits = similarity >= threshold
+        matched_scores.append(similarity[hits])
+        matched_rows.append(chunk_rows[hits])
+
+    if not matched_scores:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), total, 0
+    scores = np.concatenate(matched_scores)
+    matched = np.concatenate(matched_rows)
+    found = len(scores)
+    if top_k and found > top_k:
+        keep = np.argpartition(-scores, top_k - 1)[:top_k]
+        scores, matched = scores[keep], matched[keep]
+    return scores, matched, total, found
+
+
+class ExactMatchCounters:
+    """How often the template_hash shortcut answers enrollment/identification (since process start)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+    def record(self, operation: str, hit: bool):
+        with self._lock:
+            self._counts[f"{operation}_checks"] = self._counts.get(f"{operation}_checks", 0) + 1
+            if hit:
+                self._counts[f"{operation}_hits"] = self._counts.get(f"{operation}_hits", 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+# Global instances
+fingerprint_index = FingerprintIndex()
+exact_match_counters = ExactMatchCounters()
@@ -0,0 +1,300 @@
+"""
+Issue Auto-Report Deduplication for Madagascar License System
+Collapses repeated frontend error reports into one issue per error fingerprint
+
+Each report is reduced to a fingerprint (SHA-256 of the report type, the
+message and URL path with ids masked, and the top stack frame without line
+numbers or bundle hashes). Repeats of a fingerprint whose open issue occurred
+within ISSUE_AUTO_REPORT_WINDOW_HOURS are counted on that issue
+(occurrence_count, last_occurred_at); recent fingerprints are buffered in
+memory and their counts written every ISSUE_AUTO_REPORT_FLUSH_SECONDS with one
+UPDATE. Reports are rate limited per user and new issues per minute (429 with
+Retry-After). Counts still buffered when the process dies are lost, which only
+makes occurrence_count an undercount.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.config import get_settings
+from app.schemas.issue import IssueResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_USERS = 10000
+MAX_MESSAGE_LENGTH = 500
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+HEX_PATTERN = re.compile(r"\b(?:0x)?[0-9a-f]*\d[0-9a-f]*\b", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"\d+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+FRAME_HOST_PATTERN = re.compile(r"https?://[^/\s)]+")
+FRAME_QUERY_PATTERN = re.compile(r"\?[^:)\s]*")
+FRAME_POSITION_PATTERN = re.compile(r"(?::\d+)+")
+BUNDLE_HASH_PATTERN = re.compile(r"[-.][0-9A-Za-z_]{8,}(?=\.m?js\b)")  # index-DiwrgTda.js -> index.js
+
+
+class AutoReportRateLimited(Exception):
+    """Raised when an auto-report exceeds the per-user or new-issue rate"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _normalize_message(message: str) -> str:
+    message = UUID_PATTERN.sub("<id>", message or "")
+    message = HEX_PATTERN.sub("<n>", message)
+    message = NUMBER_PATTERN.sub("<n>", message)
+    return WHITESPACE_PATTERN.sub(" ", message).strip()[:MAX_MESSAGE_LENGTH]
+
+
+def _url_pattern(url: str) -> str:
+    """Path of the page with record ids masked: /applications/3f2a.../edit -> /applications/:id/edit"""
+    parts = urlsplit(url or "")
+    # Hash routing keeps the route in the fragment
+    path = parts.fragment if parts.fragment.startswith("/") else parts.path
+    path = path.split("?", 1)[0]
+    return "/".join(":id" if NUMBER_PATTERN.search(segment) else segment for segment in path.split("/"))
+
+
+def _stack_top(stack_trace: Optional[str]) -> str:
+    """First frame of a V8 ("at fn (url:line:col)") or Firefox/Safari ("fn@url:line:col") stack"""
+    for line in (stack_trace or "").splitlines():
+        line = line.strip()
+        if line.startswith("at ") or "@" in line:
+            frame = FRAME_HOST_PATTERN.sub("", line)
+            frame = FRAME_QUERY_PATTERN.sub("", frame)
+            # Line/column numbers and bundle hashes change with every frontend build
+            frame = FRAME_POSITION_PATTERN.sub("", frame)
+            return BUNDLE_HASH_PATTERN.sub("", frame)
+    return ""
+
+
+def error_fingerprint(report_type: Any, error_message: str, page_url: str, stack_trace: Optional[str] = None) -> str:
+    """Stable key for "the same error": type, masked message, URL pattern and top stack frame"""
+    key = "\n".join((
+        getattr(report_type, "value", str(report_type)),
+        _normalize_message(error_message),
+        _url_pattern(page_url),
+        _stack_top(stack_trace),
+    ))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class _BufferedIssue:
+    """A recent fingerprint's issue and the repeats not yet written to it"""
+
+    __slots__ = ("issue_id", "snapshot", "occurrence_count", "pending", "last_occurred_at")
+
+    def __init__(self, issue_id: uuid.UUID, snapshot: Dict[str, Any], occurrence_count: int, last_occurred_at: datetime):
+        self.issue_id = issue_id
+        self.snapshot = snapshot
+        self.occurrence_count = occurrence_count
+        self.pending = 0
+        self.last_occurred_at = last_occurred_at
+
+
+class IssueAutoReports:
+    """Rate limiting and in-memory coalescing of frontend error auto-reports"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._buffer: "OrderedDict[str, _BufferedIssue]" = OrderedDict()
+        # Counts of issues no longer buffered (evicted, resolved) still to be written
+        self._unflushed: Dict[uuid.UUID, Tuple[int, datetime]] = {}
+        self._user_tokens: Dict[str, Tuple[float, float]] = {}
+        self._new_issue_times: Deque[float] = deque()
+        self.counters = {"created": 0, "merged": 0, "coalesced": 0, "rate_limited": 0, "flushed": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    @property
+    def window(self) -> timedelta:
+        return timedelta(hours=self.settings.ISSUE_AUTO_REPORT_WINDOW_HOURS)
+
+    # ------------------------------------------------------------------
+    # Rate limiting
+    # ------------------------------------------------------------------
+
+    def check_rate(self, user_id: Any):
+        """Take one token from the user's bucket (refilled continuously to the per-minute rate)"""
+        rate = self.settings.ISSUE_AUTO_REPORT_USER_RATE_PER_MINUTE
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        key = str(user_id)
+        with self._lock:
+            tokens, updated = self._user_tokens.get(key, (float(rate), now))
+            tokens = min(float(rate), tokens + (now - updated) * rate / 60)
+            if tokens < 1:
+                self._user_tokens[key] = (tokens, now)
+                self.counters["rate_limited"] += 1
+                raise AutoReportRateLimited(
+                    "Too many error reports from this user", retry_after=max(1, int((1 - tokens) * 60 / rate) + 1)
+                )
+            self._user_tokens[key] = (tokens - 1, now)
+            if len(self._user_tokens) > MAX_TRACKED_USERS:
+                # Drop users whose bucket has refilled anyway
+                for stale in [user for user, (_, seen) in self._user_tokens.items() if now - seen > 60]:
+                    del self._user_tokens[stale]
+
+    def check_new_issue(self):
+        """Count a new auto-reported issue against the global per-minute cap"""
+        limit = self.settings.ISSUE_AUTO_REPORT_MAX_NEW_PER_MINUTE
+        if limit <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._new_issue_times and now - self._new_issue_times[0] >= 60:
+                self._new_issue_times.popleft()
+            if len(self._new_issue_times) >= limit:
+                self.counters["rate_limited"] += 1
+                raise AutoReportRateLimited(
+                    "Too many new error reports", retry_after=max(1, int(60 - (now - self._new_issue_times[0])) + 1)
+                )
+            self._new_issue_times.append(now)
+
+    # ------------------------------------------------------------------
+    # Coalescing
+    # ------------------------------------------------------------------
+
+    def coalesce(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Count a repeat of a buffered fingerprint
+
+        Returns the issue (as IssueResponse data, with the updated count) or
+        None when the fingerprint is not buffered and the database decides.
+        """
+        now = datetime.now()
+        with self._lock:
+            entry = self._buffer.get(fingerprint)
+            if entry is None:
+                return None
+            if now - entry.last_occurred_at > self.window:
+                self._release(self._buffer.pop(fingerprint))
+                return None
+            entry.occurrence_count += 1
+            entry.pending += 1
+            entry.last_occurred_at = now
+            self._buffer.move_to_end(fingerprint)
+            self.counters["coalesced"] += 1
+            return {**entry.snapshot, "occurrence_count": entry.occurrence_count, "last_occurred_at": now}
+
+    def remember(self, fingerprint: str, issue: Any, created: bool):
+        """Buffer the issue a fingerprint was just created or merged into"""
+        snapshot = IssueResponse.model_validate(issue).model_dump()
+        with self._lock:
+            self.counters["created" if created else "merged"] += 1
+            previous = self._buffer.pop(fingerprint, None)
+            if previous is not None:
+                self._release(previous)
+            self._buffer[fingerprint] = _BufferedIssue(
+                issue.id, snapshot, issue.occurrence_count or 1, issue.last_occurred_at or datetime.now()
+            )
+            while len(self._buffer) > max(1, self.settings.ISSUE_AUTO_REPORT_BUFFER_SIZE):
+                self._release(self._buffer.popitem(last=False)[1])
+
+    def forget_issue(self, issue_id: uuid.UUID):
+        """Stop coalescing into an issue (resolved, closed or deleted); its next repeat opens a new one"""
+        with self._lock:
+            for fingerprint in [key for key, entry in self._buffer.items() if entry.issue_id == issue_id]:
+                self._release(self._buffer.pop(fingerprint))
+
+    def _release(self, entry: _BufferedIssue):
+        """Keep the pending count of an entry leaving the buffer for the next flush (lock held)"""
+        if entry.pending:
+            count, last = self._unflushed.get(entry.issue_id, (0, entry.last_occurred_at))
+            self._unflushed[entry.issue_id] = (count + entry.pending, max(last, entry.last_occurred_at))
+
+    def drain(self) -> Dict[uuid.UUID, Tuple[int, datetime]]:
+        """Take all counts not yet written: issue id -> (repeats, last occurrence)"""
+        with self._lock:
+            pending, self._unflushed = self._unflushed, {}
+            for entry in self._buffer.values():
+                if entry.pending:
+                    count, last = pending.get(entry.issue_id, (0, entry.last_occurred_at))
+                    pending[entry.issue_id] = (count + entry.pending, max(last, entry.last_occurred_at))
+                    entry.pending = 0
+        return pending
+
+    def flush(self) -> int:
+        """Write buffered counts with one UPDATE; returns the number of issues updated"""
+        pending = self.drain()
+        if not pending:
+            return 0
+        from app.core.database import SessionLocal
+        from app.crud import issue as crud_issue
+
+        db = SessionLocal()
+        try:
+            crud_issue.record_occurrences(db, pending)
+        except Exception as e:
+            logger.error(f"Could not write auto-report occurrence counts: {e}")
+            db.rollback()
+            with self._lock:
+                # Retry with the next flush
+                for issue_id, (count, last) in pending.items():
+                    current, current_last = self._unflushed.get(issue_id, (0, last))
+                    self._unflushed[issue_id] = (current + count, max(last, current_last))
+            return 0
+        finally:
+            db.close()
+        with self._lock:
+            self.counters["flushed"] += sum(count for count, _ in pending.values())
+        return len(pending)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buffered_fingerprints": len(self._buffer),
+                "pending_occurrences": sum(entry.pending for entry in self._buffer.values())
+                + sum(count for count, _ in self._unflushed.values()),
+                **self.counters,
+            }
+
+    # ------------------------------------------------------------------
+    # Flush schedule
+    # ------------------------------------------------------------------
+
+    async def _schedule(self):
+        interval = max(1, self.settings.ISSUE_AUTO_REPORT_FLUSH_SECONDS)
+        while not self._stop.is_set():
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Auto-report flush failed: {e}")
+
+    def start(self):
+        """Start writing buffered counts in the background"""
+        if self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        """Stop the schedule and write what is still buffered"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+# Global instance
+issue_auto_reports = IssueAutoReports()
@@ -10,27 +10,68 @@ Storage Structure:
 /var/madagascar-license-data/issues/
 └── YYYY/MM/DD/
     └── {issue_id}/
-        ├── screenshot.png
-        ├── console_logs.txt
+        ├── screenshot.webp       (screenshot.png/.jpg until optimized)
+        ├── console_logs.txt.gz   (console_logs.txt for older issues)
         └── additional_{filename}
 
 This follows the same date-based organization as biometric files for backup management.
+
+Console logs are gzip-compressed on write and decompressed while they are
+streamed back. Screenshots are stored as uploaded; schedule_screenshot_optimization
+re-encodes them to lossless WebP in the image worker pool after the request
+and switches the issue over once the smaller file is written. The bytes saved
+by both are counted in the storage ledger (get_storage_stats).
 """
 
+import asyncio
+import gzip
 import io
 import json
+import os
 import uuid
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Iterator, Set
 from datetime import datetime
 from PIL import Image
 from fastapi import UploadFile, HTTPException
 import logging
 
 from app.core.config import get_settings
+from app.services.cold_archive import cold_archive
+from app.services.image_service import run_image_task
+from app.services.storage_ledger import storage_ledger
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK_BYTES = 64 * 1024
+SCREENSHOT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "GIF": ".gif"}
+
+MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+    '.tif': 'image/tiff',
+    '.tiff': 'image/tiff',
+    '.txt': 'text/plain',
+    '.json': 'application/json',
+    '.pdf': 'application/pdf'
+}
+
+
+def _screenshot_extension(image_format: Optional[str]) -> str:
+    """File extension for a screenshot in image_format (.bin when it is not a readable image)"""
+    if image_format in SCREENSHOT_EXTENSIONS:
+        return SCREENSHOT_EXTENSIONS[image_format]
+    if image_format:
+        for extension, name in Image.registered_extensions().items():
+            if name == image_format:
+                return extension
+    return '.bin'
+
+
 class IssueFileManager:
     """Service for storing and managing issue-related files on persistent disk"""
     
@@ -38,6 +79,7 @@ class IssueFileManager:
         self.settings = get_settings()
         self.base_storage_path = self.settings.get_file_storage_path()
         self.issues_path = self.base_storage_path / "issues"
+        self._background_tasks: Set[asyncio.Task] = set()
         
         # Ensure directories exist
         self._ensure_directories()
@@ -93,32 +135,23 @@ class IssueFileManager:
         """
         try:
             storage_path = self._get_issue_storage_path(issue_id, created_at)
-            filename = "screenshot.png"
-            file_path = storage_path / filename
             
-            # Validate and process image
+            # Only the header is read here; decoding and re-encoding happen in
+            # the background (schedule_screenshot_optimization)
             try:
-                image = Image.open(io.BytesIO(screenshot_data))
-                
-                # Convert to PNG if necessary and optimize
-                if image.format != 'PNG':
-                    # Convert to RGB if necessary (removes alpha channel issues)
-                    if image.mode == 'RGBA':
-                        background = Image.new('RGB', image.size, (255, 255, 255))
-                        background.paste(image, mask=image.split()[-1])
-                        image = background
-                    
-                # Save optimized screenshot
-                with open(file_path, 'wb') as f:
-                    image.save(f, 'PNG', optimize=True)
-                    
+                image_format = Image.open(io.BytesIO(screenshot_data)).format
             except Exception as e:
-                logger.warning(f"Failed to process image, saving raw data: {e}")
-                # Save raw data if image processing fails
-                with open(file_path, 'wb') as f:
-                    f.write(screenshot_data)
+                logger.warning(f"Screenshot for issue {issue_id} is not a readable image, saving raw data: {e}")
+                image_format = None
+            # Other formats (BMP, TIFF...) keep their own extension until re-encoded as WebP
+            filename = f"screenshot{_screenshot_extension(image_format)}"
+            file_path = storage_path / filename
+            
+            with open(file_path, 'wb') as f:
+                f.write(screenshot_data)
             
             file_size = file_path.stat().st_size
+            storage_ledger.record(file_path, file_size)
             
             logger.info(f"Screenshot saved: {file_path} ({file_size} bytes)")
             
@@ -152,24 +185,23 @@ class IssueFileManager:
         """
         try:
             storage_path = self._get_issue_storage_path(issue_id, created_at)
-            filename = "console_logs.txt"
+            filename = "console_logs.txt.gz"
             file_path = storage_path / filename
             
-            # Format console logs with timestamps
+            # Format console logs with timestamps, compressed as they are written
             timestamp = datetime.now().isoformat()
-            log_content = f"Console Logs captured at {timestamp}\n"
-            log_content += "=" * 50 + "\n\n"
-            
-            for i, log_entry in enumerate(console_logs, 1):
-                log_content += f"[{i:03d}] {log_entry}\n"
-            
-            # Save console logs
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(log_content)
+            header = f"Console Logs captured at {timestamp}\n" + "=" * 50 + "\n\n"
+            raw_size = 0
+            with gzip.open(file_path, 'wb') as f:
+                raw_size += f.write(header.encode('utf-8'))
+                for i, log_entry in enumerate(console_logs, 1):
+                    raw_size += f.write(f"[{i:03d}] {log_entry}\n".encode('utf-8'))
             
             file_size = file_path.stat().st_size
+            storage_ledger.record(file_path, file_size)
+            storage_ledger.record_savings("issues", "console_logs", max(0, raw_size - file_size))
             
-            logger.info(f"Console logs saved: {file_path} ({file_size} bytes)")
+            logger.info(f"Console logs saved: {file_path} ({file_size} bytes, {raw_size} uncompressed)")
             
             return {
                 "file_path": str(file_path),
@@ -214,6 +246,7 @@ class IssueFileManager:
                 f.write(file_content)
             
             file_size = file_path.stat().st_size
+            storage_ledger.record(file_path, file_size)
             
             logger.info(f"Additional file saved: {file_path} ({file_size} bytes)")
             
@@ -238,38 +271,144 @@ class IssueFileManager:
             file_path: Path to the file
             
         Returns:
-            Tuple of (file_content, mime_type)
+            Tuple of (file_content, mime_type); compressed files are decompressed
         """
+        chunks, mime_type, _ = self.open_file_stream(file_path)
         try:
-            path = Path(file_path)
-            
-            if not path.exists():
-                raise HTTPException(status_code=404, detail="File not found")
-            
-            with open(path, 'rb') as f:
-                content = f.read()
-            
-            # Determine MIME type based on extension
-            extension = path.suffix.lower()
-            mime_type_map = {
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.gif': 'image/gif',
-                '.txt': 'text/plain',
-                '.json': 'application/json',
-                '.pdf': 'application/pdf'
-            }
-            
-            mime_type = mime_type_map.get(extension, 'application/octet-stream')
-            
-            return content, mime_type
+            return b"".join(chunks), mime_type
+        except Exception as e:
+            logger.error(f"Failed to retrieve file {file_path}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to retrieve file")
+    
+    def open_file_stream(self, file_path: str) -> Tuple[Iterator[bytes], str, str]:
+        """
+        Open a stored file for streaming
+        
+        The file is opened here, so a missing file raises 404 before any
+        response starts; gzip-compressed files are decompressed chunk by chunk.
+        
+        Args:
+            file_path: Path to the file
             
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="File not found")
+        Returns:
+            Tuple of (content chunks, mime_type, filename to serve it as)
+        """
+        path = Path(file_path)
+        try:
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                # Older issues are packed into the cold archive
+                content = cold_archive.read(path)
+                if content is None:
+                    raise HTTPException(status_code=404, detail="File not found")
+                f = io.BytesIO(content)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to retrieve file {file_path}: {e}")
             raise HTTPException(status_code=500, detail="Failed to retrieve file")
+        
+        name = path.name
+        if path.suffix.lower() == '.gz':
+            f = gzip.GzipFile(fileobj=f, mode='rb')
+            name = path.stem
+        mime_type = MIME_TYPES.get(Path(name).suffix.lower(), 'application/octet-stream')
+        return self._read_chunks(f), mime_type, name
+    
+    @staticmethod
+    def _read_chunks(f) -> Iterator[bytes]:
+        with f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    
+    def optimize_screenshot(self, file_path: str) -> Optional[Dict[str, int]]:
+        """
+        Re-encode a screenshot as lossless WebP next to the original
+        
+        Runs in the image worker pool. The original is left in place for the
+        caller to remove once the issue points at the new file.
+        
+        Returns:
+            Dictionary with the new file_path, original_size, file_size and
+            bytes_saved, or None when WebP would not be smaller
+        """
+        path = Path(file_path)
+        if path.suffix.lower() == '.webp':
+            return None
+        original_size = path.stat().st_size
+        target = path.with_suffix('.webp')
+        temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with Image.open(path) as image:
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+                image.save(temporary, 'WEBP', lossless=True, method=4)
+            file_size = temporary.stat().st_size
+            if file_size >= original_size:
+                return None
+            os.replace(temporary, target)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+        storage_ledger.record(target, file_size)
+        return {
+            "file_path": str(target),
+            "original_size": original_size,
+            "file_size": file_size,
+            "bytes_saved": original_size - file_size
+        }
+    
+    def schedule_screenshot_optimization(self, issue_id: uuid.UUID, file_path: str):
+        """Optimize a just-saved screenshot after the request (call from the event loop)"""
+        task = asyncio.create_task(self._optimize_screenshot_in_background(issue_id, file_path))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _optimize_screenshot_in_background(self, issue_id: uuid.UUID, file_path: str):
+        try:
+            result = await run_image_task(self.optimize_screenshot, file_path)
+            if result is None:
+                return
+            switched = await asyncio.to_thread(self._switch_screenshot_path, issue_id, file_path, result["file_path"])
+            # Whichever copy the issue does not point at goes
+            self._remove_file(Path(file_path if switched else result["file_path"]))
+            if switched:
+                storage_ledger.record_savings("issues", "screenshots", result["bytes_saved"])
+                logger.info(
+                    f"Screenshot of issue {issue_id} optimized: {result['original_size']} -> "
+                    f"{result['file_size']} bytes"
+                )
+        except Exception as e:
+            logger.warning(f"Screenshot optimization failed for issue {issue_id} (original kept): {e}")
+    
+    @staticmethod
+    def _switch_screenshot_path(issue_id: uuid.UUID, old_path: str, new_path: str) -> bool:
+        """Point the issue at the optimized screenshot unless it changed or was deleted meanwhile"""
+        from app.core.database import SessionLocal
+        from app.models.issue import Issue
+        
+        db = SessionLocal()
+        try:
+            updated = db.query(Issue).filter(
+                Issue.id == issue_id, Issue.screenshot_path == old_path
+            ).update({Issue.screenshot_path: new_path}, synchronize_session=False)
+            db.commit()
+            return updated == 1
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _remove_file(path: Path):
+        try:
+            path.unlink()
+            storage_ledger.forget(path)
+        except FileNotFoundError:
+            pass
     
     def delete_issue_files(self, issue_id: uuid.UUID, created_at: Optional[datetime] = None) -> bool:
         """
@@ -284,12 +423,14 @@ class IssueFileManager:
         """
         try:
             storage_path = self._get_issue_storage_path(issue_id, created_at)
+            cold_archive.forget_directory(storage_path)
             
             if storage_path.exists():
                 # Remove all files in the issue directory
                 for file_path in storage_path.iterdir():
                     if file_path.is_file():
                         file_path.unlink()
+                        storage_ledger.forget(file_path)
                         logger.info(f"Deleted file: {file_path}")
                 
                 # Remove the issue directory if empty
@@ -310,24 +451,27 @@ class IssueFileManager:
         """
         Get storage statistics for issue files
         
+        Read from the storage ledger instead of scanning the issue tree, with
+        the bytes saved by console log compression and screenshot re-encoding
+        
         Returns:
             Dictionary with storage statistics
         """
         try:
-            total_files = 0
-            total_size = 0
-            
-            if self.issues_path.exists():
-                for file_path in self.issues_path.rglob("*"):
-                    if file_path.is_file():
-                        total_files += 1
-                        total_size += file_path.stat().st_size
+            totals = storage_ledger.totals("issues")
+            total_size = totals["bytes"]
+            savings = storage_ledger.savings("issues")
             
             return {
-                "total_files": total_files,
+                "total_files": totals["files"],
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
-                "storage_path": str(self.issues_path)
+                "total_issue_directories": totals["directories"],
+                "by_file_type": totals["by_type"],
+                "bytes_saved": sum(entry["bytes"] for entry in savings.values()),
+                "savings_by_kind": savings,
+                "storage_path": str(self.issues_path),
+                "ledger_reconciled_at": totals["reconciled_at"]
             }
             
         except Exception as e:
@@ -0,0 +1,118 @@
+"""
+Bulk License Status Jobs for Madagascar License System
+Runs large bulk status updates in the background and tracks their progress
+
+POST /licenses/bulk/status-update applies small requests inline with
+crud_license.bulk_update_status. Requests with more than
+LICENSE_BULK_STATUS_BACKGROUND_THRESHOLD ids are handed to this service
+instead: the endpoint answers 202 with a job id and the update runs in a worker
+thread with its own session, polled through GET
+/licenses/bulk/status-update/jobs/{job_id}.
+
+The update is one transaction, so a job that fails (or a process that dies
+mid-job) changes nothing. The MAX_TRACKED_JOBS most recent jobs are kept.
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.schemas.license import BulkLicenseStatusUpdate
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_JOBS = 50
+
+
+class LicenseBulkStatusJobs:
+    """Background bulk license status updates"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def runs_in_background(self, license_ids: List[uuid.UUID]) -> bool:
+        return len(license_ids) > self.settings.LICENSE_BULK_STATUS_BACKGROUND_THRESHOLD
+
+    def submit(self, bulk_update: BulkLicenseStatusUpdate, changed_by: uuid.UUID, requested_by: str) -> Dict[str, Any]:
+        """Start a job on the running event loop; returns its initial record"""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "running",
+            "requested_by": requested_by,
+            "total_requested": len(bulk_update.license_ids),
+            "successful": 0,
+            "failed": 0,
+            "error_details": [],
+            "started_at": datetime.utcnow(),
+            "finished_at": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]["status"] == "running":
+                    break
+                del self._jobs[oldest]
+
+        task = asyncio.create_task(asyncio.to_thread(self._run, job, bulk_update, changed_by))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"Bulk license status job {job['job_id']}: {job['total_requested']} licenses to {bulk_update.status.value}")
+        return dict(job)
+
+    def _run(self, job: Dict[str, Any], bulk_update: BulkLicenseStatusUpdate, changed_by: uuid.UUID):
+        from app.core.database import SessionLocal
+        from app.crud.crud_license import crud_license
+
+        db = SessionLocal()
+        try:
+            successful, error_details = crud_license.bulk_update_status(
+                db,
+                license_ids=bulk_update.license_ids,
+                status_update=bulk_update,
+                changed_by=changed_by,
+                batch_size=self.settings.LICENSE_BULK_STATUS_BATCH_SIZE
+            )
+            with self._lock:
+                job.update(
+                    status="completed", successful=successful,
+                    failed=len(error_details), error_details=error_details
+                )
+        except Exception as e:
+            logger.error(f"Bulk license status job {job['job_id']} failed: {e}")
+            with self._lock:
+                job.update(status="failed", error=str(e))
+        finally:
+            db.close()
+            with self._lock:
+                job["finished_at"] = datetime.utcnow()
+        logger.info(
+            f"Bulk license status job {job['job_id']} {job['status']}: "
+            f"{job['successful']} updated, {job['failed']} rejected"
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Tracked jobs without their per-id errors, newest first"""
+        with self._lock:
+            return [
+                {key: value for key, value in job.items() if key != "error_details"}
+                for job in reversed(self._jobs.values())
+            ]
+
+
+# Global instance
+license_bulk_status_jobs = LicenseBulkStatusJobs()
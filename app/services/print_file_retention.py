@@ -0,0 +1,388 @@
+"""
+Print Job File Retention for Madagascar License System
+Deletes the card files of finished print jobs in bulk on a schedule
+
+Card files are normally removed right after QA passes, but jobs that were
+cancelled, failed, or whose QA-time cleanup failed keep theirs until someone
+deletes them by hand. On the fixed-size data disk those add up, so a
+background pass:
+
+- finds jobs in a terminal status (COMPLETED, CANCELLED, FAILED) that still
+  have files and were last updated more than PRINT_FILE_RETENTION_DAYS ago,
+  in keyset pages over the partial index ix_print_jobs_file_retention
+  (add_print_file_retention_index_migration.py)
+- removes each job directory without the per-job parent pruning and
+  verification of delete_print_job_files, paced to
+  PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND so uploads and card generation keep
+  their disk bandwidth
+- clears the file columns of each page with one UPDATE, recording what was
+  freed in generation_metadata
+- removes batch sheet day directories older than the cutoff
+- prunes the emptied day/month/year directories once per pass
+- appends a summary line to <storage>/.print_file_retention_history.jsonl
+
+A dry run reports the same selection, sized from the storage ledger, without
+deleting anything.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.printing import PrintJob, PrintJobStatus
+from app.services.card_file_manager import card_file_manager
+from app.services.storage_ledger import storage_ledger
+
+logger = logging.getLogger(__name__)
+
+RETENTION_STATUSES = (PrintJobStatus.COMPLETED, PrintJobStatus.CANCELLED, PrintJobStatus.FAILED)
+HISTORY_FILENAME = ".print_file_retention_history.jsonl"
+DRY_RUN_SAMPLE_SIZE = 20
+SCHEDULER_START_DELAY_SECONDS = 60
+
+
+class RetentionPassRunning(Exception):
+    """Raised when a pass is requested while another one is still running"""
+
+
+class PrintFileRetention:
+    """Scheduled bulk deletion of card files of finished print jobs"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.history_path = card_file_manager.base_path / HISTORY_FILENAME
+        self._pass_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.utcnow()) - timedelta(days=self.settings.PRINT_FILE_RETENTION_DAYS)
+
+    def _expired_page(self, db: Session, cutoff: datetime, after: Optional[Tuple[datetime, Any]],
+                      limit: int) -> List[Any]:
+        """Next page of expired jobs with files, oldest first (keyset over updated_at, id)"""
+        query = db.query(
+            PrintJob.id, PrintJob.updated_at, PrintJob.submitted_at,
+            PrintJob.pdf_front_path, PrintJob.pdf_combined_path, PrintJob.pdf_back_path
+        ).filter(
+            PrintJob.pdf_files_generated == True,
+            PrintJob.status.in_(RETENTION_STATUSES),
+            PrintJob.updated_at < cutoff
+        )
+        if after is not None:
+            query = query.filter(tuple_(PrintJob.updated_at, PrintJob.id) > tuple_(*after))
+        return query.order_by(PrintJob.updated_at, PrintJob.id).limit(limit).all()
+
+    @staticmethod
+    def job_directory(job: Any) -> Path:
+        """Directory holding a job's files, taken from its stored paths when present"""
+        for relative in (job.pdf_front_path, job.pdf_combined_path, job.pdf_back_path):
+            if relative:
+                directory = card_file_manager.base_path / Path(relative).parent
+                # Only trust stored paths that point at this job's own directory
+                if directory.name == str(job.id) and card_file_manager.cards_path in directory.parents:
+                    return directory
+        return card_file_manager._get_print_job_directory(str(job.id), job.submitted_at)
+
+    # ------------------------------------------------------------------
+    # Deletion
+    # ------------------------------------------------------------------
+
+    def purge_directories(self, directories: Iterable[Path], report: Dict[str, Any],
+                          started: float) -> List[Tuple[Path, Dict[str, int]]]:
+        """
+        Remove job directories at the configured pace, adding to the pass report
+
+        Returns:
+            (directory, remove_job_directory result) for every directory that is
+            gone afterwards (including ones that were already missing)
+        """
+        rate = self.settings.PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND
+        removed = []
+        for directory in directories:
+            if self._stop.is_set():
+                break
+            try:
+                result = card_file_manager.remove_job_directory(directory, update_ledger=False)
+            except OSError as e:
+                report["errors"] += 1
+                logger.warning(f"Retention could not remove {directory}: {e}")
+                continue
+            removed.append((directory, result))
+            report["jobs"] += 1
+            self._add_result(report, result)
+            report["_day_directories"].add(directory.parent)
+
+            if rate:
+                # Pace deletions: sleep off any lead over jobs/rate seconds
+                lead = report["jobs"] / rate - (time.monotonic() - started)
+                if lead > 0:
+                    self._stop.wait(lead)
+        storage_ledger.forget_directories(directory for directory, _ in removed)
+        return removed
+
+    def purge_batch_sheets(self, cutoff: datetime, report: Dict[str, Any], dry_run: bool):
+        """Remove batch sheet day directories dated before the cutoff"""
+        batches_path = card_file_manager.cards_path / "batches"
+        cutoff_day = cutoff.strftime("%Y/%m/%d")
+        for day_directory in sorted(batches_path.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]")):
+            if day_directory.relative_to(batches_path).as_posix() >= cutoff_day:
+                break
+            for batch_directory in day_directory.iterdir():
+                if not batch_directory.is_dir():
+                    continue
+                if dry_run:
+                    usage = storage_ledger.directory_usage(batch_directory)
+                    result = {"files_deleted": usage["files"], "bytes_freed": usage["bytes"],
+                              "archived_files_released": 0, "archived_bytes_released": 0}
+                else:
+                    try:
+                        result = card_file_manager.remove_job_directory(batch_directory)
+                    except OSError as e:
+                        report["errors"] += 1
+                        logger.warning(f"Retention could not remove {batch_directory}: {e}")
+                        continue
+                report["batch_sheets"] += 1
+                self._add_result(report, result)
+            report["_day_directories"].add(day_directory)
+
+    @staticmethod
+    def _add_result(report: Dict[str, Any], result: Dict[str, int]):
+        # Archived members released from bundles still in use are not freed disk space
+        for key in ("files_deleted", "bytes_freed", "archived_files_released", "archived_bytes_released"):
+            report[key] += result[key]
+
+    @staticmethod
+    def _mark_files_deleted(db: Session, removed: List[Tuple[Any, Path, Dict[str, int]]], deleted_at: str):
+        """Clear file columns of a page of jobs and record what was freed, in one statement"""
+        if not removed:
+            return
+        metadata = [
+            json.dumps({
+                "files_deleted_at": deleted_at,
+                "files_deleted_by": "retention",
+                "folder_completely_removed": True,
+                "cleanup_result": {
+                    "files_deleted": result["files_deleted"],
+                    "bytes_freed": result["bytes_freed"],
+                    "archived_files_released": result["archived_files_released"],
+                    "archived_bytes_released": result["archived_bytes_released"],
+                    "folder_path": str(directory)
+                }
+            })
+            for _, directory, result in removed
+        ]
+        db.execute(
+            text("""
+                UPDATE print_jobs AS pj
+                SET pdf_files_generated = false,
+                    pdf_front_path = NULL,
+                    pdf_back_path = NULL,
+                    pdf_combined_path = NULL,
+                    generation_metadata = (COALESCE(pj.generation_metadata::jsonb, '{}'::jsonb) || freed.metadata::jsonb)::json
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:metadata AS text[])) AS freed(id, metadata)
+                WHERE pj.id = freed.id
+            """),
+            {"ids": [str(job_id) for job_id, _, _ in removed], "metadata": metadata}
+        )
+        db.commit()
+
+    # ------------------------------------------------------------------
+    # Pass
+    # ------------------------------------------------------------------
+
+    def run_pass(self, db: Session, dry_run: bool = False, trigger: str = "schedule") -> Dict[str, Any]:
+        """
+        Run one retention pass (blocking)
+
+        Args:
+            db: Session used for the job queries and updates
+            dry_run: Report what would be deleted without deleting anything
+            trigger: Recorded in the history ("schedule" or "manual:<username>")
+
+        Raises:
+            RetentionPassRunning: another pass is in progress
+        """
+        if not self._pass_lock.acquire(blocking=False):
+            raise RetentionPassRunning("A retention pass is already running")
+        try:
+            return self._run_pass(db, dry_run, trigger)
+        finally:
+            self._pass_lock.release()
+
+    def _new_report(self, started_at: datetime, trigger: str, dry_run: bool) -> Dict[str, Any]:
+        """Empty pass report with every counter the deletion steps add to"""
+        report: Dict[str, Any] = {
+            "started_at": started_at.isoformat(),
+            "trigger": trigger,
+            "dry_run": dry_run,
+            "retention_days": self.settings.PRINT_FILE_RETENTION_DAYS,
+            "cutoff": self.cutoff(started_at).isoformat(),
+            "jobs": 0,
+            "batch_sheets": 0,
+            "files_deleted": 0,
+            "bytes_freed": 0,
+            "archived_files_released": 0,
+            "archived_bytes_released": 0,
+            "errors": 0,
+            "_day_directories": set(),
+        }
+        if dry_run:
+            report["sample_job_ids"] = []
+            report["bytes_source"] = "storage_ledger"
+        return report
+
+    def _run_pass(self, db: Session, dry_run: bool, trigger: str) -> Dict[str, Any]:
+        started_at = datetime.utcnow()
+        started = time.monotonic()
+        cutoff = self.cutoff(started_at)
+        batch_size = self.settings.PRINT_FILE_RETENTION_BATCH_SIZE
+        report = self._new_report(started_at, trigger, dry_run)
+
+        after = None
+        while not self._stop.is_set():
+            page = self._expired_page(db, cutoff, after, batch_size)
+            if not page:
+                break
+            after = (page[-1].updated_at, page[-1].id)
+            directories = [self.job_directory(job) for job in page]
+
+            if dry_run:
+                for job, directory in zip(page, directories):
+                    usage = storage_ledger.directory_usage(directory)
+                    report["jobs"] += 1
+                    report["files_deleted"] += usage["files"]
+                    report["bytes_freed"] += usage["bytes"]
+                    if len(report["sample_job_ids"]) < DRY_RUN_SAMPLE_SIZE:
+                        report["sample_job_ids"].append(str(job.id))
+                continue
+
+            removed = self.purge_directories(directories, report, started)
+            ids_by_directory = {directory: job.id for job, directory in zip(page, directories)}
+            self._mark_files_deleted(
+                db,
+                [(ids_by_directory[directory], directory, result) for directory, result in removed],
+                datetime.utcnow().isoformat()
+            )
+            if len(page) < batch_size:
+                break
+
+        if not self._stop.is_set():
+            self.purge_batch_sheets(cutoff, report, dry_run)
+
+        day_directories = report.pop("_day_directories")
+        if not dry_run:
+            # Once per pass: day directories, then their month/year parents if emptied
+            report["empty_directories_removed"] = sum(
+                card_file_manager._cleanup_empty_directories(directory)
+                for directory in sorted(day_directories, reverse=True)
+            )
+        report["interrupted"] = self._stop.is_set()
+        report["duration_seconds"] = round(time.monotonic() - started, 2)
+        report["bytes_freed_mb"] = round(report["bytes_freed"] / 1024 / 1024, 2)
+
+        if not dry_run:
+            self._record(report)
+        logger.info(
+            f"Print file retention{' (dry run)' if dry_run else ''}: {report['jobs']} jobs, "
+            f"{report['batch_sheets']} batch sheets, {report['files_deleted']} files, "
+            f"{report['bytes_freed']:,} bytes in {report['duration_seconds']} s"
+        )
+        return report
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+
+    def _record(self, report: Dict[str, Any]):
+        try:
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record retention pass: {e}")
+
+    def history(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent pass summaries, newest first"""
+        try:
+            with open(self.history_path, encoding="utf-8") as f:
+                lines = deque(f, maxlen=limit)
+        except FileNotFoundError:
+            return []
+        return [json.loads(line) for line in reversed(lines) if line.strip()]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.PRINT_FILE_RETENTION_DAYS > 0,
+            "retention_days": self.settings.PRINT_FILE_RETENTION_DAYS,
+            "interval_minutes": self.settings.PRINT_FILE_RETENTION_INTERVAL_MINUTES,
+            "batch_size": self.settings.PRINT_FILE_RETENTION_BATCH_SIZE,
+            "max_jobs_per_second": self.settings.PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND,
+            "running": self._pass_lock.locked(),
+            "recent_passes": self.history(),
+        }
+
+    # ------------------------------------------------------------------
+    # Scheduler
+    # ------------------------------------------------------------------
+
+    def run_scheduled_pass(self) -> Optional[Dict[str, Any]]:
+        from app.core.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return self.run_pass(db, trigger="schedule")
+        except RetentionPassRunning:
+            logger.info("Skipping scheduled retention pass - a pass is already running")
+            return None
+        finally:
+            db.close()
+
+    async def _schedule(self):
+        interval = max(1, self.settings.PRINT_FILE_RETENTION_INTERVAL_MINUTES) * 60
+        await asyncio.sleep(SCHEDULER_START_DELAY_SECONDS)
+        while not self._stop.is_set():
+            try:
+                await asyncio.to_thread(self.run_scheduled_pass)
+            except Exception as e:
+                logger.error(f"Print file retention pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """Start the background schedule (no-op when retention is disabled)"""
+        if self.settings.PRINT_FILE_RETENTION_DAYS <= 0 or self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._schedule())
+        logger.info(
+            f"Print file retention scheduled every {self.settings.PRINT_FILE_RETENTION_INTERVAL_MINUTES} min "
+            f"({self.settings.PRINT_FILE_RETENTION_DAYS} day retention)"
+        )
+
+    async def stop(self):
+        """Stop the schedule; a running pass stops after its current job"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+print_file_retention = PrintFileRetention()
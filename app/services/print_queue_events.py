@@ -0,0 +1,158 @@
+"""
+Print Queue Event Broker for Madagascar License System
+Pushes compact job-level deltas to print operator screens over Server-Sent Events
+
+Every CRUDPrintJob transition publishes one event after its commit. Each location
+has its own monotonically increasing event id and a short replay buffer, so a
+client that reconnects with Last-Event-ID only receives what it missed. When the
+gap is larger than the buffer (or the client is too slow to keep up) the client
+gets a single `resync` event and refetches the full queue once.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+REPLAY_BUFFER_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Event types
+JOB_CREATED = "job_created"
+JOB_MOVED = "job_moved"
+JOB_STATUS_CHANGED = "status_changed"
+JOB_QA_RESULT = "qa_result"
+RESYNC = "resync"
+
+
+class QueueSubscription:
+    """One connected client listening to a location's queue"""
+
+    def __init__(self, location_id: str, loop: asyncio.AbstractEventLoop):
+        self.location_id = location_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event: Dict[str, Any]):
+        """Runs on the subscriber's event loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: stop queueing and ask it to refetch once it catches up
+            self.overflowed = True
+
+
+class PrintQueueEventBroker:
+    """In-process publish/subscribe hub keyed by print location"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[QueueSubscription]] = {}
+        self._last_event_id: Dict[str, int] = {}
+        self._replay: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def subscribe(self, location_id: UUID) -> QueueSubscription:
+        """Register a subscriber; must be called from the event loop serving it"""
+        key = str(location_id)
+        subscription = QueueSubscription(key, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: QueueSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.location_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.location_id, None)
+
+    def last_event_id(self, location_id: UUID) -> int:
+        with self._lock:
+            return self._last_event_id.get(str(location_id), 0)
+
+    def events_since(self, location_id: UUID, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Buffered events newer than last_event_id
+
+        Returns None when some of them have already left the replay buffer.
+        """
+        key = str(location_id)
+        with self._lock:
+            current = self._last_event_id.get(key, 0)
+            if last_event_id > current:
+                # Ids restart with the process; the client's copy predates this run
+                return None
+            if last_event_id == current:
+                return []
+            buffered = list(self._replay.get(key, ()))
+        if not buffered or buffered[0]["id"] > last_event_id + 1:
+            return None
+        return [event for event in buffered if event["id"] > last_event_id]
+
+    def publish(self, location_id: UUID, event_type: str, data: Dict[str, Any]):
+        """Publish an event to every subscriber of the location (thread-safe, never raises)"""
+        try:
+            key = str(location_id)
+            with self._lock:
+                event_id = self._last_event_id.get(key, 0) + 1
+                self._last_event_id[key] = event_id
+                event = {
+                    "id": event_id,
+                    "type": event_type,
+                    "data": data,
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+                self._replay.setdefault(key, deque(maxlen=REPLAY_BUFFER_SIZE)).append(event)
+                subscribers = list(self._subscribers.get(key, ()))
+
+            for subscription in subscribers:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+        except Exception as e:
+            logger.warning(f"Failed to publish print queue event {event_type} for location {location_id}: {e}")
+
+    def publish_job(self, event_type: str, print_job, **extra: Any):
+        """Publish the compact delta for a print job"""
+        try:
+            data = {**job_delta(print_job), **extra}
+        except Exception as e:
+            logger.warning(f"Failed to build print queue event {event_type} for job {print_job.id}: {e}")
+            return
+        self.publish(print_job.print_location_id, event_type, data)
+
+
+def job_delta(print_job) -> Dict[str, Any]:
+    """Fields a client needs to update its local copy of the queue"""
+    def plain(value):
+        if isinstance(value, Enum):
+            return value.value
+        if isinstance(value, UUID):
+            return str(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    return {
+        "job_id": plain(print_job.id),
+        "job_number": print_job.job_number,
+        "status": plain(print_job.status),
+        "priority": plain(print_job.priority),
+        "queue_position": print_job.queue_position,
+        "assigned_to_user_id": plain(print_job.assigned_to_user_id),
+        "quality_check_result": plain(print_job.quality_check_result),
+        "pdf_files_generated": print_job.pdf_files_generated,
+        "submitted_at": plain(print_job.submitted_at),
+    }
+
+
+# Global instance
+print_queue_events = PrintQueueEventBroker()
@@ -0,0 +1,191 @@
+"""
+Receipt Views for Madagascar License System
+Keeps GET /transactions/{id}/receipt a read: cached receipts and batched
+"printed" flags
+
+Receipts are built from one read (crud_transaction.get_for_receipt) and kept
+for RECEIPT_CACHE_SECONDS, tagged with the transaction version (updated_at);
+only the transaction part is cached, the viewing user is filled in per
+request. crud_transaction drops the entry when it changes the transaction.
+Person and location edits show once the entry expires. First views queue the
+receipt_printed flag, written every RECEIPT_PRINTED_FLUSH_SECONDS with one
+UPDATE (crud_transaction.mark_receipts_printed). Flags still queued when the
+process dies are lost, leaving those receipts marked as not printed.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedReceipt:
+    """Receipt data of one transaction version"""
+
+    __slots__ = ("version", "location_id", "receipt", "expires_at")
+
+    def __init__(self, version: Any, location_id: uuid.UUID, receipt: Dict[str, Any], expires_at: float):
+        self.version = version
+        self.location_id = location_id
+        self.receipt = receipt
+        self.expires_at = expires_at
+
+
+class ReceiptViews:
+    """Short-lived receipt cache and batched receipt_printed writes"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[uuid.UUID, _CachedReceipt]" = OrderedDict()
+        # When each transaction was last changed (time.monotonic())
+        self._invalidated: "OrderedDict[uuid.UUID, float]" = OrderedDict()
+        self._printed: Dict[uuid.UUID, datetime] = {}
+        self.counters = {"hits": 0, "misses": 0, "flushed": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def get(self, transaction_id: uuid.UUID) -> Optional[_CachedReceipt]:
+        """Cached receipt of a transaction, if still fresh"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(transaction_id)
+            if entry is not None and entry.expires_at <= now:
+                del self._cache[transaction_id]
+                entry = None
+            self.counters["hits" if entry is not None else "misses"] += 1
+            return entry
+
+    def put(self, transaction: Any, receipt: Dict[str, Any], read_at: float):
+        """Cache the receipt built from a transaction read at read_at (time.monotonic())"""
+        ttl = self.settings.RECEIPT_CACHE_SECONDS
+        if ttl <= 0:
+            return
+        entry = _CachedReceipt(transaction.updated_at, transaction.location_id, receipt, time.monotonic() + ttl)
+        with self._lock:
+            invalidated_at = self._invalidated.get(transaction.id)
+            if invalidated_at is not None and read_at <= invalidated_at:
+                # Changed while this read was in flight
+                return
+            current = self._cache.get(transaction.id)
+            # A slower concurrent read must not replace a newer version
+            if current is not None and current.version and entry.version and current.version > entry.version:
+                return
+            self._cache[transaction.id] = entry
+            self._cache.move_to_end(transaction.id)
+            while len(self._cache) > max(1, self.settings.RECEIPT_CACHE_SIZE):
+                self._cache.popitem(last=False)
+
+    def invalidate(self, transaction_id: uuid.UUID):
+        """Drop the cached receipt of a transaction that was just changed"""
+        now = time.monotonic()
+        with self._lock:
+            self._cache.pop(transaction_id, None)
+            self._invalidated[transaction_id] = now
+            self._invalidated.move_to_end(transaction_id)
+            # Only reads still in flight need the time; those are far shorter than the TTL
+            horizon = now - max(1, self.settings.RECEIPT_CACHE_SECONDS)
+            while self._invalidated and next(iter(self._invalidated.values())) < horizon:
+                self._invalidated.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Printed flags
+    # ------------------------------------------------------------------
+
+    def mark_printed(self, transaction_id: uuid.UUID, printed_at: Optional[datetime] = None):
+        """Queue the first print of a receipt; the earliest time queued wins"""
+        printed_at = printed_at or datetime.utcnow()
+        with self._lock:
+            queued = self._printed.get(transaction_id)
+            if queued is None or printed_at < queued:
+                self._printed[transaction_id] = printed_at
+
+    def is_marked(self, transaction_id: uuid.UUID) -> bool:
+        with self._lock:
+            return transaction_id in self._printed
+
+    def flush(self) -> int:
+        """Write queued printed flags with one UPDATE; returns the number of transactions"""
+        with self._lock:
+            printed, self._printed = self._printed, {}
+        if not printed:
+            return 0
+
+        from app.core.database import SessionLocal
+        from app.crud import crud_transaction
+
+        db = SessionLocal()
+        try:
+            crud_transaction.mark_receipts_printed(db, printed)
+        except Exception as e:
+            logger.error(f"Could not record printed receipts: {e}")
+            db.rollback()
+            with self._lock:
+                # Retry with the next flush
+                for transaction_id, printed_at in printed.items():
+                    queued = self._printed.get(transaction_id)
+                    if queued is None or printed_at < queued:
+                        self._printed[transaction_id] = printed_at
+            return 0
+        finally:
+            db.close()
+
+        with self._lock:
+            self.counters["flushed"] += len(printed)
+        return len(printed)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached_receipts": len(self._cache),
+                "pending_printed_flags": len(self._printed),
+                **self.counters,
+            }
+
+    # ------------------------------------------------------------------
+    # Flush schedule
+    # ------------------------------------------------------------------
+
+    async def _schedule(self):
+        interval = max(1, self.settings.RECEIPT_PRINTED_FLUSH_SECONDS)
+        while not self._stop.is_set():
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Printed receipt flush failed: {e}")
+
+    def start(self):
+        """Start writing queued printed flags in the background"""
+        if self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        """Stop the schedule and write what is still queued"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+# Global instance
+receipt_views = ReceiptViews()
@@ -0,0 +1,194 @@
+"""
+Sequence Service for Madagascar License System
+Allocates business numbers (print jobs, applications, transactions, receipts,
+card orders, cards) from locked counter rows instead of LIKE/ORDER BY scans
+
+Allocation modes:
+- Gap-free (default): the counter row is locked with SELECT ... FOR UPDATE and
+  incremented inside the caller's transaction. A rollback also rolls back the
+  increment, so numbers stay contiguous. Concurrent callers queue on the row lock
+  until the caller commits, so only use it when the commit follows shortly.
+- Committed: one value taken in a short transaction of its own
+  (`next_committed_value`), for callers that do slow work (card rendering) before
+  they commit. The row lock is released at once; a caller rollback leaves a gap.
+- Block: a worker reserves `SEQUENCE_BLOCK_SIZE` values in a short transaction of
+  its own and hands them out from memory. Numbers never collide but a block that is
+  not fully used (worker restart) leaves a gap, so only use it for kinds where gaps
+  are acceptable (configured through `SEQUENCE_PREALLOCATE_KINDS`).
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.sequence import SequenceCounter
+
+logger = logging.getLogger(__name__)
+
+# Returns the highest number already issued for a key before the counter row existed
+SeedFunction = Callable[[Session], int]
+SequenceKey = Tuple[str, str, str]
+
+
+class SequenceService:
+    """Row-locked counters keyed by (kind, scope, period)"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.block_size = max(1, self.settings.SEQUENCE_BLOCK_SIZE)
+        self.preallocate_kinds = {
+            kind.strip() for kind in self.settings.SEQUENCE_PREALLOCATE_KINDS.split(",") if kind.strip()
+        }
+        # key -> [next_value, last_value] of the block reserved by this worker
+        self._blocks: Dict[SequenceKey, list] = {}
+        self._lock = threading.Lock()
+
+    def next_value(
+        self,
+        db: Session,
+        kind: str,
+        scope: str = "",
+        period: str = "",
+        seed: Optional[SeedFunction] = None
+    ) -> int:
+        """
+        Return the next number for (kind, scope, period)
+
+        Args:
+            db: Caller's session; in gap-free mode the increment commits with it
+            kind: Sequence kind, e.g. 'print_job'
+            scope: Partition inside the kind, e.g. location code
+            period: Reset period key, e.g. 'YYYYMMDD'
+            seed: Called once, when the counter row is first created, to continue
+                  from numbers issued before the counter existed
+        """
+        if kind in self.preallocate_kinds:
+            return self._next_from_block((kind, scope, period), seed)
+
+        counter = self._lock_counter(db, kind, scope, period, seed)
+        counter.current_value += 1
+        db.flush()
+        return counter.current_value
+
+    def next_committed_value(
+        self,
+        kind: str,
+        scope: str = "",
+        period: str = "",
+        seed: Optional[SeedFunction] = None
+    ) -> int:
+        """
+        Return the next number for (kind, scope, period), committed on its own
+
+        The counter row is only locked for the dedicated transaction, not until the
+        caller commits.
+        """
+        if kind in self.preallocate_kinds:
+            return self._next_from_block((kind, scope, period), seed)
+
+        first, _ = self.allocate_block(kind, scope, period, size=1, seed=seed)
+        return first
+
+    def allocate_block(
+        self,
+        kind: str,
+        scope: str = "",
+        period: str = "",
+        size: Optional[int] = None,
+        seed: Optional[SeedFunction] = None
+    ) -> Tuple[int, int]:
+        """
+        Reserve `size` consecutive numbers in a dedicated transaction
+
+        Returns:
+            Inclusive (first, last) range owned exclusively by the caller
+        """
+        from app.core.database import SessionLocal
+
+        size = size or self.block_size
+        db = SessionLocal()
+        try:
+            counter = self._lock_counter(db, kind, scope, period, seed)
+            first = counter.current_value + 1
+            counter.current_value += size
+            last = counter.current_value
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        logger.debug(f"Reserved {kind}/{scope}/{period} block {first}-{last}")
+        return first, last
+
+    def reset_blocks(self) -> None:
+        """Drop cached blocks (unused numbers in them are abandoned)"""
+        with self._lock:
+            self._blocks.clear()
+
+    def _next_from_block(self, key: SequenceKey, seed: Optional[SeedFunction]) -> int:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                first, last = self.allocate_block(*key, seed=seed)
+                block = [first, last]
+                self._blocks[key] = block
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def _lock_counter(
+        self,
+        db: Session,
+        kind: str,
+        scope: str,
+        period: str,
+        seed: Optional[SeedFunction]
+    ) -> SequenceCounter:
+        """Fetch the counter row FOR UPDATE, creating it race-free on first use"""
+        counter = self._select_for_update(db, kind, scope, period)
+        if counter is not None:
+            return counter
+
+        start_value = seed(db) if seed else 0
+        # Two workers may both get here; ON CONFLICT lets exactly one insert win
+        db.execute(
+            pg_insert(SequenceCounter.__table__)
+            .values(kind=kind, scope=scope, period=period, current_value=start_value)
+            .on_conflict_do_nothing(index_elements=["kind", "scope", "period"])
+        )
+        return self._select_for_update(db, kind, scope, period)
+
+    @staticmethod
+    def _select_for_update(db: Session, kind: str, scope: str, period: str) -> Optional[SequenceCounter]:
+        return db.query(SequenceCounter).filter(
+            SequenceCounter.kind == kind,
+            SequenceCounter.scope == scope,
+            SequenceCounter.period == period
+        ).with_for_update().populate_existing().first()
+
+
+def max_numeric_suffix(db: Session, column, prefix: str, separator: str = "") -> int:
+    """
+    Seed helper: highest number following `prefix` + `separator` in `column`
+
+    Only used the first time a counter row is created, so the LIKE scan runs once
+    per key instead of once per insert.
+    """
+    start = len(prefix) + len(separator)
+    highest = 0
+    for (value,) in db.query(column).filter(column.like(f"{prefix}{separator}%")):
+        try:
+            highest = max(highest, int(value[start:]))
+        except (TypeError, ValueError):
+            continue
+    return highest
+
+
+# Global instance
+sequence_service = SequenceService()
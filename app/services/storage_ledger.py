@@ -0,0 +1,492 @@
+"""
+Storage Usage Ledger for Madagascar License System
+Keeps running totals of the files on the storage volume so usage reports do
+not have to walk the YYYY/MM/DD trees
+
+The ledger is a SQLite database on the storage volume itself
+(<storage>/.storage_ledger.sqlite3), so it survives restarts and moves with
+the disk. The file managers record every file they write and forget every
+file they delete; each change updates, in the same transaction:
+
+- files            one row per stored file (path relative to the storage root)
+- type_usage       files/bytes per (area, file type), e.g. ("cards", "combined.pdf")
+- day_usage        files/bytes per (area, day, file type)
+- directory_usage  files/bytes per leaf directory (one print job, batch or issue)
+- area_usage       number of leaf directories per area
+
+An area is the top-level storage directory ("cards", "issues"). Totals and
+breakdowns read the aggregate tables directly, and large directories come
+from an index on directory_usage.bytes, so report cost does not grow with the
+number of stored files.
+
+Files written or removed outside the file managers (manual cleanup, restored
+backups, a crash between writing a file and recording it) make the ledger
+drift. reconcile() rescans the areas once, repairs the file rows, rebuilds the
+aggregates and remembers the empty directories it saw; run it with
+reconcile_storage_ledger.py.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILENAME = ".storage_ledger.sqlite3"
+LEDGER_AREAS = ("cards", "issues")
+
+# Files whose names carry a random suffix are counted under a common type
+TYPE_PREFIXES = ("additional_", "archive-")
+
+# Directories per statement when forgetting many at once (SQLite parameter limit)
+FORGET_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    area TEXT NOT NULL,
+    day TEXT,
+    directory TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS ix_files_area ON files (area);
+
+CREATE TABLE IF NOT EXISTS type_usage (
+    area TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (area, file_type)
+);
+
+CREATE TABLE IF NOT EXISTS day_usage (
+    area TEXT NOT NULL,
+    day TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (area, day, file_type)
+);
+
+CREATE TABLE IF NOT EXISTS directory_usage (
+    directory TEXT PRIMARY KEY,
+    area TEXT NOT NULL,
+    day TEXT,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_directory_usage_area_bytes ON directory_usage (area, bytes);
+
+CREATE TABLE IF NOT EXISTS area_usage (
+    area TEXT PRIMARY KEY,
+    directories INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ledger_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _classify(relative: str) -> Tuple[str, Optional[str], str, str]:
+    """
+    Split a storage-relative path into (area, day, directory, file_type)
+
+    The day comes from the first YYYY/MM/DD run of path components, so both
+    cards/2025/01/15/<job>/front.pdf and cards/batches/2025/01/15/<batch>/sheet.pdf
+    are dated 2025-01-15.
+    """
+    parts = relative.split("/")
+    area = parts[0]
+    day = None
+    for index in range(1, len(parts) - 3):
+        year, month, day_of_month = parts[index:index + 3]
+        if (len(year), len(month), len(day_of_month)) == (4, 2, 2) and (year + month + day_of_month).isdigit():
+            day = f"{year}-{month}-{day_of_month}"
+            break
+
+    name = parts[-1]
+    file_type = name
+    for prefix in TYPE_PREFIXES:
+        if name.startswith(prefix):
+            file_type = prefix.rstrip("_-")
+            break
+    return area, day, "/".join(parts[:-1]), file_type
+
+
+class StorageLedger:
+    """Incrementally maintained file counts and sizes of the storage volume"""
+
+    def __init__(self, base_path: Optional[Path] = None):
+        self.base_path = Path(base_path) if base_path else get_settings().get_file_storage_path()
+        self.ledger_path = self.base_path / LEDGER_FILENAME
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(str(self.ledger_path), check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path)
+        if path.is_absolute():
+            path = path.relative_to(self.base_path)
+        return path.as_posix()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, path: Path, size: int):
+        """Record a file written (or overwritten) at path with the given size"""
+        self._apply(lambda connection: self._upsert(connection, self._relative(path), size), "record", path)
+
+    def forget(self, path: Path):
+        """Record that the file at path was deleted"""
+        self._apply(lambda connection: self._remove(connection, self._relative(path)), "forget", path)
+
+    def forget_directory(self, directory: Path):
+        """Record that a leaf directory and all files in it were deleted"""
+        self.forget_directories([directory])
+
+    def forget_directories(self, directories: Iterable[Path]):
+        """Record that leaf directories and all files in them were deleted (set-based, one transaction)"""
+        relative = [self._relative(directory) for directory in directories]
+        if not relative:
+            return
+
+        def remove_all(connection: sqlite3.Connection):
+            for start in range(0, len(relative), FORGET_CHUNK_SIZE):
+                chunk = relative[start:start + FORGET_CHUNK_SIZE]
+                marks = ",".join("?" * len(chunk))
+                usage = connection.execute(
+                    f"SELECT area, day, file_type, COUNT(*), SUM(size) FROM files "
+                    f"WHERE directory IN ({marks}) GROUP BY area, day, file_type",
+                    chunk,
+                ).fetchall()
+                for area, day, file_type, files, size in usage:
+                    self._adjust_totals(connection, area, day, file_type, -files, -size)
+                directories_by_area = connection.execute(
+                    f"SELECT area, COUNT(*) FROM directory_usage WHERE directory IN ({marks}) GROUP BY area", chunk
+                ).fetchall()
+                for area, count in directories_by_area:
+                    connection.execute("UPDATE area_usage SET directories = directories - ? WHERE area = ?", (count, area))
+                connection.execute(f"DELETE FROM directory_usage WHERE directory IN ({marks})", chunk)
+                connection.execute(f"DELETE FROM files WHERE directory IN ({marks})", chunk)
+
+        label = relative[0] if len(relative) == 1 else f"{len(relative)} directories"
+        self._apply(remove_all, "forget_directories", label)
+
+    def record_savings(self, area: str, kind: str, saved_bytes: int):
+        """Count a file stored smaller than it arrived (compression, re-encoding) and the bytes saved"""
+        def add(connection: sqlite3.Connection):
+            connection.executemany(
+                "INSERT INTO ledger_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + CAST(excluded.value AS INTEGER)",
+                ((f"saved_files:{area}:{kind}", "1"), (f"saved_bytes:{area}:{kind}", str(saved_bytes))),
+            )
+        self._apply(add, "record_savings", f"{area}/{kind}")
+
+    def _apply(self, change, action: str, path: Any):
+        """Run a change in one transaction; the ledger must never fail a file operation"""
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    change(connection)
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            logger.warning(f"Storage ledger {action} failed for {path} (reconcile will repair): {e}")
+
+    @staticmethod
+    def _adjust_totals(connection: sqlite3.Connection, area: str, day: Optional[str], file_type: str,
+                       files: int, size: int):
+        """Apply a change to the per-type and per-day aggregates"""
+        connection.execute(
+            "INSERT INTO type_usage (area, file_type, files, bytes) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (area, file_type) DO UPDATE SET files = files + excluded.files, bytes = bytes + excluded.bytes",
+            (area, file_type, files, size),
+        )
+        if day:
+            connection.execute(
+                "INSERT INTO day_usage (area, day, file_type, files, bytes) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (area, day, file_type) DO UPDATE SET files = files + excluded.files, bytes = bytes + excluded.bytes",
+                (area, day, file_type, files, size),
+            )
+        if files < 0:
+            connection.execute("DELETE FROM type_usage WHERE area = ? AND file_type = ? AND files <= 0", (area, file_type))
+            connection.execute("DELETE FROM day_usage WHERE area = ? AND day = ? AND file_type = ? AND files <= 0",
+                               (area, day, file_type))
+
+    def _adjust(self, connection: sqlite3.Connection, area: str, day: Optional[str], directory: str,
+                file_type: str, files: int, size: int):
+        """Apply a change to all aggregates for one file"""
+        self._adjust_totals(connection, area, day, file_type, files, size)
+        created = connection.execute(
+            "INSERT OR IGNORE INTO directory_usage (directory, area, day, files, bytes) VALUES (?, ?, ?, ?, ?)",
+            (directory, area, day, files, size),
+        ).rowcount
+        if not created:
+            connection.execute(
+                "UPDATE directory_usage SET files = files + ?, bytes = bytes + ? WHERE directory = ?",
+                (files, size, directory),
+            )
+        removed = 0
+        if files < 0:
+            removed = connection.execute(
+                "DELETE FROM directory_usage WHERE directory = ? AND files <= 0", (directory,)
+            ).rowcount
+        if created or removed:
+            connection.execute(
+                "INSERT INTO area_usage (area, directories) VALUES (?, ?) "
+                "ON CONFLICT (area) DO UPDATE SET directories = directories + excluded.directories",
+                (area, created - removed),
+            )
+
+    def _upsert(self, connection: sqlite3.Connection, relative: str, size: int):
+        area, day, directory, file_type = _classify(relative)
+        previous = connection.execute("SELECT size FROM files WHERE path = ?", (relative,)).fetchone()
+        if previous is None:
+            connection.execute(
+                "INSERT INTO files (path, area, day, directory, file_type, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (relative, area, day, directory, file_type, size),
+            )
+            self._adjust(connection, area, day, directory, file_type, 1, size)
+        elif previous[0] != size:
+            connection.execute("UPDATE files SET size = ? WHERE path = ?", (size, relative))
+            self._adjust(connection, area, day, directory, file_type, 0, size - previous[0])
+
+    def _remove(self, connection: sqlite3.Connection, relative: str):
+        row = connection.execute(
+            "SELECT area, day, directory, file_type, size FROM files WHERE path = ?", (relative,)
+        ).fetchone()
+        if row is None:
+            return
+        area, day, directory, file_type, size = row
+        connection.execute("DELETE FROM files WHERE path = ?", (relative,))
+        self._adjust(connection, area, day, directory, file_type, -1, -size)
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, parameters: Iterable[Any] = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, tuple(parameters)).fetchall()
+
+    def _meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM ledger_meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def totals(self, area: str) -> Dict[str, Any]:
+        """Files, bytes and leaf directories of an area, with per-type totals"""
+        by_type = {
+            file_type: {"files": files, "bytes": size}
+            for file_type, files, size in self._query(
+                "SELECT file_type, files, bytes FROM type_usage WHERE area = ? ORDER BY file_type", (area,)
+            )
+        }
+        directories = self._query("SELECT directories FROM area_usage WHERE area = ?", (area,))
+        return {
+            "files": sum(entry["files"] for entry in by_type.values()),
+            "bytes": sum(entry["bytes"] for entry in by_type.values()),
+            "directories": directories[0][0] if directories else 0,
+            "by_type": by_type,
+            "reconciled_at": self._meta(f"reconciled_at:{area}"),
+        }
+
+    def savings(self, area: str) -> Dict[str, Dict[str, int]]:
+        """Files and bytes saved per kind (see record_savings)"""
+        result: Dict[str, Dict[str, int]] = {}
+        for key, value in self._query(
+            "SELECT key, value FROM ledger_meta WHERE key LIKE ? OR key LIKE ?",
+            (f"saved_files:{area}:%", f"saved_bytes:{area}:%"),
+        ):
+            counter, _, kind = key.split(":", 2)
+            result.setdefault(kind, {"files": 0, "bytes": 0})["files" if counter == "saved_files" else "bytes"] = int(value)
+        return result
+
+    def by_day(self, area: str, start_day: Optional[str] = None, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day usage of an area (days as YYYY-MM-DD, inclusive bounds), oldest first"""
+        rows = self._query(
+            "SELECT day, file_type, files, bytes FROM day_usage "
+            "WHERE area = ? AND day >= ? AND day <= ? ORDER BY day, file_type",
+            (area, start_day or "0000-00-00", end_day or "9999-99-99"),
+        )
+        days: Dict[str, Dict[str, Any]] = {}
+        for day, file_type, files, size in rows:
+            entry = days.setdefault(day, {"day": day, "files": 0, "bytes": 0, "by_type": {}})
+            entry["files"] += files
+            entry["bytes"] += size
+            entry["by_type"][file_type] = {"files": files, "bytes": size}
+        return list(days.values())
+
+    def large_directories(self, area: str, min_bytes: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Leaf directories of an area holding more than min_bytes, largest first"""
+        rows = self._query(
+            "SELECT directory, day, files, bytes FROM directory_usage "
+            "WHERE area = ? AND bytes > ? ORDER BY bytes DESC LIMIT ?",
+            (area, min_bytes, limit),
+        )
+        return [
+            {"directory": str(self.base_path / directory), "day": day, "file_count": files, "size_bytes": size}
+            for directory, day, files, size in rows
+        ]
+
+    def directory_usage(self, directory: Path) -> Dict[str, int]:
+        """Files and bytes recorded for one leaf directory"""
+        rows = self._query("SELECT files, bytes FROM directory_usage WHERE directory = ?", (self._relative(directory),))
+        files, size = rows[0] if rows else (0, 0)
+        return {"files": files, "bytes": size}
+
+    def empty_directories(self, area: str) -> List[str]:
+        """Empty directories seen by the last reconcile of an area"""
+        value = self._meta(f"empty_directories:{area}")
+        return json.loads(value) if value else []
+
+    # ------------------------------------------------------------------
+    # Reconcile
+    # ------------------------------------------------------------------
+
+    def _scan(self, area: str) -> Tuple[Dict[str, int], List[str], int]:
+        """Walk an area: ({relative path: size}, empty directories, directory count)"""
+        found: Dict[str, int] = {}
+        empty: List[str] = []
+        directories = 0
+        root = self.base_path / area
+        if not root.exists():
+            return found, empty, directories
+        for directory, subdirectories, filenames in os.walk(root):
+            directories += len(subdirectories)
+            if not subdirectories and not filenames and Path(directory) != root:
+                empty.append(directory)
+            relative_directory = Path(directory).relative_to(self.base_path).as_posix()
+            for filename in filenames:
+                try:
+                    found[f"{relative_directory}/{filename}"] = os.stat(os.path.join(directory, filename)).st_size
+                except FileNotFoundError:
+                    continue  # Deleted while scanning
+        return found, empty, directories
+
+    def reconcile(self, areas: Iterable[str] = LEDGER_AREAS, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Compare the ledger with the files on disk and repair any drift
+
+        Args:
+            areas: Top-level storage directories to reconcile
+            dry_run: Report the drift without changing the ledger
+
+        Returns:
+            Per-area drift: files missing from the ledger, files no longer on disk,
+            files whose size changed, and byte totals before/after
+        """
+        report: Dict[str, Any] = {"dry_run": dry_run, "areas": {}}
+        for area in areas:
+            started_at = datetime.utcnow().isoformat()
+            found, empty, directories = self._scan(area)
+            recorded = dict(self._query("SELECT path, size FROM files WHERE area = ?", (area,)))
+
+            missing = {path: size for path, size in found.items() if path not in recorded}
+            stale = [path for path in recorded if path not in found]
+            resized = {path: size for path, size in found.items() if path in recorded and recorded[path] != size}
+            ledger_bytes = self.totals(area)["bytes"]
+            disk_bytes = sum(found.values())
+
+            area_report = {
+                "files_on_disk": len(found),
+                "files_in_ledger": len(recorded),
+                "bytes_on_disk": disk_bytes,
+                "bytes_in_ledger": ledger_bytes,
+                "missing_from_ledger": len(missing),
+                "no_longer_on_disk": len(stale),
+                "size_changed": len(resized),
+                "empty_directories": len(empty),
+                "directories": directories,
+                "drift_detected": bool(missing or stale or resized or ledger_bytes != disk_bytes),
+            }
+            report["areas"][area] = area_report
+            if dry_run:
+                continue
+
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    for path in stale:
+                        connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                    for path, size in resized.items():
+                        connection.execute("UPDATE files SET size = ? WHERE path = ?", (size, path))
+                    connection.executemany(
+                        "INSERT INTO files (path, area, day, directory, file_type, size) VALUES (?, ?, ?, ?, ?, ?)",
+                        ((path, *_classify(path), size) for path, size in missing.items()),
+                    )
+                    self._rebuild_aggregates(connection, area)
+                    connection.executemany(
+                        "INSERT INTO ledger_meta (key, value) VALUES (?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                        ((f"reconciled_at:{area}", started_at), (f"empty_directories:{area}", json.dumps(empty))),
+                    )
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            logger.info(
+                f"Storage ledger reconciled for {area}: +{len(missing)} / -{len(stale)} / ~{len(resized)} files, "
+                f"{ledger_bytes:,} -> {disk_bytes:,} bytes"
+            )
+        return report
+
+    @staticmethod
+    def _rebuild_aggregates(connection: sqlite3.Connection, area: str):
+        """Recompute an area's aggregate rows from its file rows"""
+        for table in ("type_usage", "day_usage", "directory_usage"):
+            connection.execute(f"DELETE FROM {table} WHERE area = ?", (area,))
+        connection.execute(
+            "INSERT INTO type_usage (area, file_type, files, bytes) "
+            "SELECT area, file_type, COUNT(*), SUM(size) FROM files WHERE area = ? GROUP BY file_type",
+            (area,),
+        )
+        connection.execute(
+            "INSERT INTO day_usage (area, day, file_type, files, bytes) "
+            "SELECT area, day, file_type, COUNT(*), SUM(size) FROM files "
+            "WHERE area = ? AND day IS NOT NULL GROUP BY day, file_type",
+            (area,),
+        )
+        connection.execute(
+            "INSERT INTO directory_usage (directory, area, day, files, bytes) "
+            "SELECT directory, area, MIN(day), COUNT(*), SUM(size) FROM files WHERE area = ? GROUP BY directory",
+            (area,),
+        )
+        connection.execute(
+            "INSERT INTO area_usage (area, directories) "
+            "SELECT ?, COUNT(*) FROM directory_usage WHERE area = ? "
+            "ON CONFLICT (area) DO UPDATE SET directories = excluded.directories",
+            (area, area),
+        )
+
+
+# Global instance
+storage_ledger = StorageLedger()
@@ -0,0 +1,563 @@
+"""
+Storage Reconciliation for Madagascar License System
+Finds orphaned and missing biometric and card files with sorted merge-joins
+
+The older orphan checks go file by file: cleanup_orphaned_images tests every
+fingerprint image against a list of template ids, and the card cleanup asks
+the database about one job at a time. A reconciliation run instead lists one
+directory shard, loads the database keys for the same shard, sorts both and
+walks them once:
+
+    on disk    a  c  d     f
+    database   a     d  e  f      ->  orphan c, missing e
+
+Areas and their shards:
+
+- fingerprints: fingerprints/<template_id>.png against active
+  fingerprint_templates, one shard per leading hex digit (a primary key range)
+- biometric: biometric/YYYY/MM/DD/<application_id>/<file> against
+  application_biometric_data.file_path and the license-ready copy recorded in
+  capture_metadata, one shard per day
+- cards: cards/YYYY/MM/DD/<print_job_id>/ against print jobs with generated
+  files, by the directory of their stored paths, one shard per day; job
+  directories packed into the cold archive count as present, and every stored
+  path of a matched job must exist
+
+Memory is bounded by the largest shard, not the tree. Shards run on
+STORAGE_RECONCILE_WORKERS threads with a session each; the per-day queries use
+the prefix indexes from add_storage_reconciliation_indexes_migration.py.
+
+An orphan candidate is only reported when it is older than
+STORAGE_RECONCILE_GRACE_MINUTES (uploads write the file before the row is
+committed) and, for biometric and card files, when its application or job does
+not reference it under another path. Those are counted as
+"referenced_elsewhere" and left alone.
+
+Every finding is streamed to <storage>/.storage_reconciliation/<run_id>.jsonl
+and the run summary is appended to history.jsonl next to it. With
+quarantine=True orphans are moved, not deleted, to
+<storage>/.quarantine/<run_id>/ under their original relative path; moving
+them back restores them.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.application import ApplicationBiometricData
+from app.models.biometric import FingerprintTemplate
+from app.models.printing import PrintJob
+from app.services.cold_archive import DAY_PATTERN, cold_archive
+from app.services.storage_ledger import LEDGER_AREAS, storage_ledger
+
+logger = logging.getLogger(__name__)
+
+AREAS = ("fingerprints", "biometric", "cards")
+REPORT_DIRECTORY = ".storage_reconciliation"
+HISTORY_FILENAME = "history.jsonl"
+QUARANTINE_DIRECTORY = ".quarantine"
+SAMPLE_SIZE = 50
+QUERY_PAGE_SIZE = 1000
+HEX_DIGITS = "0123456789abcdef"
+DAY_RE = re.compile(r"^\d{4}/\d{2}/\d{2}$")
+FINDING_COUNTERS = {"orphan": "orphans", "missing": "missing", "referenced_elsewhere": "referenced_elsewhere"}
+
+
+class ReconciliationRunning(Exception):
+    """Raised when a run is requested while another one is still running"""
+
+
+def merge_join(on_disk: Iterable[str], in_db: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Walk two ascending, duplicate-free key streams once
+
+    Yields ("orphan", key) for keys only on disk, ("missing", key) for keys
+    only in the database and ("matched", key) for keys in both.
+    """
+    disk = iter(on_disk)
+    database = iter(in_db)
+    on_disk_key = next(disk, None)
+    db_key = next(database, None)
+    while on_disk_key is not None or db_key is not None:
+        if db_key is None or (on_disk_key is not None and on_disk_key < db_key):
+            yield "orphan", on_disk_key
+            on_disk_key = next(disk, None)
+        elif on_disk_key is None or db_key < on_disk_key:
+            yield "missing", db_key
+            db_key = next(database, None)
+        else:
+            yield "matched", on_disk_key
+            on_disk_key = next(disk, None)
+            db_key = next(database, None)
+
+
+def _as_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+class _Run:
+    """Counters, samples and the findings file of one run, shared by the shard workers"""
+
+    def __init__(self, run_id: str, areas: List[str], quarantine: bool, findings_path: Path, grace_cutoff: float):
+        self.run_id = run_id
+        self.quarantine = quarantine
+        self.grace_cutoff = grace_cutoff
+        self.areas: Dict[str, Dict[str, Any]] = {
+            area: {
+                "shards": 0, "orphans": 0, "missing": 0, "referenced_elsewhere": 0,
+                "recent_skipped": 0, "quarantined": 0, "errors": 0,
+                "orphan_sample": [], "missing_sample": [],
+            }
+            for area in areas
+        }
+        self._lock = threading.Lock()
+        self._findings = open(findings_path, "a", encoding="utf-8")
+
+    def add(self, area: str, kind: str, path: str, **details):
+        with self._lock:
+            counts = self.areas[area]
+            counts[FINDING_COUNTERS[kind]] += 1
+            sample = counts.get(f"{kind}_sample")
+            if sample is not None and len(sample) < SAMPLE_SIZE:
+                sample.append(path)
+            self._findings.write(json.dumps({"area": area, "kind": kind, "path": path, **details}) + "\n")
+
+    def count(self, area: str, counter: str):
+        with self._lock:
+            self.areas[area][counter] += 1
+
+    def close(self):
+        self._findings.close()
+
+
+class StorageReconciliation:
+    """Orphan and missing file detection for biometric and card storage"""
+
+    def __init__(self, base_path: Optional[Path] = None):
+        self.settings = get_settings()
+        self.base_path = Path(base_path) if base_path else self.settings.get_file_storage_path()
+        self.report_path = self.base_path / REPORT_DIRECTORY
+        self.history_path = self.report_path / HISTORY_FILENAME
+        self.quarantine_path = self.base_path / QUARANTINE_DIRECTORY
+        self._run_lock = threading.Lock()
+
+    def _session(self) -> Session:
+        from app.core.database import SessionLocal
+
+        return SessionLocal()
+
+    # ------------------------------------------------------------------
+    # Shards
+    # ------------------------------------------------------------------
+
+    def shards(self, db: Session, areas: Iterable[str]) -> List[Tuple[str, str]]:
+        """(area, shard) pairs: hex digits for fingerprints, YYYY/MM/DD days otherwise"""
+        areas = set(areas)
+        shards = []
+        if "fingerprints" in areas:
+            shards += [("fingerprints", digit) for digit in HEX_DIGITS]
+        if "biometric" in areas:
+            days = self._disk_days(self.base_path / "biometric") | self._biometric_days(db)
+            shards += [("biometric", day) for day in sorted(days)]
+        if "cards" in areas:
+            days = self._disk_days(self.base_path / "cards") | self._card_days(db)
+            shards += [("cards", day) for day in sorted(days)]
+        return shards
+
+    @staticmethod
+    def _disk_days(root: Path) -> Set[str]:
+        if not root.exists():
+            return set()
+        return {day.relative_to(root).as_posix() for day in root.glob(DAY_PATTERN) if day.is_dir()}
+
+    def _biometric_prefix(self, day: str = "") -> str:
+        """Absolute path prefix biometric rows store, as written by the upload endpoint"""
+        return f"{self.base_path / 'biometric' / day}/" if day else f"{self.base_path / 'biometric'}/"
+
+    def _biometric_days(self, db: Session) -> Set[str]:
+        prefix = self._biometric_prefix()
+        rows = db.execute(
+            text("""
+                SELECT DISTINCT substring(file_path FROM :start FOR 10)
+                FROM application_biometric_data
+                WHERE file_path LIKE :pattern
+            """),
+            {"start": len(prefix) + 1, "pattern": prefix + "%"}
+        )
+        return {day for (day,) in rows if day and DAY_RE.match(day)}
+
+    @staticmethod
+    def _card_days(db: Session) -> Set[str]:
+        rows = db.execute(text("""
+            SELECT DISTINCT substring(pdf_front_path FROM 7 FOR 10)
+            FROM print_jobs
+            WHERE pdf_files_generated AND pdf_front_path LIKE 'cards/%'
+        """))
+        return {day for (day,) in rows if day and DAY_RE.match(day)}
+
+    # ------------------------------------------------------------------
+    # Fingerprints
+    # ------------------------------------------------------------------
+
+    def _reconcile_fingerprints(self, db: Session, digit: str, run: _Run):
+        root = self.base_path / "fingerprints"
+        for kind, template_id in merge_join(self._fingerprint_files(digit), self._fingerprint_ids(db, digit)):
+            if kind == "orphan":
+                self._orphan(run, "fingerprints", root / f"{template_id}.png")
+            elif kind == "missing":
+                run.add("fingerprints", "missing", f"fingerprints/{template_id}.png")
+
+    def _fingerprint_files(self, digit: str) -> List[str]:
+        """Sorted image stems whose first character falls in the digit's shard"""
+        position = HEX_DIGITS.index(digit)
+        upper = HEX_DIGITS[position + 1] if position + 1 < len(HEX_DIGITS) else None
+        stems = []
+        try:
+            with os.scandir(self.base_path / "fingerprints") as entries:
+                for entry in entries:
+                    first = entry.name[:1]
+                    # The first and last shard also take names outside 0-f, so every file is covered
+                    if (position and first < digit) or (upper and first >= upper):
+                        continue
+                    if entry.name.endswith(".png") and entry.is_file(follow_symlinks=False):
+                        stems.append(entry.name[:-4])
+        except FileNotFoundError:
+            pass
+        return sorted(stems)
+
+    @staticmethod
+    def _fingerprint_ids(db: Session, digit: str) -> Iterator[str]:
+        """Active template ids in the digit's primary key range, ascending"""
+        position = HEX_DIGITS.index(digit)
+        query = db.query(FingerprintTemplate.id).filter(FingerprintTemplate.is_active == True)
+        if position:
+            query = query.filter(FingerprintTemplate.id >= uuid.UUID(digit + "0" * 31))
+        if position + 1 < len(HEX_DIGITS):
+            query = query.filter(FingerprintTemplate.id < uuid.UUID(HEX_DIGITS[position + 1] + "0" * 31))
+        # uuid ordering is byte order, which is the order of the lowercase hex strings
+        for (template_id,) in query.order_by(FingerprintTemplate.id).yield_per(QUERY_PAGE_SIZE):
+            yield str(template_id)
+
+    # ------------------------------------------------------------------
+    # Biometric
+    # ------------------------------------------------------------------
+
+    def _reconcile_biometric(self, db: Session, day: str, run: _Run):
+        root = self.base_path / "biometric"
+        candidates = []
+        for kind, key in merge_join(self._day_files(root / day, day), self._biometric_references(db, day)):
+            if kind == "orphan":
+                candidates.append(key)
+            elif kind == "missing":
+                run.add("biometric", "missing", f"biometric/{key}")
+        if not candidates:
+            return
+
+        referenced = self._biometric_referenced_names(db, {key.split("/")[3] for key in candidates if key.count("/") == 4})
+        for key in candidates:
+            parts = key.split("/")
+            if len(parts) == 5 and (parts[3], parts[4]) in referenced:
+                run.add("biometric", "referenced_elsewhere", f"biometric/{key}")
+            else:
+                self._orphan(run, "biometric", root / key)
+
+    @staticmethod
+    def _day_files(day_directory: Path, day: str) -> List[str]:
+        """Sorted "<day>/<owner>/<file>" keys of a day directory (and any loose "<day>/<file>")"""
+        keys = []
+        try:
+            with os.scandir(day_directory) as leaves:
+                for leaf in leaves:
+                    if leaf.is_dir(follow_symlinks=False):
+                        with os.scandir(leaf.path) as entries:
+                            keys.extend(
+                                f"{day}/{leaf.name}/{entry.name}" for entry in entries
+                                if entry.is_file(follow_symlinks=False)
+                            )
+                    elif leaf.is_file(follow_symlinks=False):
+                        keys.append(f"{day}/{leaf.name}")
+        except FileNotFoundError:
+            pass
+        return sorted(keys)
+
+    @staticmethod
+    def _license_ready_path(capture_metadata: Any) -> Optional[str]:
+        if isinstance(capture_metadata, str):
+            try:
+                capture_metadata = json.loads(capture_metadata)
+            except ValueError:
+                return None
+        if not isinstance(capture_metadata, dict):
+            return None
+        return (capture_metadata.get("license_ready_version") or {}).get("file_path")
+
+    def _biometric_references(self, db: Session, day: str) -> List[str]:
+        """Sorted "<day>/<application_id>/<file>" keys of the files a day's rows reference"""
+        root = self._biometric_prefix()
+        prefix = self._biometric_prefix(day)
+        references = set()
+        # LIKE treats "_" in the storage path as a wildcard; startswith() below is exact
+        query = db.query(
+            ApplicationBiometricData.file_path, ApplicationBiometricData.capture_metadata
+        ).filter(ApplicationBiometricData.file_path.like(prefix + "%"))
+        for file_path, capture_metadata in query.yield_per(QUERY_PAGE_SIZE):
+            for path in (file_path, self._license_ready_path(capture_metadata)):
+                if path and path.startswith(prefix):
+                    references.add(path[len(root):])
+        return sorted(references)
+
+    def _biometric_referenced_names(self, db: Session, application_ids: Set[str]) -> Set[Tuple[str, str]]:
+        """(application_id, file name) of every file the applications reference, wherever stored"""
+        ids = [application_id for application_id in map(_as_uuid, application_ids) if application_id]
+        if not ids:
+            return set()
+        names = set()
+        query = db.query(
+            ApplicationBiometricData.application_id,
+            ApplicationBiometricData.file_path,
+            ApplicationBiometricData.capture_metadata
+        ).filter(ApplicationBiometricData.application_id.in_(ids))
+        for application_id, file_path, capture_metadata in query:
+            for path in (file_path, self._license_ready_path(capture_metadata)):
+                if path:
+                    names.add((str(application_id), path.replace("\\", "/").rsplit("/", 1)[-1]))
+        return names
+
+    # ------------------------------------------------------------------
+    # Cards
+    # ------------------------------------------------------------------
+
+    def _reconcile_cards(self, db: Session, day: str, run: _Run):
+        day_directory = self.base_path / "cards" / day
+        loose = self._job_directories(day_directory)
+        archived = cold_archive.archived_directories(day_directory)
+        jobs = self._card_jobs(db, day)
+
+        candidates = []
+        for kind, name in merge_join(sorted(loose | set(archived)), sorted(jobs)):
+            if kind == "orphan":
+                candidates.append(name)
+            elif kind == "missing":
+                run.add("cards", "missing", f"cards/{day}/{name}")
+            else:
+                present = set(archived.get(name, ()))
+                if name in loose:
+                    present.update(os.listdir(day_directory / name))
+                for file_name in sorted(set(jobs[name]) - present):
+                    run.add("cards", "missing", f"cards/{day}/{name}/{file_name}")
+        if not candidates:
+            return
+
+        with_files = self._card_jobs_with_files(db, candidates)
+        for name in candidates:
+            if name in with_files:
+                run.add("cards", "referenced_elsewhere", f"cards/{day}/{name}")
+            else:
+                self._orphan(run, "cards", day_directory / name, archived=name not in loose)
+
+    @staticmethod
+    def _job_directories(day_directory: Path) -> Set[str]:
+        try:
+            with os.scandir(day_directory) as entries:
+                return {entry.name for entry in entries if entry.is_dir(follow_symlinks=False)}
+        except FileNotFoundError:
+            return set()
+
+    @staticmethod
+    def _card_jobs(db: Session, day: str) -> Dict[str, List[str]]:
+        """Stored file names per job directory of a day, for jobs with generated files"""
+        prefix = f"cards/{day}/"
+        jobs: Dict[str, List[str]] = {}
+        query = db.query(
+            PrintJob.pdf_front_path, PrintJob.pdf_back_path, PrintJob.pdf_combined_path
+        ).filter(
+            PrintJob.pdf_files_generated == True,
+            PrintJob.pdf_front_path.like(prefix + "%")
+        )
+        for paths in query.yield_per(QUERY_PAGE_SIZE):
+            for path in paths:
+                if path and path.startswith(prefix):
+                    directory, _, name = path[len(prefix):].partition("/")
+                    if name and "/" not in name:
+                        jobs.setdefault(directory, []).append(name)
+        return jobs
+
+    @staticmethod
+    def _card_jobs_with_files(db: Session, names: List[str]) -> Set[str]:
+        ids = [job_id for job_id in map(_as_uuid, names) if job_id]
+        if not ids:
+            return set()
+        rows = db.query(PrintJob.id).filter(PrintJob.id.in_(ids), PrintJob.pdf_files_generated == True)
+        return {str(job_id) for (job_id,) in rows}
+
+    # ------------------------------------------------------------------
+    # Orphans
+    # ------------------------------------------------------------------
+
+    def _orphan(self, run: _Run, area: str, path: Path, archived: bool = False):
+        relative = path.relative_to(self.base_path).as_posix()
+        if archived:
+            # Only in a bundle: reported, released when the job is deleted
+            run.add(area, "orphan", relative, archived=True)
+            return
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            return  # Removed while the shard was being compared
+        if modified > run.grace_cutoff:
+            run.count(area, "recent_skipped")
+            return
+        quarantined_to = self._quarantine(run, area, path, relative) if run.quarantine else None
+        run.add(area, "orphan", relative, quarantined_to=quarantined_to)
+
+    def _quarantine(self, run: _Run, area: str, path: Path, relative: str) -> Optional[str]:
+        target = self.quarantine_path / run.run_id / relative
+        is_directory = path.is_dir()
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        except OSError as e:
+            logger.warning(f"Could not quarantine {path}: {e}")
+            run.count(area, "errors")
+            return None
+        if area in LEDGER_AREAS:
+            if is_directory:
+                storage_ledger.forget_directory(path)
+            else:
+                storage_ledger.forget(path)
+        run.count(area, "quarantined")
+        return target.relative_to(self.base_path).as_posix()
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, areas: Iterable[str] = AREAS, quarantine: bool = False, trigger: str = "manual") -> Dict[str, Any]:
+        """
+        Compare storage with the database (blocking)
+
+        Args:
+            areas: Any of fingerprints, biometric, cards
+            quarantine: Move orphans to <storage>/.quarantine/<run_id>/
+            trigger: Recorded in the history ("script" or "manual:<username>")
+
+        Raises:
+            ValueError: unknown area
+            ReconciliationRunning: another run is in progress
+        """
+        areas = list(areas)
+        unknown = [area for area in areas if area not in AREAS]
+        if unknown:
+            raise ValueError(f"Unknown storage area(s): {', '.join(unknown)}")
+        if not self._run_lock.acquire(blocking=False):
+            raise ReconciliationRunning("A storage reconciliation is already running")
+        try:
+            return self._run([area for area in AREAS if area in areas], quarantine, trigger)
+        finally:
+            self._run_lock.release()
+
+    def _run(self, areas: List[str], quarantine: bool, trigger: str) -> Dict[str, Any]:
+        started_at = datetime.utcnow()
+        started = time.monotonic()
+        run_id = f"{started_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        grace_minutes = self.settings.STORAGE_RECONCILE_GRACE_MINUTES
+        self.report_path.mkdir(parents=True, exist_ok=True)
+        findings_path = self.report_path / f"{run_id}.jsonl"
+
+        db = self._session()
+        try:
+            shards = self.shards(db, areas)
+        finally:
+            db.close()
+
+        run = _Run(run_id, areas, quarantine, findings_path, time.time() - grace_minutes * 60)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.settings.STORAGE_RECONCILE_WORKERS),
+                                    thread_name_prefix="storage-reconcile") as pool:
+                list(pool.map(lambda shard: self._reconcile_shard(run, *shard), shards))
+        finally:
+            run.close()
+
+        report = {
+            "run_id": run_id,
+            "started_at": started_at.isoformat(),
+            "trigger": trigger,
+            "quarantine": quarantine,
+            "grace_minutes": grace_minutes,
+            "shards": len(shards),
+            "areas": run.areas,
+            "findings_file": findings_path.relative_to(self.base_path).as_posix(),
+            "duration_seconds": round(time.monotonic() - started, 2),
+        }
+        if quarantine:
+            report["quarantine_directory"] = (self.quarantine_path / run_id).relative_to(self.base_path).as_posix()
+        self._record(report)
+        logger.info(
+            f"Storage reconciliation {run_id}: " + ", ".join(
+                f"{area} {counts['orphans']} orphaned/{counts['missing']} missing" for area, counts in run.areas.items()
+            ) + f" in {report['duration_seconds']} s"
+        )
+        return report
+
+    def _reconcile_shard(self, run: _Run, area: str, shard: str):
+        db = self._session()
+        try:
+            getattr(self, f"_reconcile_{area}")(db, shard, run)
+            run.count(area, "shards")
+        except Exception as e:
+            logger.error(f"Storage reconciliation of {area} shard {shard} failed: {e}")
+            run.count(area, "errors")
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+
+    def _record(self, report: Dict[str, Any]):
+        try:
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record storage reconciliation: {e}")
+
+    def history(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent run summaries, newest first"""
+        try:
+            with open(self.history_path, encoding="utf-8") as f:
+                lines = deque(f, maxlen=limit)
+        except FileNotFoundError:
+            return []
+        return [json.loads(line) for line in reversed(lines) if line.strip()]
+
+    def latest_run(self, area: str) -> Optional[Dict[str, Any]]:
+        """Most recent run that covered the area"""
+        return next((report for report in self.history() if area in report["areas"]), None)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._run_lock.locked(),
+            "workers": self.settings.STORAGE_RECONCILE_WORKERS,
+            "grace_minutes": self.settings.STORAGE_RECONCILE_GRACE_MINUTES,
+            "recent_runs": self.history(),
+        }
+
+
+# Global instance
+storage_reconciliation = StorageReconciliation()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Print File Retention Benchmark
+Deletes synthetic print job directories the old way (delete_print_job_files +
+verify_complete_cleanup per job) and the retention way (bulk removal, one
+directory prune per pass) and compares throughput
+
+The database side of a pass (one indexed page query and one UPDATE per
+PRINT_FILE_RETENTION_BATCH_SIZE jobs) is not exercised here; this measures the
+disk work, which dominates.
+
+Usage:
+    python benchmark_print_file_retention.py [jobs]      # default 100000
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.card_file_manager import card_file_manager
+from app.services.print_file_retention import print_file_retention
+from app.services.storage_ledger import storage_ledger
+
+DEFAULT_JOBS = 100000
+LEGACY_SAMPLE = 5000
+CARD_FILES = ("front.png", "back.png", "watermark.png", "front.pdf", "back.pdf", "combined.pdf")
+START_DAY = datetime(2024, 1, 1)
+
+
+def create_jobs(count: int):
+    jobs = []
+    for index in range(count):
+        created_at = START_DAY + timedelta(days=index % 365)
+        job_dir = card_file_manager._get_print_job_directory(f"job-{index:06d}", created_at)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        for name in CARD_FILES:
+            with open(job_dir / name, "wb") as f:
+                f.write(b"x" * 256)
+        jobs.append((f"job-{index:06d}", created_at, job_dir))
+    return jobs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_JOBS
+    print("🗑️  Print file retention benchmark")
+    print("=" * 50)
+    start = time.perf_counter()
+    jobs = create_jobs(count)
+    print(f"Created {count:,} jobs ({count * len(CARD_FILES):,} files) in {time.perf_counter() - start:.1f} s")
+    start = time.perf_counter()
+    storage_ledger.reconcile(["cards"])
+    print(f"Indexed them in the storage ledger in {time.perf_counter() - start:.1f} s")
+
+    legacy_jobs = jobs[:min(LEGACY_SAMPLE, count // 10 or 1)]
+    bulk_jobs = jobs[len(legacy_jobs):]
+
+    # Dry run sizing comes from the ledger: no file system access
+    start = time.perf_counter()
+    would_free = sum(storage_ledger.directory_usage(job_dir)["bytes"] for _, _, job_dir in bulk_jobs)
+    dry_run = time.perf_counter() - start
+    print(f"\nDry run sizing of {len(bulk_jobs):,} jobs: {would_free:,} bytes in {dry_run:.2f} s")
+
+    start = time.perf_counter()
+    for job_id, created_at, _ in legacy_jobs:
+        result = card_file_manager.delete_print_job_files(job_id, created_at)
+        assert result["status"] == "success", result
+        card_file_manager.verify_complete_cleanup(job_id, created_at)
+    legacy = (time.perf_counter() - start) / len(legacy_jobs)
+
+    print_file_retention.settings = print_file_retention.settings.model_copy(
+        update={"PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND": 0}
+    )
+    report = print_file_retention._new_report(datetime.utcnow(), "benchmark", dry_run=False)
+    start = time.perf_counter()
+    print_file_retention.purge_directories((job_dir for _, _, job_dir in bulk_jobs), report, time.monotonic())
+    pruned = sum(card_file_manager._cleanup_empty_directories(directory)
+                 for directory in sorted(report["_day_directories"], reverse=True))
+    bulk_total = time.perf_counter() - start
+    bulk = bulk_total / len(bulk_jobs)
+
+    assert report["jobs"] == len(bulk_jobs) and report["bytes_freed"] == would_free
+    assert not any(card_file_manager.cards_path.iterdir()), "directories left behind"
+    assert storage_ledger.totals("cards")["files"] == 0
+
+    print(f"\nPer-job delete + verify ({len(legacy_jobs):,} jobs)   {legacy * 1000:7.3f} ms/job "
+          f"-> {legacy * count:7.1f} s for {count:,}")
+    print(f"Retention bulk removal ({len(bulk_jobs):,} jobs)  {bulk * 1000:7.3f} ms/job "
+          f"-> {bulk_total:7.1f} s, {pruned:,} directories pruned once")
+    print(f"Speed-up {legacy / bulk:.1f}x; at the default pace of "
+          f"{print_file_retention.settings.model_fields['PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND'].default} "
+          f"jobs/s a {count:,} job backlog drains in "
+          f"{count / print_file_retention.settings.model_fields['PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND'].default / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        storage.cleanup()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Cold Archive Compaction
+Packs card and issue day directories older than COLD_ARCHIVE_AFTER_DAYS into
+per-day bundles (app/services/cold_archive.py) and prunes stale extracted
+copies from the archive cache
+
+Safe to run while the service is up: originals are only removed after their
+bundle is written and indexed, and files rewritten meanwhile stay loose.
+Schedule it daily (e.g. a Render cron job) outside office hours.
+
+Usage:
+    python compact_cold_archive.py                      # compact all areas
+    python compact_cold_archive.py --dry-run            # report what would be packed
+    python compact_cold_archive.py --older-than 30 issues
+"""
+
+import os
+import sys
+import time
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.cold_archive import ARCHIVE_DAY_ROOTS, cold_archive
+
+
+def main():
+    arguments = sys.argv[1:]
+    dry_run = "--dry-run" in arguments
+    older_than = None
+    if "--older-than" in arguments:
+        position = arguments.index("--older-than")
+        older_than = int(arguments[position + 1])
+        del arguments[position:position + 2]
+    areas = [argument for argument in arguments if argument != "--dry-run"] or list(ARCHIVE_DAY_ROOTS)
+    unknown = [area for area in areas if area not in ARCHIVE_DAY_ROOTS]
+    if unknown:
+        print(f"Unknown area(s): {', '.join(unknown)}. Available: {', '.join(ARCHIVE_DAY_ROOTS)}")
+        sys.exit(2)
+
+    print(f"🗄️  Cold archive compaction{' (dry run)' if dry_run else ''}")
+    print("=" * 50)
+    start = time.perf_counter()
+    report = cold_archive.compact(areas, older_than_days=older_than, dry_run=dry_run)
+    print(f"Day directories dated before {report['cutoff']}")
+    for area, totals in report["areas"].items():
+        print(f"{area}: {totals['days']:,} days, {totals['files']:,} files, {totals['bytes']:,} bytes"
+              + (f", {totals['errors']} errors" if totals['errors'] else ""))
+        if dry_run:
+            print(f"    disk usage now {totals['disk_usage_before']:,} bytes")
+        else:
+            print(f"    disk usage {totals['disk_usage_before']:,} -> {totals['disk_usage_after']:,} bytes")
+    if not dry_run:
+        print(f"Archive cache: {report['cache_files_pruned']:,} stale copies removed")
+    print(f"\nDone in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Storage File Reconcile
+Compares the fingerprint, biometric and card storage trees with the database
+and reports orphaned files (on disk, not referenced) and missing files
+(referenced, not on disk) - see app/services/storage_reconciliation.py
+
+Orphans are only moved when --quarantine is given, into
+<storage>/.quarantine/<run_id>/ under their original relative path. Review
+the findings file before deleting a quarantine directory; moving files back
+restores them.
+
+Usage:
+    python reconcile_storage_files.py                      # report only, all areas
+    python reconcile_storage_files.py cards biometric      # report on some areas
+    python reconcile_storage_files.py --quarantine         # move orphans aside
+"""
+
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.storage_reconciliation import AREAS, storage_reconciliation
+
+
+def main():
+    arguments = sys.argv[1:]
+    quarantine = "--quarantine" in arguments
+    areas = [argument for argument in arguments if argument != "--quarantine"] or list(AREAS)
+    unknown = [area for area in areas if area not in AREAS]
+    if unknown:
+        print(f"Unknown area(s): {', '.join(unknown)}. Available: {', '.join(AREAS)}")
+        sys.exit(2)
+
+    print(f"🔍 Storage file reconcile{' (quarantining orphans)' if quarantine else ''}: {storage_reconciliation.base_path}")
+    print("=" * 50)
+    report = storage_reconciliation.run(areas, quarantine=quarantine, trigger="script")
+
+    for area, counts in report["areas"].items():
+        status = "⚠️  findings" if counts["orphans"] or counts["missing"] else "✓ in sync"
+        print(f"{area}: {status} ({counts['shards']:,} shards)")
+        print(f"    orphaned {counts['orphans']:,}, missing {counts['missing']:,}, "
+              f"referenced elsewhere {counts['referenced_elsewhere']:,}, "
+              f"too recent to judge {counts['recent_skipped']:,}, errors {counts['errors']:,}")
+        if quarantine:
+            print(f"    quarantined {counts['quarantined']:,}")
+        for path in counts["orphan_sample"][:5]:
+            print(f"    orphan   {path}")
+        for path in counts["missing_sample"][:5]:
+            print(f"    missing  {path}")
+    print(f"\nFindings: {storage_reconciliation.base_path / report['findings_file']}")
+    if quarantine:
+        print(f"Quarantine: {storage_reconciliation.base_path / report['quarantine_directory']}")
+    print(f"Compared in {report['duration_seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Storage Ledger Reconcile
+Rescans the card and issue storage trees and repairs drift in the storage
+usage ledger (app/services/storage_ledger.py)
+
+Run once after deploying the ledger to index the files already on disk, and
+again whenever files were added or removed by hand or restored from backup.
+The scan is the same os.walk the usage reports used to do on every call, so
+schedule it outside office hours on large volumes.
+
+Usage:
+    python reconcile_storage_ledger.py                 # repair all areas
+    python reconcile_storage_ledger.py --dry-run       # report drift only
+    python reconcile_storage_ledger.py cards           # repair one area
+"""
+
+import os
+import sys
+import time
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.storage_ledger import LEDGER_AREAS, storage_ledger
+
+
+def main():
+    arguments = sys.argv[1:]
+    dry_run = "--dry-run" in arguments
+    areas = [argument for argument in arguments if argument != "--dry-run"] or list(LEDGER_AREAS)
+    unknown = [area for area in areas if area not in LEDGER_AREAS]
+    if unknown:
+        print(f"Unknown area(s): {', '.join(unknown)}. Available: {', '.join(LEDGER_AREAS)}")
+        sys.exit(2)
+
+    print(f"📒 Storage ledger reconcile{' (dry run)' if dry_run else ''}: {storage_ledger.ledger_path}")
+    print("=" * 50)
+    start = time.perf_counter()
+    report = storage_ledger.reconcile(areas, dry_run=dry_run)
+    elapsed = time.perf_counter() - start
+
+    for area, drift in report["areas"].items():
+        status = "⚠️  drift" if drift["drift_detected"] else "✓ in sync"
+        print(f"{area}: {status}")
+        print(f"    files   disk {drift['files_on_disk']:>10,} | ledger {drift['files_in_ledger']:>10,}")
+        print(f"    bytes   disk {drift['bytes_on_disk']:>14,} | ledger {drift['bytes_in_ledger']:>14,}")
+        print(f"    missing from ledger {drift['missing_from_ledger']:,}, no longer on disk "
+              f"{drift['no_longer_on_disk']:,}, size changed {drift['size_changed']:,}, "
+              f"empty directories {drift['empty_directories']:,}")
+    print(f"\nScanned in {elapsed:.1f} s" + ("" if dry_run else " - ledger repaired"))
+
+
+if __name__ == "__main__":
+    main()
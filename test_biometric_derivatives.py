@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Biometric Derivative Test
+Checks that the public mobile file route only serves variants that were
+already rendered (and the original otherwise), that an original that cannot
+be decoded fails with UnreadableImageError instead of an arbitrary PIL error,
+and that concurrent requests render a variant once without leaving per-variant
+locks behind
+
+Usage:
+    python test_biometric_derivatives.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException
+from PIL import Image
+
+from app.api.v1.endpoints.mobile import serve_mobile_biometric_file
+from app.services.biometric_derivatives import UnreadableImageError, biometric_derivative_cache as cache
+
+
+def original(name: str, content: bytes = None) -> Path:
+    relative = Path("biometric/2025/01/15") / str(uuid.uuid4()) / name
+    path = Path(storage.name) / relative
+    path.parent.mkdir(parents=True)
+    if content is None:
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), (180, 120, 90)).save(buffer, format="JPEG")
+        content = buffer.getvalue()
+    path.write_bytes(content)
+    return path
+
+
+def mobile(path: Path, variant: str):
+    relative = path.relative_to(storage.name).as_posix()
+    return asyncio.run(serve_mobile_biometric_file(file_path=relative, variant=variant, db=None))
+
+
+def test_mobile_serves_only_rendered_variants():
+    photo = original("photo_x.jpg")
+    misses = cache.stats()["misses"]
+
+    response = mobile(photo, "thumb")
+    assert Path(response.path) == photo.resolve() and response.media_type == "image/jpeg"
+    assert not cache.derivative_path(photo, "thumb").exists(), "public request rendered a variant"
+    assert cache.stats()["misses"] == misses
+
+    # Rendered by an authenticated request, then served from the public route
+    rendered = cache.get(photo, "thumb-webp")
+    response = mobile(photo, "thumb-webp")
+    assert Path(response.path) == rendered and response.media_type == "image/webp"
+    with Image.open(rendered) as image:
+        assert image.width == 160
+
+    try:
+        mobile(photo, "huge")
+        raise AssertionError("unknown variant accepted")
+    except HTTPException as e:
+        assert e.status_code == 400
+
+
+def test_unreadable_originals():
+    errors = cache.stats()["errors"]
+    good = original("photo_y.jpg").read_bytes()
+    for name, content in (("photo_bad.jpg", b"not an image at all"), ("photo_cut.jpg", good[: len(good) // 3])):
+        path = original(name, content)
+        try:
+            cache.get(path, "thumb")
+            raise AssertionError(f"{name} rendered")
+        except UnreadableImageError:
+            pass
+        assert not list(cache.derivative_path(path, "thumb").parent.glob("*")), "partial render left behind"
+        # The public route still serves the original as-is
+        assert Path(mobile(path, "thumb").path) == path.resolve()
+    assert cache.stats()["errors"] == errors + 2
+    assert not cache._generation_locks, "locks kept after failed renders"
+
+
+def test_concurrent_render_once():
+    photo = original("photo_z.jpg")
+    misses = cache.stats()["misses"]
+    start = threading.Barrier(8)
+    paths = []
+
+    def request():
+        start.wait()
+        paths.append(cache.get(photo, "medium"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(paths)) == 1 and len(paths) == 8
+    assert cache.stats()["misses"] == misses + 1, "variant rendered more than once"
+    assert not cache._generation_locks
+
+
+if __name__ == "__main__":
+    try:
+        print("🖼️  Biometric derivatives")
+        print("=" * 50)
+        for test in (test_mobile_serves_only_rendered_variants, test_unreadable_originals, test_concurrent_render_once):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        storage.cleanup()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Cold Archive Test
+Checks that archived card and issue files stay readable through the file
+managers, that deletes release bundles (reporting released archive members
+apart from freed disk space), and measures the disk blocks saved
+and the read latency on a synthetic card/issue tree
+
+Usage:
+    python test_cold_archive.py [jobs]      # benchmark size, default 20000
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.card_file_manager import card_file_manager
+from app.services.cold_archive import cold_archive, read_bundle_index
+from app.services.issue_file_manager import IssueFileManager
+from app.services.storage_ledger import storage_ledger
+
+DEFAULT_JOBS = 20000
+CARD_FILE_SIZES = {"front_image": 60_000, "back_image": 45_000, "watermark_image": 3_000,
+                   "front_pdf": 70_000, "back_pdf": 55_000, "combined_pdf": 120_000}
+OLD_DAY = datetime.utcnow() - timedelta(days=120)
+
+
+def card_files(scale: float = 1.0):
+    return {name: base64.b64encode(os.urandom(int(size * scale))).decode() for name, size in CARD_FILE_SIZES.items()}
+
+
+def disk_usage(path: Path) -> int:
+    """Allocated bytes (st_blocks) of all files under path"""
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            total += os.stat(os.path.join(directory, filename)).st_blocks * 512
+    return total
+
+
+def test_archived_reads_are_transparent():
+    job_id = str(uuid.uuid4())
+    recent_job = str(uuid.uuid4())
+    files = card_files(0.05)
+    card_file_manager.save_card_files(job_id, files, created_at=OLD_DAY)
+    card_file_manager.save_card_files(recent_job, files, created_at=datetime.utcnow())
+    card_file_manager.save_batch_sheet("batch-old", b"%PDF-sheet", created_at=OLD_DAY)
+    issues = IssueFileManager()
+    issue_id = uuid.uuid4()
+    logs = issues.save_console_logs(issue_id, ["TypeError: x is undefined"], created_at=OLD_DAY)
+
+    before = {file_type: card_file_manager.get_file_content(job_id, file_type, OLD_DAY)
+              for file_type in card_file_manager.CARD_FILE_NAMES}
+    report = cold_archive.compact()
+    assert report["areas"]["cards"]["files"] == 7 and report["areas"]["issues"]["files"] == 1, report
+
+    job_dir = card_file_manager._get_print_job_directory(job_id, OLD_DAY)
+    assert not job_dir.exists(), "loose files left behind"
+    assert card_file_manager._get_print_job_directory(recent_job).exists(), "recent job archived"
+    bundles = list(job_dir.parent.glob("archive-*.pack"))
+    assert len(bundles) == 1 and len(read_bundle_index(bundles[0])["files"]) == 6
+
+    for file_type, content in before.items():
+        assert card_file_manager.get_file_content(job_id, file_type, OLD_DAY) == content, file_type
+        path = card_file_manager.get_file_path(job_id, file_type, OLD_DAY)
+        assert path is not None and path.read_bytes() == content, file_type
+    assert card_file_manager.get_batch_sheet_path("batch-old", OLD_DAY).read_bytes() == b"%PDF-sheet"
+    assert issues.get_file_content(logs["file_path"])[0].startswith(b"Console Logs captured")
+    assert card_file_manager.get_file_content(str(uuid.uuid4()), "front_image", OLD_DAY) is None
+
+    # Ledger follows: loose files forgotten, bundles recorded
+    assert not storage_ledger.reconcile(dry_run=True)["areas"]["cards"]["drift_detected"]
+
+    # Deleting the job releases its archived files; the bundle goes once nothing in it is live
+    bundle_size = bundles[0].stat().st_size
+    result = card_file_manager.delete_print_job_files(job_id, OLD_DAY)
+    assert result["archived_files_released"] == 6 and card_file_manager.get_file_content(job_id, "front_image", OLD_DAY) is None
+    assert (result["files_deleted"], result["bytes_freed"]) == (0, bundle_size), result
+    assert not bundles[0].exists()
+    issues.delete_issue_files(issue_id, OLD_DAY)
+    assert "issues" not in cold_archive.stats(), "empty issue bundle kept"
+
+
+def test_rearchived_file_supersedes_old_copy():
+    job_id = str(uuid.uuid4())
+    card_file_manager.save_card_files(job_id, {"front_image": base64.b64encode(b"first").decode()}, created_at=OLD_DAY)
+    cold_archive.compact(["cards"])
+    # Regenerated after archiving: the loose file wins, then gets archived again
+    card_file_manager.save_card_files(job_id, {"front_image": base64.b64encode(b"second").decode()}, created_at=OLD_DAY)
+    assert card_file_manager.get_file_content(job_id, "front_image", OLD_DAY) == b"second"
+    cold_archive.compact(["cards"])
+    assert card_file_manager.get_file_content(job_id, "front_image", OLD_DAY) == b"second"
+    assert card_file_manager.get_file_path(job_id, "front_image", OLD_DAY).read_bytes() == b"second"
+    day_dir = card_file_manager._get_print_job_directory(job_id, OLD_DAY).parent
+    assert len(list(day_dir.glob("archive-*.pack"))) == 1, "superseded bundle not removed"
+    card_file_manager.delete_print_job_files(job_id, OLD_DAY)
+
+
+def test_released_members_are_not_freed_space():
+    """Deleting one job of a shared bundle releases its members; disk space frees with the bundle"""
+    day = OLD_DAY - timedelta(days=3)
+    first, second = str(uuid.uuid4()), str(uuid.uuid4())
+    for job_id in (first, second):
+        card_file_manager.save_card_files(job_id, card_files(0.01), created_at=day)
+    cold_archive.compact(["cards"])
+    first_dir = card_file_manager._get_print_job_directory(first, day)
+    bundle = next(first_dir.parent.glob("archive-*.pack"))
+    bundle_size = bundle.stat().st_size
+
+    result = card_file_manager.remove_job_directory(first_dir)
+    assert (result["files_deleted"], result["bytes_freed"]) == (0, 0), result
+    assert result["archived_files_released"] == 6 and result["archived_bytes_released"] > 0
+    assert bundle.exists() and bundle.stat().st_size == bundle_size
+    assert cold_archive.stats()["cards"]["live_bytes"] < cold_archive.stats()["cards"]["bytes"]
+
+    result = card_file_manager.remove_job_directory(card_file_manager._get_print_job_directory(second, day))
+    assert result["bytes_freed"] == bundle_size and result["archived_files_released"] == 6, result
+    assert not bundle.exists()
+
+
+def benchmark(jobs: int):
+    print(f"Synthetic tree: {jobs:,} print jobs over 30 days, 6 files each, plus {jobs // 4:,} issues")
+    issues = IssueFileManager()
+    start_day = OLD_DAY - timedelta(days=30)
+    job_ids = []
+    for index in range(jobs):
+        job_id = f"bench-{index:06d}"
+        created_at = start_day + timedelta(days=index % 30)
+        job_dir = card_file_manager._get_print_job_directory(job_id, created_at)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        for file_type, size in CARD_FILE_SIZES.items():
+            name = {"watermark_image": "watermark.png"}.get(file_type) or card_file_manager.CARD_FILE_NAMES[file_type]
+            with open(job_dir / name, "wb") as f:
+                f.write(os.urandom(size // 10))  # Scaled down to keep the benchmark quick
+        job_ids.append((job_id, created_at))
+    for index in range(jobs // 4):
+        issues.save_console_logs(uuid.uuid4(), [f"log line {line}" for line in range(20)],
+                                 created_at=start_day + timedelta(days=index % 30))
+
+    base = Path(storage.name)
+    loose_files = sum(len(filenames) for _, _, filenames in os.walk(base / "cards")) + \
+        sum(len(filenames) for _, _, filenames in os.walk(base / "issues"))
+    before = disk_usage(base / "cards") + disk_usage(base / "issues")
+    sample = job_ids[:: max(1, len(job_ids) // 500)]
+    start = time.perf_counter()
+    for job_id, created_at in sample:
+        card_file_manager.get_file_content(job_id, "combined_pdf", created_at)
+    loose_read = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    report = cold_archive.compact()
+    compaction = time.perf_counter() - start
+    after = disk_usage(base / "cards") + disk_usage(base / "issues")
+    archived_files = sum(len(filenames) for _, _, filenames in os.walk(base / "cards")) + \
+        sum(len(filenames) for _, _, filenames in os.walk(base / "issues"))
+    payload = sum(area["bytes"] for area in report["areas"].values())
+
+    start = time.perf_counter()
+    for job_id, created_at in sample:
+        assert card_file_manager.get_file_content(job_id, "combined_pdf", created_at)
+    archived_read = (time.perf_counter() - start) / len(sample)
+    start = time.perf_counter()
+    for job_id, created_at in sample:
+        card_file_manager.get_file_path(job_id, "combined_pdf", created_at)
+    first_path = (time.perf_counter() - start) / len(sample)
+
+    print(f"    payload                {payload:>15,} bytes")
+    print(f"    loose files            {before:>15,} bytes on disk in {loose_files:,} files")
+    print(f"    archived               {after:>15,} bytes on disk in {archived_files:,} files")
+    print(f"    saved                  {before - after:>15,} bytes ({(before - after) / before * 100:.1f}%), "
+          f"{loose_files - archived_files:,} inodes, compacted in {compaction:.1f} s")
+    print(f"    get_file_content       loose {loose_read * 1000:.3f} ms | archived {archived_read * 1000:.3f} ms")
+    print(f"    get_file_path          archived, first extraction {first_path * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        print("🗄️  Cold archive")
+        print("=" * 50)
+        for test in (test_archived_reads_are_transparent, test_rearchived_file_supersedes_old_copy,
+                     test_released_members_are_not_freed_space):
+            test()
+            print(f"   ✓ {test.__name__}")
+        print()
+        benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_JOBS)
+    finally:
+        storage.cleanup()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Document Batch Generation Test
+Checks that the precompiled templates are reused across documents, that a
+batch of receipts or card collection notices comes out as one page per
+document (or one PDF per document in a streamed zip), and times per-document
+generation at 1, 100 and 1000 documents
+
+Usage:
+    python test_document_batch.py [documents]     # largest batch, default 1000
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from reportlab import rl_config
+
+from app.api.v1.endpoints.documents import _zip_chunks
+from app.services.document_generator import DocumentGenerator, ReceiptTemplate, document_styles
+
+PAGE = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def page_count(pdf: bytes) -> int:
+    return len(PAGE.findall(pdf))
+
+
+@contextlib.contextmanager
+def readable_pdfs():
+    """Uncompressed page content, so document text can be looked for in the bytes"""
+    rl_config.pageCompression = 0
+    try:
+        yield
+    finally:
+        rl_config.pageCompression = 1
+
+
+def receipts(generator, count):
+    sample = generator.get_sample_receipt_data()
+    return [
+        {**sample, "receipt_number": f"RCT-20250101-{i:05d}", "person_name": f"RAKOTO {i}",
+         "items": sample["items"][:1 + i % 3]}
+        for i in range(count)
+    ]
+
+
+def collections(generator, count):
+    sample = generator.get_sample_card_collection_data()
+    return [{**sample, "person_name": f"RABE {i}", "person_id": f"1012345{i:05d}"} for i in range(count)]
+
+
+def test_templates_are_reused():
+    generator = DocumentGenerator()
+    template = generator.templates["receipt"]
+    assert template.styles is document_styles() is generator.templates["card_collection"].styles
+
+    documents = receipts(generator, 3)
+    first = generator.generate_receipt(documents[0])
+    fixed = dict(template._fixed)
+    assert fixed, "no fixed paragraphs were cached"
+    generator.generate_receipt(documents[1])
+    assert template._fixed == fixed, "fixed paragraphs parsed again for the next receipt"
+    assert all(len(paragraph._layouts) == 1 for paragraph in fixed.values())
+
+    # A fresh template lays out the same document identically
+    rl_config.invariant = 1
+    try:
+        assert generator.generate_receipt(documents[2]) == ReceiptTemplate("Madagascar Official Receipt").generate(documents[2])
+    finally:
+        rl_config.invariant = 0
+    assert page_count(first) == 1
+
+
+def test_batch_pdf():
+    generator = DocumentGenerator()
+    for template_type, documents in (("receipt", receipts(generator, 25)), ("card_collection", collections(generator, 25))):
+        with readable_pdfs():
+            pdf = generator.generate_batch(template_type, documents)
+        assert page_count(pdf) == len(documents), (template_type, page_count(pdf))
+        for document in (documents[0], documents[-1]):
+            assert document["person_name"].encode() in pdf
+    try:
+        generator.generate_batch("license_verification", [generator.get_sample_license_verification_data()])
+        raise AssertionError("unsupported template accepted")
+    except ValueError:
+        pass
+
+
+def test_fixed_text_across_pages():
+    """Long caller-supplied footer text is split over a page break like any paragraph"""
+    generator = DocumentGenerator()
+    long_receipt = {
+        **generator.get_sample_receipt_data(),
+        "items": [{"description": f"Service fee {i}", "amount": 1000} for i in range(12)],
+        "validity_note": " ".join(["This receipt is valid and must be kept for your records."] * 40),
+    }
+    pdf = generator.generate_receipt(long_receipt)
+    assert page_count(pdf) == 2, page_count(pdf)
+    # Twice, so the second receipt reuses the split prototype
+    batch = generator.generate_batch("receipt", [long_receipt, long_receipt])
+    assert page_count(batch) == 4, page_count(batch)
+
+
+def test_zip_stream():
+    generator = DocumentGenerator()
+    documents = receipts(generator, 5)
+    with readable_pdfs():
+        chunks = list(_zip_chunks("receipt", generator.generate_each("receipt", documents)))
+    assert len(chunks) == len(documents) + 1, "PDFs were not streamed one by one"
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert names == [f"receipt_{i:04d}.pdf" for i in range(1, 6)]
+        for name, document in zip(names, documents):
+            pdf = archive.read(name)
+            assert page_count(pdf) == 1 and document["receipt_number"].encode() in pdf
+
+
+def benchmark(largest: int):
+    generator = DocumentGenerator()
+    print(f"{'documents':>10} {'one request each':>18} {'batch PDF':>12} {'zip stream':>12}   (ms per document)")
+    for count in (1, 100, largest):
+        documents = receipts(generator, count)
+        start = time.perf_counter()
+        for document in documents:
+            generator.generate_receipt(document)
+        single = (time.perf_counter() - start) / count
+
+        start = time.perf_counter()
+        pdf = generator.generate_batch("receipt", documents)
+        batch = (time.perf_counter() - start) / count
+        assert page_count(pdf) == count
+
+        start = time.perf_counter()
+        for _ in _zip_chunks("receipt", generator.generate_each("receipt", documents)):
+            pass
+        streamed = (time.perf_counter() - start) / count
+        print(f"{count:>10} {single * 1000:>18.2f} {batch * 1000:>12.2f} {streamed * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    try:
+        print("🧾 Document batch generation")
+        print("=" * 50)
+        for test in (test_templates_are_reused, test_batch_pdf, test_fixed_text_across_pages, test_zip_stream):
+            test()
+            print(f"   ✓ {test.__name__}")
+        print()
+        benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    finally:
+        storage.cleanup()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Fingerprint Index Test
+Checks that 1:N identification against the resident gallery scores at most
+max_candidates templates, taken in search order (closest quality band first),
+with and without a candidate person filter, and that templates stored
+without a quality score are searched by probes of any quality
+
+The gallery is filled directly, so this runs without a database.
+
+Usage:
+    python test_fingerprint_index.py
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import app.services.fingerprint_index as fingerprint_index_module
+from app.services.fingerprint_index import FingerprintIndex
+
+PROBE = bytes(range(64))
+
+
+def gallery(templates):
+    """Index holding (person_id, quality_score, template_bytes) templates, all finger 2"""
+    index = FingerprintIndex()
+    index._loaded = True
+    for person_id, quality_score, template_bytes in templates:
+        index.add_template(uuid.uuid4(), person_id, 2, quality_score, template_bytes)
+    return index
+
+
+def index_quality_scores():
+    """A quality score in the highest band and one in the band below it"""
+    edges = FingerprintIndex().quality_band_edges
+    assert edges, "FINGERPRINT_QUALITY_BANDS has no edges"
+    return edges[-1], edges[-1] - 1
+
+
+def test_max_candidates():
+    high, low = index_quality_scores()
+    people = [uuid.uuid4() for _ in range(10)]
+    # Matches sit in the low band only; the high band is searched first
+    templates = [(people[i % 10], high, bytes(64)) for i in range(30)]
+    templates += [(people[i % 10], low, PROBE) for i in range(30)]
+    index = gallery(templates)
+
+    shard_rows = fingerprint_index_module.SHARD_ROWS
+    fingerprint_index_module.SHARD_ROWS = 7
+    try:
+        matches, checked, found = index.identify(PROBE, 4, probe_quality_score=high)
+        assert checked == 60 and found == 30, (checked, found)
+
+        for limit in (1, 7, 25, 30):
+            matches, checked, found = index.identify(PROBE, 4, probe_quality_score=high, max_candidates=limit)
+            assert checked == limit and found == 0 and not matches, (limit, checked, found)
+        matches, checked, found = index.identify(PROBE, 4, probe_quality_score=high, max_candidates=36)
+        assert (checked, found) == (36, 6)
+        assert index.identify(PROBE, 4, max_candidates=1000)[1] == 60
+
+        # With a person filter the limit counts that person's templates only
+        matches, checked, found = index.identify(
+            PROBE, 4, candidate_person_ids=people[:2], probe_quality_score=high, max_candidates=8
+        )
+        assert (checked, found) == (8, 2), (checked, found)
+        assert {match["person_id"] for match in matches} <= set(people[:2])
+    finally:
+        fingerprint_index_module.SHARD_ROWS = shard_rows
+
+
+def test_unknown_quality_searched_by_every_probe():
+    high, low = index_quality_scores()
+    person_id = uuid.uuid4()
+    index = gallery([(uuid.uuid4(), high, bytes(64)), (uuid.uuid4(), 5, bytes(64)), (person_id, None, PROBE)])
+
+    for probe_quality in (high, low, 0, None):
+        matches, checked, found = index.identify(PROBE, 4, probe_quality_score=probe_quality)
+        assert found == 1 and matches[0]["person_id"] == person_id, probe_quality
+        assert matches[0]["template_quality"] is None
+
+    # Searched after the known bands, so a capped search reaches it last
+    matches, checked, found = index.identify(PROBE, 4, probe_quality_score=high, max_candidates=1)
+    assert (checked, found) == (1, 0)
+    assert index.identify(PROBE, 4, max_candidates=2)[2] == 0
+
+
+if __name__ == "__main__":
+    try:
+        print("🔎 Fingerprint index")
+        print("=" * 50)
+        for test in (test_max_candidates, test_unknown_quality_searched_by_every_probe):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        storage.cleanup()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Issue Auto-Report Deduplication Test
+Checks error fingerprint normalization, the per-user and new-issue rate limits,
+and in-memory coalescing of repeated auto-reports, and times a buffered repeat
+against computing the fingerprint
+
+Issues are SimpleNamespace stand-ins carrying the IssueResponse fields, so this
+runs without PostgreSQL.
+
+Usage:
+    python test_issue_auto_reports.py [reports]     # benchmark size, default 100000
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.models.enums import IssueCategory, IssuePriority, IssueReportType, IssueStatus
+from app.services.issue_auto_reports import AutoReportRateLimited, IssueAutoReports, error_fingerprint
+
+DEFAULT_REPORTS = 100000
+
+STACK = """TypeError: Cannot read properties of undefined (reading 'id')
+    at renderPerson (https://mls.example.mg/assets/index-DiwrgTda.js:412:1933)
+    at commitRoot (https://mls.example.mg/assets/vendor-B1x9QkPz.js:88:40211)"""
+
+
+def make_issue(**overrides):
+    now = datetime.now()
+    fields = dict(
+        id=uuid.uuid4(), title="Auto-reported: TypeError", description="Automatic error report",
+        category=IssueCategory.BUG, priority=IssuePriority.MEDIUM, status=IssueStatus.NEW,
+        report_type=IssueReportType.AUTO_REPORTED_JS_ERROR, error_message="TypeError", page_url="/persons/1",
+        user_agent=None, steps_to_reproduce=None, expected_behavior=None, actual_behavior=None,
+        environment_info=None, screenshot_path=None, console_logs_path=None,
+        reported_by=uuid.uuid4(), assigned_to=None, resolved_by=None,
+        reported_at=now, assigned_at=None, resolved_at=None, created_at=now, updated_at=now,
+        error_fingerprint="f" * 64, occurrence_count=1, last_occurred_at=now,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def service(**settings):
+    reports = IssueAutoReports()
+    reports.settings = reports.settings.model_copy(update=settings)
+    return reports
+
+
+def test_fingerprint_normalization():
+    person, other = uuid.uuid4(), uuid.uuid4()
+    first = error_fingerprint(
+        IssueReportType.AUTO_REPORTED_JS_ERROR, f"Failed to load person {person} (HTTP 404, attempt 1)",
+        f"https://mls.example.mg/persons/{person}/edit?tab=2", STACK,
+    )
+    rebuilt_stack = STACK.replace("index-DiwrgTda.js:412:1933", "index-Qx81LmZr.js:415:88")
+    same = error_fingerprint(
+        IssueReportType.AUTO_REPORTED_JS_ERROR, f"Failed to load person  {other} (HTTP 404, attempt 3)",
+        f"http://localhost:5173/persons/{other}/edit", rebuilt_stack,
+    )
+    assert first == same
+    assert first == error_fingerprint(
+        "AUTO_REPORTED_JS_ERROR", f"Failed to load person {other} (HTTP 404, attempt 1)", f"/persons/{other}/edit", rebuilt_stack,
+    )
+    assert first != error_fingerprint(
+        IssueReportType.AUTO_REPORTED_API_ERROR, f"Failed to load person {person} (HTTP 404, attempt 1)",
+        f"/persons/{person}/edit", STACK,
+    )
+
+    assert first != error_fingerprint(
+        IssueReportType.AUTO_REPORTED_JS_ERROR, f"Failed to save person {person}", f"/persons/{person}/edit", STACK,
+    )
+    assert first != error_fingerprint(
+        IssueReportType.AUTO_REPORTED_JS_ERROR, f"Failed to load person {person} (HTTP 404, attempt 1)", f"/applications/{person}/edit", STACK,
+    )
+    assert first != error_fingerprint(
+        IssueReportType.AUTO_REPORTED_JS_ERROR, f"Failed to load person {person} (HTTP 404, attempt 1)", f"/persons/{person}/edit",
+        STACK.replace("renderPerson", "renderCard"),
+    )
+    # Hash routing: the route lives in the fragment
+    assert error_fingerprint(IssueReportType.AUTO_REPORTED_JS_ERROR, "x", "https://mls.example.mg/#/cards/12", None) == \
+        error_fingerprint(IssueReportType.AUTO_REPORTED_JS_ERROR, "x", "/cards/98", None)
+
+
+def test_rate_limits():
+    reports = service(ISSUE_AUTO_REPORT_USER_RATE_PER_MINUTE=3, ISSUE_AUTO_REPORT_MAX_NEW_PER_MINUTE=2)
+    user = uuid.uuid4()
+    for _ in range(3):
+        reports.check_rate(user)
+    try:
+        reports.check_rate(user)
+        raise AssertionError("fourth report was not limited")
+    except AutoReportRateLimited as e:
+        assert 1 <= e.retry_after <= 21
+    reports.check_rate(uuid.uuid4())  # Other users keep their own bucket
+
+    reports.check_new_issue()
+    reports.check_new_issue()
+    try:
+        reports.check_new_issue()
+        raise AssertionError("third new issue was not limited")
+    except AutoReportRateLimited as e:
+        assert 1 <= e.retry_after <= 61
+    assert reports.status()["rate_limited"] == 2
+
+    unlimited = service(ISSUE_AUTO_REPORT_USER_RATE_PER_MINUTE=0, ISSUE_AUTO_REPORT_MAX_NEW_PER_MINUTE=0)
+    for _ in range(100):
+        unlimited.check_rate(user)
+        unlimited.check_new_issue()
+
+
+def test_coalescing():
+    reports = service(ISSUE_AUTO_REPORT_BUFFER_SIZE=2)
+    assert reports.coalesce("a") is None
+
+    issue_a = make_issue()
+    reports.remember("a", issue_a, created=True)
+    for expected in (2, 3, 4):
+        response = reports.coalesce("a")
+        assert response["id"] == issue_a.id and response["occurrence_count"] == expected
+    assert reports.status()["pending_occurrences"] == 3
+
+    issue_b, issue_c = make_issue(occurrence_count=7), make_issue()
+    reports.remember("b", issue_b, created=False)
+    assert reports.coalesce("b")["occurrence_count"] == 8
+    reports.remember("c", issue_c, created=True)  # Evicts "a", keeping its pending repeats
+    assert reports.coalesce("a") is None
+    assert reports.status()["buffered_fingerprints"] == 2
+
+    pending = reports.drain()
+    assert {issue_id: count for issue_id, (count, _) in pending.items()} == {issue_a.id: 3, issue_b.id: 1}
+    assert reports.drain() == {}
+
+    # Resolved issue: no more coalescing, pending count still written
+    reports.coalesce("c")
+    reports.forget_issue(issue_c.id)
+    assert reports.coalesce("c") is None
+    assert {issue_id: count for issue_id, (count, _) in reports.drain().items()} == {issue_c.id: 1}
+
+    # Entries older than the window are handed back to the database
+    stale = make_issue(last_occurred_at=datetime.now() - timedelta(hours=25))
+    reports.remember("d", stale, created=False)
+    assert reports.coalesce("d") is None
+    counters = reports.status()
+    assert (counters["created"], counters["merged"], counters["coalesced"]) == (2, 2, 5)
+
+
+def test_closed_through_patch():
+    """PATCH /issues/{id} closing an issue stops coalescing like PATCH /issues/{id}/status"""
+    from app.api.v1.endpoints import issues as endpoints
+    from app.schemas.issue import IssueUpdate
+
+    global_reports = endpoints.issue_auto_reports
+    reports = endpoints.issue_auto_reports = service()
+    issue = make_issue()
+    reports.remember("e", issue, created=True)
+    manager = SimpleNamespace(id=uuid.uuid4(), has_permission=lambda permission: True)
+
+    def update(db, db_obj, obj_in):
+        for field, value in obj_in.model_dump(exclude_unset=True).items():
+            setattr(db_obj, field, value)
+        return db_obj
+
+    crud = endpoints.crud_issue
+    endpoints.crud_issue = SimpleNamespace(get=lambda db, id: issue, update=update)
+    try:
+        asyncio.run(endpoints.update_issue(db=None, issue_id=issue.id, issue_in=IssueUpdate(priority=IssuePriority.HIGH), current_user=manager))
+        assert reports.coalesce("e") is not None, "open issue forgotten"
+        asyncio.run(endpoints.update_issue(db=None, issue_id=issue.id, issue_in=IssueUpdate(status=IssueStatus.CLOSED), current_user=manager))
+        assert reports.coalesce("e") is None, "closed issue still coalescing"
+    finally:
+        endpoints.crud_issue, endpoints.issue_auto_reports = crud, global_reports
+
+
+def benchmark(count: int):
+    reports = service(ISSUE_AUTO_REPORT_BUFFER_SIZE=256)
+    url = f"https://mls.example.mg/persons/{uuid.uuid4()}/edit"
+    print(f"{count:,} repeats of one error")
+
+    start = time.perf_counter()
+    for _ in range(count):
+        fingerprint = error_fingerprint(IssueReportType.AUTO_REPORTED_JS_ERROR, "Failed to load person (HTTP 500)", url, STACK)
+    hashing = time.perf_counter() - start
+
+    reports.remember(fingerprint, make_issue(), created=True)
+    start = time.perf_counter()
+    for _ in range(count):
+        reports.coalesce(fingerprint)
+    coalescing = time.perf_counter() - start
+    assert sum(count for count, _ in reports.drain().values()) == count
+
+    print(f"    fingerprint                {hashing / count * 1e6:8.1f} µs per report")
+    print(f"    buffered repeat            {coalescing / count * 1e6:8.1f} µs per report "
+          f"(no query; previously one INSERT and one console log file each)")
+
+
+if __name__ == "__main__":
+    try:
+        print("🐞 Issue auto-report deduplication")
+        print("=" * 50)
+        for test in (test_fingerprint_normalization, test_rate_limits, test_coalescing, test_closed_through_patch):
+            test()
+            print(f"   ✓ {test.__name__}")
+        print()
+        benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPORTS)
+    finally:
+        storage.cleanup()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Issue File Storage Test
+Checks that compressed console logs and optimized screenshots round-trip
+intact (loose and from the cold archive), that the bytes saved reach the
+storage stats, and times the screenshot request path before and after moving
+optimization to the background
+
+The issue row update of the background step is left out (no PostgreSQL);
+optimize_screenshot is called directly.
+
+Usage:
+    python test_issue_files.py
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from PIL import Image, ImageDraw
+
+from app.services.cold_archive import cold_archive
+from app.services.issue_file_manager import IssueFileManager
+from app.services.storage_ledger import storage_ledger
+
+DAY = datetime(2025, 2, 3, 10, 0)
+
+
+def screenshot_png(width=1366, height=768) -> bytes:
+    """Something like an html2canvas capture: flat panels, text-ish strokes"""
+    rng = random.Random(48)
+    image = Image.new("RGB", (width, height), (245, 246, 248))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, 56), fill=(25, 118, 210))
+    draw.rectangle((0, 56, 240, height), fill=(255, 255, 255))
+    for row in range(60):
+        y = 80 + row * 11
+        for _ in range(rng.randrange(3, 12)):
+            x = rng.randrange(260, width - 120)
+            draw.line((x, y, x + rng.randrange(20, 110), y), fill=(60, 60, 60), width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def read_stream(manager, path):
+    chunks, mime_type, filename = manager.open_file_stream(path)
+    return b"".join(chunks), mime_type, filename
+
+
+def test_console_logs_round_trip():
+    manager = IssueFileManager()
+    issue_id = uuid.uuid4()
+    entries = [f"ERROR Échec de chargement de la personne {uuid.uuid4()} (HTTP 500) — tentative {i}" for i in range(2000)]
+    info = manager.save_console_logs(issue_id, entries, created_at=DAY)
+    assert info["filename"] == "console_logs.txt.gz"
+
+    content, mime_type, filename = read_stream(manager, info["file_path"])
+    lines = content.decode("utf-8").splitlines()
+    assert lines[0].startswith("Console Logs captured at ") and lines[1] == "=" * 50
+    assert lines[3:] == [f"[{i:03d}] {entry}" for i, entry in enumerate(entries, 1)]
+    assert (mime_type, filename) == ("text/plain", "console_logs.txt")
+    assert manager.get_file_content(info["file_path"]) == (content, "text/plain")
+    assert info["file_size"] * 3 < len(content), "console logs barely compressed"
+
+    # Older, uncompressed logs are still served as they are
+    legacy = Path(info["storage_path"]) / "console_logs.txt"
+    legacy.write_bytes(b"[001] old entry\n")
+    assert read_stream(manager, str(legacy)) == (b"[001] old entry\n", "text/plain", "console_logs.txt")
+
+    # And from the cold archive
+    cold_archive.compact_day("issues", Path(info["storage_path"]).parent)
+    assert not Path(info["file_path"]).exists()
+    assert read_stream(manager, info["file_path"])[0] == content
+
+    saved = manager.get_storage_stats()["savings_by_kind"]["console_logs"]
+    assert saved["files"] == 1 and saved["bytes"] == len(content) - info["file_size"]
+
+
+def test_screenshot_optimization():
+    manager = IssueFileManager()
+    png = screenshot_png()
+    info = manager.save_screenshot(uuid.uuid4(), png, created_at=datetime(2025, 2, 4))
+    assert info["filename"] == "screenshot.png"
+    assert Path(info["file_path"]).read_bytes() == png, "request path altered the upload"
+
+    result = manager.optimize_screenshot(info["file_path"])
+    assert result is not None and result["bytes_saved"] > 0, result
+    optimized, mime_type, filename = read_stream(manager, result["file_path"])
+    assert (mime_type, filename) == ("image/webp", "screenshot.webp")
+    with Image.open(io.BytesIO(png)) as original, Image.open(io.BytesIO(optimized)) as webp:
+        assert webp.size == original.size
+        assert webp.convert("RGB").tobytes() == original.convert("RGB").tobytes(), "WebP re-encode is not lossless"
+
+    # Photo-like JPEG uploads are kept when lossless WebP would be larger
+    rng = random.Random(1)
+    noise = Image.frombytes("RGB", (400, 300), bytes(rng.randrange(256) for _ in range(400 * 300 * 3)))
+    jpeg = io.BytesIO()
+    noise.save(jpeg, "JPEG", quality=80)
+    jpeg_info = manager.save_screenshot(uuid.uuid4(), jpeg.getvalue(), created_at=datetime(2025, 2, 4))
+    assert jpeg_info["filename"] == "screenshot.jpg"
+    assert manager.optimize_screenshot(jpeg_info["file_path"]) is None
+    assert not Path(jpeg_info["file_path"]).with_suffix(".webp").exists()
+    assert Path(jpeg_info["file_path"]).read_bytes() == jpeg.getvalue()
+
+    # Other formats keep their own extension, then become WebP
+    for image_format, extension, mime in (("BMP", ".bmp", "image/bmp"), ("TIFF", ".tif", "image/tiff")):
+        upload = io.BytesIO()
+        Image.open(io.BytesIO(png)).save(upload, image_format)
+        other_info = manager.save_screenshot(uuid.uuid4(), upload.getvalue(), created_at=datetime(2025, 2, 4))
+        assert other_info["filename"] == f"screenshot{extension}"
+        assert read_stream(manager, other_info["file_path"])[1] == mime
+        assert manager.optimize_screenshot(other_info["file_path"])["file_path"].endswith(".webp")
+
+    # Unreadable data is still stored as sent, not labelled as an image
+    raw = manager.save_screenshot(uuid.uuid4(), b"not an image", created_at=datetime(2025, 2, 4))
+    assert raw["filename"] == "screenshot.bin"
+    assert Path(raw["file_path"]).read_bytes() == b"not an image"
+
+    # Background step: the issue is switched to the WebP, the original goes
+    switched = []
+    manager._switch_screenshot_path = lambda issue_id, old, new: switched.append((old, new)) or True
+    asyncio.run(manager._optimize_screenshot_in_background(uuid.uuid4(), info["file_path"]))
+    assert switched == [(info["file_path"], result["file_path"])]
+    assert not Path(info["file_path"]).exists() and Path(result["file_path"]).exists()
+    stats = manager.get_storage_stats()
+    assert stats["savings_by_kind"]["screenshots"] == {"files": 1, "bytes": result["bytes_saved"]}
+    assert stats["bytes_saved"] == sum(entry["bytes"] for entry in stats["savings_by_kind"].values())
+
+    # Issue changed or deleted meanwhile: the WebP is dropped instead
+    other = manager.save_screenshot(uuid.uuid4(), png, created_at=datetime(2025, 2, 4))
+    manager._switch_screenshot_path = lambda issue_id, old, new: False
+    asyncio.run(manager._optimize_screenshot_in_background(uuid.uuid4(), other["file_path"]))
+    assert Path(other["file_path"]).exists() and not Path(other["file_path"]).with_suffix(".webp").exists()
+    assert storage_ledger.savings("issues")["screenshots"]["files"] == 1
+
+
+def benchmark():
+    manager = IssueFileManager()
+    png = screenshot_png()
+    rounds = 10
+    start = time.perf_counter()
+    for _ in range(rounds):
+        image = Image.open(io.BytesIO(png))
+        image.save(io.BytesIO(), "PNG", optimize=True)
+    inline = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        info = manager.save_screenshot(uuid.uuid4(), png, created_at=datetime(2025, 2, 5))
+    deferred = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    result = manager.optimize_screenshot(info["file_path"])
+    background = time.perf_counter() - start
+
+    optimized_png = io.BytesIO()
+    Image.open(io.BytesIO(png)).save(optimized_png, "PNG", optimize=True)
+    print(f"1366x768 screenshot, {len(png):,} bytes uploaded")
+    print(f"    request path, PNG optimize inline     {inline * 1000:8.1f} ms  -> {len(optimized_png.getvalue()):,} bytes")
+    print(f"    request path, stored as uploaded     {deferred * 1000:8.1f} ms")
+    print(f"    background lossless WebP             {background * 1000:8.1f} ms  -> {result['file_size']:,} bytes")
+
+
+if __name__ == "__main__":
+    try:
+        print("📎 Issue file storage")
+        print("=" * 50)
+        for test in (test_console_logs_round_trip, test_screenshot_optimization):
+            test()
+            print(f"   ✓ {test.__name__}")
+        print()
+        benchmark()
+    finally:
+        storage.cleanup()
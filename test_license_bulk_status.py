@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Bulk License Status Update Test
+Checks the set-based crud_license.bulk_update_status: per-id failures for
+unknown, duplicate and ineligible licenses, one locking SELECT plus one UPDATE
+and one history INSERT per batch in a single transaction, and rollback on
+error; then runs a job through the background service
+
+The session is a recorder that answers the status SELECT from a dict and
+compiles every other statement for PostgreSQL, so this runs without a database.
+
+Usage:
+    python test_license_bulk_status.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy.dialects import postgresql
+
+from app.crud.crud_license import crud_license
+from app.models.license import LicenseStatus
+from app.schemas.license import BulkLicenseStatusUpdate
+from app.services.license_bulk_status import LicenseBulkStatusJobs
+
+
+class RecordingSession:
+    """Session stand-in: statuses come from a dict, statements are compiled and kept"""
+
+    def __init__(self, statuses, fail_on_insert=False):
+        self.statuses = statuses
+        self.fail_on_insert = fail_on_insert
+        self.statements = []
+        self.parameters = []
+        self.committed = self.rolled_back = self.closed = False
+
+    def execute(self, statement, parameters=None, **kwargs):
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.statements.append(sql)
+        self.parameters.append(parameters)
+        if sql.startswith("SELECT"):
+            assert sql.rstrip().endswith("FOR UPDATE"), sql
+            return self
+        if sql.startswith("INSERT") and self.fail_on_insert:
+            raise RuntimeError("value too long for type character varying(200)")
+
+    def all(self):
+        return sorted(self.statuses.items())
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+def licenses(count, status):
+    return {uuid.uuid4(): status for _ in range(count)}
+
+
+def test_set_based_update():
+    active, suspended, cancelled = licenses(5, LicenseStatus.ACTIVE), licenses(2, LicenseStatus.SUSPENDED), licenses(1, LicenseStatus.CANCELLED)
+    unknown = uuid.uuid4()
+    duplicate = next(iter(active))
+    ids = list(active) + list(suspended) + list(cancelled) + [unknown, duplicate]
+    db = RecordingSession({**active, **suspended, **cancelled})
+
+    successful, errors = crud_license.bulk_update_status(
+        db, license_ids=ids, changed_by=uuid.uuid4(), batch_size=2,
+        status_update=BulkLicenseStatusUpdate(license_ids=ids, status=LicenseStatus.SUSPENDED, reason="Court order"),
+    )
+    assert successful == 5
+    assert {error["license_id"]: error["error"] for error in errors} == {
+        str(duplicate): "Duplicate license id in request",
+        str(unknown): f"License {unknown} not found",
+        **{str(i): "Cannot change status from SUSPENDED to SUSPENDED" for i in suspended},
+        **{str(i): "Cannot change status from CANCELLED to SUSPENDED" for i in cancelled},
+    }
+    # 1 SELECT ... FOR UPDATE, then UPDATE + INSERT for batches of 2, 2 and 1
+    kinds = [sql.split()[0] for sql in db.statements]
+    assert kinds == ["SELECT"] + ["UPDATE", "INSERT"] * 3, kinds
+    assert "suspension_reason" in db.statements[1] and "cancellation_date" not in db.statements[1]
+    history = [row for rows in db.parameters if isinstance(rows, list) for row in rows]
+    assert sorted(row["license_id"] for row in history) == sorted(active)
+    assert {row["from_status"] for row in history} == {LicenseStatus.ACTIVE}
+    assert db.committed and not db.rolled_back
+
+
+def test_rollback_on_error():
+    active = licenses(3, LicenseStatus.ACTIVE)
+    db = RecordingSession(active, fail_on_insert=True)
+    try:
+        crud_license.bulk_update_status(
+            db, license_ids=list(active), changed_by=uuid.uuid4(),
+            status_update=BulkLicenseStatusUpdate(license_ids=list(active), status=LicenseStatus.CANCELLED, reason="x"),
+        )
+        raise AssertionError("error was swallowed")
+    except RuntimeError:
+        pass
+    assert db.rolled_back and not db.committed
+
+
+def test_background_job():
+    active = licenses(4, LicenseStatus.ACTIVE)
+    db = RecordingSession(active)
+    jobs = LicenseBulkStatusJobs()
+    jobs.settings = jobs.settings.model_copy(update={"LICENSE_BULK_STATUS_BACKGROUND_THRESHOLD": 3})
+    assert jobs.runs_in_background(list(active)) and not jobs.runs_in_background(list(active)[:3])
+
+    import app.core.database as database
+    session_local = database.SessionLocal
+    database.SessionLocal = lambda: db
+    try:
+        async def run():
+            job = jobs.submit(
+                BulkLicenseStatusUpdate(license_ids=list(active), status=LicenseStatus.SUSPENDED, reason="Audit"),
+                uuid.uuid4(), "T010001",
+            )
+            assert job["status"] == "running" and job["total_requested"] == 4
+            await asyncio.gather(*jobs._tasks)
+            return job["job_id"]
+
+        job_id = asyncio.run(run())
+    finally:
+        database.SessionLocal = session_local
+
+    job = jobs.get(job_id)
+    assert job["status"] == "completed" and job["successful"] == 4 and job["failed"] == 0, job
+    assert job["finished_at"] is not None and db.closed
+    assert jobs.jobs()[0]["job_id"] == job_id and "error_details" not in jobs.jobs()[0]
+
+
+if __name__ == "__main__":
+    try:
+        print("🪪 Bulk license status update")
+        print("=" * 50)
+        for test in (test_set_based_update, test_rollback_on_error, test_background_job):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        storage.cleanup()
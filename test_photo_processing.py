@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Photo Processing Pipeline Test
+Checks the license-ready JPEG size search and upload size limit, and measures
+how responsive the event loop stays while several photo uploads are processed
+at once (inline, as before, versus through the image worker pool)
+
+Usage:
+    python test_photo_processing.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageFilter
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.image_service import ImageProcessingService, run_image_task, read_upload_limited
+
+CONCURRENT_UPLOADS = 8
+
+
+def camera_photo(seed: int, size=(1920, 2560)) -> bytes:
+    """A webcam-sized JPEG with some texture"""
+    image = Image.effect_noise(size, 40 + seed).convert("RGB").filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def stepped_quality(image: Image.Image) -> int:
+    """Previous search: step down from the start quality by 5"""
+    quality = ImageProcessingService.LICENSE_READY_QUALITY_START
+    while quality >= 30:
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=False)
+        if len(buffer.getvalue()) <= ImageProcessingService.LICENSE_READY_TARGET_SIZE:
+            return quality
+        quality -= 5
+    return 30
+
+
+def license_ready_image(seed: int) -> Image.Image:
+    image = Image.open(io.BytesIO(camera_photo(seed, (600, 800)))).convert("RGB")
+    return ImageProcessingService._create_license_ready_image(ImageProcessingService._crop_to_iso_standards(image))
+
+
+def test_license_ready_size_search():
+    target = ImageProcessingService.LICENSE_READY_TARGET_SIZE
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in range(5):
+            image = license_ready_image(seed)
+            path = Path(directory) / f"license_ready_{seed}.jpg"
+            ImageProcessingService._save_license_ready_image(image, path)
+            size = path.stat().st_size
+
+            stepped = stepped_quality(image)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=stepped, optimize=True, progressive=False)
+            stepped_size = len(buffer.getvalue())
+            if stepped_size <= target:
+                # Fits like before, at the same or a higher quality (larger file)
+                assert stepped_size <= size <= target, f"seed {seed}: {size} vs stepped {stepped_size}"
+            else:
+                assert size == stepped_size, f"seed {seed}: minimum quality fallback differs"
+
+
+def test_upload_size_limit():
+    async def run():
+        upload = UploadFile(file=io.BytesIO(b"x" * 300_000), filename="big.jpg")
+        try:
+            await read_upload_limited(upload, max_bytes=200_000)
+            raise AssertionError("oversized upload accepted")
+        except HTTPException as e:
+            assert e.status_code == 413
+        upload = UploadFile(file=io.BytesIO(b"x" * 150_000), filename="ok.jpg")
+        assert len(await read_upload_limited(upload, max_bytes=200_000)) == 150_000
+    asyncio.run(run())
+
+
+def test_oversized_dimensions_rejected():
+    big = Image.new("L", (8000, 6000))
+    buffer = io.BytesIO()
+    big.save(buffer, "PNG")
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            ImageProcessingService.process_license_photo_data(
+                buffer.getvalue(), "image/png", "big.png", Path(directory)
+            )
+            raise AssertionError("oversized image accepted")
+        except HTTPException as e:
+            assert e.status_code == 400 and "megapixels" in e.detail
+
+
+async def loop_lag_during(uploads, process) -> tuple:
+    """Worst delay of a 5 ms ticker while all uploads are processed"""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - start - 0.005)
+
+    ticking = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(process(data, index) for index, data in enumerate(uploads)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticking
+    return elapsed, worst
+
+
+def benchmark():
+    uploads = [camera_photo(seed) for seed in range(CONCURRENT_UPLOADS)]
+
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            storage = Path(directory)
+
+            async def inline(data, index):
+                ImageProcessingService.process_license_photo_data(data, "image/jpeg", "p.jpg", storage, f"inline_{index}")
+
+            async def pooled(data, index):
+                await run_image_task(ImageProcessingService.process_license_photo_data,
+                                     data, "image/jpeg", "p.jpg", storage, f"pooled_{index}")
+
+            for label, process in (("inline (previous)", inline), ("image worker pool", pooled)):
+                elapsed, worst = await loop_lag_during(uploads, process)
+                print(f"    {label:<18} | {CONCURRENT_UPLOADS} uploads in {elapsed:5.2f} s | "
+                      f"worst event loop stall {worst * 1000:7.1f} ms")
+
+    print(f"{CONCURRENT_UPLOADS} concurrent 1920x2560 photo uploads")
+    asyncio.run(run())
+
+    image = license_ready_image(0)
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        stepped_quality(image)
+    stepped = (time.perf_counter() - start) / runs
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for _ in range(runs):
+            ImageProcessingService._save_license_ready_image(image, Path(directory) / "x.jpg")
+        bisected = (time.perf_counter() - start) / runs
+    print(f"License-ready size search: stepping {stepped * 1000:.1f} ms, bisection {bisected * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    print("🖼️  Photo processing pipeline")
+    print("=" * 50)
+    for test in (test_license_ready_size_search, test_upload_size_limit, test_oversized_dimensions_rejected):
+        test()
+        print(f"   ✓ {test.__name__}")
+    print()
+    benchmark()
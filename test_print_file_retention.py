@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Print File Retention Test
+Checks that a retention pass selects only finished jobs that still have files
+and were last updated before the cutoff, pages through them with the keyset
+query, leaves files and columns untouched on a dry run, and on a real run
+removes the job directories and clears each page with one UPDATE ... FROM
+unnest, recording what was freed
+
+Runs the job queries against a SQLite copy of print_jobs; the page UPDATE is
+PostgreSQL-only, so it is recorded and applied by the test session.
+
+Usage:
+    python test_print_file_retention.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, orm
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.models.printing import PrintJob, PrintJobStatus
+from app.services.card_file_manager import card_file_manager
+from app.services.print_file_retention import print_file_retention
+from app.services.storage_ledger import storage_ledger
+
+CARD_FILES = ("front.png", "back.png", "front.pdf", "back.pdf", "combined.pdf")
+FILE_SIZE = 100
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_text(element, compiler, **kw):
+    # Stored as 32 hex digits, the non-native UUID format; sorts like PostgreSQL's uuid
+    return "CHAR(32)"
+
+
+class RetentionSession(orm.Session):
+    """SQLite session that records the page UPDATE and applies it column by column"""
+
+    updates = []
+
+    def execute(self, statement, params=None, **kwargs):
+        sql = str(statement)
+        if "FROM unnest" not in sql:
+            return super().execute(statement, params, **kwargs)
+        self.updates.append((sql, params))
+        for job_id, metadata in zip(params["ids"], params["metadata"]):
+            job = self.get(PrintJob, uuid.UUID(job_id))
+            self.query(PrintJob).filter(PrintJob.id == job.id).update({
+                "pdf_files_generated": False, "pdf_front_path": None, "pdf_back_path": None,
+                "pdf_combined_path": None, "updated_at": job.updated_at,
+                "generation_metadata": {**(job.generation_metadata or {}), **json.loads(metadata)},
+            }, synchronize_session="fetch")
+
+
+engine = create_engine(f"sqlite:///{os.path.join(storage.name, 'print_jobs.db')}")
+PrintJob.__table__.create(engine)
+Session = sessionmaker(bind=engine, class_=RetentionSession)
+
+
+def add_job(status, days_old, with_files=True):
+    """A job last updated days_old ago, with card files on disk when with_files"""
+    updated_at = datetime.utcnow() - timedelta(days=days_old)
+    job_id = uuid.uuid4()
+    directory = card_file_manager._get_print_job_directory(str(job_id), updated_at)
+    paths = {}
+    if with_files:
+        directory.mkdir(parents=True)
+        for name in CARD_FILES:
+            (directory / name).write_bytes(b"x" * FILE_SIZE)
+        relative = directory.relative_to(card_file_manager.base_path).as_posix()
+        paths = {"pdf_front_path": f"{relative}/front.pdf", "pdf_back_path": f"{relative}/back.pdf",
+                 "pdf_combined_path": f"{relative}/combined.pdf"}
+
+    db = Session()
+    db.add(PrintJob(
+        id=job_id, job_number=f"T01{uuid.uuid4().hex[:8]}", status=status, submitted_at=updated_at,
+        person_id=uuid.uuid4(), print_location_id=uuid.uuid4(), primary_application_id=uuid.uuid4(),
+        card_number=uuid.uuid4().hex[:12], license_data={}, person_data={},
+        pdf_files_generated=with_files, generation_metadata={"version": 1},
+        created_at=updated_at, updated_at=updated_at, **paths,
+    ))
+    db.commit()
+    db.close()
+    return job_id, directory
+
+
+def job(job_id):
+    db = Session()
+    try:
+        return db.get(PrintJob, job_id)
+    finally:
+        db.close()
+
+
+def run_pass(dry_run):
+    db = Session()
+    try:
+        return print_file_retention.run_pass(db, dry_run=dry_run, trigger="test")
+    finally:
+        db.close()
+
+
+def test_retention_pass():
+    days = print_file_retention.settings.PRINT_FILE_RETENTION_DAYS
+    print_file_retention.settings = print_file_retention.settings.model_copy(update={
+        "PRINT_FILE_RETENTION_BATCH_SIZE": 2, "PRINT_FILE_RETENTION_MAX_JOBS_PER_SECOND": 0,
+    })
+    expired = [add_job(status, days + 1 + index) for index, status in enumerate(
+        (PrintJobStatus.COMPLETED, PrintJobStatus.CANCELLED, PrintJobStatus.FAILED,
+         PrintJobStatus.COMPLETED, PrintJobStatus.COMPLETED)
+    )]
+    kept = [
+        add_job(PrintJobStatus.COMPLETED, days - 1),  # Inside the retention period
+        add_job(PrintJobStatus.QUEUED, days + 10),  # Not finished
+        add_job(PrintJobStatus.PRINTING, days + 10),
+    ]
+    add_job(PrintJobStatus.COMPLETED, days + 10, with_files=False)
+    storage_ledger.reconcile(["cards"])
+    expected_bytes = len(expired) * len(CARD_FILES) * FILE_SIZE
+
+    report = run_pass(dry_run=True)
+    assert (report["jobs"], report["files_deleted"], report["bytes_freed"]) == (
+        len(expired), len(expired) * len(CARD_FILES), expected_bytes
+    ), report
+    assert set(report["sample_job_ids"]) == {str(job_id) for job_id, _ in expired}
+    assert not RetentionSession.updates, "dry run updated jobs"
+    for job_id, directory in expired:
+        assert len(list(directory.iterdir())) == len(CARD_FILES), "dry run deleted files"
+        assert job(job_id).pdf_files_generated and job(job_id).pdf_front_path
+    assert not print_file_retention.history(), "dry run recorded in the history"
+
+    report = run_pass(dry_run=False)
+    assert (report["jobs"], report["files_deleted"], report["bytes_freed"], report["errors"]) == (
+        len(expired), len(expired) * len(CARD_FILES), expected_bytes, 0
+    ), report
+    # Keyset pages of 2: one UPDATE per page
+    assert [len(params["ids"]) for _, params in RetentionSession.updates] == [2, 2, 1]
+    assert all("FROM unnest" in sql for sql, _ in RetentionSession.updates)
+    for job_id, directory in expired:
+        assert not directory.exists()
+        cleared = job(job_id)
+        assert not cleared.pdf_files_generated and cleared.pdf_front_path is None
+        assert cleared.generation_metadata["version"] == 1
+        assert cleared.generation_metadata["files_deleted_by"] == "retention"
+        assert cleared.generation_metadata["cleanup_result"]["bytes_freed"] == len(CARD_FILES) * FILE_SIZE
+    for job_id, directory in kept:
+        assert len(list(directory.iterdir())) == len(CARD_FILES) and job(job_id).pdf_files_generated
+    assert print_file_retention.history(1)[0]["jobs"] == len(expired)
+
+    # Nothing left to select
+    assert run_pass(dry_run=False)["jobs"] == 0
+
+
+if __name__ == "__main__":
+    try:
+        print("🗑️  Print file retention")
+        print("=" * 50)
+        for test in (test_retention_pass,):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        engine.dispose()
+        storage.cleanup()
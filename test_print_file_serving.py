@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Print Job File Serving Test
+Checks ETag/304, Range and If-Range handling of the card file responses, and
+compares memory use and latency of repeated previews against the previous
+read-into-memory responses
+
+Usage:
+    python test_print_file_serving.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fastapi import Request, Response
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.file_delivery import file_response
+
+FILE_SIZES = {"front.png": 350 * 1024, "combined.pdf": 2 * 1024 * 1024}
+PREVIEWS = 200
+
+
+def make_request(headers=None) -> Request:
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers, "query_string": b""})
+
+
+async def send_response(response: Response, keep_body: bool = True):
+    """Run a response through ASGI and collect (status, headers, body)"""
+    messages = []
+
+    async def receive():
+        # The client stays connected for the whole response
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if not keep_body and message["type"] == "http.response.body":
+            # Benchmarks only count the bytes, like a socket would
+            message = {**message, "body": b"x" * bool(message.get("body"))}
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "extensions": {}}
+    await response(scope, receive, send)
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, body
+
+
+async def get(path: Path, headers=None, keep_body: bool = True):
+    response = await file_response(make_request(headers), path, media_type="application/octet-stream", filename=path.name)
+    return await send_response(response, keep_body)
+
+
+async def legacy_get(path: Path, headers=None, keep_body: bool = True):
+    """Previous endpoint behaviour: read the whole file and return it as a Response"""
+    with open(path, "rb") as f:
+        content = f.read()
+    response = Response(content=content, media_type="application/octet-stream",
+                        headers={"Content-Length": str(len(content))})
+    return await send_response(response, keep_body)
+
+
+def stored_files(directory: Path):
+    paths = {}
+    for name, size in FILE_SIZES.items():
+        path = directory / name
+        path.write_bytes(os.urandom(size))
+        paths[name] = path
+    return paths
+
+
+def test_full_response_and_revalidation():
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            path = stored_files(Path(directory))["front.png"]
+            status, headers, body = await get(path)
+            assert status == 200 and body == path.read_bytes()
+            assert headers["etag"].startswith('"') and headers["accept-ranges"] == "bytes"
+            assert headers["cache-control"] == "private, no-cache"
+
+            status, _, body = await get(path, {"If-None-Match": headers["etag"]})
+            assert status == 304 and body == b""
+            status, _, _ = await get(path, {"If-None-Match": f'W/{headers["etag"]}, "other"'})
+            assert status == 304
+
+            # Rewritten content gets a new ETag even with the same size
+            path.write_bytes(os.urandom(path.stat().st_size))
+            status, new_headers, _ = await get(path, {"If-None-Match": headers["etag"]})
+            assert status == 200 and new_headers["etag"] != headers["etag"]
+    asyncio.run(run())
+
+
+def test_range_requests():
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            path = stored_files(Path(directory))["combined.pdf"]
+            content = path.read_bytes()
+            size = len(content)
+            _, headers, _ = await get(path, {"If-None-Match": '"nope"'})
+            etag = headers["etag"]
+
+            status, headers, body = await get(path, {"Range": "bytes=100-199"})
+            assert status == 206 and body == content[100:200]
+            assert headers["content-range"] == f"bytes 100-199/{size}" and headers["content-length"] == "100"
+
+            status, _, body = await get(path, {"Range": f"bytes={size - 10}-"})
+            assert status == 206 and body == content[-10:]
+            status, _, body = await get(path, {"Range": "bytes=-500"})
+            assert status == 206 and body == content[-500:]
+            status, _, body = await get(path, {"Range": f"bytes=0-{size * 2}"})
+            assert status == 206 and body == content
+
+            status, headers, _ = await get(path, {"Range": f"bytes={size}-"})
+            assert status == 416 and headers["content-range"] == f"bytes */{size}"
+
+            # Multi-range, other units and stale If-Range fall back to the full file
+            for extra in ({"Range": "bytes=0-1,5-6"}, {"Range": "items=0-1"},
+                          {"Range": "bytes=0-1", "If-Range": '"stale"'}):
+                status, _, body = await get(path, extra)
+                assert status == 200 and body == content, extra
+            status, _, body = await get(path, {"Range": "bytes=0-1", "If-Range": etag})
+            assert status == 206 and body == content[:2]
+    asyncio.run(run())
+
+
+async def measure(handler, path: Path, revalidate: bool):
+    headers = {}
+    if revalidate:
+        _, first, _ = await get(path)
+        headers = {"If-None-Match": first["etag"]}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(PREVIEWS):
+        await handler(path, headers, keep_body=False)
+    elapsed = (time.perf_counter() - start) / PREVIEWS
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchmark():
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            for name, path in stored_files(Path(directory)).items():
+                print(f"{name} ({path.stat().st_size / 1024:,.0f} KB), {PREVIEWS} previews")
+                for label, handler, revalidate in (("read into Response", legacy_get, False),
+                                                   ("FileResponse", get, False),
+                                                   ("revalidated (304)", get, True)):
+                    elapsed, peak = await measure(handler, path, revalidate)
+                    print(f"    {label:<20} | {elapsed * 1000:7.2f} ms/request | peak {peak / 1024:8,.0f} KB")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("📄 Print job file serving")
+    print("=" * 50)
+    for test in (test_full_response_and_revalidation, test_range_requests):
+        test()
+        print(f"   ✓ {test.__name__}")
+    print()
+    benchmark()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Print Queue Test
+Checks that the print queue row is created race-free at a location that has no
+queue yet (the ON CONFLICT target is a real unique constraint) and that a job
+created there gets the first rank, and that concurrent job number allocation
+hands out each number once without keeping the counter row locked while the
+job's card files render. Queue ranks are only taken once the files are rendered,
+so moving or starting other jobs does not wait for rendering; ranks go to the
+back (or the front for urgent jobs) and the queue size follows jobs in and out
+
+Sessions are in-memory stand-ins: SELECT ... FOR UPDATE takes a per-row lock
+that is held until commit or rollback, and the queue row INSERT is compiled
+for PostgreSQL, so this runs without a database.
+
+Usage:
+    python test_print_queue.py
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from types import SimpleNamespace
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+import app.core.database as database_module
+from app.crud.crud_printing import crud_print_job, crud_print_queue
+from app.models.printing import QUEUE_POSITION_GAP, PrintJobStatus, PrintQueue
+from app.models.sequence import SequenceCounter
+from app.models.user import Location
+
+LOCK_TIMEOUT = 5
+
+
+class FakeDatabase:
+    """Rows shared by every session: one sequence counter, queue rows per location"""
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.location = SimpleNamespace(id=uuid.uuid4(), code="T01")
+        self.counter = None
+        self.queues = {}
+        self.row_locks = {}
+        self.inserts = []
+
+    def row_lock(self, key):
+        with self.mutex:
+            return self.row_locks.setdefault(key, threading.Lock())
+
+    def session(self):
+        return FakeSession(self)
+
+
+class FakeQuery:
+    def __init__(self, session, entity):
+        self.session = session
+        self.entity = entity
+        self.locking = False
+
+    def filter(self, *criteria):
+        return self
+
+    def with_for_update(self):
+        self.locking = True
+        return self
+
+    def populate_existing(self):
+        return self
+
+    def __iter__(self):
+        # Seed scans find no earlier job numbers
+        return iter([])
+
+    def first(self):
+        database = self.session.database
+        if self.entity is Location:
+            return database.location
+        if self.entity is SequenceCounter:
+            key, row = "sequence_counters", database.counter
+        elif self.entity is PrintQueue:
+            key, row = ("print_queues", database.location.id), database.queues.get(database.location.id)
+        else:
+            raise AssertionError(f"unexpected query for {self.entity}")
+        if row is not None and self.locking:
+            self.session.lock(key)
+        return row
+
+
+class FakeSession:
+    """Session stand-in; row locks taken FOR UPDATE are released on commit/rollback"""
+
+    def __init__(self, database):
+        self.database = database
+        self.held = []
+        self.added = []
+        self.commits = 0
+
+    def lock(self, key):
+        lock = self.database.row_lock(key)
+        if lock in self.held:
+            return
+        assert lock.acquire(timeout=LOCK_TIMEOUT), f"waited more than {LOCK_TIMEOUT}s for {key}"
+        self.held.append(lock)
+
+    def holds(self, *key):
+        return self.database.row_lock(key if len(key) > 1 else key[0]) in self.held
+
+    def query(self, entity):
+        return FakeQuery(self, entity)
+
+    def execute(self, statement, *args, **kwargs):
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.database.inserts.append(sql)
+        values = statement.compile().params
+        with self.database.mutex:
+            # ON CONFLICT DO NOTHING: the first insert wins
+            if sql.startswith("INSERT INTO print_queues"):
+                self.database.queues.setdefault(values["location_id"], PrintQueue(
+                    location_id=values["location_id"], current_queue_size=values["current_queue_size"],
+                    next_queue_position=values["next_queue_position"],
+                    front_queue_position=values["front_queue_position"], total_jobs_processed=0,
+                ))
+            elif sql.startswith("INSERT INTO sequence_counters") and self.database.counter is None:
+                self.database.counter = SequenceCounter(
+                    kind=values["kind"], scope=values["scope"], period=values["period"],
+                    current_value=values["current_value"],
+                )
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def flush(self):
+        for obj in self.added:
+            if getattr(obj, "id", None) is None:
+                obj.id = uuid.uuid4()
+
+    def refresh(self, obj):
+        pass
+
+    def _release(self):
+        while self.held:
+            self.held.pop().release()
+
+    def commit(self):
+        self.flush()
+        self.commits += 1
+        self._release()
+
+    def rollback(self):
+        self._release()
+
+    def close(self):
+        self._release()
+
+
+@contextlib.contextmanager
+def use_database(database):
+    """Dedicated transactions (SessionLocal) open sessions on the fake database"""
+    session_local = database_module.SessionLocal
+    database_module.SessionLocal = database.session
+    try:
+        yield database
+    finally:
+        database_module.SessionLocal = session_local
+
+
+@contextlib.contextmanager
+def rendering(render):
+    """Card rendering replaced by render(print_job_data, db_session)"""
+    from app.services.card_generator import madagascar_card_generator
+    madagascar_card_generator.generate_card_files = render
+    try:
+        yield
+    finally:
+        del madagascar_card_generator.generate_card_files
+
+
+def create_job(db, location_id, **kwargs):
+    return crud_print_job.create_print_job(
+        db, application_id=uuid.uuid4(), person_id=uuid.uuid4(), print_location_id=location_id,
+        card_number="T0100000012", license_data={}, person_data={},
+        current_user=SimpleNamespace(id=uuid.uuid4()), **{"render_files": False, **kwargs}
+    )
+
+
+def test_conflict_target_is_unique():
+    database = FakeDatabase()
+    crud_print_queue.get_or_create_queue(database.session(), database.location.id)
+    insert = database.inserts[-1]
+    assert "ON CONFLICT (location_id) DO NOTHING" in insert, insert
+
+    # PostgreSQL only accepts that conflict target if location_id alone is unique
+    unique = [
+        {column.name for column in constraint.columns}
+        for constraint in PrintQueue.__table__.constraints if isinstance(constraint, UniqueConstraint)
+    ]
+    assert {"location_id"} in unique, unique
+    ddl = str(CreateTable(PrintQueue.__table__).compile(dialect=postgresql.dialect()))
+    assert "CONSTRAINT uq_print_queue_location UNIQUE (location_id)" in ddl
+
+
+def test_job_at_location_without_queue():
+    with use_database(FakeDatabase()) as database:
+        location_id = database.location.id
+        assert location_id not in database.queues
+
+        db = database.session()
+        job = create_job(db, location_id)
+        queue = database.queues[location_id]
+        assert job.status == PrintJobStatus.QUEUED and job.job_number.endswith("T01001")
+        assert job.queue_position == 1 and queue.current_queue_size == 1
+        assert not db.held, "row locks outlived the commit"
+
+        # A second creator at the same location finds the row instead of inserting another
+        inserts = len(database.inserts)
+        second = create_job(database.session(), location_id)
+        assert second.queue_position > job.queue_position and queue.current_queue_size == 2
+        assert len(database.queues) == 1 and not any("print_queues" in sql for sql in database.inserts[inserts:])
+
+
+def test_job_number_concurrency():
+    with use_database(FakeDatabase()) as database:
+        location_id = database.location.id
+        start = threading.Barrier(8)
+        numbers = []
+
+        def allocate():
+            db = database.session()
+            start.wait()
+            numbers.append(crud_print_job.generate_job_number(db, location_id))
+            assert not db.held, "caller's session holds the counter row"
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(int(number[-3:]) for number in numbers) == list(range(1, 9)), numbers
+        assert sum("INSERT INTO sequence_counters" in sql for sql in database.inserts) >= 1
+
+        # Another job number is handed out while a job's card files render
+        seen = {}
+
+        def render(print_job_data, db_session=None):
+            seen["counter_locked"] = database.row_lock("sequence_counters").locked()
+            other = threading.Thread(
+                target=lambda: seen.setdefault("other", crud_print_job.generate_job_number(database.session(), location_id))
+            )
+            other.start()
+            other.join(LOCK_TIMEOUT)
+            return {"files_generated": True, "file_paths": {}, "file_sizes": {}}
+
+        with rendering(render):
+            job = create_job(database.session(), location_id, render_files=True)
+        assert not seen["counter_locked"], "counter row locked during rendering"
+        assert seen.get("other", "").endswith("T01010") and job.job_number.endswith("T01009")
+        assert job.pdf_files_generated
+
+
+def test_rank_after_rendering():
+    with use_database(FakeDatabase()) as database:
+        location_id = database.location.id
+        first = create_job(database.session(), location_id)
+        seen = {}
+
+        def render(print_job_data, db_session=None):
+            seen["queue_locked"] = database.row_lock(("print_queues", location_id)).locked()
+            # Moving another job to the front does not wait for this render
+            other = threading.Thread(target=lambda: seen.setdefault("front", move_to_front(database, location_id)))
+            other.start()
+            other.join(LOCK_TIMEOUT)
+            return {"files_generated": True, "file_paths": {}, "file_sizes": {}}
+
+        with rendering(render):
+            db = database.session()
+            job = create_job(db, location_id, render_files=True)
+        assert not seen["queue_locked"], "queue row locked during rendering"
+        assert seen.get("front") == -QUEUE_POSITION_GAP
+        assert job.queue_position == first.queue_position + QUEUE_POSITION_GAP
+        assert database.queues[location_id].current_queue_size == 2 and not db.held
+
+
+def move_to_front(database, location_id):
+    db = database.session()
+    position = crud_print_queue.move_to_front(db, location_id)
+    db.commit()
+    return position
+
+
+def test_queue_ranks():
+    with use_database(FakeDatabase()) as database:
+        location_id = database.location.id
+        db = database.session()
+        back = [crud_print_queue.add_to_queue(db, location_id) for _ in range(3)]
+        assert back == [1, 1 + QUEUE_POSITION_GAP, 1 + 2 * QUEUE_POSITION_GAP]
+        assert db.holds("print_queues", location_id), "counter change not locked until commit"
+        db.commit()
+
+        # Urgent jobs and move-to-top go ahead of everything handed out so far
+        front = crud_print_queue.add_to_queue(db, location_id, at_front=True)
+        moved = crud_print_queue.move_to_front(db, location_id)
+        assert moved < front < min(back)
+        batch = crud_print_queue.add_many_to_queue(db, location_id, 2)
+        assert batch == [1 + 3 * QUEUE_POSITION_GAP, 1 + 4 * QUEUE_POSITION_GAP]
+        db.commit()
+
+        queue = database.queues[location_id]
+        assert queue.current_queue_size == 6, "move-to-top counted as a new job"
+        crud_print_queue.remove_from_queue(db, location_id)
+        crud_print_queue.record_job_processed(db, location_id)
+        db.commit()
+        assert (queue.current_queue_size, queue.total_jobs_processed) == (5, 1)
+        assert not queue.needs_rebalance()
+
+
+if __name__ == "__main__":
+    try:
+        print("🖨️  Print queue")
+        print("=" * 50)
+        for test in (test_conflict_target_is_unique, test_job_at_location_without_queue, test_job_number_concurrency,
+                     test_rank_after_rendering, test_queue_ranks):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        storage.cleanup()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Receipt View Test
+Checks that GET /transactions/{id}/receipt loads the transaction with its
+person, aliases and location in one SELECT (items without multiplying rows),
+serves repeat views from the short-lived cache (with the viewing user filled
+in per request) until crud_transaction changes the transaction, and queues
+the receipt_printed flag instead of committing it; then writes queued flags
+with one UPDATE and keeps them for the next flush when that fails
+
+The receipt query and the flag UPDATE are compiled for PostgreSQL by recording
+sessions, so this runs without a database.
+
+Usage:
+    python test_receipt_views.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import app.core.database as database
+from app.api.v1.endpoints import transactions as endpoints
+from app.crud import crud_transaction
+from app.services.receipt_views import ReceiptViews
+
+LOCATION = uuid.uuid4()
+
+
+class QueryRecorder(Session):
+    """Session that compiles the statement it is asked to run and stops there"""
+
+    class Stop(Exception):
+        pass
+
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+
+    def execute(self, statement, *args, **kwargs):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        raise self.Stop()
+
+
+class RecordingSession:
+    """Session stand-in for the flush: keeps statements and parameters"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.executed = []
+        self.committed = self.rolled_back = self.closed = False
+
+    def execute(self, statement, parameters=None):
+        self.executed.append((str(statement.compile(dialect=postgresql.dialect())), parameters))
+        if self.fail:
+            raise RuntimeError("connection reset")
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+def transaction(printed=False):
+    created = datetime(2025, 3, 1, 9, 30)
+    return SimpleNamespace(
+        id=uuid.uuid4(), location_id=LOCATION, updated_at=created, receipt_printed=printed,
+        receipt_number="RCT-20250301-0001", transaction_number="TXN-20250301-0001", created_at=created,
+        processed_at=created, total_amount=Decimal("48000"), payment_reference=None,
+        payment_method=SimpleNamespace(value="CASH"),
+        person=SimpleNamespace(first_name="Jean", surname="RAKOTO", aliases=[
+            SimpleNamespace(document_type="MADAGASCAR_ID", is_primary=True, document_number="101234567890"),
+        ]),
+        location=SimpleNamespace(name="Antananarivo", street_address="Rue 1", locality="Analakely", full_code="T01"),
+        items=[SimpleNamespace(description="Application fee", amount=Decimal("38000")),
+               SimpleNamespace(description="Theory test", amount=Decimal("10000"))],
+    )
+
+
+def user(name, locations=(LOCATION,)):
+    return SimpleNamespace(first_name=name, last_name="Cashier", username=name.lower(),
+                           can_access_location=lambda location_id: location_id in locations)
+
+
+def use_views(views):
+    endpoints.receipt_views = views
+    return views
+
+
+def test_single_query():
+    db = QueryRecorder()
+    try:
+        crud_transaction.get_for_receipt(db, id=uuid.uuid4())
+    except QueryRecorder.Stop:
+        pass
+    assert len(db.statements) == 1
+    sql = db.statements[0]
+    for table in ("persons", "person_aliases", "locations"):
+        assert f"JOIN {table}" in sql, (table, sql)
+    # Items come with a separate IN query, so rows don't multiply by aliases
+    assert "transaction_items" not in sql
+
+
+def test_repeat_views_are_cached():
+    views = use_views(ReceiptViews())
+    paid = transaction()
+    loads = []
+    original = crud_transaction.get_for_receipt
+    crud_transaction.get_for_receipt = lambda db, id: loads.append(id) or (paid if id == paid.id else None)
+    try:
+        first = endpoints.get_transaction_receipt(paid.id, db=None, current_user=user("Alice"))
+        second = endpoints.get_transaction_receipt(paid.id, db=None, current_user=user("Bob"))
+        assert loads == [paid.id], "repeat view queried the database"
+        assert [item["amount"] for item in first["items"]] == [38000.0, 10000.0]
+        assert first["person_id"] == "101234567890" and first["total_amount"] == 48000.0
+        assert (first["processed_by"], second["processed_by"]) == ("Alice Cashier", "Bob Cashier")
+        assert {**first, "processed_by": None, "processed_by_id": None} == {**second, "processed_by": None, "processed_by_id": None}
+        assert list(first) == list(endpoints._receipt_data(paid)), "field order changed"
+
+        # Printed flag queued once, not committed
+        assert views.is_marked(paid.id) and views.status()["pending_printed_flags"] == 1
+
+        # Location check still applies to cached receipts
+        try:
+            endpoints.get_transaction_receipt(paid.id, db=None, current_user=user("Eve", locations=()))
+            raise AssertionError("cached receipt served to another location")
+        except HTTPException as e:
+            assert e.status_code == 403
+
+        try:
+            endpoints.get_transaction_receipt(uuid.uuid4(), db=None, current_user=user("Alice"))
+            raise AssertionError("missing transaction")
+        except HTTPException as e:
+            assert e.status_code == 404
+
+        # Already printed receipts are not queued again; expired entries are read again
+        printed = transaction(printed=True)
+        crud_transaction.get_for_receipt = lambda db, id: loads.append(id) or printed
+        views.settings = views.settings.model_copy(update={"RECEIPT_CACHE_SECONDS": 0})
+        endpoints.get_transaction_receipt(printed.id, db=None, current_user=user("Alice"))
+        endpoints.get_transaction_receipt(printed.id, db=None, current_user=user("Alice"))
+        assert loads.count(printed.id) == 2 and not views.is_marked(printed.id)
+    finally:
+        crud_transaction.get_for_receipt = original
+
+
+def test_newer_version_kept():
+    views = ReceiptViews()
+    paid = transaction()
+    newer = SimpleNamespace(**{**vars(paid), "updated_at": datetime(2025, 3, 2)})
+    views.put(newer, {"version": "new"}, time.monotonic())
+    views.put(paid, {"version": "old"}, time.monotonic())
+    assert views.get(paid.id).receipt == {"version": "new"}
+    views.invalidate(paid.id)
+    assert views.get(paid.id) is None
+
+
+def test_changes_invalidate():
+    views = use_views(ReceiptViews())
+    paid = transaction()
+    # app.crud.crud_transaction is the CRUD instance, not the module
+    sys.modules["app.crud.crud_transaction"].receipt_views = views
+
+    # A read that started before the change is not cached
+    read_at = time.monotonic()
+    views.invalidate(paid.id)
+    views.put(paid, {"stale": True}, read_at)
+    assert views.get(paid.id) is None
+    views.put(paid, {"stale": False}, time.monotonic())
+    assert views.get(paid.id).receipt == {"stale": False}
+
+    # Writes through crud_transaction drop the cached receipt
+    class NoRow:
+        def query(self, model):
+            return self
+
+        def get(self, id):
+            return None
+
+    crud_transaction.remove(NoRow(), id=paid.id)
+    assert views.get(paid.id) is None
+
+    views.put(paid, {"stale": False}, time.monotonic())
+    db = SimpleNamespace(commit=lambda: None)
+    crud_transaction.complete_payment(db, transaction=SimpleNamespace(**{**vars(paid), "items": []}), payment_method="CASH")
+    assert views.get(paid.id) is None
+
+
+def test_flush():
+    views = ReceiptViews()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    views.mark_printed(first, datetime(2025, 3, 1, 10, 0))
+    views.mark_printed(first, datetime(2025, 3, 1, 9, 0))
+    views.mark_printed(second, datetime(2025, 3, 1, 11, 0))
+
+    session_local = database.SessionLocal
+    try:
+        failing = RecordingSession(fail=True)
+        database.SessionLocal = lambda: failing
+        assert views.flush() == 0 and failing.rolled_back and failing.closed
+        assert views.status()["pending_printed_flags"] == 2, "flags lost on a failed flush"
+
+        db = RecordingSession()
+        database.SessionLocal = lambda: db
+        assert views.flush() == 2 and db.committed
+    finally:
+        database.SessionLocal = session_local
+
+    assert len(db.executed) == 1
+    sql, parameters = db.executed[0]
+    assert sql.lstrip().startswith("UPDATE transactions") and "NOT t.receipt_printed" in sql and "updated_at" not in sql
+    assert dict(zip(parameters["ids"], parameters["printed_at"])) == {
+        str(first): datetime(2025, 3, 1, 9, 0), str(second): datetime(2025, 3, 1, 11, 0)
+    }
+    assert views.flush() == 0 and views.status()["flushed"] == 2
+
+
+if __name__ == "__main__":
+    try:
+        print("🧾 Transaction receipt views")
+        print("=" * 50)
+        for test in (test_single_query, test_repeat_views_are_cached, test_newer_version_kept, test_changes_invalidate, test_flush):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        storage.cleanup()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Storage Ledger Test
+Checks that the usage ledger follows card/issue saves and deletes, that
+reconcile repairs drift, and compares report latency against walking the tree
+
+Usage:
+    python test_storage_ledger.py
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.card_file_manager import CardFileManager
+from app.services.issue_file_manager import IssueFileManager
+from app.services.storage_ledger import StorageLedger
+
+BENCHMARK_JOBS = 20000
+
+
+def managers(directory: Path):
+    """Card/issue managers and a ledger rooted in a temporary storage directory"""
+    ledger = StorageLedger(directory)
+    # The package re-exports the manager instances under the module names
+    sys.modules[CardFileManager.__module__].storage_ledger = ledger
+    sys.modules[IssueFileManager.__module__].storage_ledger = ledger
+    cards = CardFileManager()
+    cards.base_path = directory
+    cards.cards_path = directory / "cards"
+    issues = IssueFileManager()
+    issues.base_path = directory
+    issues.issues_path = directory / "issues"
+    return cards, issues, ledger
+
+
+def card_files(size: int = 1000):
+    return {name: base64.b64encode(os.urandom(size)).decode()
+            for name in ("front_image", "back_image", "front_pdf", "back_pdf", "combined_pdf")}
+
+
+def walked_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def test_saves_and_deletes_tracked():
+    with tempfile.TemporaryDirectory() as directory:
+        cards, issues, ledger = managers(Path(directory))
+        day = datetime(2025, 1, 15)
+        jobs = [str(uuid.uuid4()) for _ in range(3)]
+        for job in jobs:
+            cards.save_card_files(job, card_files(), created_at=day)
+        cards.save_card_files(jobs[0], card_files(2000), created_at=day)  # Regenerated, overwritten
+        cards.save_batch_sheet("batch-1", b"%PDF" + os.urandom(500), created_at=day + timedelta(days=1))
+
+        stats = cards.get_storage_statistics()
+        assert stats["total_files"] == 16 and stats["total_size_bytes"] == walked_bytes(cards.cards_path)
+        assert stats["total_print_jobs"] == 3 and stats["total_directories"] == 4
+        assert stats["by_file_type"]["combined.pdf"] == {"files": 3, "bytes": 4000}
+
+        daily = cards.get_daily_storage_usage()
+        assert [entry["day"] for entry in daily] == ["2025-01-15", "2025-01-16"]
+        assert daily[0]["files"] == 15 and daily[1]["by_type"]["sheet.pdf"]["files"] == 1
+
+        cards.delete_print_job_files(jobs[1], created_at=day)
+        stats = cards.get_storage_statistics()
+        assert stats["total_files"] == 11 and stats["total_size_bytes"] == walked_bytes(cards.cards_path)
+        assert stats["total_print_jobs"] == 2
+
+        issue_id = uuid.uuid4()
+        issues.save_console_logs(issue_id, ["first", "second"], created_at=day)
+        issues.save_screenshot(issue_id, b"not an image", created_at=day)
+        stats = issues.get_storage_stats()
+        assert stats["total_files"] == 2 and stats["total_size_bytes"] == walked_bytes(issues.issues_path)
+        issues.delete_issue_files(issue_id, created_at=day)
+        assert issues.get_storage_stats()["total_files"] == 0
+
+        report = ledger.reconcile()
+        assert not any(area["drift_detected"] for area in report["areas"].values()), report
+
+
+def test_large_directories_and_reconcile():
+    with tempfile.TemporaryDirectory() as directory:
+        cards, _, ledger = managers(Path(directory))
+        cards.settings = cards.settings.model_copy(update={"STORAGE_LARGE_DIRECTORY_MB": 0})
+        day = datetime(2025, 2, 1)
+        cards.save_card_files("job-a", card_files(5000), created_at=day)
+        cards.save_card_files("job-b", card_files(100), created_at=day)
+
+        # Drift: a file removed by hand, one added by hand, one rewritten, an empty directory
+        job_a = cards.cards_path / "2025" / "02" / "01" / "job-a"
+        (job_a / "back.png").unlink()
+        (job_a / "notes.txt").write_bytes(b"x" * 42)
+        (cards.cards_path / "2025" / "02" / "01" / "job-b" / "front.pdf").write_bytes(b"y" * 7)
+        (cards.cards_path / "2025" / "02" / "02" / "job-c").mkdir(parents=True)
+
+        dry = ledger.reconcile(["cards"], dry_run=True)["areas"]["cards"]
+        assert dry["drift_detected"] and dry["missing_from_ledger"] == 1
+        assert dry["no_longer_on_disk"] == 1 and dry["size_changed"] == 1
+        assert cards.get_storage_statistics()["ledger_reconciled_at"] is None
+
+        ledger.reconcile(["cards"])
+        stats = cards.get_storage_statistics()
+        assert stats["total_size_bytes"] == walked_bytes(cards.cards_path) and stats["ledger_reconciled_at"]
+        assert stats["by_file_type"]["notes.txt"] == {"files": 1, "bytes": 42}
+
+        bloat = cards.get_directory_bloat_report()
+        assert [entry["directory"] for entry in bloat["large_directories"]] == [str(job_a), str(job_a.parent / "job-b")]
+        assert bloat["empty_directories"] == [str(job_a.parent.parent / "02" / "job-c")] and bloat["bloat_detected"]
+        assert not ledger.reconcile(["cards"])["areas"]["cards"]["drift_detected"]
+
+
+def benchmark():
+    with tempfile.TemporaryDirectory() as directory:
+        cards, _, ledger = managers(Path(directory))
+        start_day = datetime(2024, 1, 1)
+        print(f"Populating {BENCHMARK_JOBS:,} print jobs ({BENCHMARK_JOBS * 5:,} files)...")
+        for index in range(BENCHMARK_JOBS):
+            job_dir = cards._get_print_job_directory(f"job-{index}", start_day + timedelta(days=index % 365))
+            job_dir.mkdir(parents=True, exist_ok=True)
+            for name in ("front.png", "back.png", "front.pdf", "back.pdf", "combined.pdf"):
+                (job_dir / name).write_bytes(b"x" * 64)
+        start = time.perf_counter()
+        ledger.reconcile(["cards"])
+        print(f"    reconcile (one walk)         {time.perf_counter() - start:8.3f} s")
+
+        start = time.perf_counter()
+        walked = sum(os.stat(os.path.join(root, name)).st_size
+                     for root, _, files in os.walk(cards.cards_path) for name in files)
+        print(f"    os.walk + stat (previous)    {time.perf_counter() - start:8.3f} s per report (warm cache)")
+        for label, report in (("get_storage_statistics", cards.get_storage_statistics),
+                              ("get_directory_bloat_report", cards.get_directory_bloat_report),
+                              ("get_daily_storage_usage", cards.get_daily_storage_usage)):
+            start = time.perf_counter()
+            for _ in range(20):
+                report()
+            print(f"    {label:<28} {(time.perf_counter() - start) / 20 * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    print("📒 Storage usage ledger")
+    print("=" * 50)
+    for test in (test_saves_and_deletes_tracked, test_large_directories_and_reconcile):
+        test()
+        print(f"   ✓ {test.__name__}")
+    print()
+    benchmark()
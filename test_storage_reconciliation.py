@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Storage Reconciliation Test
+Checks orphan/missing detection, the grace period, quarantine and cold archive
+handling of the storage reconciliation on a synthetic tree, and compares the
+merge-join with the per-file membership check of cleanup_orphaned_images
+
+The database side is replaced by in-memory rows (InMemoryReconciliation), so
+this runs without PostgreSQL; the queries themselves are exercised against a
+real database only.
+
+Usage:
+    python test_storage_reconciliation.py [templates]     # benchmark size, default 20000
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.cold_archive import cold_archive
+from app.services.fingerprint_image_service import FingerprintImageService
+from app.services.storage_reconciliation import HEX_DIGITS, StorageReconciliation, merge_join
+
+DEFAULT_TEMPLATES = 20000
+DAY = "2025/03/04"
+OLD = time.time() - 7 * 24 * 3600
+
+
+class NoSession:
+    def close(self):
+        pass
+
+
+class InMemoryReconciliation(StorageReconciliation):
+    """Reconciliation against in-memory rows instead of PostgreSQL"""
+
+    def __init__(self, base_path: Path, templates=(), biometric_rows=(), jobs=None):
+        super().__init__(base_path)
+        self.templates = sorted(templates)
+        self.biometric_rows = list(biometric_rows)  # (application_id, file_path, license_ready_path)
+        self.jobs = jobs or {}  # job_id -> stored relative paths
+
+    def _session(self):
+        return NoSession()
+
+    def _biometric_days(self, db):
+        prefix = self._biometric_prefix()
+        return {path[len(prefix):len(prefix) + 10] for _, path, _ in self.biometric_rows if path.startswith(prefix)}
+
+    def _card_days(self, db):
+        return {paths[0][6:16] for paths in self.jobs.values() if paths}
+
+    def _fingerprint_ids(self, db, digit):
+        position = HEX_DIGITS.index(digit)
+        upper = HEX_DIGITS[position + 1] if position + 1 < len(HEX_DIGITS) else None
+        return [i for i in self.templates if (not position or i[0] >= digit) and (not upper or i[0] < upper)]
+
+    def _biometric_references(self, db, day):
+        root, prefix = self._biometric_prefix(), self._biometric_prefix(day)
+        return sorted({path[len(root):] for _, file_path, license_ready in self.biometric_rows
+                       for path in (file_path, license_ready) if path and path.startswith(prefix)})
+
+    def _biometric_referenced_names(self, db, application_ids):
+        return {(application_id, path.rsplit("/", 1)[-1]) for application_id, file_path, license_ready in self.biometric_rows
+                for path in (file_path, license_ready) if path and application_id in application_ids}
+
+    def _card_jobs(self, db, day):
+        prefix = f"cards/{day}/"
+        return {paths[0][len(prefix):].split("/")[0]: [path.rsplit("/", 1)[-1] for path in paths]
+                for paths in self.jobs.values() if paths and paths[0].startswith(prefix)}
+
+    def _card_jobs_with_files(self, db, names):
+        return {name for name in names if self.jobs.get(name)}
+
+
+def touch(path: Path, age: float = OLD, content: bytes = b"x" * 100):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    os.utime(path, (age, age))
+    os.utime(path.parent, (age, age))
+    return path
+
+
+def test_merge_join():
+    assert list(merge_join([], [])) == []
+    assert list(merge_join("acdf", "adef")) == [
+        ("matched", "a"), ("orphan", "c"), ("matched", "d"), ("missing", "e"), ("matched", "f")
+    ]
+    assert list(merge_join("xyz", "")) == [("orphan", "x"), ("orphan", "y"), ("orphan", "z")]
+
+
+def test_findings_and_quarantine():
+    base = Path(storage.name)  # Shared with the cold archive and storage ledger
+    kept, orphan_image, missing_image = (str(uuid.uuid4()) for _ in range(3))
+    touch(base / "fingerprints" / f"{kept}.png")
+    touch(base / "fingerprints" / f"{orphan_image}.png")
+    touch(base / "fingerprints" / "NOT-A-UUID.png")
+    touch(base / "fingerprints" / f"{uuid.uuid4()}.png", age=time.time())  # Upload in flight
+
+    application, moved_application, gone_application = (str(uuid.uuid4()) for _ in range(3))
+    app_dir = base / "biometric" / DAY / application
+    standard = touch(app_dir / "license_photo_standard_1.jpg")
+    license_ready = touch(app_dir / "license_photo_license_ready_1.jpg")
+    stray = touch(app_dir / "license_photo_standard_0.jpg")  # Superseded capture
+    moved = touch(base / "biometric" / DAY / moved_application / "signature.jpg")
+    biometric_rows = [
+        (application, str(standard), str(license_ready)),
+        (moved_application, f"/old/storage/biometric/{DAY}/{moved_application}/signature.jpg", None),
+        (gone_application, str(base / "biometric" / "2025/03/05" / gone_application / "fingerprint.png"), None),
+    ]
+
+    job, orphan_job, files_deleted_job, moved_job, missing_job, archived_job = (str(uuid.uuid4()) for _ in range(6))
+    for job_id in (job, orphan_job, files_deleted_job, moved_job):
+        for name in ("front.png", "back.png", "combined.pdf"):
+            touch(base / "cards" / DAY / job_id / name)
+    (base / "cards" / DAY / job / "back.png").unlink()
+    os.utime(base / "cards" / DAY / job, (OLD, OLD))
+    for name in ("front.png", "back.png", "combined.pdf"):
+        touch(base / "cards" / "2025/01/02" / archived_job / name)
+    cold_archive.compact_day("cards", base / "cards" / "2025/01/02")
+    assert not (base / "cards" / "2025/01/02" / archived_job).exists()
+    jobs = {
+        job_id: [f"cards/{day}/{job_id}/{name}" for name in ("front.png", "back.png", "combined.pdf")]
+        for job_id, day in ((job, DAY), (missing_job, DAY), (archived_job, "2025/01/02"))
+    }
+    jobs[moved_job] = [f"cards/2024/12/31/{moved_job}/front.png"]  # Stored path disagrees with the tree
+    jobs[files_deleted_job] = []  # Files marked deleted, directory left behind
+
+    reconciliation = InMemoryReconciliation(base, templates=[kept, missing_image], biometric_rows=biometric_rows, jobs=jobs)
+    report = reconciliation.run()
+    fingerprints, biometric, cards = (report["areas"][area] for area in ("fingerprints", "biometric", "cards"))
+
+    assert fingerprints["shards"] == 16 and fingerprints["recent_skipped"] == 1
+    assert sorted(fingerprints["orphan_sample"]) == sorted([f"fingerprints/{orphan_image}.png", "fingerprints/NOT-A-UUID.png"])
+    assert fingerprints["missing_sample"] == [f"fingerprints/{missing_image}.png"]
+
+    assert biometric["orphan_sample"] == [str(stray.relative_to(base))], biometric
+    assert biometric["referenced_elsewhere"] == 1  # Same application and file name under an old storage path
+    assert biometric["missing_sample"] == [f"biometric/2025/03/05/{gone_application}/fingerprint.png"]
+
+    assert sorted(cards["orphan_sample"]) == sorted(f"cards/{DAY}/{name}" for name in (orphan_job, files_deleted_job))
+    assert cards["referenced_elsewhere"] == 1
+    assert sorted(cards["missing_sample"]) == sorted([
+        f"cards/{DAY}/{missing_job}", f"cards/{DAY}/{job}/back.png", f"cards/2024/12/31/{moved_job}"
+    ])
+    assert all(archived_job not in path for path in cards["orphan_sample"] + cards["missing_sample"])
+    assert (base / report["findings_file"]).read_text().count("\n") == sum(
+        counts["orphans"] + counts["missing"] + counts["referenced_elsewhere"] for counts in report["areas"].values()
+    )
+    assert stray.exists(), "report-only run moved files"
+
+    report = reconciliation.run(["biometric", "cards"], quarantine=True)
+    quarantine = base / report["quarantine_directory"]
+    assert report["areas"]["cards"]["quarantined"] == 2 and report["areas"]["biometric"]["quarantined"] == 1
+    assert not stray.exists() and (quarantine / stray.relative_to(base)).read_bytes() == b"x" * 100
+    assert (quarantine / "cards" / DAY / orphan_job / "combined.pdf").exists()
+    assert standard.exists() and moved.exists() and (base / "cards" / DAY / job / "front.png").exists()
+    assert reconciliation.latest_run("cards")["run_id"] == report["run_id"]
+
+    again = reconciliation.run(["biometric", "cards"])
+    assert again["areas"]["biometric"]["orphans"] == 0 and again["areas"]["cards"]["orphans"] == 0
+
+
+def benchmark(templates: int):
+    with tempfile.TemporaryDirectory() as directory:
+        base = Path(directory)
+        ids = [str(uuid.uuid4()) for _ in range(templates)]
+        orphans = [str(uuid.uuid4()) for _ in range(templates // 20)]
+        (base / "fingerprints").mkdir()
+        for template_id in ids + orphans:
+            (base / "fingerprints" / f"{template_id}.png").write_bytes(b"")
+            os.utime(base / "fingerprints" / f"{template_id}.png", (OLD, OLD))
+        print(f"{templates:,} fingerprint templates, {len(orphans):,} orphaned images")
+
+        service = FingerprintImageService()
+        service.fingerprints_path = base / "fingerprints"
+        # Previous check: each image looked up in the list of template ids
+        valid = list(ids)
+        tracemalloc.start()
+        start = time.perf_counter()
+        found = sum(1 for image in service.fingerprints_path.glob("*.png") if image.stem not in valid)
+        per_file = time.perf_counter() - start
+        per_file_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert found == len(orphans)
+
+        reconciliation = InMemoryReconciliation(base, templates=ids)
+        tracemalloc.start()
+        start = time.perf_counter()
+        report = reconciliation.run(["fingerprints"])
+        merged = time.perf_counter() - start
+        merged_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert report["areas"]["fingerprints"]["orphans"] == len(orphans)
+
+        print(f"    per-file list lookup       {per_file:8.3f} s   peak {per_file_peak / 1024 / 1024:6.1f} MB")
+        print(f"    sharded merge-join         {merged:8.3f} s   peak {merged_peak / 1024 / 1024:6.1f} MB "
+              f"(ids held in memory by the stand-in database)")
+
+
+if __name__ == "__main__":
+    try:
+        print("🔍 Storage reconciliation")
+        print("=" * 50)
+        for test in (test_merge_join, test_findings_and_quarantine):
+            test()
+            print(f"   ✓ {test.__name__}")
+        print()
+        benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TEMPLATES)
+    finally:
+        storage.cleanup()
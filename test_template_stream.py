@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Template Stream Cursor Test
+Checks that /fingerprint/templates-for-matching/stream pages through every
+template, that the cursor of the last page stays behind the overlap window so
+a template stamped before an already streamed one but committed after it is
+still sent on the next poll, and that pages keep moving forward when more
+changes than one page fall inside the window
+
+Runs the stream query against a SQLite copy of fingerprint_templates, so no
+PostgreSQL is needed.
+
+Usage:
+    python test_template_stream.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+storage = tempfile.TemporaryDirectory()
+os.environ["FILE_STORAGE_PATH"] = storage.name
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import biometric as endpoints
+from app.models.biometric import FingerprintTemplate
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_text(element, compiler, **kw):
+    # Stored as 32 hex digits, the non-native UUID format; sorts like PostgreSQL's uuid
+    return "CHAR(32)"
+
+
+engine = create_engine(f"sqlite:///{os.path.join(storage.name, 'templates.db')}")
+FingerprintTemplate.__table__.create(engine)
+Session = sessionmaker(bind=engine)
+endpoints.SessionLocal = Session
+
+
+def add_template(updated_at, is_active=True):
+    db = Session()
+    template = FingerprintTemplate(
+        id=uuid.uuid4(), person_id=uuid.uuid4(), finger_position=2, template_format="ISO19794-2",
+        template_bytes=os.urandom(32), template_size=32, quality_score=80, is_active=is_active,
+        created_at=updated_at, updated_at=updated_at,
+    )
+    db.add(template)
+    db.commit()
+    template_id = template.id
+    db.close()
+    return template_id
+
+
+def fetch(cursor=None, limit=5000):
+    """One page: ([template ids], has_more, next cursor)"""
+    after = endpoints._decode_template_cursor(cursor) if cursor else None
+    data = b"".join(endpoints._template_stream_chunks(after, None, limit, "none"))
+    assert data[:5] == endpoints.TEMPLATE_STREAM_MAGIC + bytes([endpoints.TEMPLATE_STREAM_VERSION])
+    offset, ids = 5, []
+    while True:
+        (length,) = struct.unpack_from(">I", data, offset)
+        offset += 4
+        if not length:
+            break
+        ids.append(uuid.UUID(bytes=data[offset + 1:offset + 17]))
+        offset += length
+    has_more = data[offset]
+    (cursor_length,) = struct.unpack_from(">H", data, offset + 1)
+    return ids, bool(has_more), data[offset + 3:offset + 3 + cursor_length].decode("ascii")
+
+
+def sync(cursor=None, limit=5000):
+    """Follow pages until has_more is 0; returns every id received and the final cursor"""
+    received = []
+    for _ in range(1000):
+        ids, has_more, cursor = fetch(cursor, limit)
+        received += ids
+        if not has_more:
+            return received, cursor
+    raise AssertionError("paging did not finish")
+
+
+def clear():
+    db = Session()
+    db.query(FingerprintTemplate).delete()
+    db.commit()
+    db.close()
+
+
+def test_late_commit_is_not_skipped():
+    clear()
+    now = datetime.utcnow()
+    old = add_template(now - timedelta(hours=2))
+    received, cursor = sync()
+    assert received == [old]
+
+    # Stamped first, committed last: flushed before the newer row but not yet visible
+    stamped_early = now - timedelta(seconds=5)
+    newer = add_template(now - timedelta(seconds=1))
+    received, cursor = sync(cursor)
+    assert received == [newer]
+    late = add_template(stamped_early)
+
+    received, cursor = sync(cursor)
+    assert late in received, "late committed template skipped"
+    # The overlap repeats recent changes only; clients apply them by id
+    assert set(received) == {late, newer}
+
+    # Once out of the window, nothing is repeated
+    endpoints.TEMPLATE_STREAM_OVERLAP_SECONDS = 0
+    try:
+        received, cursor = sync(cursor)
+        assert set(received) == {late, newer}
+        assert sync(cursor)[0] == []
+    finally:
+        endpoints.TEMPLATE_STREAM_OVERLAP_SECONDS = 60
+
+
+def test_pages_progress_inside_window():
+    clear()
+    now = datetime.utcnow()
+    recent = {add_template(now - timedelta(seconds=index % 20)) for index in range(23)}
+    deleted = add_template(now - timedelta(seconds=3), is_active=False)
+
+    # Full download over several pages inside the window, each template once
+    received, cursor = sync(limit=5)
+    assert len(received) == len(set(received)) and set(received) - {deleted} == recent
+
+    # Incremental polls repeat the window (deletions included) and still finish
+    for _ in range(3):
+        received, next_cursor = sync(cursor, limit=5)
+        assert set(received) == recent | {deleted}
+        assert endpoints._decode_template_cursor(next_cursor) >= endpoints._decode_template_cursor(cursor)
+        cursor = next_cursor
+
+
+if __name__ == "__main__":
+    try:
+        print("🔁 Template stream cursor")
+        print("=" * 50)
+        for test in (test_late_commit_is_not_skipped, test_pages_progress_inside_window):
+            test()
+            print(f"   ✓ {test.__name__}")
+    finally:
+        engine.dispose()
+        storage.cleanup()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Barcode Compression Dictionary Trainer
+Trains a versioned zstd dictionary on synthetic license barcode payloads and
+benchmarks compression ratio/time per level with and without it
+
+The dictionary is written to app/services/barcode_dictionaries/ and picked up
+by LicenseBarcodeService on start. New barcodes use the dictionary named by
+BARCODE_ZSTD_DICTIONARY_ID, which defaults to the shipped v1 (32769), so
+compression with a dictionary is on by default; 0 turns it off, and a newly
+trained version is used once the setting is changed to its id. Barcodes carry
+the id in their zstd frame header, so every dictionary ever shipped must be
+kept for decoding.
+
+Usage:
+    python train_barcode_dictionary.py train <version>   # write license_payload_v<version>.zstdict
+    python train_barcode_dictionary.py benchmark         # compare levels with/without dictionaries
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import cbor2
+import zstandard as zstd
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.barcode_service import (
+    BARCODE_DICTIONARY_DIR, BARCODE_DICTIONARY_ID_BASE, load_compression_dictionaries
+)
+
+DICTIONARY_SIZE = 4096
+TRAINING_SAMPLES = 5000
+BENCHMARK_SAMPLES = 500
+BENCHMARK_LEVELS = [1, 3, 6, 9, 12, 19]
+
+FIRST_NAMES = ["Jean", "Marie", "Hery", "Fara", "Rivo", "Nirina", "Tiana", "Aina", "Lova", "Mamy",
+               "Soa", "Haja", "Voahangy", "Tojo", "Andry", "Zo", "Feno", "Miora", "Sitraka", "Koto"]
+SURNAMES = ["RAKOTO", "RABE", "RASOA", "RANDRIANASOLO", "RAZAFINDRAKOTO", "ANDRIANARIVO",
+            "RAHARISON", "RAKOTOMALALA", "RANAIVO", "RAZAFY", "RATSIMBA", "RAMAROSON"]
+CATEGORIES = ["A1", "A2", "A", "B1", "B", "B2", "BE", "C1", "C", "C1E", "CE", "D1", "D", "D2", "D1E", "DE"]
+LOCATION_CODES = ["T01", "T02", "A01", "F01", "M01", "D01", "U01"]
+
+
+def synthetic_payload(rng: random.Random) -> bytes:
+    """CBOR payload shaped like create_cbor_payload_compressed_encrypted (without photo)"""
+    birth = datetime(rng.randint(1950, 2006), rng.randint(1, 12), rng.randint(1, 28))
+    issued = datetime(rng.randint(2015, 2026), rng.randint(1, 12), rng.randint(1, 28))
+    data = {
+        "v": 4,
+        "c": "MG",
+        "n": f"{rng.choice(SURNAMES)} {rng.choice(FIRST_NAMES)}",
+        "i": f"{rng.randint(100000000000, 999999999999)}",
+        "s": rng.choice("MF"),
+        "b": int(birth.timestamp()),
+        "f": int(issued.timestamp()),
+        "t": int(issued.replace(year=issued.year + 5).timestamp()),
+        "o": sorted(rng.sample(CATEGORIES, rng.randint(1, 3))),
+        "r": sorted(rng.sample(["glasses", "prosthetics", "auto", "electric", "disabled"], rng.randint(0, 2))),
+    }
+    if rng.random() < 0.9:
+        data["d"] = f"{rng.choice(LOCATION_CODES)}{rng.randint(0, 99999999):08d}{rng.randint(0, 9)}"
+    return cbor2.dumps({"data": data})
+
+
+def train(version: int):
+    rng = random.Random(version)
+    samples = [synthetic_payload(rng) for _ in range(TRAINING_SAMPLES)]
+    dictionary = zstd.train_dictionary(DICTIONARY_SIZE, samples, dict_id=BARCODE_DICTIONARY_ID_BASE + version)
+    BARCODE_DICTIONARY_DIR.mkdir(parents=True, exist_ok=True)
+    path = BARCODE_DICTIONARY_DIR / f"license_payload_v{version}.zstdict"
+    if path.exists():
+        print(f"❌ {path} already exists - dictionaries are immutable once shipped, train a new version")
+        sys.exit(1)
+    path.write_bytes(dictionary.as_bytes())
+    print(f"✅ Wrote {path} ({len(dictionary.as_bytes())} bytes, dict id {dictionary.dict_id()})")
+
+
+def benchmark():
+    rng = random.Random(12345)
+    samples = [synthetic_payload(rng) for _ in range(BENCHMARK_SAMPLES)]
+    raw_total = sum(len(sample) for sample in samples)
+    dictionaries = {"none": None, **{f"id {dict_id}": d for dict_id, d in load_compression_dictionaries().items()}}
+
+    print(f"{len(samples)} synthetic payloads, average {raw_total / len(samples):.0f} bytes")
+    print(f"{'dictionary':>12} | {'level':>5} | {'avg size':>8} | {'ratio':>5} | {'compress':>9} | {'decompress':>10}")
+    for name, dictionary in dictionaries.items():
+        for level in BENCHMARK_LEVELS:
+            if dictionary is not None:
+                compressor = zstd.ZstdCompressor(level=level, dict_data=dictionary)
+                decompressor = zstd.ZstdDecompressor(dict_data=dictionary)
+            else:
+                compressor = zstd.ZstdCompressor(level=level)
+                decompressor = zstd.ZstdDecompressor()
+
+            start = time.perf_counter()
+            compressed = [compressor.compress(sample) for sample in samples]
+            compress_time = (time.perf_counter() - start) / len(samples)
+
+            start = time.perf_counter()
+            for frame in compressed:
+                decompressor.decompress(frame)
+            decompress_time = (time.perf_counter() - start) / len(samples)
+
+            compressed_total = sum(len(frame) for frame in compressed)
+            print(f"{name:>12} | {level:>5} | {compressed_total / len(samples):>6.0f} B | "
+                  f"{raw_total / compressed_total:>5.2f} | {compress_time * 1e6:>6.1f} us | {decompress_time * 1e6:>7.1f} us")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "train":
+        train(int(sys.argv[2]))
+    elif len(sys.argv) == 2 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        print(__doc__)
+        sys.exit(1)